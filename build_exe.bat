@@ -28,6 +28,8 @@ pyinstaller --noconsole --onedir --name="MonitorBeltMate" ^
  --hidden-import=uvicorn.lifespan ^
  --hidden-import=uvicorn.lifespan.on ^
  --hidden-import=sqlalchemy.sql.default_comparator ^
+ --hidden-import=sqlalchemy.dialects.sqlite.aiosqlite ^
+ --hidden-import=aiosqlite ^
  --hidden-import=engineio.async_drivers.asgi ^
  entry_point.py
 
@@ -17,14 +17,24 @@ from repositories.database import init_db
 
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session  # Dodano
-from repositories.database import init_db, get_db, SessionLocal
+from repositories.database import init_db, get_db, SessionLocal, WriterSessionLocal, engine, STORAGE_PROFILE, \
+    storage_maintenance
+from repositories.measure_migration import MeasureBackfill
+from repositories.measure_partitions import measure_partitions
+from repositories.measure_rollups import measure_rollups
 from routers import measure_data, aliases, static_params, commands, app_interface, dynamic_readings, devices, \
     network_observer, admins
 from routers.service_mode import router as service_mode_router
 from routers import device_selection
 from routers import measure_data
 from routers import reports
-from models.models import Users  # Dodano model Users
+from models.models import Users, MeasureData  # Dodano model Users
+from services.key_ring import rc4_key_ring
+from services.tcp_listener import IntegratorTcpServer
+from services.db_executor import shutdown_executors
+from services.ingest_queue import measure_write_queue
+from services.frame_recorder import frame_recorder
+from services.measure_compression import measure_compressor
 
 
 import uvicorn
@@ -166,6 +176,101 @@ async def log_requests(request: Request, call_next):
 # Inicjalizacja bazy danych
 init_db()
 
+# Wstępne wyliczenie kluczy RC4: pierścień kluczy indeksowany RC4_KEY_ID
+# (slot 0x00 - klucze z konfiguracji, dodatkowe klucze ze zmiennej RC4_KEY_RING)
+try:
+    rc4_key_ring.load_env(commands.RC4_KEY1, commands.RC4_KEY2, commands.RC4_ITERATIONS)
+except Exception as e:
+    logger.error(f"Błąd podczas wyliczania kluczy RC4: {e}")
+
+# Nasłuch TCP integratorów (ramki protokołu bez HTTP) - domyślnie wyłączony (port 0).
+# Włączenie: ustaw numer portu przed uruchomieniem serwera, np. w run.bat
+#   set INTEGRATOR_TCP_PORT=8081
+# i otwórz ten port w zaporze. Przy uvicorn --workers N port zajmuje tylko pierwszy
+# proces (pozostałe logują błąd bind), integratory HTTP (/commands/analyze) działają bez zmian.
+INTEGRATOR_TCP_HOST = os.getenv("INTEGRATOR_TCP_HOST", "0.0.0.0")
+INTEGRATOR_TCP_PORT = int(os.getenv("INTEGRATOR_TCP_PORT", "0"))
+integrator_tcp_server = IntegratorTcpServer(commands.RC4_KEY1, commands.RC4_KEY2, commands.RC4_ITERATIONS)
+
+
+# Zapis odroczony MeasureData (kolejka z zapisem paczkami), 0 - zapis bezpośredni
+INGEST_QUEUE_ENABLED = os.getenv("INGEST_QUEUE_ENABLED", "1") != "0"
+
+# Rejestrator surowych ramek (plik pierścieniowy), pusta ścieżka - wyłączony
+FRAME_RECORDER_PATH = os.getenv("FRAME_RECORDER_PATH", "")
+FRAME_RECORDER_SLOTS = int(os.getenv("FRAME_RECORDER_SLOTS", "100000"))
+
+
+# Uzupełnianie kolumn liczbowych MeasureData w starszych bazach (w tle, paczkami)
+MEASURE_BACKFILL_ENABLED = os.getenv("MEASURE_BACKFILL_ENABLED", "1") == "1"
+measure_backfill = MeasureBackfill(engine)
+
+# Przenoszenie zakończonych miesięcy MeasureData do plików partycji (w tle)
+MEASURE_PARTITIONS_ENABLED = os.getenv("MEASURE_PARTITIONS_ENABLED", "0") == "1"
+
+# Przeliczanie agregatów MeasureRollup (rekordy sprzed migracji, przedziały dirty) w tle
+MEASURE_ROLLUPS_ENABLED = os.getenv("MEASURE_ROLLUPS_ENABLED", "1") == "1"
+
+
+@app.on_event("startup")
+async def start_ingestion():
+    logger.info(f"Profil SQLite: {STORAGE_PROFILE._asdict()}")
+    storage_maintenance.start()
+
+    if MEASURE_BACKFILL_ENABLED and measure_backfill.pending():
+        measure_backfill.start()
+
+    if MEASURE_PARTITIONS_ENABLED:
+        measure_partitions.start()
+
+    if MEASURE_ROLLUPS_ENABLED:
+        measure_rollups.start()
+
+    if FRAME_RECORDER_PATH:
+        try:
+            frame_recorder.open(FRAME_RECORDER_PATH, FRAME_RECORDER_SLOTS)
+        except OSError as e:
+            logger.error(f"Nie można otworzyć pliku rejestratora ramek {FRAME_RECORDER_PATH}: {e}")
+
+    if INGEST_QUEUE_ENABLED:
+        measure_write_queue.start()
+
+    if not INTEGRATOR_TCP_PORT:
+        return
+    try:
+        await integrator_tcp_server.start(INTEGRATOR_TCP_HOST, INTEGRATOR_TCP_PORT)
+    except OSError as e:
+        logger.error(f"Nie można uruchomić nasłuchu TCP integratorów na porcie {INTEGRATOR_TCP_PORT}: {e}")
+
+
+@app.on_event("shutdown")
+async def stop_ingestion():
+    await integrator_tcp_server.stop()
+    measure_backfill.stop()
+    measure_partitions.stop()
+    measure_rollups.stop()
+    # Dokończenie zadań w pulach wątków bazy danych
+    shutdown_executors(wait=True)
+    # Zapis rekordów wstrzymanych przez kompresję (końce otwartych odcinków)
+    pending = measure_compressor.flush_all()
+    if pending:
+        db = WriterSessionLocal()
+        try:
+            db.bulk_insert_mappings(MeasureData, pending)
+            db.commit()
+        except Exception as e:
+            logger.error(f"Błąd zapisu {len(pending)} rekordów wstrzymanych przez kompresję: {e}")
+            db.rollback()
+        finally:
+            db.close()
+    # Zapis rekordów pozostałych w kolejce
+    measure_write_queue.stop(flush=True)
+    frame_recorder.close()
+    rc4_key_ring.shutdown()
+    # Końcowy checkpoint WAL
+    storage_maintenance.stop()
+
+
 # Automatyczne tworzenie użytkownika admin
 try:
     db = SessionLocal()
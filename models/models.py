@@ -1,24 +1,95 @@
 from repositories.database import Base
-from sqlalchemy import Column, Integer, String, Boolean
+from repositories.rollup_triggers import trigger_statements
+from sqlalchemy import Column, Integer, String, Boolean, Float, Index, DDL, event, text
 
 
 
 
 class MeasureData(Base):
     __tablename__ = 'MeasureData'
+    # Indeksy dla istniejących baz zakłada repositories.migrations
+    __table_args__ = (
+        # Filtr urządzenia + zakres/sortowanie po czasie; wartości w indeksie pokrywają
+        # podsumowania i wykresy bez odczytu wierszy tabeli
+        Index('ix_MeasureData_device_time', 'deviceId', 'timeEpoch', 'speedValue', 'rateValue', 'totalValue'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    # Filtr urządzenia obsługuje ix_MeasureData_device_time (deviceId jest pierwszą kolumną)
     deviceId = Column(String)
     speed = Column(String)
     rate = Column(String)
     total = Column(String)
     currentTime = Column(String)
+    # Wartości liczbowe (wypełniane przy zapisie, dla starszych baz - repositories.measure_migration)
+    speedValue = Column(Float)
+    rateValue = Column(Float)
+    # Licznik sumy: liczby całkowite (uint64 z VERSION 2) zapisywane dokładnie, ułamki SQLite przechowuje jako REAL
+    totalValue = Column(Integer)
+    timeEpoch = Column(Integer, index=True)  # currentTime jako sekundy epoki (czas lokalny integratora)
+    # 1 - currentTime nie jest poprawnym czasem (timeEpoch NULL); rekord poza okresami raportów,
+    # liczony osobno w podsumowaniach (invalid_time_records)
+    timeInvalid = Column(Integer)
+    receivedAt = Column(Integer)            # czas odebrania ramki przez serwer (sekundy epoki)
+
+
+# Wyzwalacze agregatów MeasureRollup dla nowych baz (istniejące - repositories.migrations)
+for _statement in trigger_statements():
+    event.listen(MeasureData.__table__, 'after_create', DDL(_statement.replace('%', '%%')))
+
+
+class MeasureRollup(Base):
+    """Agregat rekordów MeasureData urządzenia w przedziale minutowym, godzinowym lub dobowym"""
+    __tablename__ = 'MeasureRollup'
+    __table_args__ = (
+        Index('ix_MeasureRollup_dirty', 'dirty', sqlite_where=text('dirty = 1')),
+    )
+
+    deviceId = Column(String, primary_key=True)
+    resolution = Column(Integer, primary_key=True)  # długość przedziału [s]: 60, 3600, 86400
+    bucket = Column(Integer, primary_key=True)      # początek przedziału (sekundy epoki, doby od północy)
+    count = Column(Integer, nullable=False)
+    speedCount = Column(Integer, nullable=False)
+    speedSum = Column(Float, nullable=False)
+    speedMin = Column(Float)
+    speedMax = Column(Float)
+    rateCount = Column(Integer, nullable=False)
+    rateSum = Column(Float, nullable=False)
+    rateMin = Column(Float)
+    rateMax = Column(Float)
+    totalCount = Column(Integer, nullable=False)
+    totalSum = Column(Float, nullable=False)
+    firstTime = Column(Integer)
+    lastTime = Column(Integer)
+    lastSpeed = Column(Float)                  # prędkość ostatniego rekordu - czas pracy na granicy przedziałów
+    firstTotal = Column(Float)                 # pierwsza / ostatnia wartość licznika sumy w przedziale
+    lastTotal = Column(Float)
+    totalIncrement = Column(Float, nullable=False)    # przyrost licznika w przedziale (z resetami)
+    runningSeconds = Column(Integer, nullable=False)  # czas pracy (speedValue > 0) w przedziale
+    dirty = Column(Integer, nullable=False, default=0)  # rekordy poza kolejnością - do przeliczenia
+
+
+class MeasureRollupState(Base):
+    """Stan agregatów (np. zakończone przeliczenie rekordów sprzed wyzwalaczy)"""
+    __tablename__ = 'MeasureRollupState'
+
+    name = Column(String, primary_key=True)
+    value = Column(String)
+
+class ReportInterval(Base):
+    """Polityka interwału raportowania urządzenia (services.report_interval); deviceId '*' - polityka domyślna"""
+    __tablename__ = 'ReportInterval'
+
+    deviceId = Column(String, primary_key=True)
+    running = Column(Integer, nullable=False)
+    stopped = Column(Integer, nullable=False)
+    service = Column(Integer, nullable=False)
 
 class Aliases(Base):
     __tablename__ = 'Aliases'
 
     id = Column(Integer, primary_key=True, index=True)
-    deviceId = Column(String)
+    deviceId = Column(String, index=True)
     company = Column(String)
     location = Column(String)
     productName = Column(String)
@@ -27,7 +98,7 @@ class Aliases(Base):
 class StaticParams(Base):
     __tablename__ = 'StaticParams'
     id = Column(Integer, primary_key=True, index=True)
-    deviceId = Column(String)
+    deviceId = Column(String, index=True)
     filterRate = Column(String)
     scaleCapacity = Column(String)
     autoZero = Column(String)
@@ -1,18 +1,28 @@
+import os
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
 from dotenv import load_dotenv
 
+from repositories.sqlite_profile import StorageMaintenance, apply_profile, env_profile
+
 
 # Ładowanie zmiennych środowiskowych
 load_dotenv()
 
-# Konfiguracja bazy danych
+# Konfiguracja bazy danych (DATABASE_PATH - inny plik bazy, np. katalog tymczasowy testów)
 DATABASE_NAME = 'measurement_system.db'
-SQLALCHEMY_DATABASE_URL = f'sqlite:///./{DATABASE_NAME}'
+DATABASE_PATH = os.getenv("DATABASE_PATH", f'./{DATABASE_NAME}')
+SQLALCHEMY_DATABASE_URL = f'sqlite:///{DATABASE_PATH}'
+ASYNC_SQLALCHEMY_DATABASE_URL = f'sqlite+aiosqlite:///{DATABASE_PATH}'
+
+# Profil pracy pliku SQLite (WAL, synchronous, pamięć podręczna) - repositories.sqlite_profile
+STORAGE_PROFILE = env_profile()
 
-# Utworzenie silnika bazy danych
+# Utworzenie silnika bazy danych (ogólny: panel, konfiguracja, migracje)
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={
@@ -20,6 +30,34 @@ engine = create_engine(
         "timeout": 30  # Timeout dla operacji bazodanowych
     }
 )
+apply_profile(engine, STORAGE_PROFILE)
+
+# Silnik zapisu ramek - jedno połączenie, zapisy integratorów wykonywane po kolei
+# bez oczekiwania na połączenie z puli zajętej przez zapytania panelu
+writer_engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={
+        "check_same_thread": False,
+        "timeout": 30
+    },
+    pool_size=1,
+    max_overflow=0,
+    pool_timeout=60
+)
+apply_profile(writer_engine, STORAGE_PROFILE)
+
+# Silnik tylko do odczytu - raporty, wykresy i podsumowania (PRAGMA query_only).
+# W trybie WAL odczyty nie blokują zapisu ramek.
+read_engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={
+        "check_same_thread": False,
+        "timeout": 30
+    },
+    pool_size=int(os.getenv("DB_READ_POOL_SIZE", "4")),
+    max_overflow=4
+)
+apply_profile(read_engine, STORAGE_PROFILE, read_only=True)
 
 # Konfiguracja sesji
 SessionLocal = sessionmaker(
@@ -28,12 +66,50 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+WriterSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=writer_engine
+)
+
+ReadSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=read_engine
+)
+
+# Silnik asynchroniczny (aiosqlite) - zapytania bez blokowania pętli zdarzeń
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    connect_args={
+        "timeout": 30
+    }
+)
+apply_profile(async_engine.sync_engine, STORAGE_PROFILE)
+
+# Konfiguracja sesji asynchronicznej
+AsyncSessionLocal = sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Globalna instancja
+# Okresowe PRAGMA optimize i checkpoint WAL (SQLITE_MAINTENANCE_INTERVAL [s], 0 - wyłączone)
+storage_maintenance = StorageMaintenance(engine, float(os.getenv("SQLITE_MAINTENANCE_INTERVAL", "600")))
+
 # Klasa bazowa dla modeli
 Base = declarative_base()
 
 def init_db():
     """Inicjalizacja bazy danych i tworzenie wszystkich tabel"""
     Base.metadata.create_all(bind=engine)
+    # Starsze bazy - kolumny i indeksy dodawane wersjonowanymi migracjami
+    # (kolumny liczbowe MeasureData wypełniane w tle przez MeasureBackfill)
+    from repositories.migrations import apply_migrations
+    apply_migrations(engine)
 
 def get_db():
     """
@@ -47,5 +123,14 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """
+    Generator sesji asynchronicznej (AsyncSession) dla endpointów async.
+    Zapewnia automatyczne zamykanie sesji po użyciu.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 # Inicjalizacja bazy przy imporcie modułu
 init_db()
\ No newline at end of file
@@ -0,0 +1,222 @@
+# Uruchomienie: python -m repositories.measure_migration [--database measurement_system.db] [--batch-size 5000]
+"""
+Migracja tabeli MeasureData do kolumn liczbowych.
+
+Starsze bazy mają tylko kolumny tekstowe (speed, rate, total, currentTime).
+ensure_typed_columns() dodaje brakujące kolumny liczbowe (ALTER TABLE ADD COLUMN
+nie przepisuje tabeli), a MeasureBackfill wypełnia je paczkami po id - każda
+paczka to krótka, osobna transakcja, więc serwer może przyjmować ramki w trakcie
+migracji. Rekordy do uzupełnienia rozpoznawane są po timeEpoch IS NULL
+i timeInvalid IS NULL, dlatego przerwaną migrację wystarczy uruchomić ponownie.
+
+Rekord, którego currentTime nie jest poprawnym czasem, dostaje timeInvalid = 1
+(timeEpoch zostaje NULL) - migracja kończy się dla niego tak jak dla pozostałych,
+a raporty pokazują liczbę takich rekordów osobno. receivedAt starszych rekordów
+nie jest znany - uzupełniany jest czasem pomiaru (timeEpoch), a dla rekordu bez
+poprawnego czasu czasem poprzedniego rekordu w kolejności zapisu (id).
+
+Rekord jeszcze nieuzupełniony nie należy do żadnego okresu - do końca migracji
+podsumowania, listy, liczniki i raport CSV oznaczają wynik jako niekompletny
+(complete = False, pending_records - MeasurePartitions.count_without_time).
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from typing import List, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, Engine
+
+from services.measure_values import parse_epoch, parse_number, parse_total
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'MeasureData'
+# Kolumny liczbowe i ich typy SQLite (jak w models.MeasureData)
+TYPED_COLUMN_TYPES = {
+    'speedValue': 'FLOAT',
+    'rateValue': 'FLOAT',
+    'totalValue': 'INTEGER',
+    'timeEpoch': 'INTEGER',
+    'timeInvalid': 'INTEGER',
+    'receivedAt': 'INTEGER',
+}
+
+
+def add_typed_columns(connection: Connection) -> List[str]:
+    """
+    Dodaje brakujące kolumny liczbowe do tabeli MeasureData (w bieżącej transakcji)
+
+    Returns:
+        List[str]: Nazwy dodanych kolumn
+    """
+    existing = {row[1] for row in connection.execute(text(f'PRAGMA table_info("{TABLE}")'))}
+    if not existing:
+        return []
+    added = [name for name in TYPED_COLUMN_TYPES if name not in existing]
+    for name in added:
+        connection.execute(text(f'ALTER TABLE "{TABLE}" ADD COLUMN "{name}" {TYPED_COLUMN_TYPES[name]}'))
+    if added:
+        logger.info(f"Dodano kolumny liczbowe MeasureData: {', '.join(added)}")
+    return added
+
+
+def ensure_typed_columns(engine: Engine) -> List[str]:
+    """
+    Dodaje brakujące kolumny liczbowe do tabeli MeasureData
+
+    Returns:
+        List[str]: Nazwy dodanych kolumn
+    """
+    with engine.begin() as connection:
+        return add_typed_columns(connection)
+
+
+class MeasureBackfill:
+    """
+    Uzupełnianie kolumn liczbowych MeasureData paczkami (wznawialne)
+    """
+
+    def __init__(self, engine: Engine, batch_size: int = 5000, pause: float = 0.05):
+        """
+        Args:
+            engine: Silnik bazy danych
+            batch_size: Liczba rekordów w jednej transakcji
+            pause: Przerwa między paczkami [s] - czas dla zapisu bieżących ramek
+        """
+        self.engine = engine
+        self.batch_size = batch_size
+        self.pause = pause
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Statystyki
+        self.rows_updated = 0
+        self.batches = 0
+        self.last_id = 0
+        self.invalid_time = 0
+        self.finished = False
+        # receivedAt ostatniego uzupełnionego rekordu - dla kolejnego rekordu bez poprawnego czasu
+        self._last_received: Optional[int] = None
+
+    def pending(self) -> int:
+        """Liczba rekordów bez wartości liczbowych (bez rekordów oznaczonych timeInvalid)"""
+        with self.engine.connect() as connection:
+            return connection.execute(text(
+                f'SELECT COUNT(*) FROM "{TABLE}" WHERE "timeEpoch" IS NULL AND "timeInvalid" IS NULL'
+            )).scalar()
+
+    def invalid(self) -> int:
+        """Liczba rekordów oznaczonych jako rekordy bez poprawnego czasu (timeInvalid = 1)"""
+        with self.engine.connect() as connection:
+            return connection.execute(text(f'SELECT COUNT(*) FROM "{TABLE}" WHERE "timeInvalid" = 1')).scalar()
+
+    def run_batch(self) -> int:
+        """
+        Uzupełnia jedną paczkę rekordów o id większym niż ostatnio przetworzone
+
+        Returns:
+            int: Liczba przetworzonych rekordów (0 - koniec)
+        """
+        with self.engine.begin() as connection:
+            rows = connection.execute(text(
+                f'SELECT id, speed, rate, total, "currentTime" FROM "{TABLE}" '
+                f'WHERE id > :last_id AND "timeEpoch" IS NULL AND "timeInvalid" IS NULL ORDER BY id LIMIT :limit'
+            ), {"last_id": self.last_id, "limit": self.batch_size}).fetchall()
+            if not rows:
+                return 0
+            updates = []
+            for row in rows:
+                epoch = parse_epoch(row[4])
+                if epoch is not None:
+                    self._last_received = epoch
+                updates.append({"id": row[0], "speed": parse_number(row[1]), "rate": parse_number(row[2]),
+                                "total": parse_total(row[3]), "epoch": epoch, "invalid": int(epoch is None),
+                                "received": self._last_received})
+            connection.execute(text(
+                f'UPDATE "{TABLE}" SET "speedValue" = :speed, "rateValue" = :rate, "totalValue" = :total, '
+                f'"timeEpoch" = :epoch, "timeInvalid" = :invalid, '
+                f'"receivedAt" = COALESCE("receivedAt", :received) WHERE id = :id'
+            ), updates)
+        self.last_id = rows[-1][0]
+        self.rows_updated += len(rows)
+        self.invalid_time += sum(update["invalid"] for update in updates)
+        self.batches += 1
+        return len(rows)
+
+    def run(self, max_batches: Optional[int] = None) -> int:
+        """
+        Uzupełnia rekordy do końca tabeli (lub max_batches paczek)
+
+        Returns:
+            int: Liczba przetworzonych rekordów
+        """
+        processed = 0
+        started = time.perf_counter()
+        while not self._stop.is_set() and (max_batches is None or self.batches < max_batches):
+            count = self.run_batch()
+            if not count:
+                self.finished = True
+                break
+            processed += count
+            if self.pause:
+                self._stop.wait(self.pause)
+        if processed:
+            logger.info(f"Migracja MeasureData: uzupełniono {processed} rekordów w "
+                        f"{time.perf_counter() - started:.1f} s (ostatnie id: {self.last_id})")
+        return processed
+
+    def start(self) -> None:
+        """Uruchamia uzupełnianie w wątku w tle"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="measure-backfill", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def get_stats(self) -> dict:
+        return {
+            "rows_updated": self.rows_updated,
+            "batches": self.batches,
+            "last_id": self.last_id,
+            "invalid_time": self.invalid_time,
+            "finished": self.finished,
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from repositories.migrations import apply_migrations
+
+    parser = argparse.ArgumentParser(description="Uzupełnienie kolumn liczbowych MeasureData")
+    parser.add_argument('--database', default='measurement_system.db', help="plik bazy SQLite")
+    parser.add_argument('--batch-size', dest='batch_size', type=int, default=5000,
+                        help="liczba rekordów w jednej transakcji")
+    parser.add_argument('--pause', type=float, default=0.05, help="przerwa między paczkami [s]")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.database):
+        print(f"Brak pliku bazy: {args.database}", file=sys.stderr)
+        return 1
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    engine = create_engine(f'sqlite:///{args.database}', connect_args={"timeout": 30})
+    apply_migrations(engine)
+    backfill = MeasureBackfill(engine, args.batch_size, args.pause)
+    print(f"Rekordy do uzupełnienia: {backfill.pending()}")
+    backfill.run()
+    print(f"Uzupełniono {backfill.rows_updated} rekordów w {backfill.batches} paczkach, "
+          f"bez poprawnego czasu (timeInvalid): {backfill.invalid()}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
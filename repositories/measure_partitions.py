@@ -0,0 +1,584 @@
+# Uruchomienie: python -m repositories.measure_partitions list | roll | archive RRRRMM --to KATALOG | drop RRRRMM
+"""
+Miesięczne partycje MeasureData.
+
+Tabela MeasureData w głównej bazie przechowuje tylko ostatnie miesiące (partycja
+bieżąca - zapis ramek bez zmian). Zakończone miesiące przenoszone są paczkami do
+osobnych plików {katalog}/MeasureData_RRRRMM.db (ta sama tabela i indeksy), więc:
+- zapytanie o okres czyta tylko pliki miesięcy nachodzących na ten okres
+  oraz tabelę główną (spóźnione rekordy, np. z MEASURE_BATCH), a wyniki łączone
+  są w kolejności czasu,
+- archiwizacja lub usunięcie starego miesiąca to przeniesienie / usunięcie pliku.
+
+Przeniesienie paczki to dwie transakcje: INSERT OR REPLACE do pliku partycji
+(z zachowaniem id), potem DELETE z tabeli głównej - przerwane przeniesienie
+wystarczy powtórzyć. Rekord o największym id zostaje w tabeli głównej, żeby
+SQLite nie użył ponownie id już przeniesionych rekordów.
+"""
+import argparse
+import heapq
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import MetaData, create_engine, func, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from models.models import MeasureData
+from repositories.database import STORAGE_PROFILE, engine
+from repositories.sqlite_profile import apply_profile
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+FILE_PATTERN = re.compile(r'^MeasureData_(\d{6})\.db$')
+COLUMNS = [column.name for column in MeasureData.__table__.columns]
+
+
+def month_key(epoch: int) -> str:
+    """Klucz partycji (RRRRMM, czas lokalny jak timeEpoch) dla sekund epoki"""
+    return datetime.fromtimestamp(epoch).strftime("%Y%m")
+
+
+def month_bounds(key: str) -> Tuple[int, int]:
+    """
+    Returns:
+        Tuple[int, int]: Początek miesiąca i początek następnego (sekundy epoki)
+    """
+    year, month = int(key[:4]), int(key[4:])
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return int(start.timestamp()), int(end.timestamp())
+
+
+def _next_key(key: str) -> str:
+    year, month = int(key[:4]), int(key[4:])
+    return f"{year + 1}01" if month == 12 else f"{year}{month + 1:02d}"
+
+
+def _time_key(measure) -> Tuple[bool, int]:
+    """Klucz sortowania jak ORDER BY timeEpoch w SQLite (NULL na początku)"""
+    return measure.timeEpoch is not None, measure.timeEpoch or 0
+
+
+class MeasurePartitions:
+    """
+    Miesięczne partycje MeasureData: przenoszenie zakończonych miesięcy do plików,
+    kierowanie zapytań o okres do nachodzących partycji i archiwizacja plików
+    """
+
+    def __init__(self, engine: Engine, directory: str, hot_months: int = 2, batch_size: int = 5000,
+                 interval: float = 3600.0):
+        """
+        Args:
+            engine: Silnik głównej bazy (z prawem zapisu)
+            directory: Katalog plików partycji
+            hot_months: Liczba miesięcy (z bieżącym) pozostawianych w tabeli głównej
+            batch_size: Liczba rekordów przenoszonych w jednej paczce
+            interval: Odstęp między przebiegami przenoszenia w tle [s]
+        """
+        self.engine = engine
+        self.directory = directory
+        self.hot_months = max(1, hot_months)
+        self.batch_size = batch_size
+        self.interval = interval
+        self._engines: Dict[str, Engine] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Statystyki
+        self.rows_moved = 0
+        self.months_rolled = 0
+        self.last_rollover: Optional[float] = None
+
+    # ------------------------------------------------------------------ pliki
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"MeasureData_{key}.db")
+
+    def list_partitions(self) -> List[str]:
+        """Klucze (RRRRMM) istniejących plików partycji, rosnąco"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(match.group(1) for match in map(FILE_PATTERN.match, names) if match)
+
+    def partitions_for(self, start_epoch: Optional[int], end_epoch: Optional[int]) -> List[str]:
+        """
+        Partycje nachodzące na zakres [start_epoch, end_epoch] (None - bez ograniczenia)
+        """
+        first = month_key(start_epoch) if start_epoch is not None else None
+        last = month_key(end_epoch) if end_epoch is not None else None
+        return [key for key in self.list_partitions()
+                if (first is None or key >= first) and (last is None or key <= last)]
+
+    def _partition_engine(self, key: str) -> Engine:
+        with self._lock:
+            partition_engine = self._engines.get(key)
+            if partition_engine is None:
+                partition_engine = create_engine(f"sqlite:///{self.path_for(key)}",
+                                                 connect_args={"check_same_thread": False, "timeout": 30})
+                # Pliki partycji w trybie DELETE (bez -wal/-shm), więc archiwizacja to przeniesienie jednego pliku
+                apply_profile(partition_engine, STORAGE_PROFILE._replace(journal_mode="DELETE"), read_only=True)
+                self._engines[key] = partition_engine
+            return partition_engine
+
+    def _release(self, key: str) -> None:
+        with self._lock:
+            partition_engine = self._engines.pop(key, None)
+        if partition_engine is not None:
+            partition_engine.dispose()
+
+    # -------------------------------------------------------------- zapytania
+
+    def _run(self, db: Session, start_epoch: Optional[int], end_epoch: Optional[int],
+             query_func: Callable[[Session], object]) -> List[object]:
+        """
+        Wykonuje query_func w tabeli głównej (najpierw), potem w każdej nachodzącej partycji.
+        Wyniki zwracane są w kolejności partycji rosnąco, tabela główna na końcu.
+
+        Odczyt tabeli głównej przed partycjami gwarantuje tylko, że rekord przenoszony w trakcie
+        zapytania nie zostanie pominięty - może zostać odczytany dwa razy (wystarcza dla min/max).
+        """
+        main = query_func(db)
+        results = []
+        for key in self.partitions_for(start_epoch, end_epoch):
+            session = Session(bind=self._partition_engine(key))
+            try:
+                results.append(query_func(session))
+            finally:
+                session.close()
+        results.append(main)
+        return results
+
+    @staticmethod
+    def _first_main_ids(keys: List[str]) -> list:
+        """
+        Podzapytania: najmniejsze id rekordu miesiąca partycji wciąż obecnego w tabeli głównej.
+
+        roll_month przenosi rekordy miesiąca rosnąco po id (kopia do partycji, potem usunięcie
+        z tabeli głównej), więc rekord partycji o id >= tej wartości jest jeszcze w tabeli głównej -
+        przy odczycie tabeli głównej w tym samym zapytaniu został już policzony.
+        """
+        moved = MeasureData.__table__.alias("moved")
+        return [select(func.min(moved.c.id)).where(moved.c.timeEpoch >= start, moved.c.timeEpoch < end)
+                .scalar_subquery() for start, end in map(month_bounds, keys)]
+
+    def _aggregate(self, db: Session, device_id: Optional[str], start_epoch: Optional[int],
+                   end_epoch: Optional[int], columns: list) -> List[tuple]:
+        """
+        Agregaty columns w tabeli głównej i w nachodzących partycjach, bez rekordów liczonych dwa razy
+
+        Tabela główna czytana jest pierwsza, jednym zapytaniem razem z _first_main_ids (jeden
+        odczyt bazy), a w partycjach pomijane są rekordy, które w chwili tego odczytu były
+        jeszcze w tabeli głównej - przenoszenie w tle nie dubluje ani nie gubi paczki rekordów.
+
+        Returns:
+            List[tuple]: Wiersz agregatów tabeli głównej, potem partycji
+        """
+        keys = self.partitions_for(start_epoch, end_epoch)
+        row = self._filtered(db.query(*columns, *self._first_main_ids(keys)),
+                             device_id, start_epoch, end_epoch).one()
+        parts = [tuple(row[:len(columns)])]
+        for key, first_id in zip(keys, row[len(columns):]):
+            session = Session(bind=self._partition_engine(key))
+            try:
+                query = self._filtered(session.query(*columns), device_id, start_epoch, end_epoch)
+                if first_id is not None:
+                    query = query.filter(MeasureData.id < first_id)
+                parts.append(tuple(query.one()))
+            finally:
+                session.close()
+        return parts
+
+    @staticmethod
+    def _filtered(query, device_id: Optional[str], start_epoch: Optional[int], end_epoch: Optional[int]):
+        if device_id:
+            query = query.filter(MeasureData.deviceId == device_id)
+        if start_epoch is not None:
+            query = query.filter(MeasureData.timeEpoch >= start_epoch)
+        if end_epoch is not None:
+            query = query.filter(MeasureData.timeEpoch <= end_epoch)
+        return query
+
+    def query_measures(self, db: Session, device_id: Optional[str], start_epoch: Optional[int] = None,
+                       end_epoch: Optional[int] = None) -> List[MeasureData]:
+        """
+        Rekordy urządzenia z zakresu [start_epoch, end_epoch] ze wszystkich partycji, rosnąco po czasie.
+        Tabela główna czytana jest pierwsza, rekordy partycji o id już odczytanym są pomijane.
+
+        Args:
+            db: Sesja głównej bazy
+            device_id: DEVICE_ID (None - wszystkie urządzenia)
+        """
+        def query(session: Session) -> List[MeasureData]:
+            return self._filtered(session.query(MeasureData), device_id, start_epoch,
+                                  end_epoch).order_by(MeasureData.timeEpoch).all()
+
+        main = query(db)
+        keys = self.partitions_for(start_epoch, end_epoch)
+        if not keys:
+            return main
+        seen = {measure.id for measure in main}
+        parts = []
+        for key in keys:
+            session = Session(bind=self._partition_engine(key))
+            try:
+                parts.append([measure for measure in query(session) if measure.id not in seen])
+            finally:
+                session.close()
+        return list(heapq.merge(*parts, main, key=_time_key))
+
+    def first_measure(self, db: Session, device_id: str) -> Optional[MeasureData]:
+        """
+        Returns:
+            Optional[MeasureData]: Najwcześniejszy rekord urządzenia (po timeEpoch i id) ze wszystkich
+            partycji i tabeli głównej lub None
+        """
+        found = [measure for measure in self._run(db, None, None, lambda session: self._filtered(
+            session.query(MeasureData), device_id, None, None).order_by(MeasureData.timeEpoch, MeasureData.id).first())
+                 if measure is not None]
+        return min(found, key=lambda measure: (_time_key(measure), measure.id)) if found else None
+
+    def count(self, db: Session, device_id: Optional[str], start_epoch: Optional[int] = None,
+              end_epoch: Optional[int] = None) -> int:
+        return sum(part[0] for part in self._aggregate(db, device_id, start_epoch, end_epoch,
+                                                       [func.count(MeasureData.id)]))
+
+    @staticmethod
+    def count_without_time(db: Session, device_id: Optional[str]) -> Tuple[int, int]:
+        """
+        Rekordy urządzenia bez timeEpoch - nie należą do żadnego okresu i zostają w tabeli głównej
+        (przenoszenie wg timeEpoch).
+
+        Returns:
+            Tuple[int, int]: (rekordy bez poprawnego czasu - timeInvalid = 1, rekordy oczekujące
+            na uzupełnienie przez MeasureBackfill - dopóki są, okresy mogą być niekompletne)
+        """
+        # timeEpoch IS NULL - zakres indeksu (deviceId, timeEpoch) zamiast wszystkich rekordów urządzenia;
+        # timeInvalid takiego rekordu to 1 lub NULL (rekord jeszcze nieuzupełniony)
+        query = db.query(func.count(MeasureData.timeInvalid), func.count(MeasureData.id)).filter(
+            MeasureData.timeEpoch.is_(None))
+        if device_id:
+            query = query.filter(MeasureData.deviceId == device_id)
+        invalid, untimed = query.one()
+        return invalid, untimed - invalid
+
+    def summarize(self, db: Session, device_id: Optional[str], start_epoch: Optional[int] = None,
+                  end_epoch: Optional[int] = None) -> Dict[str, Optional[float]]:
+        """
+        Agregaty okresu (liczba rekordów, pierwszy/ostatni czas, średnia/min/max prędkości
+        i wydajności, suma total) połączone z partycji
+        """
+        parts = self._aggregate(db, device_id, start_epoch, end_epoch, [
+            func.count(MeasureData.id), func.min(MeasureData.timeEpoch), func.max(MeasureData.timeEpoch),
+            func.count(MeasureData.speedValue), func.sum(MeasureData.speedValue),
+            func.min(MeasureData.speedValue), func.max(MeasureData.speedValue),
+            func.count(MeasureData.rateValue), func.sum(MeasureData.rateValue),
+            func.min(MeasureData.rateValue), func.max(MeasureData.rateValue),
+            func.count(MeasureData.totalValue), func.sum(MeasureData.totalValue),
+        ])
+
+        def merged(index: int, combine) -> Optional[float]:
+            values = [part[index] for part in parts if part[index] is not None]
+            return combine(values) if values else None
+
+        speed_count, rate_count = sum(part[3] for part in parts), sum(part[7] for part in parts)
+        return {
+            "total_records": sum(part[0] for part in parts),
+            "first_measurement": merged(1, min),
+            "last_measurement": merged(2, max),
+            "speed_avg": merged(4, sum) / speed_count if speed_count else None,
+            "speed_min": merged(5, min),
+            "speed_max": merged(6, max),
+            "rate_avg": merged(8, sum) / rate_count if rate_count else None,
+            "rate_min": merged(9, min),
+            "rate_max": merged(10, max),
+            "total_sum": merged(12, sum),
+        }
+
+    def sample_measures(self, db: Session, device_id: Optional[str], start_epoch: Optional[int],
+                        end_epoch: Optional[int], pick: Callable[[int], List[int]]) -> List[MeasureData]:
+        """
+        Próbkowanie rekordów z wielu partycji: pick(liczba_rekordów) zwraca pozycje
+        (w kolejności czasu) rekordów do pobrania. Pozycje rekordu przenoszonego w trakcie
+        zapytania pochodzą z tabeli głównej.
+
+        Returns:
+            List[MeasureData]: Wybrane rekordy, rosnąco po czasie
+        """
+        keys = self.partitions_for(start_epoch, end_epoch)
+        engines = [self._partition_engine(key) for key in keys]
+
+        def positions(session: Session, source: int):
+            rows = self._filtered(session.query(MeasureData.timeEpoch, MeasureData.id),
+                                  device_id, start_epoch, end_epoch).order_by(MeasureData.timeEpoch).all()
+            return [(epoch is not None, epoch or 0, source, measure_id) for epoch, measure_id in rows]
+
+        sessions = [Session(bind=partition_engine) for partition_engine in engines] + [db]
+        try:
+            # Tabela główna pierwsza - rekordy przenoszone w trakcie zapytania pomijane w partycjach po id
+            main = positions(db, len(engines))
+            seen = {position[3] for position in main}
+            ordered = list(heapq.merge(*([position for position in positions(session, source)
+                                          if position[3] not in seen]
+                                         for source, session in enumerate(sessions[:-1])), main))
+            selected: Dict[int, List[int]] = {}
+            for index in pick(len(ordered)):
+                _, _, source, measure_id = ordered[index]
+                selected.setdefault(source, []).append(measure_id)
+            parts = []
+            for source, ids in selected.items():
+                rows = []
+                # Limit parametrów zapytania SQLite
+                for offset in range(0, len(ids), 900):
+                    rows.extend(sessions[source].query(MeasureData)
+                                .filter(MeasureData.id.in_(ids[offset:offset + 900])).all())
+                rows.sort(key=_time_key)
+                parts.append(rows)
+        finally:
+            for session in sessions[:-1]:
+                session.close()
+        return list(heapq.merge(*parts, key=_time_key))
+
+    def device_ranges(self, db: Session) -> Dict[str, Tuple[int, int]]:
+        """
+        Returns:
+            Dict[str, Tuple[int, int]]: Najstarszy i najnowszy timeEpoch rekordów każdego urządzenia
+        """
+        ranges: Dict[str, Tuple[int, int]] = {}
+        for part in self._run(db, None, None, lambda session: session.query(
+                MeasureData.deviceId, func.min(MeasureData.timeEpoch), func.max(MeasureData.timeEpoch))
+                .filter(MeasureData.timeEpoch.isnot(None)).group_by(MeasureData.deviceId).all()):
+            for device_id, first, last in part:
+                if device_id in ranges:
+                    first, last = min(first, ranges[device_id][0]), max(last, ranges[device_id][1])
+                ranges[device_id] = (first, last)
+        return ranges
+
+    def measure_values(self, db, device_id: str, start_epoch: int, end_epoch: int) -> List[tuple]:
+        """
+        Wartości liczbowe rekordów urządzenia z zakresu [start_epoch, end_epoch] ze wszystkich partycji
+
+        Tabela główna czytana jest przed partycjami: w transakcji z blokadą zapisu
+        (BEGIN IMMEDIATE) przeniesienie paczki nie usunie rekordu z tabeli głównej
+        między odczytami, a rekord już skopiowany do partycji jest pomijany po id.
+
+        Args:
+            db: Sesja lub połączenie głównej bazy
+
+        Returns:
+            List[tuple]: (timeEpoch, id, speedValue, rateValue, totalValue) rosnąco po czasie i id
+        """
+        statement = select(MeasureData.timeEpoch, MeasureData.id, MeasureData.speedValue, MeasureData.rateValue,
+                           MeasureData.totalValue).where(
+            MeasureData.deviceId == device_id, MeasureData.timeEpoch >= start_epoch,
+            MeasureData.timeEpoch <= end_epoch).order_by(MeasureData.timeEpoch, MeasureData.id)
+        parts = [[tuple(row) for row in db.execute(statement)]]
+        seen = {row[1] for row in parts[0]}
+        for key in self.partitions_for(start_epoch, end_epoch):
+            with self._partition_engine(key).connect() as connection:
+                parts.append([tuple(row) for row in connection.execute(statement) if row[1] not in seen])
+        if len(parts) == 1:
+            return parts[0]
+        return list(heapq.merge(*parts))
+
+    # -------------------------------------------------------------- przenoszenie
+
+    def _create_partition(self, key: str) -> str:
+        path = self.path_for(key)
+        os.makedirs(self.directory, exist_ok=True)
+        partition_engine = create_engine(f"sqlite:///{path}")
+        try:
+            # Kopia tabeli bez wyzwalaczy agregatów (MeasureRollup jest tylko w bazie głównej)
+            MeasureData.__table__.to_metadata(MetaData()).create(bind=partition_engine, checkfirst=True)
+        finally:
+            partition_engine.dispose()
+        return path
+
+    def roll_month(self, key: str) -> int:
+        """
+        Przenosi rekordy miesiąca z tabeli głównej do pliku partycji
+
+        Returns:
+            int: Liczba przeniesionych rekordów
+        """
+        start, end = month_bounds(key)
+        column_list = ', '.join(f'"{column}"' for column in COLUMNS)
+        month_filter = ('"timeEpoch" >= :start AND "timeEpoch" < :end '
+                        'AND id < (SELECT MAX(id) FROM main."MeasureData")')
+        with self.engine.connect() as connection:
+            if connection.execute(text(f'SELECT 1 FROM main."MeasureData" WHERE {month_filter} LIMIT 1'),
+                                  {"start": start, "end": end}).first() is None:
+                return 0
+        path = self._create_partition(key)
+        moved = 0
+        with self.engine.connect() as connection:
+            connection.exec_driver_sql("ATTACH DATABASE ? AS part", (path,))
+            try:
+                while not self._stop.is_set():
+                    ids = connection.execute(text(
+                        f'SELECT id FROM main."MeasureData" WHERE {month_filter} ORDER BY id LIMIT :limit'
+                    ), {"start": start, "end": end, "limit": self.batch_size}).scalars().all()
+                    if not ids:
+                        break
+                    params = {"start": start, "end": end, "low": ids[0], "high": ids[-1]}
+                    connection.execute(text(
+                        f'INSERT OR REPLACE INTO part."MeasureData" ({column_list}) SELECT {column_list} '
+                        f'FROM main."MeasureData" WHERE id BETWEEN :low AND :high AND {month_filter}'
+                    ), params)
+                    connection.commit()
+                    connection.execute(text(
+                        f'DELETE FROM main."MeasureData" WHERE id BETWEEN :low AND :high AND {month_filter}'
+                    ), params)
+                    connection.commit()
+                    moved += len(ids)
+            finally:
+                connection.rollback()
+                connection.exec_driver_sql("DETACH DATABASE part")
+        if moved:
+            with self._lock:
+                self.rows_moved += moved
+                self.months_rolled += 1
+            logger.info(f"Partycja {key}: przeniesiono {moved} rekordów do {path}")
+        return moved
+
+    def rollover(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Przenosi do partycji wszystkie miesiące starsze niż hot_months ostatnich
+
+        Returns:
+            Dict[str, int]: Liczba przeniesionych rekordów per miesiąc
+        """
+        now = now or datetime.now()
+        month_index = now.year * 12 + now.month - 1 - (self.hot_months - 1)
+        cutoff_key = f"{month_index // 12}{month_index % 12 + 1:02d}"
+        cutoff = month_bounds(cutoff_key)[0]
+        with self.engine.connect() as connection:
+            oldest = connection.execute(text('SELECT MIN("timeEpoch") FROM "MeasureData" WHERE "timeEpoch" < :cutoff'),
+                                        {"cutoff": cutoff}).scalar()
+        result = {}
+        key = month_key(oldest) if oldest is not None else cutoff_key
+        while key < cutoff_key and not self._stop.is_set():
+            moved = self.roll_month(key)
+            if moved:
+                result[key] = moved
+            key = _next_key(key)
+        self.last_rollover = time.time()
+        return result
+
+    def archive(self, key: str, destination: str) -> str:
+        """
+        Przenosi plik partycji do katalogu archiwum (ten sam system plików - bez kopiowania)
+
+        Raises:
+            ValueError: gdy partycja nie istnieje
+        """
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            raise ValueError(f"Brak partycji {key}")
+        self._release(key)
+        os.makedirs(destination, exist_ok=True)
+        target = os.path.join(destination, os.path.basename(path))
+        shutil.move(path, target)
+        logger.info(f"Partycja {key} zarchiwizowana: {target}")
+        return target
+
+    def drop(self, key: str) -> None:
+        """
+        Usuwa plik partycji
+
+        Raises:
+            ValueError: gdy partycja nie istnieje
+        """
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            raise ValueError(f"Brak partycji {key}")
+        self._release(key)
+        os.remove(path)
+        logger.info(f"Partycja {key} usunięta")
+
+    # ------------------------------------------------------------------- tło
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.rollover()
+            except Exception as e:
+                logger.error(f"Błąd przenoszenia partycji MeasureData: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        """Uruchamia okresowe przenoszenie miesięcy w wątku w tle"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="measure-partitions", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def get_stats(self) -> dict:
+        partitions = self.list_partitions()
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "hot_months": self.hot_months,
+                "partitions": partitions,
+                "rows_moved": self.rows_moved,
+                "months_rolled": self.months_rolled,
+                "last_rollover": self.last_rollover,
+            }
+
+
+# Globalna instancja
+measure_partitions = MeasurePartitions(
+    engine,
+    os.getenv("MEASURE_PARTITION_DIR", "partitions"),
+    hot_months=int(os.getenv("MEASURE_PARTITION_HOT_MONTHS", "2")),
+    interval=float(os.getenv("MEASURE_PARTITION_INTERVAL", "3600")),
+)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Miesięczne partycje MeasureData")
+    parser.add_argument('action', choices=('list', 'roll', 'archive', 'drop'))
+    parser.add_argument('key', nargs='?', help="miesiąc partycji RRRRMM (archive, drop)")
+    parser.add_argument('--to', dest='destination', default='archive', help="katalog archiwum (archive)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    try:
+        if args.action == 'list':
+            for key in measure_partitions.list_partitions():
+                path = measure_partitions.path_for(key)
+                print(f"{key}  {os.path.getsize(path) / 1e6:10.1f} MB  {path}")
+        elif args.action == 'roll':
+            print(f"Przeniesione rekordy: {measure_partitions.rollover() or 'brak'}")
+        elif not args.key or not re.fullmatch(r'\d{6}', args.key):
+            parser.error("podaj miesiąc partycji RRRRMM")
+        elif args.action == 'archive':
+            print(f"Zarchiwizowano: {measure_partitions.archive(args.key, args.destination)}")
+        else:
+            measure_partitions.drop(args.key)
+            print(f"Usunięto partycję {args.key}")
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,476 @@
+# Uruchomienie: python -m repositories.measure_rollups status | rebuild [--device ID] [--from RRRR-MM-DD] [--to RRRR-MM-DD]
+"""
+Agregaty MeasureData per urządzenie w przedziałach minutowych, godzinowych i dobowych.
+
+Tabelę MeasureRollup aktualizują wyzwalacze SQLite przy każdym zapisie rekordu
+(repositories.rollup_triggers). Zapytanie o okres składane jest z najgrubszych
+przedziałów mieszczących się w okresie: pełne doby z agregatów dobowych, brzegi
+z godzinowych i minutowych, a reszta (poniżej minuty) z rekordów - wynik jest
+taki sam jak z rekordów, a koszt zależy od liczby przedziałów, nie rekordów.
+
+Przyrost licznika sumy i czas pracy na granicy sąsiednich przedziałów liczone są
+przy łączeniu (ostatnia wartość jednego i pierwsza następnego przedziału), więc
+przedział zależy tylko od własnych rekordów i można go przeliczyć niezależnie
+(przedziały dirty, przebudowa dowolnego zakresu).
+
+Rekordy zapisane przed migracją 3 przeliczane są jednorazowo w tle - do końca
+przeliczenia (stan 'ready' w MeasureRollupState) zapytania czytają rekordy.
+Archiwizacja i usunięcie partycji nie usuwają agregatów.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from models.models import MeasureRollup, MeasureRollupState
+from repositories.database import engine
+from repositories.measure_partitions import MeasurePartitions, measure_partitions
+from repositories.rollup_triggers import RESOLUTIONS
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+MINUTE, HOUR, DAY = RESOLUTIONS
+RESOLUTION_NAMES = {'minute': MINUTE, 'hour': HOUR, 'day': DAY}
+READY_STATE = 'ready'
+
+
+def bucket_start(epoch: int, resolution: int) -> int:
+    """Początek przedziału zawierającego epoch (doby od północy czasu lokalnego, jak wyzwalacze)"""
+    if resolution == DAY:
+        return int(datetime.fromtimestamp(epoch).replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
+    return epoch - epoch % resolution
+
+
+def next_bucket(bucket: int, resolution: int) -> int:
+    """Początek następnego przedziału"""
+    if resolution == DAY:
+        # Doba ma 23 lub 25 godzin przy zmianie czasu
+        return bucket_start(bucket + DAY + 3600, DAY)
+    return bucket + resolution
+
+
+def _align_up(epoch: int, resolution: int) -> int:
+    start = bucket_start(epoch, resolution)
+    return start if start == epoch else next_bucket(start, resolution)
+
+
+class RollupBucket:
+    """
+    Agregat przedziału liczony w Pythonie - te same pola co MeasureRollup
+    i te same reguły co wyzwalacze (rekordy dodawane w kolejności czasu)
+    """
+
+    def __init__(self, bucket: Optional[int] = None):
+        self.bucket = bucket
+        self.count = self.speedCount = self.rateCount = self.totalCount = 0
+        self.speedSum = self.rateSum = self.totalSum = self.totalIncrement = 0.0
+        self.runningSeconds = 0
+        self.speedMin = self.speedMax = self.rateMin = self.rateMax = None
+        self.firstTime = self.lastTime = self.lastSpeed = None
+        self.firstTotal = self.lastTotal = None
+        self.dirty = 0
+
+    def add(self, epoch: int, speed: Optional[float], rate: Optional[float], total: Optional[float]) -> None:
+        """Dodaje rekord"""
+        self.count += 1
+        if speed is not None:
+            self.speedCount += 1
+            self.speedSum += speed
+            self.speedMin = speed if self.speedMin is None else min(self.speedMin, speed)
+            self.speedMax = speed if self.speedMax is None else max(self.speedMax, speed)
+        if rate is not None:
+            self.rateCount += 1
+            self.rateSum += rate
+            self.rateMin = rate if self.rateMin is None else min(self.rateMin, rate)
+            self.rateMax = rate if self.rateMax is None else max(self.rateMax, rate)
+        if total is not None:
+            self.totalCount += 1
+            self.totalSum += total
+            # Spadek licznika (reset) zaczyna nowy segment - jak calculate_incremental_sum
+            if self.lastTotal is not None and total >= self.lastTotal:
+                self.totalIncrement += total - self.lastTotal
+            if self.firstTotal is None:
+                self.firstTotal = total
+            self.lastTotal = total
+        # Praca od rekordu z prędkością > 0 do następnego rekordu - jak calculate_working_time
+        if self.lastSpeed is not None and self.lastSpeed > 0:
+            self.runningSeconds += epoch - self.lastTime
+        if self.firstTime is None:
+            self.firstTime = epoch
+        self.lastTime = epoch
+        self.lastSpeed = speed
+
+    def merge(self, other) -> None:
+        """
+        Dołącza następny (późniejszy) przedział - RollupBucket lub MeasureRollup
+        """
+        if not other.count:
+            return
+        self.count += other.count
+        self.speedCount += other.speedCount
+        self.speedSum += other.speedSum
+        self.rateCount += other.rateCount
+        self.rateSum += other.rateSum
+        self.totalCount += other.totalCount
+        self.totalSum += other.totalSum
+        for name, combine in (('speedMin', min), ('speedMax', max), ('rateMin', min), ('rateMax', max)):
+            values = [value for value in (getattr(self, name), getattr(other, name)) if value is not None]
+            setattr(self, name, combine(values) if values else None)
+        if other.firstTotal is not None:
+            if self.lastTotal is not None and other.firstTotal >= self.lastTotal:
+                self.totalIncrement += other.firstTotal - self.lastTotal
+            if self.firstTotal is None:
+                self.firstTotal = other.firstTotal
+            self.lastTotal = other.lastTotal
+        self.totalIncrement += other.totalIncrement
+        if self.lastSpeed is not None and self.lastSpeed > 0:
+            self.runningSeconds += other.firstTime - self.lastTime
+        self.runningSeconds += other.runningSeconds
+        if self.firstTime is None:
+            self.firstTime = other.firstTime
+        self.lastTime = other.lastTime
+        self.lastSpeed = other.lastSpeed
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        """
+        Returns:
+            Dict: Pola jak MeasurePartitions.summarize oraz total_increment i running_seconds
+        """
+        return {
+            "total_records": self.count,
+            "first_measurement": self.firstTime,
+            "last_measurement": self.lastTime,
+            "speed_avg": self.speedSum / self.speedCount if self.speedCount else None,
+            "speed_min": self.speedMin,
+            "speed_max": self.speedMax,
+            "rate_avg": self.rateSum / self.rateCount if self.rateCount else None,
+            "rate_min": self.rateMin,
+            "rate_max": self.rateMax,
+            "total_sum": self.totalSum if self.totalCount else None,
+            "total_increment": self.totalIncrement,
+            "running_seconds": self.runningSeconds,
+        }
+
+    def mapping(self, device_id: str, resolution: int) -> dict:
+        """Wiersz tabeli MeasureRollup"""
+        values = {column.name: getattr(self, column.name) for column in MeasureRollup.__table__.columns
+                  if column.name not in ('deviceId', 'resolution')}
+        values.update(deviceId=device_id, resolution=resolution, dirty=0)
+        return values
+
+
+class MeasureRollups:
+    """
+    Odczyt okresów z agregatów MeasureRollup oraz przeliczanie agregatów z rekordów
+    (jednorazowo dla starszych baz, przedziały dirty i dowolny zakres na żądanie)
+    """
+
+    def __init__(self, engine: Engine, partitions: MeasurePartitions, pause: float = 0.02, interval: float = 60.0):
+        """
+        Args:
+            engine: Silnik głównej bazy (z prawem zapisu)
+            partitions: Partycje MeasureData - źródło rekordów
+            pause: Przerwa między oknami przeliczenia [s] - czas dla zapisu bieżących ramek
+            interval: Odstęp między przeliczeniami przedziałów dirty w tle [s]
+        """
+        self.engine = engine
+        self.partitions = partitions
+        self.pause = pause
+        self.interval = interval
+        self._ready = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Statystyki
+        self.queries = 0
+        self.buckets_written = 0
+        self.windows_rebuilt = 0
+        self.last_rebuild: Optional[float] = None
+
+    # ------------------------------------------------------------------- stan
+
+    def is_ready(self, db: Session) -> bool:
+        """Czy agregaty obejmują wszystkie rekordy (zakończone przeliczenie starszych rekordów)"""
+        if not self._ready:
+            value = db.query(MeasureRollupState.value).filter(MeasureRollupState.name == READY_STATE).scalar()
+            self._ready = value == '1'
+        return self._ready
+
+    def _mark_ready(self) -> None:
+        with self.engine.begin() as connection:
+            connection.execute(text('INSERT OR REPLACE INTO "MeasureRollupState" (name, value) VALUES (:name, \'1\')'),
+                               {"name": READY_STATE})
+        self._ready = True
+
+    # ---------------------------------------------------------------- odczyt
+
+    def _raw(self, db, device_id: str, start: int, end: int) -> RollupBucket:
+        """Agregat rekordów z zakresu [start, end)"""
+        piece = RollupBucket(start)
+        for epoch, _, speed, rate, total in self.partitions.measure_values(db, device_id, start, end - 1):
+            piece.add(epoch, speed, rate, total)
+        return piece
+
+    def _stored(self, db: Session, device_id: str, resolution: int, start: int, end: int) -> list:
+        """Przedziały rozdzielczości resolution zaczynające się w [start, end); dirty liczone z rekordów"""
+        rows = db.query(MeasureRollup).filter(
+            MeasureRollup.deviceId == device_id, MeasureRollup.resolution == resolution,
+            MeasureRollup.bucket >= start, MeasureRollup.bucket < end).order_by(MeasureRollup.bucket).all()
+        return [self._raw(db, device_id, row.bucket, next_bucket(row.bucket, resolution)) if row.dirty else row
+                for row in rows]
+
+    def pieces(self, db: Session, device_id: str, start: int, end: int,
+               resolutions: Tuple[int, ...] = (DAY, HOUR, MINUTE)) -> list:
+        """
+        Rozkład zakresu [start, end) na najgrubsze mieszczące się w nim przedziały
+        i rekordy na brzegach, rosnąco po czasie
+        """
+        if start >= end:
+            return []
+        if not resolutions:
+            return [self._raw(db, device_id, start, end)]
+        resolution, finer = resolutions[0], resolutions[1:]
+        first, last = _align_up(start, resolution), bucket_start(end, resolution)
+        if first >= last:
+            return self.pieces(db, device_id, start, end, finer)
+        return (self.pieces(db, device_id, start, first, finer)
+                + self._stored(db, device_id, resolution, first, last)
+                + self.pieces(db, device_id, last, end, finer))
+
+    def summarize(self, db: Session, device_id: Optional[str], start_epoch: Optional[int],
+                  end_epoch: Optional[int]) -> Optional[Dict[str, Optional[float]]]:
+        """
+        Podsumowanie okresu [start_epoch, end_epoch] urządzenia z agregatów
+
+        Returns:
+            Optional[Dict]: Jak RollupBucket.summary(); None - agregaty niedostępne (trzeba czytać rekordy)
+        """
+        if not device_id or start_epoch is None or end_epoch is None or not self.is_ready(db):
+            return None
+        result = RollupBucket()
+        for piece in self.pieces(db, device_id, start_epoch, end_epoch + 1):
+            result.merge(piece)
+        with self._lock:
+            self.queries += 1
+        return result.summary()
+
+    def chart_resolution(self, start_epoch: Optional[int], end_epoch: Optional[int], max_points: int) -> Optional[int]:
+        """
+        Najgrubsza rozdzielczość nie większa niż długość okresu / max_points,
+        gdy granice okresu są granicami przedziałów (None - wykres z rekordów)
+        """
+        if start_epoch is None or end_epoch is None:
+            return None
+        end = end_epoch + 1
+        for resolution in (DAY, HOUR, MINUTE):
+            if (resolution * max_points <= end - start_epoch and bucket_start(start_epoch, resolution) == start_epoch
+                    and bucket_start(end, resolution) == end):
+                return resolution
+        return None
+
+    def series(self, db: Session, device_id: Optional[str], resolution: int, start_epoch: int,
+               end_epoch: int) -> Optional[list]:
+        """
+        Pełne przedziały rozdzielczości resolution w okresie [start_epoch, end_epoch], rosnąco po czasie
+
+        Returns:
+            Optional[list]: Przedziały (MeasureRollup / RollupBucket); None - agregaty niedostępne
+        """
+        if not device_id or not self.is_ready(db):
+            return None
+        with self._lock:
+            self.queries += 1
+        return self._stored(db, device_id, resolution, _align_up(start_epoch, resolution),
+                            bucket_start(end_epoch + 1, resolution))
+
+    # ----------------------------------------------------------- przeliczanie
+
+    def _write_window(self, device_id: str, resolutions: Tuple[int, ...], start: int, end: int) -> int:
+        """
+        Przelicza z rekordów przedziały rozdzielczości resolutions z okna [start, end)
+        złożonego z pełnych przedziałów
+
+        Returns:
+            int: Liczba zapisanych przedziałów
+        """
+        buckets: Dict[Tuple[int, int], RollupBucket] = {}
+        current: Dict[int, Tuple[int, int]] = {}
+        with self.engine.connect() as connection:
+            # Blokada zapisu przed odczytem - wyzwalacze nie zmienią przedziałów okna przed zapisem wyniku
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                for epoch, _, speed, rate, total in self.partitions.measure_values(connection, device_id, start, end - 1):
+                    for resolution in resolutions:
+                        bounds = current.get(resolution)
+                        if bounds is None or epoch >= bounds[1]:
+                            first = bucket_start(epoch, resolution)
+                            bounds = current[resolution] = (first, next_bucket(first, resolution))
+                            buckets[resolution, first] = RollupBucket(first)
+                        buckets[resolution, bounds[0]].add(epoch, speed, rate, total)
+                connection.execute(delete(MeasureRollup).where(
+                    MeasureRollup.deviceId == device_id, MeasureRollup.resolution.in_(resolutions),
+                    MeasureRollup.bucket >= start, MeasureRollup.bucket < end))
+                if buckets:
+                    connection.execute(insert(MeasureRollup), [piece.mapping(device_id, resolution)
+                                                               for (resolution, _), piece in buckets.items()])
+                connection.commit()
+            finally:
+                connection.rollback()
+        with self._lock:
+            self.buckets_written += len(buckets)
+            self.windows_rebuilt += 1
+        return len(buckets)
+
+    @staticmethod
+    def _windows(resolutions: Tuple[int, ...], first: int, last: int):
+        """Okna przeliczenia obejmujące [first, last]: doby lokalne (agregaty dobowe) lub doby epoki"""
+        window = bucket_start(first, DAY) if DAY in resolutions else first - first % DAY
+        while window <= last:
+            following = next_bucket(window, DAY) if DAY in resolutions else window + DAY
+            yield window, following
+            window = following
+
+    def rebuild(self, device_id: Optional[str] = None, start_epoch: Optional[int] = None,
+                end_epoch: Optional[int] = None) -> int:
+        """
+        Przelicza agregaty z rekordów dla zakresu [start_epoch, end_epoch]
+        (rozszerzonego do pełnych dób) jednego lub wszystkich urządzeń
+
+        Returns:
+            int: Liczba zapisanych przedziałów
+        """
+        with Session(bind=self.engine) as db:
+            ranges = self.partitions.device_ranges(db)
+        if device_id is not None:
+            ranges = {device_id: ranges[device_id]} if device_id in ranges else {}
+        written = 0
+        started = time.perf_counter()
+        for device, (first, last) in sorted(ranges.items()):
+            first = first if start_epoch is None else start_epoch
+            last = last if end_epoch is None else end_epoch
+            for resolutions in ((MINUTE, HOUR), (DAY,)):
+                for window_start, window_end in self._windows(resolutions, first, last):
+                    if self._stop.is_set():
+                        return written
+                    count = self._write_window(device, resolutions, window_start, window_end)
+                    written += count
+                    if count and self.pause:
+                        self._stop.wait(self.pause)
+        self.last_rebuild = time.time()
+        logger.info(f"Agregaty MeasureRollup: przeliczono {written} przedziałów ({len(ranges)} urządzeń) "
+                    f"w {time.perf_counter() - started:.1f} s")
+        return written
+
+    def refresh_dirty(self) -> int:
+        """
+        Przelicza okna z przedziałami oznaczonymi jako dirty (rekordy poza kolejnością)
+
+        Returns:
+            int: Liczba przeliczonych okien
+        """
+        with self.engine.connect() as connection:
+            rows = connection.execute(select(MeasureRollup.deviceId, MeasureRollup.resolution, MeasureRollup.bucket)
+                                      .where(MeasureRollup.dirty == 1)).all()
+        windows = set()
+        for device_id, resolution, bucket in rows:
+            if resolution == DAY:
+                windows.add((device_id, (DAY,), bucket, next_bucket(bucket, DAY)))
+            else:
+                window = bucket - bucket % DAY
+                windows.add((device_id, (MINUTE, HOUR), window, window + DAY))
+        for device_id, resolutions, start, end in sorted(windows):
+            if self._stop.is_set():
+                break
+            self._write_window(device_id, resolutions, start, end)
+        return len(windows)
+
+    # ------------------------------------------------------------------- tło
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                with Session(bind=self.engine) as db:
+                    ready = self.is_ready(db)
+                if not ready:
+                    self.rebuild()
+                    if not self._stop.is_set():
+                        self._mark_ready()
+                self.refresh_dirty()
+            except Exception as e:
+                logger.error(f"Błąd przeliczania agregatów MeasureRollup: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        """Uruchamia przeliczanie agregatów w wątku w tle"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="measure-rollups", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "ready": self._ready,
+                "queries": self.queries,
+                "buckets_written": self.buckets_written,
+                "windows_rebuilt": self.windows_rebuilt,
+                "last_rebuild": self.last_rebuild,
+            }
+
+
+# Globalna instancja
+measure_rollups = MeasureRollups(
+    engine,
+    measure_partitions,
+    interval=float(os.getenv("MEASURE_ROLLUP_INTERVAL", "60")),
+)
+
+
+def _parse_day(value: Optional[str]) -> Optional[int]:
+    return int(datetime.strptime(value, "%Y-%m-%d").timestamp()) if value else None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Agregaty MeasureRollup (minuta/godzina/doba)")
+    parser.add_argument('action', choices=('status', 'rebuild'))
+    parser.add_argument('--device', default=None, help="DEVICE_ID (domyślnie wszystkie urządzenia)")
+    parser.add_argument('--from', dest='start', default=None, help="pierwsza doba RRRR-MM-DD (rebuild)")
+    parser.add_argument('--to', dest='end', default=None, help="ostatnia doba RRRR-MM-DD (rebuild)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    try:
+        start, end = _parse_day(args.start), _parse_day(args.end)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    if args.action == 'rebuild':
+        written = measure_rollups.rebuild(args.device, start, end + DAY - 1 if end is not None else None)
+        if args.device is None and start is None and end is None:
+            measure_rollups._mark_ready()
+        print(f"Zapisane przedziały: {written}")
+    with Session(bind=engine) as db:
+        dirty = db.query(MeasureRollup).filter(MeasureRollup.dirty == 1).count()
+        print(f"Gotowe: {measure_rollups.is_ready(db)}, przedziały: {db.query(MeasureRollup).count()}, "
+              f"do przeliczenia: {dirty}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
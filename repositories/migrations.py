@@ -0,0 +1,182 @@
+# Uruchomienie: python -m repositories.migrations [--database measurement_system.db]
+"""
+Wersjonowane migracje schematu bazy SQLite.
+
+Base.metadata.create_all() tworzy tylko brakujące tabele - nie dodaje kolumn ani
+indeksów do istniejących plików bazy. Migracje z listy MIGRATIONS są stosowane
+kolejno przy starcie serwera (init_db), a numer ostatniej zapisywany w tabeli
+schema_version. Migracje są idempotentne (IF NOT EXISTS, sprawdzenie kolumn),
+więc migrację przerwaną przed zapisem wersji można bezpiecznie powtórzyć.
+
+Migracje opisują stan schematu w chwili ich dodania (jawne DDL, nie modele) -
+nowe zmiany dopisuje się na końcu listy z kolejnym numerem wersji.
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Callable, List, NamedTuple, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, Engine
+
+from repositories.measure_migration import add_typed_columns
+from repositories.rollup_triggers import trigger_statements
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+VERSION_TABLE = 'schema_version'
+
+
+class Migration(NamedTuple):
+    """
+    Attributes:
+        version: Numer wersji schematu po zastosowaniu migracji
+        description: Opis zapisywany w schema_version
+        apply: Funkcja wykonująca migrację na połączeniu (w transakcji)
+    """
+    version: int
+    description: str
+    apply: Callable[[Connection], object]
+
+
+def _table_exists(connection: Connection, table: str) -> bool:
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table}
+    ).first() is not None
+
+
+def _create_indexes(connection: Connection, indexes: List[tuple]) -> None:
+    """Zakłada indeksy (nazwa, tabela, kolumny) dla istniejących tabel"""
+    for name, table, columns in indexes:
+        if not _table_exists(connection, table):
+            continue
+        started = time.perf_counter()
+        column_list = ', '.join(f'"{column}"' for column in columns)
+        connection.execute(text(f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" ({column_list})'))
+        logger.info(f"Indeks {name} ({table}: {column_list}) - {time.perf_counter() - started:.1f} s")
+
+
+# Indeksy pod zapytania routerów: filtr urządzenia + zakres/sortowanie po czasie.
+# Sam deviceId obsługuje indeks (deviceId, timeEpoch, ...) - osobny indeks jednokolumnowy
+# tylko spowalniałby zapis.
+DEVICE_INDEXES = [
+    ('ix_MeasureData_timeEpoch', 'MeasureData', ('timeEpoch',)),
+    ('ix_MeasureData_device_time', 'MeasureData',
+     ('deviceId', 'timeEpoch', 'speedValue', 'rateValue', 'totalValue')),
+    ('ix_Aliases_deviceId', 'Aliases', ('deviceId',)),
+    ('ix_StaticParams_deviceId', 'StaticParams', ('deviceId',)),
+]
+
+
+def _device_indexes(connection: Connection) -> None:
+    _create_indexes(connection, DEVICE_INDEXES)
+    # Statystyki dla planera (sqlite_stat1); analysis_limit ogranicza ANALYZE do próbki
+    # indeksu, żeby start na dużej bazie nie skanował całej tabeli
+    connection.execute(text('PRAGMA analysis_limit = 1000'))
+    connection.execute(text('ANALYZE'))
+
+
+def _measure_rollups(connection: Connection) -> None:
+    connection.execute(text(
+        'CREATE TABLE IF NOT EXISTS "MeasureRollup" ('
+        '"deviceId" VARCHAR NOT NULL, resolution INTEGER NOT NULL, bucket INTEGER NOT NULL, count INTEGER NOT NULL, '
+        '"speedCount" INTEGER NOT NULL, "speedSum" FLOAT NOT NULL, "speedMin" FLOAT, "speedMax" FLOAT, '
+        '"rateCount" INTEGER NOT NULL, "rateSum" FLOAT NOT NULL, "rateMin" FLOAT, "rateMax" FLOAT, '
+        '"totalCount" INTEGER NOT NULL, "totalSum" FLOAT NOT NULL, "firstTime" INTEGER, "lastTime" INTEGER, '
+        '"lastSpeed" FLOAT, "firstTotal" FLOAT, "lastTotal" FLOAT, "totalIncrement" FLOAT NOT NULL, '
+        '"runningSeconds" INTEGER NOT NULL, dirty INTEGER NOT NULL, '
+        'PRIMARY KEY ("deviceId", resolution, bucket))'
+    ))
+    connection.execute(text('CREATE INDEX IF NOT EXISTS "ix_MeasureRollup_dirty" ON "MeasureRollup" (dirty) '
+                            'WHERE dirty = 1'))
+    connection.execute(text('CREATE TABLE IF NOT EXISTS "MeasureRollupState" ('
+                            'name VARCHAR NOT NULL PRIMARY KEY, value VARCHAR)'))
+    # Nowa baza: wyzwalacze zakłada create_all razem z tabelą MeasureData (models.models)
+    if _table_exists(connection, 'MeasureData'):
+        for statement in trigger_statements():
+            connection.execute(text(statement))
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Kolumny liczbowe MeasureData (speedValue, rateValue, totalValue, timeEpoch, timeInvalid, "
+                 "receivedAt)",
+              add_typed_columns),
+    Migration(2, "Indeksy timeEpoch / (deviceId, timeEpoch) z wartościami pomiaru", _device_indexes),
+    # Agregaty rekordów sprzed migracji przelicza repositories.measure_rollups
+    Migration(3, "Agregaty MeasureRollup (minuta/godzina/doba) z wyzwalaczami", _measure_rollups),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def _ensure_version_table(connection: Connection) -> None:
+    connection.execute(text(
+        f'CREATE TABLE IF NOT EXISTS "{VERSION_TABLE}" ('
+        f'version INTEGER PRIMARY KEY, description VARCHAR, applied_at VARCHAR)'
+    ))
+
+
+def current_version(engine: Engine) -> int:
+    """
+    Returns:
+        int: Wersja schematu zapisana w bazie (0 - baza bez migracji)
+    """
+    with engine.begin() as connection:
+        _ensure_version_table(connection)
+        return connection.execute(text(f'SELECT COALESCE(MAX(version), 0) FROM "{VERSION_TABLE}"')).scalar()
+
+
+def apply_migrations(engine: Engine, target: Optional[int] = None) -> List[int]:
+    """
+    Stosuje migracje nowsze niż wersja zapisana w bazie
+
+    Args:
+        engine: Silnik bazy danych
+        target: Wersja docelowa (domyślnie najnowsza)
+
+    Returns:
+        List[int]: Numery zastosowanych migracji
+    """
+    version = current_version(engine)
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version <= version or (target is not None and migration.version > target):
+            continue
+        started = time.perf_counter()
+        with engine.begin() as connection:
+            migration.apply(connection)
+            connection.execute(
+                text(f'INSERT INTO "{VERSION_TABLE}" (version, description, applied_at) '
+                     f'VALUES (:version, :description, :applied_at)'),
+                {"version": migration.version, "description": migration.description,
+                 "applied_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+            )
+        applied.append(migration.version)
+        logger.info(f"Migracja schematu {migration.version}: {migration.description} "
+                    f"({time.perf_counter() - started:.1f} s)")
+    return applied
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Migracje schematu bazy SQLite")
+    parser.add_argument('--database', default='measurement_system.db', help="plik bazy SQLite")
+    parser.add_argument('--target', type=int, default=None, help="wersja docelowa (domyślnie najnowsza)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.database):
+        print(f"Brak pliku bazy: {args.database}", file=sys.stderr)
+        return 1
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    engine = create_engine(f'sqlite:///{args.database}', connect_args={"timeout": 30})
+    print(f"Wersja schematu: {current_version(engine)}")
+    applied = apply_migrations(engine, args.target)
+    print(f"Zastosowane migracje: {applied or 'brak'}, wersja schematu: {current_version(engine)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
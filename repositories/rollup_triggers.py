@@ -0,0 +1,80 @@
+"""
+Wyzwalacze SQLite aktualizujące agregaty MeasureRollup przy zapisie MeasureData.
+
+Każdy rekord z poprawnym czasem (timeEpoch) aktualizuje przedział minutowy,
+godzinowy i dobowy swojego urządzenia (UPSERT) w tej samej transakcji co zapis
+rekordu - niezależnie od ścieżki zapisu (kolejka, paczki MEASURE_BATCH, import).
+
+Przyrost licznika sumy i czas pracy liczone są z kolejnych rekordów przedziału
+(jak calculate_incremental_sum i calculate_working_time w routers.reports), więc
+zależą od kolejności. Rekord starszy niż ostatni w przedziale (spóźniona paczka)
+oraz rekord uzupełniony przez MeasureBackfill oznaczają przedział jako dirty -
+taki przedział jest przeliczany z rekordów (repositories.measure_rollups).
+"""
+
+# Rozdzielczości agregatów [s]
+RESOLUTIONS = (60, 3600, 86400)
+
+# Przedziały dobowe zaczynają się o północy czasu lokalnego (jak timeEpoch)
+_BUCKET_EXPRESSIONS = {
+    60: 'NEW."timeEpoch" - NEW."timeEpoch" % 60',
+    3600: 'NEW."timeEpoch" - NEW."timeEpoch" % 3600',
+    86400: "CAST(strftime('%s', NEW.\"timeEpoch\", 'unixepoch', 'localtime', 'start of day', 'utc') AS INTEGER)",
+}
+
+_UPSERT = '''
+    INSERT INTO "MeasureRollup" ("deviceId", resolution, bucket, count,
+        "speedCount", "speedSum", "speedMin", "speedMax", "rateCount", "rateSum", "rateMin", "rateMax",
+        "totalCount", "totalSum", "firstTime", "lastTime", "lastSpeed", "firstTotal", "lastTotal",
+        "totalIncrement", "runningSeconds", dirty)
+    VALUES (NEW."deviceId", {resolution}, {bucket}, 1,
+        NEW."speedValue" IS NOT NULL, COALESCE(NEW."speedValue", 0), NEW."speedValue", NEW."speedValue",
+        NEW."rateValue" IS NOT NULL, COALESCE(NEW."rateValue", 0), NEW."rateValue", NEW."rateValue",
+        NEW."totalValue" IS NOT NULL, COALESCE(NEW."totalValue", 0), NEW."timeEpoch", NEW."timeEpoch",
+        NEW."speedValue", NEW."totalValue", NEW."totalValue", 0, 0, {dirty})
+    ON CONFLICT ("deviceId", resolution, bucket) DO UPDATE SET
+        count = count + 1,
+        "speedCount" = "speedCount" + excluded."speedCount",
+        "speedSum" = "speedSum" + excluded."speedSum",
+        "speedMin" = MIN(COALESCE("speedMin", excluded."speedMin"), COALESCE(excluded."speedMin", "speedMin")),
+        "speedMax" = MAX(COALESCE("speedMax", excluded."speedMax"), COALESCE(excluded."speedMax", "speedMax")),
+        "rateCount" = "rateCount" + excluded."rateCount",
+        "rateSum" = "rateSum" + excluded."rateSum",
+        "rateMin" = MIN(COALESCE("rateMin", excluded."rateMin"), COALESCE(excluded."rateMin", "rateMin")),
+        "rateMax" = MAX(COALESCE("rateMax", excluded."rateMax"), COALESCE(excluded."rateMax", "rateMax")),
+        "totalCount" = "totalCount" + excluded."totalCount",
+        "totalSum" = "totalSum" + excluded."totalSum",
+        "totalIncrement" = "totalIncrement" + CASE
+            WHEN excluded."lastTime" >= "lastTime" AND excluded."lastTotal" >= "lastTotal"
+            THEN excluded."lastTotal" - "lastTotal" ELSE 0 END,
+        "runningSeconds" = "runningSeconds" + CASE
+            WHEN excluded."lastTime" >= "lastTime" AND "lastSpeed" > 0
+            THEN excluded."lastTime" - "lastTime" ELSE 0 END,
+        "firstTotal" = COALESCE("firstTotal", excluded."firstTotal"),
+        "lastTotal" = CASE WHEN excluded."lastTime" >= "lastTime"
+            THEN COALESCE(excluded."lastTotal", "lastTotal") ELSE "lastTotal" END,
+        "lastSpeed" = CASE WHEN excluded."lastTime" >= "lastTime" THEN excluded."lastSpeed" ELSE "lastSpeed" END,
+        dirty = CASE WHEN excluded."lastTime" < "lastTime" OR excluded.dirty THEN 1 ELSE dirty END,
+        "firstTime" = MIN("firstTime", excluded."firstTime"),
+        "lastTime" = MAX("lastTime", excluded."lastTime");'''
+
+TRIGGERS = {
+    # Nowe rekordy
+    'tr_MeasureData_rollup_insert': (
+        'AFTER INSERT ON "MeasureData" WHEN NEW."timeEpoch" IS NOT NULL', 0),
+    # Rekordy ze starszych baz, którym MeasureBackfill uzupełnił czas - kolejność nieznana
+    'tr_MeasureData_rollup_backfill': (
+        'AFTER UPDATE OF "timeEpoch" ON "MeasureData" '
+        'WHEN OLD."timeEpoch" IS NULL AND NEW."timeEpoch" IS NOT NULL', 1),
+}
+
+
+def trigger_statements() -> list:
+    """Instrukcje DDL (DROP + CREATE) wyzwalaczy agregatów"""
+    statements = []
+    for name, (event, dirty) in TRIGGERS.items():
+        body = ''.join(_UPSERT.format(resolution=resolution, bucket=_BUCKET_EXPRESSIONS[resolution], dirty=dirty)
+                       for resolution in RESOLUTIONS)
+        statements.append(f'DROP TRIGGER IF EXISTS "{name}"')
+        statements.append(f'CREATE TRIGGER "{name}" {event} BEGIN{body}\nEND')
+    return statements
@@ -0,0 +1,223 @@
+"""
+Profile pracy pliku SQLite (PRAGMA ustawiane przy każdym nowym połączeniu).
+
+Domyślny tryb dziennika (DELETE) blokuje odczyty na czas zapisu i odwrotnie -
+raport czytający miliony rekordów potrafi wstrzymać zapis ramek ("database is
+locked"). W trybie WAL czytelnicy widzą ostatni zatwierdzony stan i nie blokują
+jedynego piszącego.
+
+Domyślny profil (durable) zachowuje trwałość każdego commitu (synchronous=FULL).
+Profil balanced (synchronous=NORMAL, fsync tylko przy checkpointach) jest szybszy,
+ale po awarii zasilania może utracić ostatnie commity - włączany świadomie przez
+SQLITE_PROFILE=balanced.
+"""
+import os
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+JOURNAL_MODES = ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF")
+SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+TEMP_STORES = ("DEFAULT", "FILE", "MEMORY")
+
+
+class StorageProfile(NamedTuple):
+    """
+    Attributes:
+        journal_mode: Tryb dziennika (WAL, DELETE, ...)
+        synchronous: OFF, NORMAL lub FULL
+        cache_size: Rozmiar pamięci podręcznej stron (ujemny - w KiB)
+        mmap_size: Rozmiar mapowania pliku w pamięci [B] (0 - wyłączone)
+        temp_store: DEFAULT, FILE lub MEMORY (tabele tymczasowe sortowań i GROUP BY)
+        busy_timeout: Czas oczekiwania na zwolnienie blokady [ms]
+    """
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    cache_size: int = -65536
+    mmap_size: int = 268435456
+    temp_store: str = "MEMORY"
+    busy_timeout: int = 30000
+
+    def validated(self) -> 'StorageProfile':
+        """
+        Raises:
+            ValueError: dla nieobsługiwanej wartości ustawienia
+        """
+        for field, allowed in (("journal_mode", JOURNAL_MODES), ("synchronous", SYNCHRONOUS_LEVELS),
+                               ("temp_store", TEMP_STORES)):
+            value = getattr(self, field).upper()
+            if value not in allowed:
+                raise ValueError(f"Niepoprawne {field}: {value} (dozwolone: {', '.join(allowed)})")
+        return self._replace(journal_mode=self.journal_mode.upper(), synchronous=self.synchronous.upper(),
+                             temp_store=self.temp_store.upper())
+
+
+PROFILES: Dict[str, StorageProfile] = {
+    # Zachowanie sprzed profili - dziennik DELETE, ustawienia domyślne SQLite
+    "compat": StorageProfile(journal_mode="DELETE", synchronous="FULL", cache_size=-2000, mmap_size=0,
+                             temp_store="DEFAULT"),
+    # WAL, fsync tylko przy checkpointach - po awarii zasilania można stracić ostatnie commity,
+    # baza pozostaje spójna (tylko na życzenie: SQLITE_PROFILE=balanced)
+    "balanced": StorageProfile(),
+    # WAL z fsync przy każdym commicie
+    "durable": StorageProfile(synchronous="FULL"),
+    # Duża baza (lata danych) - większa pamięć podręczna i mapowanie pliku, trwałość jak durable
+    "large": StorageProfile(synchronous="FULL", cache_size=-262144, mmap_size=2147483648),
+}
+
+# Profil domyślny nie obniża trwałości zatwierdzonych zapisów
+DEFAULT_PROFILE = "durable"
+
+
+def get_profile(name: str) -> StorageProfile:
+    """
+    Raises:
+        ValueError: dla nieznanej nazwy profilu
+    """
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Nieznany profil SQLite: {name} (dostępne: {', '.join(PROFILES)})") from None
+
+
+def profile_pragmas(profile: StorageProfile, read_only: bool = False) -> list:
+    """Instrukcje PRAGMA profilu w kolejności wykonania"""
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(profile.busy_timeout)}",
+        f"PRAGMA journal_mode = {profile.journal_mode}",
+        f"PRAGMA synchronous = {profile.synchronous}",
+        f"PRAGMA cache_size = {int(profile.cache_size)}",
+        f"PRAGMA mmap_size = {int(profile.mmap_size)}",
+        f"PRAGMA temp_store = {profile.temp_store}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
+    return pragmas
+
+
+def apply_profile(engine: Engine, profile: StorageProfile, read_only: bool = False) -> None:
+    """
+    Rejestruje ustawienie profilu na każdym nowym połączeniu silnika
+
+    Args:
+        engine: Silnik SQLite (dla AsyncEngine - engine.sync_engine)
+        profile: Profil pracy
+        read_only: Połączenia tylko do odczytu (PRAGMA query_only)
+    """
+    pragmas = profile_pragmas(profile, read_only)
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+class StorageMaintenance:
+    """
+    Okresowa obsługa pliku bazy w tle: PRAGMA optimize (aktualizacja statystyk
+    planera dla zmienionych tabel) oraz checkpoint WAL (przeniesienie stron z pliku
+    -wal do bazy, żeby dziennik nie rósł przy ciągłych odczytach).
+    """
+
+    def __init__(self, engine: Engine, interval: float = 600.0):
+        """
+        Args:
+            engine: Silnik z prawem zapisu
+            interval: Odstęp między przebiegami [s]
+        """
+        self.engine = engine
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # Statystyki
+        self.runs = 0
+        self.errors = 0
+        self.last_run: Optional[float] = None
+        self.last_duration_ms = 0.0
+        self.last_checkpoint: Optional[dict] = None
+
+    def run_once(self, checkpoint_mode: str = "PASSIVE") -> Optional[dict]:
+        """
+        Wykonuje PRAGMA optimize i checkpoint WAL
+
+        Args:
+            checkpoint_mode: PASSIVE (bez czekania na czytelników), RESTART lub TRUNCATE
+
+        Returns:
+            Optional[dict]: Wynik checkpointu (busy, log, checkpointed) lub None przy błędzie
+        """
+        started = time.perf_counter()
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(text("PRAGMA optimize"))
+                busy, log, checkpointed = connection.execute(
+                    text(f"PRAGMA wal_checkpoint({checkpoint_mode})")).one()
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            logger.error(f"Błąd obsługi pliku bazy (optimize/checkpoint): {e}")
+            return None
+        result = {"mode": checkpoint_mode, "busy": busy, "log": log, "checkpointed": checkpointed}
+        with self._lock:
+            self.runs += 1
+            self.last_run = time.time()
+            self.last_duration_ms = (time.perf_counter() - started) * 1000
+            self.last_checkpoint = result
+        logger.debug(f"Obsługa pliku bazy: {result} ({self.last_duration_ms:.1f} ms)")
+        return result
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def start(self) -> None:
+        """Uruchamia okresową obsługę w wątku w tle"""
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sqlite-maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Zatrzymuje wątek i wykonuje końcowy checkpoint (TRUNCATE - pusty plik -wal)"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.run_once("TRUNCATE")
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "interval": self.interval,
+                "runs": self.runs,
+                "errors": self.errors,
+                "last_run": self.last_run,
+                "last_duration_ms": round(self.last_duration_ms, 2),
+                "last_checkpoint": self.last_checkpoint,
+            }
+
+
+def env_profile() -> StorageProfile:
+    """Profil z SQLITE_PROFILE z nadpisaniem pojedynczych ustawień zmiennymi SQLITE_<USTAWIENIE>"""
+    profile = get_profile(os.getenv("SQLITE_PROFILE", DEFAULT_PROFILE))
+    overrides = {}
+    for field, kind in (("journal_mode", str), ("synchronous", str), ("cache_size", int),
+                        ("mmap_size", int), ("temp_store", str), ("busy_timeout", int)):
+        value = os.getenv(f"SQLITE_{field.upper()}")
+        if value:
+            overrides[field] = kind(value)
+    return profile._replace(**overrides).validated()
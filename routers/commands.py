@@ -1,11 +1,23 @@
 import logging
 import asyncio
 import random
+from typing import List, Optional, Tuple
 from fastapi import APIRouter, HTTPException, Body, Depends
 from sqlalchemy.orm import Session
-from repositories.database import get_db
-from services.command_handler import CommandHandler
+from repositories.database import get_db, STORAGE_PROFILE, storage_maintenance
+from repositories.measure_partitions import measure_partitions
+from repositories.measure_rollups import measure_rollups
+from services.command_handler import CommandHandler, FrameError
+from services.frame_splitter import split_frames
+from services.db_executor import ingest_executor, query_executor
+from services.ingest_queue import measure_write_queue
+from services.command_registry import command_registry
+from services.duplicate_filter import duplicate_frame_filter
+from services.frame_recorder import frame_recorder
+from services.measure_compression import measure_compressor
+from services.key_ring import rc4_key_ring
 from services.support import command_support, ProtocolAnalyzer
+from services.cipher import RC4KeyGenerator
 from fastapi.responses import Response
 
 
@@ -20,6 +32,14 @@ router = APIRouter(
     responses={404: {"description": "Not found"}}
 )
 
+# Klucze szyfrowania RC4 integratorów
+RC4_KEY1 = "Massensors"
+RC4_KEY2 = "text"
+RC4_ITERATIONS = RC4KeyGenerator.DEFAULT_ITERATIONS
+
+# Maksymalna liczba ramek w jednym żądaniu /analyze-batch
+MAX_BATCH_FRAMES = 500
+
 
 # Flaga do włączania/wyłączania symulacji
 SIMULATE_DELAY = True  # Zmień na False aby wyłączyć
@@ -35,55 +55,74 @@ async def simulate_network_delay():
 
 
 
-@router.post("/analyze")
-async def analyze_data(data: bytes = Body(...), db: Session = Depends(get_db)):
-    """
-    Endpoint do analizy przychodzącego strumienia danych i zapisu do bazy
-    """
-   # await simulate_network_delay()  # SYMULACJA
-
-    try:
-        
-        # Sprawdzenie poprawności ramki
-        if not ProtocolAnalyzer.validate_frame(data):
-            raise HTTPException(
-                status_code=400,
-                detail="Nieprawidłowa ramka: błąd znacznika końca lub sumy kontrolnej"
-            )
-        # teraz nalezy sprawdzic czy dane sa zakodowane
-        #decoded_data, crc_valid = ProtocolAnalyzer.encode_data(data,1000, bytes([1,2]), bytes([1,2]))
-        decoded_data, crc_valid = ProtocolAnalyzer.encode_data(data, 1000, "Massensors" ,"text" )
-        # Sprawdzenie czy suma kontrolna jest poprawna
-        if not crc_valid:
-            raise HTTPException(
-                status_code=400,
-                detail="Nieprawidłowa suma kontrolna CRC8"
-            )
-        flag = decoded_data[3]
-        #command_id = decoded_data[14:16]  # 2 bajty
-        #device_id = decoded_data[4:14]  # 10 bajtów
-
+# Handlery komend tworzone raz - obsługa komend pochodzi z rejestru command_registry
+command_handler = CommandHandler(RC4_KEY1, RC4_KEY2)
+batch_command_handler = CommandHandler(RC4_KEY1, RC4_KEY2, autocommit=False)
 
 
-        # Pobranie COMMAND_ID
-        command_id = ProtocolAnalyzer.extract_command_id(decoded_data)
+def _analyze_frame(db: Session, data: bytes):
+    """
+    Synchroniczna obsługa pojedynczej ramki - wykonywana w puli ingest_executor
+    """
+    # Walidacja, odszyfrowanie i obsługa komendy
+    return command_handler.process_frame(data, db, RC4_ITERATIONS)
 
 
-        #---------------nowa implementacja
+def _analyze_batch(db: Session, frames: List[bytes]) -> Tuple[List[Optional[bytes]], int, int]:
+    """
+    Synchroniczna obsługa paczki ramek w jednej transakcji - wykonywana w puli ingest_executor.
+    Przy wycofaniu transakcji przywracany jest stan urządzeń (ostatnia prędkość, kompresja).
 
-        # Utworzenie handlera komend
-        command_handler = CommandHandler("Massensors", "text")
-        # Obsługa różnych komend
-        response = command_handler.handle_command(command_id, decoded_data, flag, db)
+    Returns:
+        Tuple[List[Optional[bytes]], int, int]: (ramki odpowiedzi w kolejności ramek wejściowych -
+        None dla ramki odrzuconej lub bez ramki odpowiedzi, liczba przetworzonych, liczba odrzuconych)
+    """
+    replies: List[Optional[bytes]] = []
+    answered = []
+    processed = 0
+    rejected = 0
+    batch_command_handler.begin_device_state()
+    try:
+        for frame in frames:
+            try:
+                response = batch_command_handler.process_frame(frame, db, RC4_ITERATIONS)
+            except FrameError as e:
+                # Ramka z błędną sumą CRC8 - pomijamy, pozostałe przetwarzamy dalej
+                logger.warning(f"Odrzucono ramkę {len(replies)} z paczki: {e}")
+                rejected += 1
+                replies.append(None)
+                continue
+            processed += 1
+            if isinstance(response, Response):
+                replies.append(response.body)
+                answered.append((frame, response.body))
+            else:
+                replies.append(None)
+
+        # Jedno zatwierdzenie dla całej paczki
+        db.commit()
+    except Exception:
+        db.rollback()
+        batch_command_handler.end_device_state(restore=True)
+        raise
+    batch_command_handler.end_device_state()
+    # Odpowiedzi zapamiętywane dopiero po zatwierdzeniu - retransmisja wycofanej paczki zostanie obsłużona ponownie
+    for frame, reply in answered:
+        duplicate_frame_filter.remember(frame, reply)
+    return replies, processed, rejected
 
-        #-----koniec nowej implementacji
 
+@router.post("/analyze")
+async def analyze_data(data: bytes = Body(...)):
+    """
+    Endpoint do analizy przychodzącego strumienia danych i zapisu do bazy.
+    Obsługa ramki (RC4, zapis do bazy) wykonywana jest w puli wątków,
+    więc nie blokuje pętli zdarzeń.
+    """
+   # await simulate_network_delay()  # SYMULACJA
 
-        # # Obsługa różnych komend, stara implementacja, realizacja za pomoca funkcji
-        # response = command_support(command_id, decoded_data,
-        #                            flag,
-        #                            "Massensors",
-        #                            "text",db)
+    try:
+        response = await ingest_executor.run(_analyze_frame, data)
 
         # Jeśli response jest już obiektem Response, zwróć go bezpośrednio
         if isinstance(response, Response):
@@ -95,8 +134,90 @@ async def analyze_data(data: bytes = Body(...), db: Session = Depends(get_db)):
         logger.debug(f"Zawartość odpowiedzi JSON: {response}")
         return response
 
+    except FrameError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Błąd przetwarzania danych: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.post("/analyze-batch")
+async def analyze_batch(data: bytes = Body(...)):
+    """
+    Endpoint do analizy paczki sklejonych ramek (0xAA 0x55 ... 0x55).
+
+    Ramki są wydzielane na podstawie DATA_LEN, każda jest obsługiwana jak w /analyze,
+    a zmiany w bazie zatwierdzane są jedną transakcją. Odpowiedź zawiera sklejone
+    ramki zwrotne w kolejności ramek wejściowych. Nagłówek X-Frames-Unanswered
+    wymienia numery (od 0, w kolejności wydzielonych ramek) ramek bez ramki
+    odpowiedzi - odrzuconych (CRC8, nieznany klucz) lub obsłużonych bez odpowiedzi.
+    """
+    frames, rejected = split_frames(data, RC4_KEY1, RC4_KEY2)
+    if len(frames) > MAX_BATCH_FRAMES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Za dużo ramek w paczce: {len(frames)} (maksymalnie {MAX_BATCH_FRAMES})"
+        )
+
+    try:
+        replies, processed, rejected_crc8 = await ingest_executor.run(_analyze_batch, frames)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Błąd przetwarzania paczki danych: {str(e)}"
+        )
+    rejected += rejected_crc8
+
+    unanswered = [index for index, reply in enumerate(replies) if reply is None]
+
+    logger.info(f"Paczka ramek: przetworzone={processed}, odpowiedzi={len(replies) - len(unanswered)}, "
+                f"odrzucone={rejected}")
+    return Response(
+        content=b''.join(reply for reply in replies if reply is not None),
+        media_type="application/octet-stream",
+        headers={
+            "X-Frames-Accepted": str(processed),
+            "X-Frames-Rejected": str(rejected),
+            "X-Frames-Unanswered": ",".join(str(index) for index in unanswered),
+        }
+    )
+
+
+@router.get("/ingest/metrics")
+async def get_ingest_metrics():
+    """
+    Metryki przyjmowania danych: kolejka zapisu MeasureData (głębokość, czasy commitów),
+    pule wątków bazy danych, pominięte retransmisje ramek, stan rejestratora ramek,
+    stopień kompresji zapisu MeasureData per urządzenie oraz profil i obsługa pliku SQLite
+    (partycje, agregaty MeasureRollup)
+    """
+    return {
+        "write_queue": measure_write_queue.get_metrics(),
+        "executors": [ingest_executor.get_stats(), query_executor.get_stats()],
+        "duplicates": duplicate_frame_filter.get_stats(),
+        "recorder": frame_recorder.get_stats(),
+        "compression": measure_compressor.get_stats(),
+        "storage": {"profile": STORAGE_PROFILE._asdict(), "maintenance": storage_maintenance.get_stats(),
+                    "partitions": measure_partitions.get_stats(), "rollups": measure_rollups.get_stats()},
+    }
+
+
+@router.get("/stats")
+async def get_command_stats():
+    """
+    Statystyki obsługi komend: liczba wywołań, błędy i histogram czasu obsługi
+    """
+    return command_registry.get_stats()
+
+
+@router.get("/keys")
+async def get_rc4_keys():
+    """
+    Aktywne klucze RC4 w pierścieniu kluczy (identyfikatory RC4_KEY_ID, bez materiału kluczowego)
+    """
+    return rc4_key_ring.get_stats()
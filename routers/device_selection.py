@@ -5,6 +5,7 @@ from pydantic import BaseModel
 from typing import Dict, Any, Optional
 
 from repositories.database import get_db
+from repositories.measure_partitions import measure_partitions
 from models.models import Aliases, StaticParams, MeasureData
 from services.selected_device_store import selected_device_store
 from services.service_mode_manager import service_mode_manager
@@ -100,7 +101,7 @@ async def select_device(request: DeviceSelectionRequest, db: Session = Depends(g
             device_exists = True
 
         # Policz wszystkie pomiary
-        measures_count = db.query(MeasureData).filter(MeasureData.deviceId == device_id).count()
+        measures_count = measure_partitions.count(db, device_id)
         if measures_count > 0:
             device_info["measures_count"] = measures_count
 
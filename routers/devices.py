@@ -1,15 +1,17 @@
 import logging
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, distinct
 from typing import List, Dict, Optional
 from starlette import status
 
-from repositories.database import get_db
+from repositories.database import get_async_db
 from models.models import Aliases
 from pydantic import BaseModel
 from sqlalchemy import func
+from services.db_executor import ingest_executor, query_executor
 from services.device_activity_tracker import device_activity_tracker
+from services.report_interval import ReportIntervalPolicy, report_interval_store
 
 # Konfiguracja loggera
 logger = logging.getLogger(__name__)
@@ -74,32 +76,35 @@ class DevicesListResponse(BaseModel):
                 "count": 1
             }
         }
+
+
+async def _get_latest_aliases(db: AsyncSession) -> List[Aliases]:
+    """
+    Zwraca najnowszy rekord aliasów (najwyższe id) dla każdego urządzenia - jednym zapytaniem
+    """
+    latest_ids = select(func.max(Aliases.id)).group_by(Aliases.deviceId)
+    result = await db.execute(select(Aliases).where(Aliases.id.in_(latest_ids)).order_by(Aliases.deviceId))
+    return list(result.scalars().all())
+
+
 # NOWY ENDPOINT - Status urządzeń z informacją online/offline
 @router.get("/status")
-async def get_devices_status(db: Session = Depends(get_db)):
+async def get_devices_status(db: AsyncSession = Depends(get_async_db)):
     """
     Zwraca listę urządzeń z ich statusem online/offline.
     """
     logger.info("Wywołano endpoint /status")  # DODAJ TEN LOG
     try:
-        # Pobierz wszystkie unikalne urządzenia z bazy
-        unique_device_ids = db.query(Aliases.deviceId).distinct().all()
+        # Pobierz najnowsze aliasy wszystkich urządzeń z bazy
+        latest_aliases = await _get_latest_aliases(db)
 
         # Pobierz status aktywności z trackera
         activity_status = device_activity_tracker.get_all_devices_status()
 
         devices_list = []
 
-        for (device_id,) in unique_device_ids:
-            device_id_clean = device_id.strip()
-
-            # Pobierz najnowszy alias dla urządzenia
-            latest_alias = (
-                db.query(Aliases)
-                .filter(Aliases.deviceId == device_id_clean)
-                .order_by(Aliases.id.desc())
-                .first()
-            )
+        for latest_alias in latest_aliases:
+            device_id_clean = latest_alias.deviceId.strip()
 
             if latest_alias:
                 # Sprawdź status online
@@ -138,7 +143,7 @@ async def get_devices_status(db: Session = Depends(get_db)):
         }
 
 @router.get("/list", response_model=List[DeviceInfo])
-async def get_devices_list(db: Session = Depends(get_db)):
+async def get_devices_list(db: AsyncSession = Depends(get_async_db)):
     """
     Pobierz listę wszystkich urządzeń z ich najnowszymi aliasami.
 
@@ -146,19 +151,11 @@ async def get_devices_list(db: Session = Depends(get_db)):
     Każde urządzenie zawiera swoje ID oraz najnowsze powiązane aliasy.
     """
     try:
-        # Najpierw pobierz wszystkie unikalne deviceId
-        unique_device_ids = db.query(Aliases.deviceId).distinct().all()
+        # Dla każdego deviceId najnowszy rekord (według najwyższego id)
+        latest_aliases = await _get_latest_aliases(db)
 
         devices = []
-        for (device_id,) in unique_device_ids:
-            # Dla każdego deviceId pobierz najnowszy rekord (według najwyższego id)
-            latest_alias = (
-                db.query(Aliases)
-                .filter(Aliases.deviceId == device_id)
-                .order_by(Aliases.id.desc())
-                .first()
-            )
-
+        for latest_alias in latest_aliases:
             if latest_alias:
                 device_info = DeviceInfo(
                     device_id=latest_alias.deviceId,
@@ -188,7 +185,7 @@ async def get_devices_list(db: Session = Depends(get_db)):
 
 
 @router.get("/list/summary", response_model=DevicesListResponse)
-async def get_devices_list_with_summary(db: Session = Depends(get_db)):
+async def get_devices_list_with_summary(db: AsyncSession = Depends(get_async_db)):
     """
     Pobierz listę urządzeń wraz z podsumowaniem (liczba urządzeń).
 
@@ -211,16 +208,15 @@ async def get_devices_list_with_summary(db: Session = Depends(get_db)):
 
 
 @router.get("/count")
-async def get_devices_count(db: Session = Depends(get_db)) -> Dict[str, int]:
+async def get_devices_count(db: AsyncSession = Depends(get_async_db)) -> Dict[str, int]:
     """
     Pobierz tylko liczbę urządzeń w bazie danych.
 
     Szybki endpoint do sprawdzania liczby urządzeń bez pobierania pełnych danych.
     """
     try:
-        query = select(distinct(Aliases.deviceId))
-        result = db.execute(query)
-        count = len(result.scalars().all())
+        query = select(func.count(distinct(Aliases.deviceId)))
+        count = await db.scalar(query)
 
         logger.info(f"Liczba urządzeń w bazie: {count}")
         return {"count": count}
@@ -234,7 +230,7 @@ async def get_devices_count(db: Session = Depends(get_db)) -> Dict[str, int]:
 
 
 @router.get("/{device_id}", response_model=DeviceInfo)
-async def get_device_info(device_id: str, db: Session = Depends(get_db)):
+async def get_device_info(device_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     Pobierz informacje o konkretnym urządzeniu.
 
@@ -246,7 +242,8 @@ async def get_device_info(device_id: str, db: Session = Depends(get_db)):
     """
     try:
         # Znajdź urządzenie po ID
-        alias = db.query(Aliases).filter(Aliases.deviceId == device_id).first()
+        result = await db.execute(select(Aliases).where(Aliases.deviceId == device_id).limit(1))
+        alias = result.scalars().first()
 
         if not alias:
             raise HTTPException(
@@ -283,25 +280,17 @@ async def search_devices_by_alias(
         location: Optional[str] = None,
         product_name: Optional[str] = None,
         scale_id: Optional[str] = None,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ) -> List[DeviceInfo]:
     """
     Wyszukaj urządzenia po najnowszych aliasach.
     """
     try:
-        # Pobierz wszystkie unikalne deviceId
-        unique_device_ids = db.query(Aliases.deviceId).distinct().all()
+        # Dla każdego deviceId najnowszy rekord
+        latest_aliases = await _get_latest_aliases(db)
 
         devices = []
-        for (device_id,) in unique_device_ids:
-            # Dla każdego deviceId pobierz najnowszy rekord
-            latest_alias = (
-                db.query(Aliases)
-                .filter(Aliases.deviceId == device_id)
-                .order_by(Aliases.id.desc())
-                .first()
-            )
-
+        for latest_alias in latest_aliases:
             if latest_alias:
                 # Sprawdź filtry wyszukiwania
                 match = True
@@ -339,3 +328,60 @@ async def search_devices_by_alias(
         )
 
 
+class ReportIntervalModel(BaseModel):
+    """Model polityki interwału raportowania [s]"""
+    running: int = ReportIntervalPolicy().running
+    stopped: int = ReportIntervalPolicy().stopped
+    service: int = ReportIntervalPolicy().service
+
+
+@router.get("/report-interval/policies")
+async def get_report_interval_policies() -> Dict:
+    """
+    Domyślna polityka interwału raportowania oraz polityki ustawione dla urządzeń.
+    Interwał wysyłany jest integratorom VERSION 2 w odpowiedzi na MEASURE_DATA.
+    """
+    return await query_executor.run(report_interval_store.get_stats)
+
+
+@router.put("/report-interval/default", response_model=ReportIntervalModel)
+async def set_default_report_interval(policy: ReportIntervalModel):
+    """Ustawia domyślną politykę interwału raportowania"""
+    try:
+        await ingest_executor.run(report_interval_store.set_default, ReportIntervalPolicy(**policy.model_dump()))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    return ReportIntervalModel(**(await query_executor.run(report_interval_store.default))._asdict())
+
+
+@router.get("/{device_id}/report-interval")
+async def get_device_report_interval(device_id: str) -> Dict:
+    """Polityka interwału raportowania obowiązująca dla urządzenia"""
+    def _read(db):
+        return report_interval_store.has_policy(db, device_id), report_interval_store.get_policy(db, device_id)
+
+    custom, device_policy = await query_executor.run(_read)
+    return {"device_id": device_id, "custom": custom, "policy": device_policy._asdict()}
+
+
+@router.put("/{device_id}/report-interval", response_model=ReportIntervalModel)
+async def set_device_report_interval(device_id: str, policy: ReportIntervalModel):
+    """Ustawia politykę interwału raportowania dla urządzenia"""
+    try:
+        await ingest_executor.run(report_interval_store.set_policy, device_id,
+                                  ReportIntervalPolicy(**policy.model_dump()))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    return ReportIntervalModel(**(await query_executor.run(report_interval_store.get_policy, device_id))._asdict())
+
+
+@router.delete("/{device_id}/report-interval")
+async def reset_device_report_interval(device_id: str) -> Dict:
+    """Usuwa politykę urządzenia - urządzenie wraca do polityki domyślnej"""
+    if not await ingest_executor.run(report_interval_store.reset_policy, device_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Urządzenie '{device_id}' nie ma własnej polityki interwału raportowania"
+        )
+    return {"device_id": device_id,
+            "policy": (await query_executor.run(report_interval_store.default))._asdict()}
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import and_, func, desc, asc
 from typing import List, Optional
 from datetime import datetime, date, timedelta
@@ -7,10 +8,14 @@ from datetime import datetime, date, timedelta
 
 from starlette import status
 
-from repositories.database import get_db
+from repositories.database import get_db, get_async_db
+from repositories.measure_partitions import measure_partitions
+from repositories.measure_rollups import measure_rollups
 from models.models import MeasureData
 from pydantic import BaseModel
 from services.selected_device_store import selected_device_store
+from services.db_executor import query_executor
+from services.measure_values import format_epoch, with_typed_values
 import logging
 
 logger = logging.getLogger(__name__)
@@ -75,13 +80,23 @@ class MeasureDataListResponse(BaseModel):
     sampling_info: str
     period_info: str
     device_id: Optional[str] = None
+    complete: bool = True
+    pending_records: int = 0
 
 
 class PeriodSummary(BaseModel):
-    """Podsumowanie dla wybranego okresu"""
+    """
+    Podsumowanie dla wybranego okresu. invalid_time_records - rekordy urządzenia bez poprawnego
+    czasu (timeInvalid), których nie można przypisać do okresu - nie wchodzą do statystyk okresu.
+    pending_records - rekordy starszej bazy jeszcze bez kolumn liczbowych (migracja MeasureBackfill
+    w toku); dopóki są, statystyki mogą ich nie obejmować (complete = False).
+    """
     period_info: str
     device_id: str
     total_records: int
+    invalid_time_records: int = 0
+    pending_records: int = 0
+    complete: bool = True
     speed_avg: Optional[float] = None
     speed_min: Optional[float] = None
     speed_max: Optional[float] = None
@@ -100,39 +115,38 @@ async def get_rate_chart_data(
         start_date: Optional[date] = Query(None, description="Data początkowa (YYYY-MM-DD)"),
         end_date: Optional[date] = Query(None, description="Data końcowa (YYYY-MM-DD)"),
         period_type: Optional[str] = Query(None, description="Typ okresu"),
-        max_points: int = Query(500, ge=10, le=2000, description="Maksymalna liczba punktów na wykresie"),
-        db: Session = Depends(get_db)
+        max_points: int = Query(500, ge=10, le=2000, description="Maksymalna liczba punktów na wykresie")
 ):
     """
     Pobierz dane wydajności (rate) dla wykresu.
     Automatycznie próbkuje dane jeśli jest ich więcej niż max_points.
     """
-    try:
-        # Bazowe zapytanie
-        query = db.query(MeasureData)
+    return await query_executor.run(_get_rate_chart_data, device_id, start_date, end_date, period_type, max_points)
 
+
+def _get_rate_chart_data(db: Session, device_id, start_date, end_date, period_type, max_points) -> RateChartData:
+    """Zapytanie i próbkowanie danych wykresu - wykonywane w puli query_executor"""
+    try:
         # Filtrowanie po urządzeniu
         if not device_id:
             device_id = selected_device_store.get_device_id()
 
         if device_id:
-            query = query.filter(MeasureData.deviceId == device_id)
             logger.info(f"Pobieranie danych wykresu wydajności dla urządzenia: {device_id}")
 
         # Obsługa okresów
         calculated_start, calculated_end, period_display = _calculate_period_dates(period_type, start_date, end_date)
+        start_epoch, end_epoch = _period_epochs(calculated_start, calculated_end)
 
-        # Filtrowanie po datach
-        if calculated_start:
-            start_str = calculated_start.strftime('%Y-%m-%d %H:%M:%S')
-            query = query.filter(MeasureData.currentTime >= start_str)
-
-        if calculated_end:
-            end_str = calculated_end.strftime('%Y-%m-%d %H:%M:%S')
-            query = query.filter(MeasureData.currentTime <= end_str)
+        # Długi okres - średnie z agregatów zamiast próbek rekordów
+        resolution = measure_rollups.chart_resolution(start_epoch, end_epoch, max_points)
+        if resolution is not None and device_id:
+            buckets = measure_rollups.series(db, device_id, resolution, start_epoch, end_epoch)
+            if buckets is not None:
+                return _rollup_chart_data(buckets, device_id, period_display, max_points)
 
-        # Policz całkowitą liczbę rekordów
-        total_count = query.count()
+        # Policz całkowitą liczbę rekordów (tylko partycje nachodzące na okres)
+        total_count = measure_partitions.count(db, device_id, start_epoch, end_epoch)
 
         if total_count == 0:
             return RateChartData(
@@ -149,28 +163,21 @@ async def get_rate_chart_data(
         # Próbkowanie jeśli potrzebne
         if total_count > max_points:
             # Równomierne próbkowanie
-            all_ids_query = query.with_entities(MeasureData.id).order_by(MeasureData.currentTime)
-            all_ids = [row[0] for row in all_ids_query.all()]
-
-            step = total_count / max_points
-            sampled_ids = []
-
-            for i in range(max_points):
-                index = int(i * step)
-                if index < len(all_ids):
-                    sampled_ids.append(all_ids[index])
-
-            # Zawsze dołącz pierwszy i ostatni
-            if all_ids[0] not in sampled_ids:
-                sampled_ids.insert(0, all_ids[0])
-            if all_ids[-1] not in sampled_ids:
-                sampled_ids.append(all_ids[-1])
-
-            query = query.filter(MeasureData.id.in_(sampled_ids))
-            logger.info(f"Próbkowanie wykresu wydajności: {len(sampled_ids)} punktów z {total_count}")
-
-        # Pobierz dane posortowane chronologicznie
-        measures = query.order_by(MeasureData.currentTime).all()
+            def pick(count: int) -> List[int]:
+                step = count / max_points
+                positions = [int(i * step) for i in range(max_points) if int(i * step) < count]
+                # Zawsze dołącz pierwszy i ostatni
+                if 0 not in positions:
+                    positions.insert(0, 0)
+                if count - 1 not in positions:
+                    positions.append(count - 1)
+                return positions
+
+            measures = measure_partitions.sample_measures(db, device_id, start_epoch, end_epoch, pick)
+            logger.info(f"Próbkowanie wykresu wydajności: {len(measures)} punktów z {total_count}")
+        else:
+            # Pobierz dane posortowane chronologicznie
+            measures = measure_partitions.query_measures(db, device_id, start_epoch, end_epoch)
 
         # Przygotuj dane dla wykresu
         timestamps = []
@@ -181,20 +188,13 @@ async def get_rate_chart_data(
         for m in measures:
             timestamps.append(m.currentTime)
 
-            # Konwertuj rate na float
-            try:
-                rate_val = float(m.rate)
-                rate_values.append(rate_val)
-                valid_rates.append(rate_val)
-            except (ValueError, TypeError):
+            if m.rateValue is not None:
+                rate_values.append(m.rateValue)
+                valid_rates.append(m.rateValue)
+            else:
                 rate_values.append(0.0)
 
-            # Konwertuj speed na float
-            try:
-                speed_val = float(m.speed)
-                speed_values.append(speed_val)
-            except (ValueError, TypeError):
-                speed_values.append(0.0)
+            speed_values.append(m.speedValue if m.speedValue is not None else 0.0)
 
         max_rate = max(valid_rates) if valid_rates else 0.0
         avg_rate = sum(valid_rates) / len(valid_rates) if valid_rates else 0.0
@@ -219,36 +219,74 @@ async def get_rate_chart_data(
             detail=f"Błąd podczas pobierania danych wykresu wydajności: {str(e)}"
         )
 # ----------dotad nowy endpoint
+def _rollup_chart_data(buckets, device_id, period_display, max_points) -> RateChartData:
+    """
+    Dane wykresu z agregatów: kolejne przedziały łączone w co najwyżej max_points
+    punktów, wartość punktu to średnia wydajności / prędkości jego rekordów
+    """
+    timestamps = []
+    rate_values = []
+    speed_values = []
+    count = len(buckets)
+    groups = min(count, max_points)
+    for index in range(groups):
+        group = buckets[index * count // groups:(index + 1) * count // groups]
+        rate_count = sum(b.rateCount for b in group)
+        speed_count = sum(b.speedCount for b in group)
+        timestamps.append(format_epoch(group[0].bucket))
+        rate_values.append(sum(b.rateSum for b in group) / rate_count if rate_count else 0.0)
+        speed_values.append(sum(b.speedSum for b in group) / speed_count if speed_count else 0.0)
+
+    rate_count = sum(b.rateCount for b in buckets)
+    rate_max = [b.rateMax for b in buckets if b.rateMax is not None]
+    max_rate = max(rate_max) if rate_max else 0.0
+    avg_rate = sum(b.rateSum for b in buckets) / rate_count if rate_count else 0.0
+
+    logger.info(f"Dane wykresu wydajności z agregatów: {len(timestamps)} punktów z {count} przedziałów, "
+                f"max={max_rate:.2f}, avg={avg_rate:.2f}")
+
+    return RateChartData(
+        timestamps=timestamps,
+        rate_values=rate_values,
+        speed_values=speed_values,
+        period_info=period_display or ("Wszystkie" if buckets else "Brak danych"),
+        device_id=device_id,
+        total_records=sum(b.count for b in buckets),
+        max_rate=max_rate,
+        avg_rate=avg_rate
+    )
+
+
 @router.get("/", response_model=List[MeasureDataResponse])
-async def read_all_measures(db: Session = Depends(get_db)):
+async def read_all_measures():
     """Pobierz wszystkie zadania"""
-    return db.query(MeasureData).all()
+    return await query_executor.run(lambda db: measure_partitions.query_measures(db, None))
 
 
 @router.get("/{device_id}", response_model=MeasureDataResponse)
-async def read_device_measures(device_id: str, db: Session = Depends(get_db)):
-    """Pobierz zadanie po ID"""
-    measures = db.query(MeasureData).filter(MeasureData.deviceId == device_id).first()
+async def read_device_measures(device_id: str):
+    """Pobierz zadanie po ID (najwcześniejszy rekord urządzenia, także z partycji)"""
+    measures = await query_executor.run(lambda db: measure_partitions.first_measure(db, device_id))
     if not measures:
         raise HTTPException(status_code=404, detail="Dane nie znalezione")
     return measures
 
 
 @router.get("/device/{device_id}", response_model=List[MeasureDataResponse])
-async def read_all_device_measures(device_id: str, db: Session = Depends(get_db)):
+async def read_all_device_measures(device_id: str):
     """Pobierz wszystkie zadania dla danego urządzenia"""
-    measures = db.query(MeasureData).filter(MeasureData.deviceId == device_id).all()
+    measures = await query_executor.run(lambda db: measure_partitions.query_measures(db, device_id))
     if not measures:
         return []
     return measures
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
-async def create_data_record(data_request: MeasureDataRequest, db: Session = Depends(get_db)):
+async def create_data_record(data_request: MeasureDataRequest, db: AsyncSession = Depends(get_async_db)):
     """Utwórz nowe zadanie"""
-    data_model = MeasureData(**data_request.model_dump())
+    data_model = MeasureData(**with_typed_values(data_request.model_dump()))
     db.add(data_model)
-    db.commit()
+    await db.commit()
     return {"status": "success", "message": "Zadanie utworzone"}
 
 
@@ -266,14 +304,7 @@ def _calculate_incremental_values(measures):
     if not measures or len(measures) == 0:
         return measures
 
-    # Konwertuj wartości total na float
-    total_values = []
-    for m in measures:
-        try:
-            total_val = float(m.total)
-            total_values.append(total_val)
-        except (ValueError, TypeError):
-            total_values.append(None)
+    total_values = [m.totalValue for m in measures]
 
     # Oblicz sumy przyrostowe używając tej samej logiki co w raportach
     incremental_sums = []
@@ -320,10 +351,7 @@ async def get_filtered_measures(
         end_date: Optional[date] = Query(None, description="Data końcowa (YYYY-MM-DD)"),
         period_type: Optional[str] = Query(None,
                                            description="Typ okresu: current_month, previous_month, current_year, previous_year, custom"),
-        max_results: int = Query(1000, ge=10, le=5000, description="Maksymalna liczba rekordów (10-5000)"),
-        db: Session = Depends(get_db)
-
-
+        max_results: int = Query(1000, ge=10, le=5000, description="Maksymalna liczba rekordów (10-5000)")
 ):
     """
     Pobierz przefiltrowane dane pomiarowe z inteligentnym próbkowaniem.
@@ -333,32 +361,27 @@ async def get_filtered_measures(
     - Limitu maksymalnych wyników
     - Dostępnej liczby rekordów
     """
-    try:
-        # Bazowe zapytanie
-        query = db.query(MeasureData)
+    return await query_executor.run(_get_filtered_measures, device_id, start_date, end_date, period_type,
+                                     max_results)
 
+
+def _get_filtered_measures(db: Session, device_id, start_date, end_date, period_type,
+                           max_results) -> MeasureDataListResponse:
+    """Zapytanie, próbkowanie i sumy przyrostowe listy pomiarów - wykonywane w puli query_executor"""
+    try:
         # Filtrowanie po urządzeniu
         if not device_id:
             device_id = selected_device_store.get_device_id()
 
         if device_id:
-            query = query.filter(MeasureData.deviceId == device_id)
             logger.info(f"Filtrowanie danych dla urządzenia: {device_id}")
 
         # Obsługa okresów z automatycznym obliczaniem dat
         calculated_start, calculated_end, period_display = _calculate_period_dates(period_type, start_date, end_date)
-
-        # Filtrowanie po datach
-        if calculated_start:
-            start_str = calculated_start.strftime('%Y-%m-%d %H:%M:%S')
-            query = query.filter(MeasureData.currentTime >= start_str)
-
-        if calculated_end:
-            end_str = calculated_end.strftime('%Y-%m-%d %H:%M:%S')
-            query = query.filter(MeasureData.currentTime <= end_str)
+        start_epoch, end_epoch = _period_epochs(calculated_start, calculated_end)
 
         # Policz całkowitą liczbę rekordów
-        total_count = query.count()
+        total_count = measure_partitions.count(db, device_id, start_epoch, end_epoch)
 
         if total_count == 0:
             return MeasureDataListResponse(
@@ -367,20 +390,15 @@ async def get_filtered_measures(
                 shown_count=0,
                 sampling_info="Brak danych dla wybranych kryteriów",
                 period_info=period_display or "Wszystkie",
-                device_id=device_id
+                device_id=device_id,
+                **_completeness(db, device_id)
             )
 
-        # Inteligentne próbkowanie
-        sampling_info, final_query = _apply_intelligent_sampling(
-            query, total_count, max_results, calculated_start, calculated_end, db
+        # Inteligentne próbkowanie - rekordy od najstarszego do najnowszego
+        sampling_info, measures = _apply_intelligent_sampling(
+            db, device_id, start_epoch, end_epoch, total_count, max_results
         )
 
-        # Pobierz przefiltrowane dane - SORTUJ OD NAJSTARSZEGO
-        measures = final_query.all()
-
-        # Posortuj w Pythonie od najstarszego do najnowszego
-        measures.sort(key=lambda m: m.currentTime)
-
         # Oblicz sumy przyrostowe
         measures_with_incremental = _calculate_incremental_values(measures)
 
@@ -400,7 +418,8 @@ async def get_filtered_measures(
             shown_count=len(measure_responses),
             sampling_info=sampling_info,
             period_info=period_display or "Wszystkie",
-            device_id=device_id
+            device_id=device_id,
+            **_completeness(db, device_id)
         )
 
     except Exception as e:
@@ -416,12 +435,16 @@ async def get_period_summary(
         device_id: Optional[str] = Query(None, description="ID urządzenia (opcjonalne)"),
         start_date: Optional[date] = Query(None, description="Data początkowa (YYYY-MM-DD)"),
         end_date: Optional[date] = Query(None, description="Data końcowa (YYYY-MM-DD)"),
-        period_type: Optional[str] = Query(None, description="Typ okresu"),
-        db: Session = Depends(get_db)
+        period_type: Optional[str] = Query(None, description="Typ okresu")
 ):
     """
     Pobierz podsumowanie statystyczne dla wybranego okresu.
     """
+    return await query_executor.run(_get_period_summary, device_id, start_date, end_date, period_type)
+
+
+def _get_period_summary(db: Session, device_id, start_date, end_date, period_type) -> PeriodSummary:
+    """Agregacje podsumowania okresu - wykonywane w puli query_executor"""
     try:
         if not device_id:
             device_id = selected_device_store.get_device_id()
@@ -435,59 +458,33 @@ async def get_period_summary(
         # Oblicz daty okresu
         calculated_start, calculated_end, period_display = _calculate_period_dates(period_type, start_date, end_date)
 
-        # Bazowe zapytanie z agregacjami
-        query = db.query(
-            func.count(MeasureData.id).label('total_records'),
-            func.min(MeasureData.currentTime).label('first_measurement'),
-            func.max(MeasureData.currentTime).label('last_measurement')
-        ).filter(MeasureData.deviceId == device_id)
-
-        # Dodatkowo sprawdź czy kolumny można konwertować na float
-        numeric_query = db.query(
-            func.avg(func.cast(MeasureData.speed, db.bind.dialect.NUMERIC)).label('speed_avg'),
-            func.min(func.cast(MeasureData.speed, db.bind.dialect.NUMERIC)).label('speed_min'),
-            func.max(func.cast(MeasureData.speed, db.bind.dialect.NUMERIC)).label('speed_max'),
-            func.avg(func.cast(MeasureData.rate, db.bind.dialect.NUMERIC)).label('rate_avg'),
-            func.min(func.cast(MeasureData.rate, db.bind.dialect.NUMERIC)).label('rate_min'),
-            func.max(func.cast(MeasureData.rate, db.bind.dialect.NUMERIC)).label('rate_max'),
-            func.sum(func.cast(MeasureData.total, db.bind.dialect.NUMERIC)).label('total_sum')
-        ).filter(MeasureData.deviceId == device_id)
-
-        # Filtrowanie po datach
-        if calculated_start:
-            start_str = calculated_start.strftime('%Y-%m-%d %H:%M:%S')
-            query = query.filter(MeasureData.currentTime >= start_str)
-            numeric_query = numeric_query.filter(MeasureData.currentTime >= start_str)
-
-        if calculated_end:
-            end_str = calculated_end.strftime('%Y-%m-%d %H:%M:%S')
-            query = query.filter(MeasureData.currentTime <= end_str)
-            numeric_query = numeric_query.filter(MeasureData.currentTime <= end_str)
-
-        # Wykonaj zapytania
-        basic_result = query.first()
-        numeric_result = numeric_query.first()
-
-        if not basic_result or basic_result.total_records == 0:
+        # Agregaty minutowe/godzinowe/dobowe; bez granic okresu lub przed przeliczeniem
+        # agregatów - agregacje po kolumnach liczbowych z partycji nachodzących na okres
+        start_epoch, end_epoch = _period_epochs(calculated_start, calculated_end)
+        summary = measure_rollups.summarize(db, device_id, start_epoch, end_epoch)
+        if summary is None:
+            summary = measure_partitions.summarize(db, device_id, start_epoch, end_epoch)
+        else:
+            del summary["total_increment"], summary["running_seconds"]
+
+        invalid_time_records, pending_records = measure_partitions.count_without_time(db, device_id)
+        completeness = dict(invalid_time_records=invalid_time_records, pending_records=pending_records,
+                            complete=pending_records == 0)
+        if summary["total_records"] == 0:
             return PeriodSummary(
                 period_info=period_display or "Brak danych",
                 device_id=device_id,
-                total_records=0
+                total_records=0,
+                **completeness
             )
 
+        summary["first_measurement"] = format_epoch(summary["first_measurement"])
+        summary["last_measurement"] = format_epoch(summary["last_measurement"])
         return PeriodSummary(
             period_info=period_display or "Wszystkie",
             device_id=device_id,
-            total_records=basic_result.total_records,
-            speed_avg=float(numeric_result.speed_avg) if numeric_result.speed_avg else None,
-            speed_min=float(numeric_result.speed_min) if numeric_result.speed_min else None,
-            speed_max=float(numeric_result.speed_max) if numeric_result.speed_max else None,
-            rate_avg=float(numeric_result.rate_avg) if numeric_result.rate_avg else None,
-            rate_min=float(numeric_result.rate_min) if numeric_result.rate_min else None,
-            rate_max=float(numeric_result.rate_max) if numeric_result.rate_max else None,
-            total_sum=float(numeric_result.total_sum) if numeric_result.total_sum else None,
-            first_measurement=basic_result.first_measurement,
-            last_measurement=basic_result.last_measurement
+            **completeness,
+            **summary
         )
 
     except Exception as e:
@@ -498,6 +495,15 @@ async def get_period_summary(
         )
 
 
+def _completeness(db: Session, device_id: Optional[str]) -> dict:
+    """
+    Pola kompletności odpowiedzi: rekordy urządzenia oczekujące na uzupełnienie kolumn liczbowych
+    (MeasureBackfill) nie są jeszcze przypisane do okresu - wynik okresu może być niepełny
+    """
+    _, pending = measure_partitions.count_without_time(db, device_id)
+    return {"complete": pending == 0, "pending_records": pending}
+
+
 def _calculate_period_dates(period_type, start_date, end_date):
     """Oblicza daty okresu na podstawie typu okresu lub podanych dat"""
     calculated_start = None
@@ -552,89 +558,80 @@ def _calculate_period_dates(period_type, start_date, end_date):
     return calculated_start, calculated_end, period_display
 
 
-def _apply_intelligent_sampling(query, total_count, max_results, start_date, end_date, db):
+def _period_epochs(calculated_start, calculated_end):
+    """Granice okresu jako sekundy epoki (None - bez ograniczenia)"""
+    return (int(calculated_start.timestamp()) if calculated_start else None,
+            int(calculated_end.timestamp()) if calculated_end else None)
+
+
+def _apply_intelligent_sampling(db, device_id, start_epoch, end_epoch, total_count, max_results):
     """Zastosuj inteligentne próbkowanie danych z całego zakresu czasowego"""
 
     if total_count <= max_results:
         # Mało danych - pokaż wszystko chronologicznie
-        return "Wszystkie dostępne rekordy", query
+        return "Wszystkie dostępne rekordy", measure_partitions.query_measures(db, device_id, start_epoch, end_epoch)
 
     # Oblicz krok próbkowania aby równomiernie rozłożyć rekordy
     step = total_count / max_results
 
-    # Pobierz WSZYSTKIE ID posortowane chronologicznie
-    all_ids_query = query.with_entities(MeasureData.id).order_by(MeasureData.currentTime)
-    all_ids = [row[0] for row in all_ids_query.all()]
+    def pick(count: int) -> List[int]:
+        # Wybierz równomiernie rozłożone pozycje (w kolejności czasu) z całego zakresu
+        positions = []
+        for i in range(max_results):
+            index = int(i * step)
+            if index < count:
+                positions.append(index)
 
-    # Wybierz równomiernie rozłożone ID z całego zakresu
-    sampled_ids = []
-    for i in range(max_results):
-        index = int(i * step)
-        if index < len(all_ids):
-            sampled_ids.append(all_ids[index])
+        # Zawsze dołącz pierwszy i ostatni rekord
+        if 0 not in positions:
+            positions.insert(0, 0)
+        if count - 1 not in positions:
+            positions.append(count - 1)
 
-    # Zawsze dołącz pierwszy i ostatni rekord
-    if all_ids[0] not in sampled_ids:
-        sampled_ids.insert(0, all_ids[0])
-    if all_ids[-1] not in sampled_ids:
-        sampled_ids.append(all_ids[-1])
+        # Ogranicz do max_results
+        return positions[:max_results]
 
-    # Ogranicz do max_results
-    if len(sampled_ids) > max_results:
-        sampled_ids = sampled_ids[:max_results]
+    measures = measure_partitions.sample_measures(db, device_id, start_epoch, end_epoch, pick)
 
     # Oblicz rzeczywisty krok
-    actual_step = total_count / len(sampled_ids)
+    actual_step = total_count / len(measures)
 
     # Sprawdź czy faktycznie jest próbkowanie (pokazujemy mniej niż dostępne)
-    if len(sampled_ids) >= total_count:
+    if len(measures) >= total_count:
         sampling_info = f"Wszystkie rekordy ({total_count} dostępnych)"
     else:
         # Jest próbkowanie - pokaż szczegóły
         if actual_step >= 10:
-            sampling_info = f"Próbkowanie: co ~{int(actual_step)} rekord z całego zakresu (wyświetlono {len(sampled_ids)} z {total_count})"
+            sampling_info = f"Próbkowanie: co ~{int(actual_step)} rekord z całego zakresu (wyświetlono {len(measures)} z {total_count})"
         elif actual_step >= 5:
-            sampling_info = f"Próbkowanie: co ~{actual_step:.1f} rekord (wyświetlono {len(sampled_ids)} z {total_count})"
+            sampling_info = f"Próbkowanie: co ~{actual_step:.1f} rekord (wyświetlono {len(measures)} z {total_count})"
         else:
-            sampling_info = f"Równomierne próbkowanie: co ~{actual_step:.2f} rekord (wyświetlono {len(sampled_ids)} z {total_count})"
-
-    # Zwróć zapytanie z wybranymi ID
-    sampled_query = query.filter(MeasureData.id.in_(sampled_ids))
+            sampling_info = f"Równomierne próbkowanie: co ~{actual_step:.2f} rekord (wyświetlono {len(measures)} z {total_count})"
 
-    return sampling_info, sampled_query
+    return sampling_info, measures
 
 
 @router.get("/count")
 async def get_measures_count(
         device_id: Optional[str] = Query(None, description="ID urządzenia"),
         start_date: Optional[date] = Query(None, description="Data początkowa"),
-        end_date: Optional[date] = Query(None, description="Data końcowa"),
-        db: Session = Depends(get_db)
+        end_date: Optional[date] = Query(None, description="Data końcowa")
 ):
     """Szybkie sprawdzenie liczby rekordów"""
     try:
-        query = db.query(func.count(MeasureData.id))
-
         if not device_id:
             device_id = selected_device_store.get_device_id()
 
-        if device_id:
-            query = query.filter(MeasureData.deviceId == device_id)
-
-        if start_date:
-            start_str = datetime.combine(start_date, datetime.min.time()).strftime('%Y-%m-%d %H:%M:%S')
-            query = query.filter(MeasureData.currentTime >= start_str)
+        start_epoch = int(datetime.combine(start_date, datetime.min.time()).timestamp()) if start_date else None
+        end_epoch = int(datetime.combine(end_date, datetime.max.time()).timestamp()) if end_date else None
 
-        if end_date:
-            end_str = datetime.combine(end_date, datetime.max.time()).strftime('%Y-%m-%d %H:%M:%S')
-            query = query.filter(MeasureData.currentTime <= end_str)
-
-        count = query.scalar()
-        return {"count": count, "device_id": device_id}
+        count, completeness = await query_executor.run(
+            lambda db: (measure_partitions.count(db, device_id, start_epoch, end_epoch), _completeness(db, device_id)))
+        return {"count": count, "device_id": device_id, **completeness}
 
     except Exception as e:
         logger.error(f"Błąd podczas liczenia rekordów: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Błąd podczas liczenia rekordów: {str(e)}"
-        )
\ No newline at end of file
+        )
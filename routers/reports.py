@@ -2,8 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from repositories.database import get_db
+from repositories.measure_partitions import measure_partitions
+from repositories.measure_rollups import RESOLUTION_NAMES, RollupBucket, measure_rollups
 from models.models import MeasureData, Aliases
 from services.selected_device_store import selected_device_store
+from services.db_executor import query_executor
+from services.measure_values import format_epoch
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 import csv
@@ -22,7 +26,7 @@ def calculate_working_time(measurements):
     lub do końca okresu (jeśli ostatni pomiar nie jest zerem).
 
     Args:
-        measurements: Lista pomiarów posortowana chronologicznie
+        measurements: Lista pomiarów posortowana chronologicznie (kolumny speedValue i timeEpoch)
 
     Returns:
         Tuple (total_hours, formatted_time_string)
@@ -35,20 +39,12 @@ def calculate_working_time(measurements):
     total_seconds = 0.0
     work_start_time = None
 
-    for i, measurement in enumerate(measurements):
-        speed = safe_float_convert(measurement.speed)
-        current_time = measurement.currentTime
-
-        # Parsuj czas jeśli to string
-        if isinstance(current_time, str):
-            try:
-                current_time = datetime.strptime(current_time, '%Y-%m-%d %H:%M:%S')
-            except ValueError:
-                try:
-                    current_time = parse_date_string(current_time)
-                except:
-                    logger.warning(f"Nie można sparsować czasu: {current_time}")
-                    continue
+    for measurement in measurements:
+        speed = measurement.speedValue
+        current_time = measurement.timeEpoch
+        if current_time is None:
+            logger.warning(f"Pomiar bez czasu (timeEpoch), id={measurement.id}: {measurement.currentTime}")
+            continue
 
         if speed is not None and speed > 0:
             # Urządzenie pracuje
@@ -60,24 +56,27 @@ def calculate_working_time(measurements):
             # Prędkość = 0 lub None - urządzenie nie pracuje
             if work_start_time is not None:
                 # Koniec okresu pracy
-                work_duration = (current_time - work_start_time).total_seconds()
+                work_duration = current_time - work_start_time
                 total_seconds += work_duration
                 logger.debug(f"Koniec pracy: {current_time}, czas trwania: {work_duration}s")
                 work_start_time = None
 
     # Jeśli ostatni pomiar miał prędkość > 0, policz czas do końca
     if work_start_time is not None:
-        last_measurement_time = measurements[-1].currentTime
-        if isinstance(last_measurement_time, str):
-            try:
-                last_measurement_time = datetime.strptime(last_measurement_time, '%Y-%m-%d %H:%M:%S')
-            except ValueError:
-                last_measurement_time = parse_date_string(last_measurement_time)
-
-        work_duration = (last_measurement_time - work_start_time).total_seconds()
+        last_measurement_time = next((m.timeEpoch for m in reversed(measurements) if m.timeEpoch is not None),
+                                     work_start_time)
+        work_duration = last_measurement_time - work_start_time
         total_seconds += work_duration
         logger.debug(f"Praca do końca okresu: {last_measurement_time}, czas trwania: {work_duration}s")
 
+    return format_working_time(total_seconds)
+
+
+def format_working_time(total_seconds):
+    """
+    Returns:
+        Tuple (total_hours, formatted_time_string) jak calculate_working_time
+    """
     # Konwertuj na godziny i minuty
     total_hours = total_seconds / 3600.0
     hours = int(total_hours)
@@ -182,6 +181,65 @@ def calculate_incremental_sum(total_values):
     return incremental_sum
 
 
+def _write_measurement_rows(writer, measurements):
+    """Dane szczegółowe - każdy pomiar z sumą przyrostową od początku okresu"""
+    # Oblicz sumy przyrostowe dla raportu
+    cumulative_incremental = 0.0
+    prev_total = None
+
+    for measurement in measurements:
+        # Konwersje wartości
+        speed_str = format_number_for_csv(measurement.speedValue, 2)
+        rate_str = format_number_for_csv(measurement.rateValue, 2)
+        total_val = measurement.totalValue
+        total_str = format_number_for_csv(total_val, 2)
+
+        # Oblicz sumę przyrostową
+        if prev_total is None:
+            # Pierwszy pomiar
+            incremental_str = format_number_for_csv(0.0, 2)
+        else:
+            if total_val is not None and total_val >= prev_total:
+                cumulative_incremental += (total_val - prev_total)
+            incremental_str = format_number_for_csv(cumulative_incremental, 2)
+
+        prev_total = total_val
+
+        writer.writerow([
+            measurement.currentTime,  # currentTime może być już string
+            speed_str,
+            rate_str,
+            total_str,
+            incremental_str
+        ])
+
+
+def _write_rollup_rows(writer, buckets):
+    """
+    Dane szczegółowe z agregatów: przedział - średnia prędkość i wydajność,
+    ostatnia wartość licznika i suma przyrostowa od początku okresu
+    """
+    cumulative = RollupBucket()
+    for bucket in buckets:
+        cumulative.merge(bucket)
+        writer.writerow([
+            format_epoch(bucket.bucket),
+            format_number_for_csv(bucket.speedSum / bucket.speedCount if bucket.speedCount else None, 2),
+            format_number_for_csv(bucket.rateSum / bucket.rateCount if bucket.rateCount else None, 2),
+            format_number_for_csv(bucket.lastTotal, 2),
+            format_number_for_csv(cumulative.totalIncrement, 2)
+        ])
+
+
+def _no_data_detail(db: Session, device_id: str) -> str:
+    """Opis braku danych okresu - z liczbą pomiarów, które migracja starszej bazy jeszcze nie objęła"""
+    _, pending_records = measure_partitions.count_without_time(db, device_id)
+    if pending_records:
+        return (f"Brak danych pomiarowych dla wybranego okresu (raport niekompletny - "
+                f"{pending_records} pomiarów oczekuje na migrację)")
+    return "Brak danych pomiarowych dla wybranego okresu"
+
+
 def parse_date_string(date_str):
     """
     Bezpieczne parsowanie daty z różnych formatów
@@ -215,12 +273,26 @@ async def generate_report(
         period_type: str,
         start_date: str = None,
         end_date: str = None,
-        db: Session = Depends(get_db)
+        resolution: str = None
 ):
     """
     Generuje raport CSV dla wybranego okresu i urządzenia.
+    Zapytania i budowa pliku CSV wykonywane są w puli query_executor,
+    dzięki czemu długi raport nie wstrzymuje innych żądań.
+
+    resolution (minute / hour / day) - dane szczegółowe z agregatów zamiast
+    wszystkich pomiarów (domyślnie każdy pomiar).
     """
+    return await query_executor.run(_generate_report, period_type, start_date, end_date, resolution)
+
+
+def _generate_report(db: Session, period_type: str, start_date: str = None, end_date: str = None,
+                     resolution: str = None) -> Response:
+    """Synchroniczna część generate_report"""
     try:
+        if resolution is not None and resolution not in RESOLUTION_NAMES:
+            raise HTTPException(status_code=400, detail=f"Nieprawidłowa rozdzielczość: {resolution}")
+
         # Pobierz aktualnie wybrane urządzenie
         current_selection = selected_device_store.get_device_id()
         if not current_selection:
@@ -263,54 +335,58 @@ async def generate_report(
 
         logger.info(f"Zakres dat: {date_from} - {date_to}")
 
-        # Pobierz dane pomiarowe
-        measurements_query = db.query(MeasureData).filter(
-            and_(
-                MeasureData.deviceId == device_id,
-                MeasureData.currentTime >= date_from,
-                MeasureData.currentTime <= date_to
-            )
-        ).order_by(MeasureData.currentTime)
-
-        measurements = measurements_query.all()
-
-        if not measurements:
-            raise HTTPException(status_code=404, detail="Brak danych pomiarowych dla wybranego okresu")
-
-        # Pobierz aliasy urządzenia
-        aliases = db.query(Aliases).filter(Aliases.deviceId == device_id).first()
+        from_epoch, to_epoch = int(date_from.timestamp()), int(date_to.timestamp())
+        measurements = None
+
+        # Statystyki z agregatów minutowych/godzinowych/dobowych (bez odczytu pomiarów)
+        summary = measure_rollups.summarize(db, device_id, from_epoch, to_epoch)
+        if summary is not None:
+            if not summary["total_records"]:
+                raise HTTPException(status_code=404, detail=_no_data_detail(db, device_id))
+            measurements_count = summary["total_records"]
+            avg_speed = summary["speed_avg"] or 0
+            max_speed = summary["speed_max"] or 0
+            avg_rate = summary["rate_avg"] or 0
+            max_rate = summary["rate_max"] or 0
+            incremental_sum = summary["total_increment"]
+            working_hours, working_time_formatted = format_working_time(summary["running_seconds"])
+        else:
+            # Pobierz dane pomiarowe (tylko partycje miesięcy z zakresu raportu)
+            measurements = measure_partitions.query_measures(db, device_id, from_epoch, to_epoch)
 
-        # ✅ POPRAWIONE: Konwertuj stringi na float z bezpieczną obsługą błędów
-        speeds = []
-        rates = []
-        totals = []
+            if not measurements:
+                raise HTTPException(status_code=404, detail=_no_data_detail(db, device_id))
+            measurements_count = len(measurements)
 
-        for m in measurements:
-            speed_val = safe_float_convert(m.speed)
-            if speed_val is not None:
-                speeds.append(speed_val)
+            # Wartości z kolumn liczbowych (NULL - tekst z ramki nie był liczbą)
+            speeds = []
+            rates = []
+            totals = []
 
-            rate_val = safe_float_convert(m.rate)
-            if rate_val is not None:
-                rates.append(rate_val)
+            for m in measurements:
+                if m.speedValue is not None:
+                    speeds.append(m.speedValue)
+                if m.rateValue is not None:
+                    rates.append(m.rateValue)
+                if m.totalValue is not None:
+                    totals.append(m.totalValue)
 
-            total_val = safe_float_convert(m.total)
-            if total_val is not None:
-                totals.append(total_val)
+            logger.info(f"Konwertowane dane - speeds: {len(speeds)}, rates: {len(rates)}, totals: {len(totals)}")
 
-        logger.info(f"Konwertowane dane - speeds: {len(speeds)}, rates: {len(rates)}, totals: {len(totals)}")
+            # Oblicz statystyki
+            avg_speed = sum(speeds) / len(speeds) if speeds else 0
+            max_speed = max(speeds) if speeds else 0
+            avg_rate = sum(rates) / len(rates) if rates else 0
+            max_rate = max(rates) if rates else 0
 
-        # Oblicz statystyki
-        avg_speed = sum(speeds) / len(speeds) if speeds else 0
-        max_speed = max(speeds) if speeds else 0
-        avg_rate = sum(rates) / len(rates) if rates else 0
-        max_rate = max(rates) if rates else 0
+            # Oblicz sumę przyrostową używając specjalnego algorytmu
+            incremental_sum = calculate_incremental_sum(totals)
 
-        # Oblicz sumę przyrostową używając specjalnego algorytmu
-        incremental_sum = calculate_incremental_sum(totals)
+            # ✅ NOWE: Oblicz czas pracy
+            working_hours, working_time_formatted = calculate_working_time(measurements)
 
-        # ✅ NOWE: Oblicz czas pracy
-        working_hours, working_time_formatted = calculate_working_time(measurements)
+        # Pobierz aliasy urządzenia
+        aliases = db.query(Aliases).filter(Aliases.deviceId == device_id).first()
 
         # Przygotuj dane do CSV
         csv_data = io.StringIO()
@@ -343,42 +419,28 @@ async def generate_report(
             writer.writerow(["Maksymalna wydajność [t/h]:", format_number_for_csv(max_rate, 2)])
             writer.writerow(["Suma przyrostowa [t]:", format_number_for_csv(incremental_sum, 2)])
             writer.writerow(["Czas pracy:", working_time_formatted])  # ✅ NOWE
-            writer.writerow(["Liczba pomiarów:", len(measurements)])
+            writer.writerow(["Liczba pomiarów:", measurements_count])
+            # Rekordy bez poprawnego czasu nie należą do okresu - tylko ich liczba dla urządzenia
+            invalid_time_records, pending_records = measure_partitions.count_without_time(db, device_id)
+            writer.writerow(["Pomiary bez poprawnego czasu (poza okresem):", invalid_time_records])
+            if pending_records:
+                # Migracja starszej bazy w toku - rekordy bez kolumn liczbowych nie są jeszcze w okresie
+                writer.writerow(["UWAGA - raport niekompletny, pomiary oczekujące na migrację:", pending_records])
             writer.writerow([])
 
             # Dane szczegółowe
             writer.writerow(["SZCZEGÓŁOWE DANE POMIAROWE:"])
             writer.writerow(["Data i czas", "Prędkość", "Natężenie", "Suma", "Suma Przyrostowa"])
 
-            # Oblicz sumy przyrostowe dla raportu
-            cumulative_incremental = 0.0
-            prev_total = None
-
-            for measurement in measurements:
-                # Konwersje wartości
-                speed_str = format_number_for_csv(safe_float_convert(measurement.speed), 2)
-                rate_str = format_number_for_csv(safe_float_convert(measurement.rate), 2)
-                total_val = safe_float_convert(measurement.total)
-                total_str = format_number_for_csv(total_val, 2)
-
-                # Oblicz sumę przyrostową
-                if prev_total is None:
-                    # Pierwszy pomiar
-                    incremental_str = format_number_for_csv(0.0, 2)
-                else:
-                    if total_val is not None and total_val >= prev_total:
-                        cumulative_incremental += (total_val - prev_total)
-                    incremental_str = format_number_for_csv(cumulative_incremental, 2)
-
-                prev_total = total_val
-
-                writer.writerow([
-                    measurement.currentTime,  # currentTime może być już string
-                    speed_str,
-                    rate_str,
-                    total_str,
-                    incremental_str
-                ])
+            buckets = None
+            if resolution is not None:
+                buckets = measure_rollups.series(db, device_id, RESOLUTION_NAMES[resolution], from_epoch, to_epoch)
+            if buckets is not None:
+                _write_rollup_rows(writer, buckets)
+            else:
+                if measurements is None:
+                    measurements = measure_partitions.query_measures(db, device_id, from_epoch, to_epoch)
+                _write_measurement_rows(writer, measurements)
 
         # Przygotuj odpowiedź CSV
         csv_content = csv_data.getvalue()
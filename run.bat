@@ -10,6 +10,9 @@ IF NOT EXIST ".venv\Scripts\python.exe" (
     exit /b
 )
 
+REM Nasluch TCP integratorow (bez HTTP) jest domyslnie wylaczony - aby wlaczyc, odkomentuj:
+REM set INTEGRATOR_TCP_PORT=8081
+
 REM Uruchomienie serwera
 .venv\Scripts\python.exe -m uvicorn main:app --host 0.0.0.0 --port 8080 --workers 4
 
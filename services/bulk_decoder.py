@@ -0,0 +1,225 @@
+import time
+from typing import Dict, List, Union
+
+try:
+    import numpy as np
+except ImportError:  # numpy jest potrzebny tylko do importu danych archiwalnych
+    np = None
+
+from services.checksum import CRC16_CCITT_INIT, CRC16_CCITT_TABLE
+from services.frame_splitter import FRAME_OVERHEAD
+from services.frame_view import FIELDS_START, FOOTER_SIZE, SEGMENT_START
+from services.measure_values import parse_epoch, parse_total
+from services.protocol_schema import COMMAND_SCHEMAS, PROTOCOL_V1
+from services.support import CommandID
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+MEASURE_SCHEMA = COMMAND_SCHEMAS[CommandID.MEASURE_DATA]
+# Długość ramki MEASURE_DATA: pola DATA + CRC8(1B) + FOOTER(3B)
+MEASURE_FRAME_SIZE = FIELDS_START + MEASURE_SCHEMA.request.size + 1 + FOOTER_SIZE
+# Pola liczbowe dekodowane do float64
+NUMERIC_FIELDS = ('speed', 'rate', 'total')
+
+# Liczby całkowite dokładnie reprezentowane przez float64
+_EXACT_INTEGER = 2 ** 53
+
+_ZERO, _NINE, _DOT, _MINUS, _PLUS, _SPACE, _NUL = 48, 57, 46, 45, 43, 32, 0
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("Dekoder wsadowy wymaga pakietu numpy (pip install numpy)")
+
+
+def measure_frame_dtype():
+    """
+    Typ strukturalny numpy odpowiadający ramce MEASURE_DATA:
+    HEADER(4B) + JAWNA(17B) + DATA_LEN, STATUS, REQUEST + pola komendy + CRC8 + FOOTER(3B)
+    """
+    _require_numpy()
+    fields = [
+        ('startMarker1', 'u1'), ('startMarker2', 'u1'), ('version', 'u1'), ('flags', 'u1'),
+        ('deviceId', 'V10'), ('commandId', '>u2'), ('rc4KeyId', 'u1'), ('timestamp', 'V3'), ('seqNum', 'u1'),
+        ('dataLen', 'u1'), ('status', 'u1'), ('request', 'u1'),
+    ]
+    fields += [(field.name, 'u1' if field.kind == 'u8' else f'S{field.size}')
+               for field in MEASURE_SCHEMA.request.fields]
+    fields += [('crc8', 'u1'), ('crc16', '>u2'), ('endMarker', 'u1')]
+    return np.dtype(fields)
+
+
+def ascii_to_float(chars: "np.ndarray") -> "np.ndarray":
+    """
+    Wektorowa konwersja kolumny tekstowej (macierz uint8: wiersze x szerokość pola)
+    do float64. Dopuszczalne są cyfry, jedna kropka, znak przed cyframi oraz
+    spacje/NUL jako dopełnienie. Wiersze o innej zawartości dają NaN.
+    """
+    _require_numpy()
+    is_digit = (chars >= _ZERO) & (chars <= _NINE)
+    is_dot = chars == _DOT
+    is_sign = (chars == _MINUS) | (chars == _PLUS)
+    is_pad = (chars == _SPACE) | (chars == _NUL)
+
+    # Cyfry po kropce dziesiętnej
+    after_dot = np.cumsum(is_dot, axis=1) > 0
+    fraction_digits = np.count_nonzero(is_digit & after_dot, axis=1)
+
+    # Waga cyfry: 10 do potęgi liczby cyfr stojących na prawo od niej
+    digits = np.where(is_digit, chars.astype(np.float64) - _ZERO, 0.0)
+    digits_right = np.cumsum(is_digit[:, ::-1], axis=1)[:, ::-1] - is_digit
+    value = (digits * np.power(10.0, digits_right)).sum(axis=1) / np.power(10.0, fraction_digits)
+
+    # Znak musi poprzedzać pierwszą cyfrę
+    width = chars.shape[1]
+    first_digit = np.where(is_digit.any(axis=1), is_digit.argmax(axis=1), width)
+    sign_position = np.where(is_sign.any(axis=1), is_sign.argmax(axis=1), -1)
+    negative = (chars == _MINUS).any(axis=1)
+
+    valid = ((is_digit | is_dot | is_sign | is_pad).all(axis=1)
+             & (np.count_nonzero(is_dot, axis=1) <= 1)
+             & (np.count_nonzero(is_sign, axis=1) <= 1)
+             & (first_digit < width)
+             & (sign_position < first_digit))
+    value = np.where(negative, -value, value)
+    return np.where(valid, value, np.nan)
+
+
+def crc16_columns(matrix: "np.ndarray") -> "np.ndarray":
+    """
+    CRC16-CCITT liczone równolegle dla wszystkich wierszy macierzy bajtów
+    """
+    _require_numpy()
+    table = np.asarray(CRC16_CCITT_TABLE, dtype=np.uint16)
+    crc = np.full(matrix.shape[0], CRC16_CCITT_INIT, dtype=np.uint16)
+    for column in range(matrix.shape[1]):
+        crc = (crc << np.uint16(8)) ^ table[(crc >> np.uint16(8)) ^ matrix[:, column]]
+    return crc
+
+
+class MeasureFrameBatch:
+    """
+    Wynik dekodowania wsadowego ramek MEASURE_DATA
+
+    Attributes:
+        frames: Tablica strukturalna ramek (widok na bufor wejściowy, bez kopiowania)
+        valid: Maska ramek poprawnych (znaczniki, VERSION, COMMAND_ID, DATA_LEN, CRC8, CRC16)
+        crc8_ok: Maska zgodności CRC8
+        crc16_ok: Maska zgodności CRC16 (same True, gdy CRC16 nie było sprawdzane)
+        speed, rate, total: Kolumny liczbowe float64 (NaN dla niepoprawnego tekstu)
+        trailing_bytes: Liczba bajtów na końcu bufora, które nie tworzą pełnej ramki
+    """
+
+    def __init__(self, frames, valid, crc8_ok, crc16_ok, numeric: Dict[str, "np.ndarray"], trailing_bytes: int):
+        self.frames = frames
+        self.valid = valid
+        self.crc8_ok = crc8_ok
+        self.crc16_ok = crc16_ok
+        self.speed = numeric['speed']
+        self.rate = numeric['rate']
+        self.total = numeric['total']
+        self.trailing_bytes = trailing_bytes
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    @property
+    def valid_count(self) -> int:
+        return int(np.count_nonzero(self.valid))
+
+    def device_ids(self) -> "np.ndarray":
+        """
+        DEVICE_ID jako tablica str - dekodowany raz dla każdej unikalnej wartości,
+        tak samo jak w MeasureDataView
+        """
+        unique, inverse = np.unique(self.frames['deviceId'], return_inverse=True)
+        decoded = np.array([value.tobytes().decode('ascii', errors='replace').strip() for value in unique],
+                           dtype=object)
+        return decoded[inverse.reshape(-1)]
+
+    def _text_column(self, name: str, mask) -> List[str]:
+        return [value.decode('ascii', errors='replace').strip() for value in self.frames[name][mask].tolist()]
+
+    @staticmethod
+    def _number_column(values: "np.ndarray", mask) -> list:
+        return [None if value != value else value for value in values[mask].tolist()]
+
+    @staticmethod
+    def _total_column(values: "np.ndarray", mask, text_values: List[str]) -> list:
+        # Licznik całkowity jako int - powyżej 2^53 float64 nie jest dokładny, wtedy z tekstu pola
+        return [None if value != value else
+                int(value) if value.is_integer() and abs(value) < _EXACT_INTEGER else parse_total(text)
+                for value, text in zip(values[mask].tolist(), text_values)]
+
+    def rows(self, only_valid: bool = True) -> List[Dict[str, str]]:
+        """
+        Wiersze MeasureData do bulk_insert_mappings (kolumny tekstowe jak w zapisie z ramki
+        oraz kolumny liczbowe z dekodowania wektorowego)
+        """
+        mask = self.valid if only_valid else np.ones(len(self.frames), dtype=bool)
+        current_time = self._text_column('currentTime', mask)
+        total = self._text_column('total', mask)
+        time_epoch = [parse_epoch(value) for value in current_time]
+        received_at = int(time.time())
+        columns = {
+            'deviceId': self.device_ids()[mask].tolist(),
+            'speed': self._text_column('speed', mask),
+            'rate': self._text_column('rate', mask),
+            'total': total,
+            'currentTime': current_time,
+            'speedValue': self._number_column(self.speed, mask),
+            'rateValue': self._number_column(self.rate, mask),
+            'totalValue': self._total_column(self.total, mask, total),
+            'timeEpoch': time_epoch,
+            'timeInvalid': [int(epoch is None) for epoch in time_epoch],
+            'receivedAt': [received_at] * len(current_time),
+        }
+        names = list(columns)
+        return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+def decode_measure_frames(buffer: Union[bytes, bytearray, memoryview],
+                          check_crc16: bool = True) -> MeasureFrameBatch:
+    """
+    Dekoduje bufor sklejonych, jawnych (odszyfrowanych) ramek MEASURE_DATA o stałej długości
+
+    Args:
+        buffer: Bufor ramek - bytes, bytearray, memoryview lub mmap
+        check_crc16: Czy weryfikować CRC16 ze stopki
+
+    Returns:
+        MeasureFrameBatch: Tablica ramek z maskami poprawności i kolumnami liczbowymi
+    """
+    _require_numpy()
+    dtype = measure_frame_dtype()
+    count = len(buffer) // dtype.itemsize
+    trailing = len(buffer) - count * dtype.itemsize
+    frames = np.frombuffer(buffer, dtype=dtype, count=count)
+    raw = np.frombuffer(buffer, dtype=np.uint8, count=count * dtype.itemsize).reshape(count, dtype.itemsize)
+
+    crc8_position = dtype.fields['crc8'][1]
+    # CRC8: suma bajtów od DATA_LEN do ostatniego pola DATA modulo 256
+    crc8_ok = (raw[:, SEGMENT_START:crc8_position].sum(axis=1, dtype=np.uint32) & 0xFF) == frames['crc8']
+    if check_crc16:
+        crc16_ok = crc16_columns(raw[:, :-FOOTER_SIZE]) == frames['crc16']
+    else:
+        crc16_ok = np.ones(count, dtype=bool)
+
+    # Dekoder obsługuje tylko układ tekstowy VERSION 1
+    valid = ((frames['startMarker1'] == 0xAA) & (frames['startMarker2'] == 0x55) & (frames['endMarker'] == 0x55)
+             & (frames['version'] == PROTOCOL_V1)
+             & (frames['commandId'] == CommandID.MEASURE_DATA)
+             & (frames['dataLen'] == dtype.itemsize - FRAME_OVERHEAD)
+             & crc8_ok & crc16_ok)
+
+    numeric = {}
+    for name in NUMERIC_FIELDS:
+        offset = dtype.fields[name][1]
+        size = dtype.fields[name][0].itemsize
+        numeric[name] = ascii_to_float(raw[:, offset:offset + size])
+
+    if trailing:
+        logger.warning(f"Dekoder wsadowy: pominięto {trailing} B niepełnej ramki na końcu bufora")
+    return MeasureFrameBatch(frames, valid, crc8_ok, crc16_ok, numeric, trailing)
@@ -0,0 +1,118 @@
+import binascii
+from typing import List
+
+# Parametry CRC16-CCITT używanego w stopce ramki (FOOTER)
+CRC16_CCITT_POLYNOMIAL = 0x1021
+CRC16_CCITT_INIT = 0xFFFF
+
+# Parametry CRC-8 (wielomian 0x07) ze specyfikacji protokołu integratora
+CRC8_POLYNOMIAL = 0x07
+CRC8_INIT = 0x00
+
+
+def _build_crc16_table(polynomial: int) -> List[int]:
+    """
+    Buduje 256-elementową tablicę CRC16 (MSB first) dla podanego wielomianu
+    """
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = (crc << 1) ^ polynomial
+            else:
+                crc <<= 1
+        table.append(crc & 0xFFFF)
+    return table
+
+
+def _build_crc8_table(polynomial: int) -> List[int]:
+    """
+    Buduje 256-elementową tablicę CRC8 (MSB first) dla podanego wielomianu
+    """
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            if crc & 0x80:
+                crc = (crc << 1) ^ polynomial
+            else:
+                crc <<= 1
+        table.append(crc & 0xFF)
+    return table
+
+
+# Tablice wyliczane jednorazowo przy imporcie modułu
+CRC16_CCITT_TABLE = tuple(_build_crc16_table(CRC16_CCITT_POLYNOMIAL))
+CRC8_TABLE = tuple(_build_crc8_table(CRC8_POLYNOMIAL))
+
+
+def crc16_ccitt_bitwise(data: bytes, init: int = CRC16_CCITT_INIT) -> int:
+    """
+    Referencyjna (bitowa) implementacja CRC16-CCITT.
+    Wolna - służy do weryfikacji pozostałych implementacji.
+    """
+    crc = init
+    for byte in data:
+        crc ^= (byte << 8)
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = (crc << 1) ^ CRC16_CCITT_POLYNOMIAL
+            else:
+                crc <<= 1
+        crc &= 0xFFFF
+    return crc
+
+
+def crc16_ccitt_table(data: bytes, init: int = CRC16_CCITT_INIT) -> int:
+    """
+    CRC16-CCITT liczone z użyciem tablicy 256 wartości (bajt na iterację)
+    """
+    crc = init
+    table = CRC16_CCITT_TABLE
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFF) ^ table[(crc >> 8) ^ byte]
+    return crc
+
+
+def crc16_ccitt(data: bytes, init: int = CRC16_CCITT_INIT) -> int:
+    """
+    CRC16-CCITT (wielomian 0x1021, wartość początkowa 0xFFFF).
+    Szybka ścieżka przez binascii.crc_hqx zaimplementowane w C.
+    """
+    return binascii.crc_hqx(data, init)
+
+
+def crc8_bitwise(data: bytes, init: int = CRC8_INIT) -> int:
+    """
+    Referencyjna (bitowa) implementacja CRC-8 z wielomianem 0x07
+    """
+    crc = init
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            if crc & 0x80:
+                crc = (crc << 1) ^ CRC8_POLYNOMIAL
+            else:
+                crc <<= 1
+        crc &= 0xFF
+    return crc
+
+
+def crc8(data: bytes, init: int = CRC8_INIT) -> int:
+    """
+    CRC-8 z wielomianem 0x07 liczone z użyciem tablicy 256 wartości
+    """
+    crc = init
+    table = CRC8_TABLE
+    for byte in data:
+        crc = table[crc ^ byte]
+    return crc
+
+
+def byte_sum8(data: bytes) -> int:
+    """
+    Suma kontrolna segmentu SZYFROWANA używana przez integratory:
+    suma bajtów DATA_LEN + DATA modulo 256
+    """
+    return sum(data) & 0xFF
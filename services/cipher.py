@@ -1,36 +1,87 @@
 import hashlib
+import logging
+import threading
+from collections import OrderedDict
 from Crypto.Cipher import ARC4
-from typing import Union, Optional
+from typing import Union, Optional, Tuple
+
+logger = logging.getLogger(__name__)
 
 
 class RC4KeyGenerator:
     DEFAULT_ITERATIONS = 1000
 
-    @staticmethod
-    def generate_key(key1: Union[str, bytes, list],
+    # Maksymalna liczba przechowywanych kluczy pochodnych (LRU)
+    MAX_CACHED_KEYS = 32
+
+    # Cache materiału kluczowego: (key1, key2, iterations) -> klucz RC4
+    _key_cache: "OrderedDict[Tuple[bytes, bytes, int], bytes]" = OrderedDict()
+    _cache_lock = threading.Lock()
+
+    @classmethod
+    def generate_key(cls, key1: Union[str, bytes, list],
                      key2: Optional[Union[str, bytes, list]] = None,
-                     iterations: int = DEFAULT_ITERATIONS) -> bytes:
+                     iterations: int = DEFAULT_ITERATIONS,
+                     use_cache: bool = True) -> bytes:
         """
         Generuje klucz RC4 na podstawie podanych parametrów.
+        Wynik wyprowadzenia (1000+ rund SHA256) jest przechowywany w cache,
+        więc kolejne ramki z tymi samymi kluczami nie liczą go ponownie.
 
         Args:
             key1: Pierwszy klucz (string, bytes lub lista intów)
             key2: Opcjonalny drugi klucz (string, bytes lub lista intów)
             iterations: Liczba iteracji dla SHA256 (domyślnie 1000)
+            use_cache: Czy korzystać z cache kluczy (domyślnie True)
 
         Returns:
             bytes: Wygenerowany klucz RC4
         """
         # Konwersja kluczy na bytes
-        key1_bytes = RC4KeyGenerator._convert_to_bytes(key1)
+        key1_bytes = cls._convert_to_bytes(key1)
 
         if key2 is None:
             # Jeśli podano tylko jeden klucz, użyj go bezpośrednio
             return key1_bytes
 
         # Konwersja drugiego klucza na bytes
-        key2_bytes = RC4KeyGenerator._convert_to_bytes(key2)
+        key2_bytes = cls._convert_to_bytes(key2)
+
+        if not use_cache:
+            return cls.derive_key(key1_bytes, key2_bytes, iterations)
+
+        cache_key = (key1_bytes, key2_bytes, iterations)
+        with cls._cache_lock:
+            key = cls._key_cache.get(cache_key)
+            if key is not None:
+                cls._key_cache.move_to_end(cache_key)
+                return key
+
+        # Wyprowadzenie poza blokadą - nie wstrzymujemy innych wątków
+        key = cls.derive_key(key1_bytes, key2_bytes, iterations)
+
+        with cls._cache_lock:
+            cls._key_cache[cache_key] = key
+            cls._key_cache.move_to_end(cache_key)
+            while len(cls._key_cache) > cls.MAX_CACHED_KEYS:
+                cls._key_cache.popitem(last=False)
+
+        return key
+
+    @staticmethod
+    def derive_key(key1_bytes: bytes, key2_bytes: bytes,
+                   iterations: int = DEFAULT_ITERATIONS) -> bytes:
+        """
+        Wyprowadza klucz RC4 bez użycia cache.
+
+        Args:
+            key1_bytes: Pierwszy klucz jako bytes
+            key2_bytes: Drugi klucz jako bytes
+            iterations: Liczba iteracji dla SHA256
 
+        Returns:
+            bytes: 32-bajtowy klucz RC4
+        """
         # Początkowy hash: key = SHA256(key1 . key2)
         key = hashlib.sha256(key1_bytes + key2_bytes).digest()
 
@@ -42,6 +93,58 @@ class RC4KeyGenerator:
 
         return key
 
+    @classmethod
+    def precompute_key(cls, key1: Union[str, bytes, list],
+                       key2: Union[str, bytes, list],
+                       iterations: int = DEFAULT_ITERATIONS) -> bytes:
+        """
+        Wylicza i umieszcza w cache klucz dla podanej pary kluczy.
+        Wywoływane przez RC4KeyRing.add - przy starcie (load_env) i przy rotacji kluczy.
+
+        Returns:
+            bytes: Wygenerowany klucz RC4
+        """
+        key = cls.generate_key(key1, key2, iterations)
+        logger.info(f"Wyliczono materiał kluczowy RC4 (iteracje: {iterations})")
+        return key
+
+    @classmethod
+    def invalidate_cache(cls, key1: Optional[Union[str, bytes, list]] = None,
+                         key2: Optional[Union[str, bytes, list]] = None) -> int:
+        """
+        Usuwa klucze z cache - wywoływane przez RC4KeyRing przy zastąpieniu
+        lub wycofaniu klucza.
+        Bez argumentów czyści cały cache.
+
+        Args:
+            key1: Pierwszy klucz, którego wpisy mają zostać usunięte
+            key2: Drugi klucz, którego wpisy mają zostać usunięte
+
+        Returns:
+            int: Liczba usuniętych wpisów
+        """
+        key1_bytes = cls._convert_to_bytes(key1) if key1 is not None else None
+        key2_bytes = cls._convert_to_bytes(key2) if key2 is not None else None
+
+        with cls._cache_lock:
+            to_remove = [
+                cache_key for cache_key in cls._key_cache
+                if (key1_bytes is None or cache_key[0] == key1_bytes)
+                and (key2_bytes is None or cache_key[1] == key2_bytes)
+            ]
+            for cache_key in to_remove:
+                del cls._key_cache[cache_key]
+
+        if to_remove:
+            logger.info(f"Usunięto {len(to_remove)} kluczy RC4 z cache")
+        return len(to_remove)
+
+    @classmethod
+    def cache_size(cls) -> int:
+        """Zwraca liczbę kluczy przechowywanych w cache"""
+        with cls._cache_lock:
+            return len(cls._key_cache)
+
     @staticmethod
     def _convert_to_bytes(key: Union[str, bytes, list]) -> bytes:
         """
@@ -1,14 +1,26 @@
-from fastapi import Depends
+import threading
+import time
+
 from sqlalchemy.orm import Session
 from datetime import datetime
+from typing import Optional, Union
 
 # from main import config
 from models.models import MeasureData, Aliases, StaticParams
-from repositories.database import get_db
 from services.machine_state import machine_state_observer
 from services.support import ProtocolAnalyzer, CommandID
 from fastapi.responses import Response
 from services.cipher import RC4KeyGenerator
+from services.command_registry import command_registry
+from services.duplicate_filter import duplicate_frame_filter
+from services.frame_builder import reply_builder
+from services.frame_recorder import frame_recorder, DIRECTION_IN, DIRECTION_OUT
+from services.frame_view import with_text_fields
+from services.ingest_queue import measure_write_queue, IngestQueueFull
+from services.measure_compression import measure_compressor
+from services.measure_values import TYPED_FIELDS, with_typed_values
+from services.key_ring import RC4_KEY_ID_OFFSET, UnknownKeyError, resolve_key
+from services.report_interval import report_interval_store
 from services.selected_device_store import selected_device_store
 from services.service_parameter_store import service_parameter_store
 from services.service_mode import ServiceMode
@@ -23,38 +35,218 @@ logger = logging.getLogger(__name__)
 # Musi być poza klasą, żeby przetrwał między wywołaniami
 _last_speed_by_device = {}
 
+
+# Prędkość traktowana jako zerowa (tolerancja dla float)
+SPEED_EPSILON = 0.001
+
+
+def parse_speed(value) -> Optional[float]:
+    """
+    Konwersja prędkości z ramki do float
+
+    Returns:
+        Optional[float]: Prędkość lub None, gdy wartości nie da się przekonwertować
+    """
+    try:
+        if isinstance(value, str):
+            # Jeśli to string, usuń białe znaki i przekonwertuj
+            return float(value.strip())
+        # Jeśli to już liczba, po prostu przekonwertuj
+        return float(value)
+    except (ValueError, AttributeError, TypeError):
+        return None
+
+
+def is_moving(speed: Optional[float]) -> bool:
+    """Czy prędkość oznacza pracujący przenośnik (None - brak poprzedniego pomiaru)"""
+    return speed is not None and abs(speed) > SPEED_EPSILON
+
+
+def should_store_measure(current_speed: float, last_speed: Optional[float]) -> bool:
+    """
+    Reguła zapisu MEASURE_DATA (wspólna dla obsługi ramek i importu archiwum):
+    - zapisuj wszystkie pomiary z prędkością != 0
+    - z prędkością = 0 zapisuj tylko pierwszy rekord po zatrzymaniu (gdy poprzednia prędkość != 0)
+
+    Args:
+        current_speed: Prędkość z bieżącej ramki
+        last_speed: Prędkość z poprzedniej ramki urządzenia (None - pierwsza ramka)
+    """
+    if abs(current_speed) > SPEED_EPSILON:
+        return True
+    return last_speed is not None and abs(last_speed) > SPEED_EPSILON
+
+
+class FrameError(ValueError):
+    """
+    Ramka odrzucona podczas walidacji (znaczniki, CRC16, CRC8)
+    """
+    pass
+
+
+class _PendingReply:
+    """
+    Odpowiedź na ramkę zapamiętywana w filtrze retransmisji (duplicate_frame_filter)
+    dopiero po zapisaniu w bazie wszystkich rekordów ramki wstawionych do kolejki zapisu.
+    Gdy któregoś rekordu nie udało się zatwierdzić, odpowiedź nie jest zapamiętywana -
+    retransmisja ramki zostanie obsłużona ponownie.
+    """
+
+    def __init__(self, frame: bytes):
+        self.frame = frame
+        self.reply: Optional[bytes] = None
+        self.pending = 0
+        self.failed = False
+        self._lock = threading.Lock()
+
+    def queued(self) -> None:
+        """Rekord ramki wstawiony do kolejki zapisu"""
+        with self._lock:
+            self.pending += 1
+
+    def written(self, ok: bool) -> None:
+        """Wynik zapisu rekordu z kolejki (wywoływane z wątku zapisującego)"""
+        with self._lock:
+            self.pending -= 1
+            self.failed = self.failed or not ok
+            self._remember()
+
+    def set_reply(self, reply: bytes) -> None:
+        """Odpowiedź gotowa - zapamiętana od razu albo po zapisie rekordów z kolejki"""
+        with self._lock:
+            self.reply = reply
+            self._remember()
+
+    def _remember(self) -> None:
+        if self.reply is not None and self.pending == 0 and not self.failed:
+            duplicate_frame_filter.remember(self.frame, self.reply)
+
+
 class CommandHandler:
     """
     Klasa odpowiedzialna za obsługę komend protokołu
     """
 
-    def __init__(self, key1: str, key2: str):
+    def __init__(self, key1: str, key2: str, autocommit: bool = True):
+        """
+        Args:
+            key1: Pierwszy klucz RC4
+            key2: Drugi klucz RC4
+            autocommit: Czy zatwierdzać transakcję po każdej komendzie.
+                        Przy False zmiany są tylko wysyłane do bazy (flush),
+                        a zatwierdza je wywołujący (np. obsługa paczki ramek).
+        """
         self.key1 = key1
         self.key2 = key2
+        self.autocommit = autocommit
+        # Odpowiedź na obsługiwaną ramkę (_PendingReply) i stan urządzeń sprzed transakcji
+        # wielu ramek (begin_device_state) - osobno dla każdego wątku
+        self._frame_state = threading.local()
 
+    def begin_device_state(self) -> None:
+        """
+        Zaczyna zapamiętywanie stanu urządzeń (ostatnia prędkość, stan kompresji) sprzed
+        pierwszej zmiany - dla transakcji obejmującej wiele ramek (tryb bez autocommit).
+        """
+        self._frame_state.saved_devices = {}
 
-    def handle_command(self, command_id: int, decoded_data: bytes, flag: int, db: Session) -> Response:
+    def end_device_state(self, restore: bool = False) -> None:
         """
-        Główna metoda obsługująca komendy na podstawie command_id
-        """
-        # Mapowanie command_id na odpowiednie metody
-        command_handlers = {
-            CommandID.MEASURE_DATA: self._handle_measure_data,
-            CommandID.REGISTER_UNIT: self._handle_register_unit,
-            CommandID.CMD_1: self._handle_cmd_1,
-            CommandID.CAPTURE_ALIASES: self._handle_capture_aliases,
-            CommandID.CAPTURE_DYNAMIC: self._handle_capture_dynamic,
-            CommandID.CAPTURE_STATIC: self._handle_capture_static,
-            CommandID.SERVICE_DATA: self._handle_service_data,
-        }
+        Kończy zapamiętywanie stanu urządzeń
 
-        # Wywołanie odpowiedniej metody lub obsługa nieznanych komend
-        handler = command_handlers.get(command_id)
-        if handler:
-            return handler(decoded_data, flag, db)
+        Args:
+            restore: Przywróć stan sprzed begin_device_state (transakcja wycofana)
+        """
+        saved = getattr(self._frame_state, 'saved_devices', None)
+        self._frame_state.saved_devices = None
+        if not restore or not saved:
+            return
+        for device_id, (last_speed, compression_state) in saved.items():
+            if last_speed is None:
+                _last_speed_by_device.pop(device_id, None)
+            else:
+                _last_speed_by_device[device_id] = last_speed
+            measure_compressor.restore(device_id, compression_state)
+        logger.info(f"Przywrócono stan urządzeń po wycofaniu transakcji: {', '.join(saved)}")
+
+    def _save_device_state(self, device_id: str) -> None:
+        """Zapamiętuje stan urządzenia przed pierwszą zmianą w transakcji (gdy zapamiętywanie trwa)"""
+        saved = getattr(self._frame_state, 'saved_devices', None)
+        if saved is not None and device_id not in saved:
+            saved[device_id] = (_last_speed_by_device.get(device_id), measure_compressor.snapshot(device_id))
+
+    def _commit(self, db: Session) -> None:
+        """Zatwierdza zmiany lub - w trybie bez autocommit - tylko je wysyła do bazy"""
+        if self.autocommit:
+            db.commit()
         else:
+            db.flush()
+
+    def process_frame(self, data: bytes, db: Session,
+                      iterations: int = RC4KeyGenerator.DEFAULT_ITERATIONS) -> Union[Response, dict]:
+        """
+        Waliduje ramkę, odszyfrowuje segment SZYFROWANA i obsługuje komendę.
+        Ramka i odpowiedź trafiają do rejestratora ramek (jeśli jest włączony).
+
+        Raises:
+            FrameError: gdy ramka nie przeszła walidacji
+        """
+        frame_recorder.record(DIRECTION_IN, data)
+        response = self._process_frame(data, db, iterations)
+        if isinstance(response, Response):
+            frame_recorder.record(DIRECTION_OUT, response.body)
+        return response
+
+    def _process_frame(self, data: bytes, db: Session, iterations: int) -> Union[Response, dict]:
+        # Sprawdzenie poprawności ramki
+        if not ProtocolAnalyzer.validate_frame(data):
+            raise FrameError("Nieprawidłowa ramka: błąd znacznika końca lub sumy kontrolnej")
+
+        # Retransmisja ramki już obsłużonej - odpowiedź z okna idempotencji, bez odszyfrowania i zapisu
+        cached_reply = duplicate_frame_filter.lookup(data)
+        if cached_reply is not None:
+            return Response(content=cached_reply, media_type="application/octet-stream")
+
+        # Klucz RC4 wybierany według RC4_KEY_ID z sekcji JAWNA
+        key1, key2 = self.key1, self.key2
+        if len(data) > RC4_KEY_ID_OFFSET and data[3] & 0x01:
+            try:
+                key1, key2 = resolve_key(data[RC4_KEY_ID_OFFSET], self.key1, self.key2)
+            except UnknownKeyError as e:
+                raise FrameError(str(e.args[0]))
+
+        # teraz nalezy sprawdzic czy dane sa zakodowane
+        decoded_data, crc_valid = ProtocolAnalyzer.encode_data(data, iterations, key1, key2)
+        # Sprawdzenie czy suma kontrolna jest poprawna
+        if not crc_valid:
+            raise FrameError("Nieprawidłowa suma kontrolna CRC8")
+
+        flag = decoded_data[3]
+        # Pobranie COMMAND_ID
+        command_id = ProtocolAnalyzer.extract_command_id(decoded_data)
+
+        pending_reply = _PendingReply(data)
+        self._frame_state.pending_reply = pending_reply
+        try:
+            response = self.handle_command(command_id, decoded_data, flag, db)
+        finally:
+            self._frame_state.pending_reply = None
+        # W trybie bez autocommit odpowiedź zapamiętuje wywołujący - po zatwierdzeniu transakcji
+        if self.autocommit and isinstance(response, Response):
+            pending_reply.set_reply(response.body)
+        return response
+
+    def handle_command(self, command_id: int, decoded_data: bytes, flag: int, db: Session) -> Response:
+        """
+        Główna metoda obsługująca komendy na podstawie command_id.
+        Obsługa wybierana jest z rejestru komend (command_registry) budowanego przy imporcie.
+        """
+        response = command_registry.dispatch(self, command_id, decoded_data, flag, db)
+        if response is None:
             return self._handle_unknown_command(command_id)
+        return response
 
+    @command_registry.register(CommandID.MEASURE_DATA)
     def _handle_measure_data(self, decoded_data: bytes, flag: int, db: Session) -> Response:
         """
         Obsługa komendy MEASURE_DATA (0x0003)
@@ -71,34 +263,24 @@ class CommandHandler:
 
         device_id = measure_data.deviceId
 
-        # Bezpieczna konwersja prędkości do float - obsługa różnych typów danych
-        try:
-            if isinstance(measure_data.speed, str):
-                # Jeśli to string, usuń białe znaki i przekonwertuj
-                current_speed = float(measure_data.speed.strip())
-            else:
-                # Jeśli to już liczba, po prostu przekonwertuj
-                current_speed = float(measure_data.speed)
-        except (ValueError, AttributeError, TypeError) as e:
-            logger.error(f"Błąd konwersji prędkości dla urządzenia {device_id}: {measure_data.speed}, błąd: {e}")
+        # Prędkość jako liczba - dla VERSION 2 wartość z ramki, bez budowania tekstu
+        current_speed = measure_data.speedValue
+        if current_speed is None:
+            logger.error(f"Błąd konwersji prędkości dla urządzenia {device_id}: {measure_data.speed}")
             current_speed = 0.0
 
         # Pobierz ostatnią prędkość (też jako float)
+        self._save_device_state(device_id)
         last_speed = _last_speed_by_device.get(device_id)
 
         # Debug - loguj typy i wartości
         logger.info(f"Device {device_id}: current_speed={current_speed}, last_speed={last_speed}")
 
-        should_save = False
+        should_save = should_store_measure(current_speed, last_speed)
 
-        # Porównanie z tolerancją dla float (prędkość != 0 jeśli > 0.001)
-        if abs(current_speed) > 0.001:
-            # Prędkość różna od zera - zawsze zapisuj
-            should_save = True
+        if should_save and abs(current_speed) > SPEED_EPSILON:
             logger.info(f"Zapisuję rekord z prędkością={current_speed} dla urządzenia {device_id}")
-        elif last_speed is not None and abs(last_speed) > 0.001:
-            # Prędkość = 0 i poprzednia była != 0 - zapisz jako ostatni rekord cyklu
-            should_save = True
+        elif should_save:
             logger.info(f"Zapisuję końcowy rekord z prędkością=0 dla urządzenia {device_id} (poprzednia: {last_speed})")
         else:
             # Prędkość = 0 i (poprzednia też była 0 LUB to pierwszy pomiar) - nie zapisuj
@@ -112,21 +294,45 @@ class CommandHandler:
 
 
         # Zapisz do bazy tylko jeśli spełnione warunki
+        records = []
         if should_save:
+            # Kolumny liczbowe z widoku ramki; pola tekstowe VERSION 2 budowane dopiero
+            # dla rekordów zapisywanych po kompresji (VERSION 1 - tekst z ramki)
+            record = {'deviceId': measure_data.deviceId, **measure_data.typed_values()}
+            if not measure_data.BINARY:
+                record.update((name, getattr(measure_data, name)) for name in TYPED_FIELDS)
+            with_typed_values(record)
+            # Kompresja (deadband / swinging door) - start i zatrzymanie przenośnika zapisywane zawsze
+            records = [with_text_fields(row) for row in measure_compressor.process(
+                device_id, record, force=not is_moving(current_speed) or not is_moving(last_speed))]
+            # Zapis odroczony - kolejka zapisuje paczki jednym commitem
+            # (paczki ramek z /analyze-batch mają własną transakcję)
+            if records and self.autocommit and measure_write_queue.is_running:
+                # Odpowiedź trafi do filtra retransmisji dopiero po zapisie rekordów z kolejki
+                pending_reply = getattr(self._frame_state, 'pending_reply', None)
+                on_written = pending_reply.written if pending_reply is not None else None
+                queued = 0
+                try:
+                    for record in records:
+                        measure_write_queue.enqueue(record, on_written=on_written)
+                        if pending_reply is not None:
+                            pending_reply.queued()
+                        queued += 1
+                except IngestQueueFull as e:
+                    logger.warning(f"{e} - zapis bezpośredni: device={device_id}")
+                records = records[queued:]
+
+        if records:
             try:
-                db_measure = MeasureData(
-                    deviceId=measure_data.deviceId,
-                    speed=measure_data.speed,
-                    rate=measure_data.rate,
-                    total=measure_data.total,
-                    currentTime=measure_data.currentTime
-                )
-                db.add(db_measure)
-                db.commit()
+                db.add_all([MeasureData(**record) for record in records])
+                self._commit(db)
                 logger.info(f" SUKCES zapisu do bazy: device={device_id}, speed={current_speed}")
             except Exception as e:
                 logger.error(f" BŁĄD zapisu do bazy: device={device_id}, speed={current_speed}, błąd: {e}")
                 db.rollback()
+                if not self.autocommit:
+                    # Transakcja wywołującego jest już wycofana - przerwij całą paczkę
+                    raise
 
         # Aktualizuj ostatnią prędkość
         _last_speed_by_device[device_id] = current_speed
@@ -172,7 +378,8 @@ class CommandHandler:
 
 
         # -- NOWA IMPLEMENTACJA Z WYKOZYSTANIEM MACHINE STATE
-        if selected_device_store.is_device_selected(current_id_clean):
+        service_session = selected_device_store.is_device_selected(current_id_clean)
+        if service_session:
             machine_state_observer.observe_network_activity(command_id=0x0003)
             request = ServiceMode.get_request_value()
             mode = ServiceMode.get_request_mode()
@@ -189,11 +396,75 @@ class CommandHandler:
             selected_device_store.clear_service_mode_device()
             logger.info(f"Wymuszenie wyłączenia trybu serwisowego, request:{request} dla: {current_device_id}")
 
+        # Interwał do następnej ramki - pole reportInterval istnieje tylko w odpowiedzi VERSION 2,
+        # dla VERSION 1 schemat odpowiedzi nie ma pól i odpowiedź pozostaje bez zmian
+        report_interval = report_interval_store.interval_for(
+            db, current_id_clean, current_speed, service_session and ServiceMode.is_enabled(), SPEED_EPSILON)
+        response_data = reply_builder.build_reply(decoded_data, flag, status=0x01, request=request,
+                                                  key1=self.key1, key2=self.key2,
+                                                  reportInterval=report_interval)
+        return Response(content=response_data, media_type="application/octet-stream")
+
+    @command_registry.register(CommandID.MEASURE_BATCH)
+    def _handle_measure_batch(self, decoded_data: bytes, flag: int, db: Session) -> Response:
+        """
+        Obsługa komendy MEASURE_BATCH (0x0007) - pomiary buforowane przez integrator
+        podczas braku łączności. Rekordy zapisywane są jednym bulk insertem i jednym
+        commitem (ta sama reguła zapisu co dla MEASURE_DATA), odpowiedź potwierdza
+        numer ostatniego przyjętego rekordu.
+        """
+        device_id, first_record, records = ProtocolAnalyzer.parse_measure_batch(decoded_data)
+        device_activity_tracker.update_activity(device_id)
 
-        return self._prepare_response(decoded_data, flag, status=0x01, request=request)
-
-
+        self._save_device_state(device_id)
+        last_speed = _last_speed_by_device.get(device_id)
+        received_at = time.time()
+        # Stan kompresji przywracany, gdy paczka nie zostanie zapisana (integrator ją ponowi)
+        compression_state = measure_compressor.snapshot(device_id)
+        rows = []
+        for record in records:
+            current_speed = record['speedValue']
+            if current_speed is None:
+                current_speed = 0.0
+            if should_store_measure(current_speed, last_speed):
+                record['deviceId'] = device_id
+                with_typed_values(record, received_at)
+                # Pola tekstowe tylko dla rekordów zapisywanych po kompresji
+                rows.extend(with_text_fields(row) for row in measure_compressor.process(
+                    device_id, record, force=not is_moving(current_speed) or not is_moving(last_speed)))
+            last_speed = current_speed
 
+        status = 0x01
+        last_record = (first_record + len(records) - 1) & 0xFFFFFFFF
+        if rows:
+            try:
+                db.bulk_insert_mappings(MeasureData, rows)
+                self._commit(db)
+            except Exception as e:
+                logger.error(f" BŁĄD zapisu paczki do bazy: device={device_id}, rekordy={len(rows)}, błąd: {e}")
+                db.rollback()
+                measure_compressor.restore(device_id, compression_state)
+                if not self.autocommit:
+                    raise
+                # Nic nie przyjęto - integrator ponowi paczkę od first_record
+                status = 0x00
+                last_record = (first_record - 1) & 0xFFFFFFFF
+                # Odpowiedź odrzucająca nie trafia do filtra retransmisji
+                pending_reply = getattr(self._frame_state, 'pending_reply', None)
+                if pending_reply is not None:
+                    pending_reply.failed = True
+
+        if status == 0x01 and records:
+            _last_speed_by_device[device_id] = last_speed
+        logger.info(f"Paczka pomiarów: device={device_id}, rekordy {first_record}..{first_record + len(records) - 1}, "
+                    f"zapisano {len(rows) if status == 0x01 else 0}")
+
+        response_data = reply_builder.build_reply(decoded_data, flag, status, 0x00,
+                                                  key1=self.key1, key2=self.key2,
+                                                  lastRecord=last_record)
+        return Response(content=response_data, media_type="application/octet-stream")
+
+    @command_registry.register(CommandID.REGISTER_UNIT)
     def _handle_register_unit(self, decoded_data: bytes, flag: int, db: Session) -> Response:
         """
         Obsługa komendy CMD_0 (0x0000)
@@ -210,6 +481,7 @@ class CommandHandler:
 
         return self._prepare_response_register(decoded_data, flag, status=0x01, request=request)
 
+    @command_registry.register(CommandID.CMD_1)
     def _handle_cmd_1(self, decoded_data: bytes, flag: int, db: Session) -> Response:
         """
         Obsługa komendy CMD_1 (0x0001)
@@ -218,6 +490,7 @@ class CommandHandler:
         request_value = ServiceMode.get_request_value()
         return self._prepare_response(decoded_data, flag, status=0x01, request=request_value)
 
+    @command_registry.register(CommandID.CAPTURE_ALIASES)
     def _handle_capture_aliases(self, decoded_data: bytes, flag: int, db: Session) -> Response:
         """
         Obsługa komendy CAPTURE_ALIASES (0x0002)
@@ -249,12 +522,13 @@ class CommandHandler:
             logger.info(f"Utworzono nowy alias dla deviceId: {alias_data.deviceId}")
 
             # Zatwierdzenie w bazie danych
-        db.commit()
+        self._commit(db)
 
         # Przygotowanie odpowiedzi z uwzględnieniem trybu serwisowego
         request_value = ServiceMode.get_request_value()
         return self._prepare_response(decoded_data, flag, status=0x01, request=request_value)
 
+    @command_registry.register(CommandID.CAPTURE_DYNAMIC)
     def _handle_capture_dynamic(self, decoded_data: bytes, flag: int, db: Session) -> Response:
         """
         Obsługa komendy CMD_4 (0x0004)
@@ -271,6 +545,7 @@ class CommandHandler:
         logger.info(f"request is set to: {request}")
         return self._prepare_response(decoded_data, flag, status=0x01, request=request)
 
+    @command_registry.register(CommandID.CAPTURE_STATIC)
     def _handle_capture_static(self, decoded_data: bytes, flag: int, db: Session) -> Response:
         """
         Obsługa komendy CAPTURE_STATIC (0x0005)
@@ -325,7 +600,7 @@ class CommandHandler:
 
         # Zatwierdzenie w bazie danych
 
-        db.commit()
+        self._commit(db)
 
         # Przygotowanie odpowiedzi z uwzględnieniem trybu serwisowego
         request_value = ServiceMode.get_request_value()
@@ -342,6 +617,7 @@ class CommandHandler:
             "status": "not_implemented"
         }
 
+    @command_registry.register(CommandID.SERVICE_DATA)
     def _handle_service_data(self, decoded_data: bytes, flag: int, db: Session, param_address: int = 0,
                              param_data: str = "") -> Response:
         """
@@ -428,30 +704,13 @@ class CommandHandler:
         # Ustawianie adresu parametru - używamy przekazanego parametru lub domyślnego
         param_address_byte = param_address if param_address > 0 else 0x00
 
-        # Przygotowanie danych parametru (19 bajtów)
-        param_data_bytes = bytearray(19)
-
-        #if param_data:
+        # Przygotowanie danych parametru (19 bajtów) - schemat odpowiedzi dopełnia
+        # je spacjami lub obcina; specjalnej komendy nie przesyłamy
         if param_data and param_data != "DISABLE_SERVICE_MODE":
-
-
-            # Konwersja przekazanego stringa na bytearray(pomijamy specjalną komendę)
-            param_data_str = str(param_data)
-            param_data_encoded = bytearray(param_data_str.encode('ascii'))
-
-            # Upewniamy się, że długość to dokładnie 19 bajtów
-            if len(param_data_encoded) < 19:
-                # Uzupełniamy spacjami, jeśli jest za krótki
-                param_data_encoded.extend([0x20] * (19 - len(param_data_encoded)))
-            elif len(param_data_encoded) > 19:
-                # Obcinamy, jeśli jest za długi
-                param_data_encoded = param_data_encoded[:19]
-
-            param_data_bytes = param_data_encoded
+            param_data_bytes = str(param_data).encode('ascii')
         else:
-            # Domyślne dane - wypełniamy pustymi znakami (spacje)
-            for i in range(19):
-                param_data_bytes[i] = 0x20  # Kod ASCII spacji
+            # Domyślne dane - same spacje
+            param_data_bytes = b''
 
         # W zależności od adresu parametru, możemy dodać dodatkową logikę
         if param_address_byte > 0 and param_address_byte <= 15:
@@ -499,173 +758,38 @@ class CommandHandler:
         elif request == 0x00:
             logger.info("Zewnętrzny kontroler wyjdzie z trybu serwisowego")
 
-        # Pobieramy DEVICE_ID i COMMAND_ID z sekcji JAWNA
-        _device_id = decoded_data[4:14]  # 10 bajtów
-        _command_id = decoded_data[14:16]  # 2 bajty
-
-        # Ustawienie najstarszego bitu w COMMAND_ID
-        command_id_value = int.from_bytes(_command_id, 'big')
-        command_id_value |= 0x8000
-        _command_id = command_id_value.to_bytes(2, 'big')
-
-        response_data = bytearray()
-
-        # HEADER (4B)
-        response_data.extend([0xAA, 0x55])  # START_MARKER_1 i START_MARKER_2
-        response_data.append(0x01)  # VERSION
-        response_data.append(0x00)  # FLAGS (plain)
-
-        # JAWNA (17B)
-        response_data.extend(_device_id)  # DEVICE_ID (10B)
-        response_data.extend(_command_id)  # COMMAND_ID (2B)
-        response_data.append(0x00)  # RC4_KEY_ID (1B)
-        response_data.extend(b'\x00\x00\x00')  # TIMESTAMP (3B)
-        response_data.append(0x00)  # SEQ_NUM (1B)
-
-        # SZYFROWANA
-        response_data.append(22)  # DATA_LEN (22 bajty danych: Status+Request+Adres+Dane)
-        response_data.append(status)  # STATUS (1B)
-        response_data.append(request)  # REQUEST (1B)
-        response_data.append(param_address_byte)  # Adres parametru (1B)
-        response_data.extend(param_data_bytes)  # Dane parametru (19B)
-
-        # Obliczenie CRC8 dla sekcji SZYFROWANA
-        crc8 = ProtocolAnalyzer.calculate_crc8(response_data[-23:])  # dla DATA_LEN + DATA
-        response_data.append(crc8)
-        encrypted_segment = response_data[21:]
-
-        # Jeśli flaga encode = true koduje dane
-        if (flag & 0x01):
-            response_data[3] = 1
-            cipher = RC4KeyGenerator.create_cipher(self.key1, self.key2)
-            encrypted = cipher.encrypt(encrypted_segment)
-            response_data[21:] = encrypted
-
-        # Obliczenie CRC16 dla całości (bez znacznika końca)
-        crc16 = ProtocolAnalyzer.calculate_crc16(response_data)
-        response_data.extend(crc16.to_bytes(2, 'big'))  # CRC16 (2B)
-
-        # FOOTER - znacznik końca
-        response_data.append(0x55)  # END_MARKER (1B)
-
-        return Response(content=bytes(response_data), media_type="application/octet-stream")
+        # Odpowiedź: Status + Request + Adres parametru (1B) + Dane parametru (19B)
+        response_data = reply_builder.build_reply(
+            decoded_data, flag, status, request,
+            key1=self.key1, key2=self.key2,
+            paramAddress=param_address_byte,
+            paramData=param_data_bytes
+        )
+
+        return Response(content=response_data, media_type="application/octet-stream")
 
     def _prepare_response(self, decoded_data: bytes, flag: int, status: int, request: int) -> Response:
         """
         Przygotowanie standardowej odpowiedzi na komendę
         """
-        # Pobieramy DEVICE_ID i COMMAND_ID z sekcji JAWNA
-        _device_id = decoded_data[4:14]  # 10 bajtów
-        _command_id = decoded_data[14:16]  # 2 bajty
-
-        # Ustawienie najstarszego bitu w COMMAND_ID
-        command_id_value = int.from_bytes(_command_id, 'big')
-        command_id_value |= 0x8000
-        _command_id = command_id_value.to_bytes(2, 'big')
-
-        response_data = bytearray()
-
-        # HEADER (4B)
-        response_data.extend([0xAA, 0x55])  # START_MARKER_1 i START_MARKER_2
-        response_data.append(0x01)  # VERSION
-        response_data.append(0x00)  # FLAGS (plain)
-
-        # JAWNA (17B)
-        response_data.extend(_device_id)  # DEVICE_ID (10B)
-        response_data.extend(_command_id)  # COMMAND_ID (2B)
-        response_data.append(0x00)  # RC4_KEY_ID (1B)
-        response_data.extend(b'\x00\x00\x00')  # TIMESTAMP (3B)
-        response_data.append(0x00)  # SEQ_NUM (1B)
-
-        # SZYFROWANA
-        response_data.append(0x02)  # DATA_LEN (2 bajty danych)
-        response_data.append(status)  # STATUS (1B)
-        response_data.append(request)  # REQUEST (1B)
-
-        # Obliczenie CRC8 dla sekcji SZYFROWANA
-        crc8 = ProtocolAnalyzer.calculate_crc8(response_data[-4:])  # dla DATA_LEN + DATA
-        response_data.append(crc8)
-        encrypted_segment = response_data[21:]
-
-        # Jeśli flaga encode = true koduje dane
-        if (flag & 0x01):
-            response_data[3] = 1
-            cipher = RC4KeyGenerator.create_cipher(self.key1, self.key2)
-            encrypted = cipher.encrypt(encrypted_segment)
-            response_data[21:] = encrypted
-
-        # Obliczenie CRC16 dla całości (bez znacznika końca)
-        crc16 = ProtocolAnalyzer.calculate_crc16(response_data)
-        response_data.extend(crc16.to_bytes(2, 'big'))  # CRC16 (2B)
-
-        # FOOTER - znacznik końca
-        response_data.append(0x55)  # END_MARKER (1B)
-
-        return Response(content=bytes(response_data), media_type="application/octet-stream")
+        response_data = reply_builder.build(decoded_data, flag, status, request,
+                                            key1=self.key1, key2=self.key2)
+        return Response(content=response_data, media_type="application/octet-stream")
 
     def _prepare_response_register(self, decoded_data: bytes, flag: int, status: int, request: int) -> Response:
         """
-        Przygotowanie standardowej odpowiedzi na komendę
+        Przygotowanie odpowiedzi na rejestrację - zawiera aktualny czas serwera (19B)
         """
-        # Pobieramy DEVICE_ID i COMMAND_ID z sekcji JAWNA
-        _device_id = decoded_data[4:14]  # 10 bajtów
-        _command_id = decoded_data[14:16]  # 2 bajty
-
-        # Ustawienie najstarszego bitu w COMMAND_ID
-        command_id_value = int.from_bytes(_command_id, 'big')
-        command_id_value |= 0x8000
-        _command_id = command_id_value.to_bytes(2, 'big')
-
-        response_data = bytearray()
-
-        # HEADER (4B)
-        response_data.extend([0xAA, 0x55])  # START_MARKER_1 i START_MARKER_2
-        response_data.append(0x01)  # VERSION
-        response_data.append(0x00)  # FLAGS (plain)
-
-        # JAWNA (17B)
-        response_data.extend(_device_id)  # DEVICE_ID (10B)
-        response_data.extend(_command_id)  # COMMAND_ID (2B)
-        response_data.append(0x00)  # RC4_KEY_ID (1B)
-        response_data.extend(b'\x00\x00\x00')  # TIMESTAMP (3B)
-        response_data.append(0x00)  # SEQ_NUM (1B)
-
-        # SZYFROWANA
-        # Pobieramy aktualny czas
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        # Zwiększamy DATA_LEN o 19 bajtów (dla daty)
-        response_data.append(0x15)  # DATA_LEN (2 + 19 bajty danych: 2 bajty oryginalnych danych + 19 bajtów daty)
-        response_data.append(status)  # STATUS (1B)
-        response_data.append(request)  # REQUEST (1B)
-        # Dodajemy 19 bajtów z aktualną datą i czasem
-        response_data.extend(current_time.encode('ascii'))  # Data i czas w formacie ASCII (19B)
-
-        # Obliczenie CRC8 dla sekcji SZYFROWANA
-        crc8 = ProtocolAnalyzer.calculate_crc8(response_data[-22:])  # dla DATA_LEN + DATA
-        response_data.append(crc8)
-        encrypted_segment = response_data[21:]
-
-        # Jeśli flaga encode = true koduje dane
-        if (flag & 0x01):
-            response_data[3] = 1
-            cipher = RC4KeyGenerator.create_cipher(self.key1, self.key2)
-            encrypted = cipher.encrypt(encrypted_segment)
-            response_data[21:] = encrypted
-
-        # Obliczenie CRC16 dla całości (bez znacznika końca)
-        crc16 = ProtocolAnalyzer.calculate_crc16(response_data)
-        response_data.extend(crc16.to_bytes(2, 'big'))  # CRC16 (2B)
-
-        # FOOTER - znacznik końca
-        response_data.append(0x55)  # END_MARKER (1B)
-
-        return Response(content=bytes(response_data), media_type="application/octet-stream")
+        response_data = reply_builder.build_reply(decoded_data, flag, status, request,
+                                                  key1=self.key1, key2=self.key2,
+                                                  currentTime=current_time)
+        return Response(content=response_data, media_type="application/octet-stream")
 
 
 # Funkcja opakowująca dla zachowania wstecznej kompatybilności
 def command_support(command_id: int, decoded_data: bytes, flag: int, key1: str, key2: str,
-                    db: Session = Depends(get_db)):
+                    db: Session):
     """
     Funkcja opakowująca dla zachowania wstecznej kompatybilności.
     Deleguje obsługę do instancji CommandHandler.
@@ -0,0 +1,159 @@
+import bisect
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Górne granice przedziałów histogramu czasu obsługi [ms] (ostatni przedział: powyżej 1000 ms)
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0)
+_LATENCY_BUCKETS_NS = tuple(int(bound * 1_000_000) for bound in LATENCY_BUCKETS_MS)
+
+
+class CommandStats:
+    """
+    Liczniki i histogram czasu obsługi jednej komendy
+    """
+    __slots__ = ('calls', 'errors', 'total_ns', 'max_ns', 'buckets')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def record(self, elapsed_ns: int, ok: bool) -> None:
+        self.calls += 1
+        if not ok:
+            self.errors += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        self.buckets[bisect.bisect_left(_LATENCY_BUCKETS_NS, elapsed_ns)] += 1
+
+    def percentile_ms(self, p: float) -> float:
+        """Szacuje percentyl czasu obsługi (górna granica przedziału histogramu)"""
+        if not self.calls:
+            return 0.0
+        target = p / 100.0 * self.calls
+        cumulative = 0
+        for index, count in enumerate(self.buckets):
+            cumulative += count
+            if cumulative >= target:
+                if index < len(LATENCY_BUCKETS_MS):
+                    return LATENCY_BUCKETS_MS[index]
+                break
+        return self.max_ns / 1_000_000
+
+    def as_dict(self) -> dict:
+        histogram = {f"<={bound}": count for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets)}
+        histogram[f">{LATENCY_BUCKETS_MS[-1]}"] = self.buckets[-1]
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ns / self.calls / 1_000_000, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_ns / 1_000_000, 3),
+            "p50_ms": self.percentile_ms(50),
+            "p95_ms": self.percentile_ms(95),
+            "p99_ms": self.percentile_ms(99),
+            "histogram_ms": histogram,
+        }
+
+
+class CommandEntry:
+    """
+    Wpis rejestru: funkcja obsługi komendy i jej statystyki
+    """
+    __slots__ = ('command_id', 'name', 'handler', 'stats')
+
+    def __init__(self, command_id: int, name: str, handler: Callable):
+        self.command_id = command_id
+        self.name = name
+        self.handler = handler
+        self.stats = CommandStats()
+
+
+class CommandRegistry:
+    """
+    Rejestr obsługi komend budowany raz przy imporcie modułów.
+
+    Funkcje obsługi rejestrowane są dekoratorem register(); dispatch() wykonuje
+    jedno wyszukiwanie w słowniku COMMAND_ID -> wpis i zlicza czas obsługi.
+    """
+
+    def __init__(self):
+        self._entries: Dict[int, CommandEntry] = {}
+        self._unknown = CommandStats()
+        self._lock = threading.Lock()
+
+    def register(self, command_id: int, name: Optional[str] = None) -> Callable[[Callable], Callable]:
+        """
+        Dekorator rejestrujący funkcję obsługi komendy.
+        Funkcja przyjmuje (handler, decoded_data, flag, db) - może to być metoda CommandHandler.
+
+        Args:
+            command_id: COMMAND_ID obsługiwanej komendy
+            name: Nazwa komendy w statystykach (domyślnie nazwa z CommandID lub CMD_xxxx)
+        """
+        def decorator(func: Callable) -> Callable:
+            entry_name = name or getattr(command_id, 'name', None) or f"CMD_{int(command_id):04x}"
+            if int(command_id) in self._entries:
+                logger.warning(f"Nadpisanie obsługi komendy 0x{int(command_id):04X} ({entry_name})")
+            self._entries[int(command_id)] = CommandEntry(int(command_id), entry_name, func)
+            return func
+
+        return decorator
+
+    def get(self, command_id: int) -> Optional[CommandEntry]:
+        return self._entries.get(command_id)
+
+    def dispatch(self, handler, command_id: int, decoded_data: bytes, flag: int, db):
+        """
+        Wywołuje obsługę komendy i zapisuje statystyki
+
+        Returns:
+            Wynik funkcji obsługi lub None, gdy komenda nie jest zarejestrowana
+        """
+        entry = self._entries.get(command_id)
+        if entry is None:
+            with self._lock:
+                self._unknown.record(0, False)
+            return None
+
+        start = time.perf_counter_ns()
+        ok = False
+        try:
+            result = entry.handler(handler, decoded_data, flag, db)
+            ok = True
+            return result
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            with self._lock:
+                entry.stats.record(elapsed, ok)
+
+    def command_ids(self) -> List[int]:
+        return sorted(self._entries)
+
+    def get_stats(self) -> dict:
+        """Zwraca statystyki wszystkich zarejestrowanych komend"""
+        with self._lock:
+            return {
+                "commands": {
+                    entry.name: dict(command_id=f"0x{entry.command_id:04X}", **entry.stats.as_dict())
+                    for entry in sorted(self._entries.values(), key=lambda e: e.command_id)
+                },
+                "unknown_commands": self._unknown.calls,
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            for entry in self._entries.values():
+                entry.stats = CommandStats()
+            self._unknown = CommandStats()
+
+
+# Globalna instancja
+command_registry = CommandRegistry()
@@ -0,0 +1,101 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from sqlalchemy.orm import Session
+
+from repositories.database import ReadSessionLocal, WriterSessionLocal
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class DbExecutor:
+    """
+    Ograniczona pula wątków dla blokującej pracy na bazie danych.
+
+    Funkcja przekazana do run() wykonywana jest w wątku puli z własną sesją
+    SQLAlchemy, dzięki czemu endpointy async nie blokują pętli zdarzeń.
+    Zadania ponad limit wątków czekają w kolejce puli.
+    """
+
+    def __init__(self, name: str, max_workers: int, session_factory: Callable[[], Session]):
+        """
+        Args:
+            name: Nazwa puli (prefiks nazw wątków)
+            max_workers: Maksymalna liczba wątków
+            session_factory: Fabryka sesji bazy danych dla zadań puli
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self.session_factory = session_factory
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        # Statystyki
+        self.tasks_total = 0
+        self.tasks_active = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix=f"db-{self.name}")
+        return self._executor
+
+    def _call(self, func: Callable[..., T], args: tuple, kwargs: dict) -> T:
+        """Wykonuje funkcję w wątku puli z nową sesją bazy danych"""
+        with self._lock:
+            self.tasks_total += 1
+            self.tasks_active += 1
+        db = self.session_factory()
+        try:
+            return func(db, *args, **kwargs)
+        finally:
+            db.close()
+            with self._lock:
+                self.tasks_active -= 1
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Wykonuje func(db, *args, **kwargs) w puli wątków i czeka na wynik
+
+        Args:
+            func: Funkcja przyjmująca sesję bazy danych jako pierwszy argument
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), self._call, func, args, kwargs)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Zamyka pulę (kolejne wywołania run() utworzą ją ponownie)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def get_stats(self) -> dict:
+        return {
+            "name": self.name,
+            "max_workers": self.max_workers,
+            "tasks_total": self.tasks_total,
+            "tasks_active": self.tasks_active,
+        }
+
+
+# Globalne instancje
+# Zapis ramek od integratorów - jeden wątek, zapisy do SQLite wykonywane po kolei (writer_engine)
+ingest_executor = DbExecutor("ingest", 1, WriterSessionLocal)
+# Raporty i ciężkie zapytania - osobna pula z sesjami tylko do odczytu (read_engine),
+# nie wstrzymuje przyjmowania ramek
+query_executor = DbExecutor("query", int(os.getenv("DB_QUERY_WORKERS", "4")), ReadSessionLocal)
+
+
+def shutdown_executors(wait: bool = True) -> None:
+    """Zamyka wszystkie pule - wywoływane przy zatrzymaniu aplikacji"""
+    ingest_executor.shutdown(wait)
+    query_executor.shutdown(wait)
@@ -0,0 +1,143 @@
+import os
+import threading
+from typing import Dict, List, Optional, Tuple, Union
+
+from services.frame_view import COMMAND_ID_OFFSET, DEVICE_ID_OFFSET, FOOTER_SIZE, SEGMENT_START
+from services.support import CommandID
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Pola sekcji JAWNA wykorzystywane w odcisku ramki
+TIMESTAMP_OFFSET = 17   # TIMESTAMP (3B)
+SEQ_NUM_OFFSET = 20     # SEQ_NUM (1B)
+
+# Odcisk ramki: (SEQ_NUM, TIMESTAMP, CRC16)
+Fingerprint = Tuple[int, bytes, bytes]
+
+
+class _DeviceWindow:
+    """
+    Pierścień ostatnich odcisków ramek jednego urządzenia wraz z odpowiedziami
+    """
+    __slots__ = ('fingerprints', 'replies', 'position')
+
+    def __init__(self, size: int):
+        self.fingerprints: List[Optional[Fingerprint]] = [None] * size
+        self.replies: List[Optional[bytes]] = [None] * size
+        self.position = 0
+
+    def find(self, fingerprint: Fingerprint) -> Optional[bytes]:
+        for index, stored in enumerate(self.fingerprints):
+            if stored == fingerprint:
+                return self.replies[index]
+        return None
+
+    def add(self, fingerprint: Fingerprint, reply: bytes) -> None:
+        for index, stored in enumerate(self.fingerprints):
+            if stored == fingerprint:
+                self.replies[index] = reply
+                return
+        self.fingerprints[self.position] = fingerprint
+        self.replies[self.position] = reply
+        self.position = (self.position + 1) % len(self.fingerprints)
+
+
+class DuplicateFrameFilter:
+    """
+    Okno idempotencji dla retransmisji ramek od integratorów.
+
+    Integrator ponawia ramkę po przekroczeniu czasu oczekiwania na odpowiedź,
+    więc ta sama ramka MEASURE_DATA (lub MEASURE_BATCH) może dotrzeć kilka razy. Dla każdego urządzenia
+    pamiętany jest pierścień window_size ostatnich odcisków (SEQ_NUM, TIMESTAMP, CRC16)
+    z sekcji JAWNA i stopki wraz z wysłaną odpowiedzią. Powtórzona ramka dostaje
+    zapamiętaną odpowiedź bez odszyfrowania i bez zapisu do bazy.
+    """
+
+    def __init__(self, window_size: int = 16,
+                 command_ids: Tuple[int, ...] = (CommandID.MEASURE_DATA, CommandID.MEASURE_BATCH)):
+        """
+        Args:
+            window_size: Liczba zapamiętanych ramek na urządzenie (0 wyłącza filtr)
+            command_ids: Komendy objęte filtrem
+        """
+        self.window_size = window_size
+        self.command_ids = frozenset(int(c) for c in command_ids)
+        self._windows: Dict[bytes, _DeviceWindow] = {}
+        self._lock = threading.Lock()
+        # Statystyki
+        self.duplicates_total = 0
+        self.duplicates_by_device: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_size > 0
+
+    def _key(self, frame: Union[bytes, bytearray, memoryview]) -> Optional[Tuple[bytes, Fingerprint]]:
+        """Zwraca (DEVICE_ID, odcisk) lub None, gdy ramka nie podlega filtrowi"""
+        if not self.enabled or len(frame) < SEGMENT_START + FOOTER_SIZE:
+            return None
+        command_id = int.from_bytes(frame[COMMAND_ID_OFFSET:COMMAND_ID_OFFSET + 2], 'big')
+        if command_id not in self.command_ids:
+            return None
+        device_id = bytes(frame[DEVICE_ID_OFFSET:DEVICE_ID_OFFSET + 10])
+        crc16 = bytes(frame[-FOOTER_SIZE:-1])
+        fingerprint = (frame[SEQ_NUM_OFFSET], bytes(frame[TIMESTAMP_OFFSET:SEQ_NUM_OFFSET]), crc16)
+        return device_id, fingerprint
+
+    def lookup(self, frame: Union[bytes, bytearray, memoryview]) -> Optional[bytes]:
+        """
+        Sprawdza, czy ramka jest retransmisją
+
+        Returns:
+            Optional[bytes]: Zapamiętana ramka odpowiedzi lub None dla nowej ramki
+        """
+        key = self._key(frame)
+        if key is None:
+            return None
+        device_id, fingerprint = key
+        with self._lock:
+            window = self._windows.get(device_id)
+            reply = window.find(fingerprint) if window is not None else None
+            if reply is None:
+                return None
+            name = device_id.decode('ascii', errors='replace').strip('\x00 ')
+            self.duplicates_total += 1
+            self.duplicates_by_device[name] = self.duplicates_by_device.get(name, 0) + 1
+        logger.info(f"Pominięto powtórzoną ramkę: device={name}, seq={fingerprint[0]}")
+        return reply
+
+    def remember(self, frame: Union[bytes, bytearray, memoryview], reply: bytes) -> None:
+        """
+        Zapamiętuje odpowiedź wysłaną na ramkę - wywoływane po zapisaniu jej danych
+        """
+        key = self._key(frame)
+        if key is None:
+            return
+        device_id, fingerprint = key
+        with self._lock:
+            window = self._windows.get(device_id)
+            if window is None:
+                window = self._windows[device_id] = _DeviceWindow(self.window_size)
+            window.add(fingerprint, reply)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._windows.clear()
+            self.duplicates_total = 0
+            self.duplicates_by_device.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "window_size": self.window_size,
+                "devices": len(self._windows),
+                "duplicates_total": self.duplicates_total,
+                "duplicates_by_device": dict(self.duplicates_by_device),
+            }
+
+
+# Globalna instancja
+duplicate_frame_filter = DuplicateFrameFilter(window_size=int(os.getenv("DUPLICATE_WINDOW_SIZE", "16")))
@@ -0,0 +1,214 @@
+import struct
+import threading
+from typing import Dict, List, Optional, Tuple, Union
+
+from services.checksum import crc16_ccitt, byte_sum8
+from services.cipher import RC4KeyGenerator
+from services.key_ring import DEFAULT_KEY_ID, RC4_KEY_ID_OFFSET, resolve_key
+from services.frame_view import (
+    HEADER_SIZE, JAWNA_SIZE, SEGMENT_START, DATA_START, FIELDS_START, FOOTER_SIZE,
+    JAWNA_STRUCT, FOOTER_STRUCT, DEVICE_ID_OFFSET, COMMAND_ID_OFFSET
+)
+from services.protocol_schema import (
+    COMMAND_SCHEMAS, MAX_BATCH_RECORDS, MEASURE_RECORD, PROTOCOL_V1, get_schema,
+)
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+START_MARKER = b'\xAA\x55'
+END_MARKER = 0x55
+PROTOCOL_VERSION = PROTOCOL_V1
+FLAG_ENCRYPTED = 0x01
+REPLY_BIT = 0x8000
+
+KeyType = Union[str, bytes, list]
+
+
+class ReplyBuilder:
+    """
+    Buduje ramki odpowiedzi z gotowych szablonów przygotowanych per urządzenie.
+    Szablon zawiera HEADER, JAWNA, DATA_LEN i znacznik końca - przy każdej
+    odpowiedzi podmieniane są tylko STATUS, REQUEST, dane, CRC8 i CRC16.
+    """
+
+    # Maksymalna liczba przechowywanych szablonów
+    MAX_TEMPLATES = 4096
+
+    def __init__(self):
+        self._templates: Dict[Tuple[bytes, int, int, int, int], bytes] = {}
+        self._lock = threading.Lock()
+
+    def _template(self, device_id: bytes, command_id: int, payload_len: int, key_id: int = 0,
+                  version: int = PROTOCOL_VERSION) -> bytes:
+        """
+        Zwraca (tworząc przy pierwszym użyciu) szablon ramki odpowiedzi
+        """
+        template_key = (device_id, command_id, payload_len, key_id, version)
+        template = self._templates.get(template_key)
+        if template is not None:
+            return template
+
+        data_len = 2 + payload_len  # STATUS + REQUEST + dane
+        frame = bytearray(SEGMENT_START + 1 + data_len + 1 + FOOTER_SIZE)
+        # HEADER (4B)
+        frame[0:2] = START_MARKER
+        frame[2] = version
+        frame[3] = 0x00  # FLAGS (plain)
+        # JAWNA (17B): DEVICE_ID, COMMAND_ID | 0x8000, RC4_KEY_ID, TIMESTAMP, SEQ_NUM
+        JAWNA_STRUCT.pack_into(frame, HEADER_SIZE, device_id, (command_id | REPLY_BIT) & 0xFFFF,
+                               key_id, b'\x00\x00\x00', 0x00)
+        # SZYFROWANA - DATA_LEN
+        frame[SEGMENT_START] = data_len
+        # FOOTER - znacznik końca
+        frame[-1] = END_MARKER
+
+        template = bytes(frame)
+        with self._lock:
+            if len(self._templates) >= self.MAX_TEMPLATES:
+                self._templates.clear()
+            self._templates[template_key] = template
+        return template
+
+    def build(self, decoded_data: bytes, flag: int, status: int, request: int,
+              payload: bytes = b'', key1: Optional[KeyType] = None,
+              key2: Optional[KeyType] = None) -> bytes:
+        """
+        Buduje ramkę odpowiedzi na podstawie ramki żądania
+
+        Args:
+            decoded_data: Odszyfrowana ramka żądania (źródło VERSION, DEVICE_ID, COMMAND_ID i RC4_KEY_ID)
+            flag: Flaga szyfrowania z ramki żądania
+            status: Pole STATUS odpowiedzi
+            request: Pole REQUEST odpowiedzi
+            payload: Dodatkowe dane odpowiedzi (po STATUS i REQUEST)
+            key1: Pierwszy klucz RC4 dla DEFAULT_KEY_ID, gdy pierścień kluczy go nie zawiera
+            key2: Drugi klucz RC4
+
+        Returns:
+            bytes: Kompletna ramka odpowiedzi
+        """
+        device_id = bytes(decoded_data[DEVICE_ID_OFFSET:DEVICE_ID_OFFSET + 10])
+        command_id = int.from_bytes(decoded_data[COMMAND_ID_OFFSET:COMMAND_ID_OFFSET + 2], 'big')
+        # Odpowiedź szyfrowana jest tym samym kluczem co żądanie
+        key_id = decoded_data[RC4_KEY_ID_OFFSET] if len(decoded_data) > RC4_KEY_ID_OFFSET else DEFAULT_KEY_ID
+        # Odpowiedź w tej samej wersji protokołu co żądanie
+        version = decoded_data[2] if len(decoded_data) > 2 else PROTOCOL_VERSION
+
+        frame = bytearray(self._template(device_id, command_id, len(payload), key_id, version))
+        segment_end = len(frame) - FOOTER_SIZE
+
+        frame[DATA_START] = status
+        frame[DATA_START + 1] = request
+        frame[FIELDS_START:segment_end - 1] = payload
+        # CRC8 dla DATA_LEN + DATA
+        frame[segment_end - 1] = byte_sum8(frame[SEGMENT_START:segment_end - 1])
+
+        # Jeśli flaga encode = true koduje dane
+        if flag & FLAG_ENCRYPTED:
+            frame[3] = FLAG_ENCRYPTED
+            cipher = RC4KeyGenerator.create_cipher(*resolve_key(key_id, key1, key2))
+            frame[SEGMENT_START:segment_end] = cipher.encrypt(bytes(frame[SEGMENT_START:segment_end]))
+
+        # CRC16 dla całości bez FOOTER
+        FOOTER_STRUCT.pack_into(frame, segment_end, crc16_ccitt(frame[:segment_end]), END_MARKER)
+        return bytes(frame)
+
+    def build_reply(self, decoded_data: bytes, flag: int, status: int, request: int,
+                    key1: Optional[KeyType] = None, key2: Optional[KeyType] = None,
+                    **fields: Union[str, bytes, int]) -> bytes:
+        """
+        Buduje ramkę odpowiedzi, pakując pola według schematu odpowiedzi komendy
+        """
+        command_id = int.from_bytes(decoded_data[COMMAND_ID_OFFSET:COMMAND_ID_OFFSET + 2], 'big')
+        schema = get_schema(command_id, decoded_data[2])
+        payload = schema.reply.pack(**fields) if schema is not None and schema.reply.fields else b''
+        return self.build(decoded_data, flag, status, request, payload, key1, key2)
+
+    def clear(self) -> None:
+        """Usuwa wszystkie szablony"""
+        with self._lock:
+            self._templates.clear()
+
+
+def build_request_frame(device_id: Union[str, bytes], command_id: int, status: int = 0x00,
+                        request: int = 0x00, encrypt: bool = False,
+                        key1: Optional[KeyType] = None, key2: Optional[KeyType] = None,
+                        rc4_key_id: int = 0x00, timestamp: int = 0, seq_num: int = 0,
+                        version: int = PROTOCOL_VERSION, payload: Optional[bytes] = None,
+                        **fields: Union[str, bytes, int]) -> bytes:
+    """
+    Buduje ramkę żądania (tak jak wysyła ją integrator) według schematu komendy.
+    Używane przez narzędzia testowe i symulatory.
+
+    Args:
+        device_id: DEVICE_ID (dopełniany bajtami 0x00 do 10B)
+        command_id: COMMAND_ID
+        status: Pole STATUS
+        request: Pole REQUEST
+        encrypt: Czy szyfrować segment SZYFROWANA
+        key1: Pierwszy klucz RC4
+        key2: Drugi klucz RC4
+        rc4_key_id: Pole RC4_KEY_ID
+        timestamp: Pole TIMESTAMP (3B)
+        seq_num: Pole SEQ_NUM
+        version: Pole VERSION z HEADER
+        payload: Gotowe dane komendy (zamiast pakowania pól wg schematu)
+        **fields: Wartości pól komendy
+
+    Returns:
+        bytes: Kompletna ramka
+    """
+    if isinstance(device_id, str):
+        device_id = device_id.encode('ascii')
+    device_id = device_id[:10].ljust(10, b'\x00')
+
+    if payload is None:
+        schema = get_schema(command_id, version)
+        payload = schema.request.pack(**fields) if schema is not None else b''
+
+    data = bytes([status & 0xFF, request & 0xFF]) + payload
+    segment = bytearray([len(data)]) + data
+    segment.append(byte_sum8(segment))
+
+    if encrypt:
+        segment = bytearray(RC4KeyGenerator.create_cipher(key1, key2).encrypt(bytes(segment)))
+
+    frame = bytearray(START_MARKER)
+    frame.append(version)
+    frame.append(FLAG_ENCRYPTED if encrypt else 0x00)
+    frame += JAWNA_STRUCT.pack(device_id, command_id, rc4_key_id,
+                               (timestamp & 0xFFFFFF).to_bytes(3, 'big'), seq_num & 0xFF)
+    frame += segment
+    frame += FOOTER_STRUCT.pack(crc16_ccitt(frame), END_MARKER)
+    return bytes(frame)
+
+
+def pack_measure_batch(first_record: int, records: List[Dict[str, Union[str, int, float]]]) -> bytes:
+    """
+    Pakuje dane komendy MEASURE_BATCH: nagłówek paczki i rekordy w układzie MEASURE_RECORD.
+    Wynik przekazuje się jako payload do build_request_frame.
+
+    Raises:
+        ValueError: gdy rekordów jest więcej niż mieści pole DATA_LEN
+    """
+    if len(records) > MAX_BATCH_RECORDS:
+        raise ValueError(f"Paczka MEASURE_BATCH mieści najwyżej {MAX_BATCH_RECORDS} rekordów")
+    header = COMMAND_SCHEMAS[0x0007].request.pack(firstRecord=first_record, recordCount=len(records))
+    return header + b''.join(MEASURE_RECORD.pack(**record) for record in records)
+
+
+def decrypt_frame(data: bytes, key1: KeyType, key2: Optional[KeyType] = None) -> bytes:
+    """
+    Zwraca ramkę z odszyfrowanym segmentem SZYFROWANA (FOOTER bez zmian).
+    Ramki nieszyfrowane zwracane są bez zmian.
+    """
+    if not data[3] & FLAG_ENCRYPTED:
+        return bytes(data)
+    segment = RC4KeyGenerator.create_cipher(key1, key2).decrypt(bytes(data[SEGMENT_START:-FOOTER_SIZE]))
+    return bytes(data[:SEGMENT_START]) + segment + bytes(data[-FOOTER_SIZE:])
+
+
+# Globalna instancja
+reply_builder = ReplyBuilder()
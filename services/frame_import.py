@@ -0,0 +1,313 @@
+# Uruchomienie: python -m services.frame_import zapis.bin [--database archiwum.db] [--workers 4]
+"""
+Import archiwum ramek integratora (karta SD, zrzut ruchu) bezpośrednio do bazy.
+
+Plik sklejonych ramek jest mapowany do pamięci (mmap) i skanowany w poszukiwaniu
+granic ramek. Paczki ramek są odszyfrowywane i parsowane w puli procesów - każdy
+proces mapuje plik samodzielnie, więc do procesów trafiają tylko położenia ramek.
+Wyniki zapisywane są w kolejności z pliku dużymi paczkami:
+    MeasureData   - bulk insert, ta sama reguła zapisu co w obsłudze MEASURE_DATA
+                    (również rekordy z paczek MEASURE_BATCH)
+    Aliases       - ostatnie wartości dla urządzenia (aktualizacja lub nowy rekord)
+    StaticParams  - ostatnie wartości dla urządzenia (aktualizacja lub nowy rekord)
+"""
+import argparse
+import mmap
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from models.models import Aliases, MeasureData, StaticParams
+from repositories.database import Base, SessionLocal, engine
+from services.cipher import RC4KeyGenerator
+from services.command_handler import parse_speed, should_store_measure
+from services.frame_splitter import FrameScanner
+from services.frame_view import with_text_fields
+from services.key_ring import RC4_KEY_ID_OFFSET, UnknownKeyError, rc4_key_ring, resolve_key
+from services.measure_values import with_typed_values
+from services.support import CommandID, ProtocolAnalyzer
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+ALIAS_FIELDS = ('company', 'location', 'productName', 'scaleId')
+STATIC_FIELDS = ('filterRate', 'scaleCapacity', 'autoZero', 'deadBand', 'scaleType', 'loadcellSet',
+                 'loadcellCapacity', 'trimm', 'idlerSpacing', 'speedSource', 'wheelDiameter',
+                 'pulsesPerRev', 'beltLength', 'beltLengthPulses', 'currentTime')
+MEASURE_FIELDS = ('speed', 'rate', 'total', 'currentTime')
+# Maksymalna liczba paczek w toku na proces roboczy (ogranicza zużycie pamięci)
+MAX_PENDING_PER_WORKER = 4
+
+# Rekord wyniku parsowania: (COMMAND_ID, DEVICE_ID, pola) lub (None, None, None) dla błędnego CRC8.
+# Dla MEASURE_BATCH zamiast pól - lista rekordów pomiarów.
+ParsedFrame = Tuple[Optional[int], Optional[str], Union[Dict[str, str], List[Dict[str, str]], None]]
+
+# Stan procesu roboczego - ustawiany przez _init_worker
+_worker_map: Optional[mmap.mmap] = None
+_worker_keys: Tuple = ()
+
+
+def _init_worker(path: str, key1: str, key2: str, iterations: int) -> None:
+    """Inicjalizacja procesu roboczego: mapowanie pliku i wyliczenie kluczy RC4"""
+    global _worker_map, _worker_keys
+    logging.disable(logging.INFO)
+    with open(path, 'rb') as file:
+        _worker_map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    rc4_key_ring.load_env(key1, key2, iterations)
+    _worker_keys = (key1, key2, iterations)
+
+
+def parse_frame(frame: bytes, key1: str, key2: str, iterations: int) -> ParsedFrame:
+    """
+    Odszyfrowuje ramkę, weryfikuje CRC8 i wyciąga pola komend zapisywanych do bazy.
+    Ramki z nieznanym RC4_KEY_ID traktowane są jak ramki z błędną sumą CRC8.
+    """
+    if frame[3] & 0x01:
+        try:
+            key1, key2 = resolve_key(frame[RC4_KEY_ID_OFFSET], key1, key2)
+        except UnknownKeyError:
+            return None, None, None
+    decoded, crc_valid = ProtocolAnalyzer.encode_data(frame, iterations, key1, key2)
+    if not crc_valid:
+        return None, None, None
+    command_id = ProtocolAnalyzer.extract_command_id(decoded)
+    if command_id == CommandID.MEASURE_DATA:
+        view, fields = ProtocolAnalyzer.parse_measure_data(decoded), MEASURE_FIELDS
+    elif command_id == CommandID.MEASURE_BATCH:
+        device_id, _, records = ProtocolAnalyzer.parse_measure_batch(decoded)
+        return command_id, device_id, records
+    elif command_id == CommandID.CAPTURE_ALIASES:
+        view, fields = ProtocolAnalyzer.parse_alias_data(decoded), ALIAS_FIELDS
+    elif command_id == CommandID.CAPTURE_STATIC:
+        view, fields = ProtocolAnalyzer.parse_static_data(decoded), STATIC_FIELDS
+    else:
+        return command_id, None, None
+    return command_id, view.deviceId, {name: getattr(view, name) for name in fields}
+
+
+def _parse_chunk(spans: List[Tuple[int, int]]) -> List[ParsedFrame]:
+    """Parsuje paczkę ramek z pliku zmapowanego w procesie roboczym"""
+    key1, key2, iterations = _worker_keys
+    return [parse_frame(_worker_map[offset:offset + length], key1, key2, iterations)
+            for offset, length in spans]
+
+
+def _chunks(spans: Iterator[Tuple[int, int]], size: int) -> Iterator[List[Tuple[int, int]]]:
+    chunk = []
+    for span in spans:
+        chunk.append(span)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class FrameImporter:
+    """
+    Zapis sparsowanych ramek do bazy w kolejności z pliku
+    """
+
+    def __init__(self, db: Session, batch_size: int = 20000, dry_run: bool = False):
+        """
+        Args:
+            db: Sesja bazy danych
+            batch_size: Liczba rekordów MeasureData w jednym commicie
+            dry_run: Tylko parsowanie i statystyki - bez zapisu
+        """
+        self.db = db
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self._measures: List[Dict[str, str]] = []
+        # Czas odebrania dla rekordów z archiwum - chwila importu
+        self._received_at = time.time()
+        self._last_speed_by_device: Dict[str, float] = {}
+        self._aliases: Dict[str, Dict[str, str]] = {}
+        self._static: Dict[str, Dict[str, str]] = {}
+        # Statystyki
+        self.frames_total = 0
+        self.crc8_errors = 0
+        self.measures_written = 0
+        self.measures_skipped = 0
+        self.other_commands = 0
+
+    def add(self, command_id: Optional[int], device_id: Optional[str],
+            fields: Union[Dict[str, str], List[Dict[str, str]], None]) -> None:
+        self.frames_total += 1
+        if command_id is None:
+            self.crc8_errors += 1
+        elif command_id == CommandID.MEASURE_DATA:
+            self._add_measure(device_id, fields)
+        elif command_id == CommandID.MEASURE_BATCH:
+            for record in fields:
+                self._add_measure(device_id, record)
+        elif command_id == CommandID.CAPTURE_ALIASES:
+            self._aliases[device_id] = fields
+        elif command_id == CommandID.CAPTURE_STATIC:
+            self._static[device_id] = fields
+        else:
+            self.other_commands += 1
+
+    def _add_measure(self, device_id: str, fields: Dict[str, str]) -> None:
+        # Rekordy MEASURE_BATCH mają kolumny liczbowe, pola tekstowe dopiero przy zapisie
+        current_speed = fields['speedValue'] if 'speedValue' in fields else parse_speed(fields['speed'])
+        if current_speed is None:
+            current_speed = 0.0
+        if should_store_measure(current_speed, self._last_speed_by_device.get(device_id)):
+            self._measures.append(with_typed_values(with_text_fields(dict(fields, deviceId=device_id)),
+                                                    self._received_at))
+            if len(self._measures) >= self.batch_size:
+                self.flush_measures()
+        else:
+            self.measures_skipped += 1
+        self._last_speed_by_device[device_id] = current_speed
+
+    def flush_measures(self) -> None:
+        """Zapisuje zebrane rekordy MeasureData jednym commitem"""
+        if self._measures and not self.dry_run:
+            self.db.bulk_insert_mappings(MeasureData, self._measures)
+            self.db.commit()
+        self.measures_written += len(self._measures)
+        self._measures = []
+
+    def _upsert(self, model, latest: Dict[str, Dict[str, str]]) -> None:
+        """Aktualizuje rekordy urządzeń lub tworzy nowe - jak obsługa CAPTURE_ALIASES/CAPTURE_STATIC"""
+        if not latest or self.dry_run:
+            return
+        existing = {row.deviceId: row for row in
+                    self.db.query(model).filter(model.deviceId.in_(list(latest))).all()}
+        for device_id, fields in latest.items():
+            row = existing.get(device_id)
+            if row is None:
+                self.db.add(model(deviceId=device_id, **fields))
+            else:
+                for name, value in fields.items():
+                    setattr(row, name, value)
+        self.db.commit()
+
+    def finish(self) -> None:
+        """Zapisuje pozostałe pomiary oraz ostatnie aliasy i parametry statyczne"""
+        self.flush_measures()
+        self._upsert(Aliases, self._aliases)
+        self._upsert(StaticParams, self._static)
+
+    def get_stats(self) -> dict:
+        return {
+            "frames": self.frames_total,
+            "crc8_errors": self.crc8_errors,
+            "measures_written": self.measures_written,
+            "measures_skipped": self.measures_skipped,
+            "aliases": len(self._aliases),
+            "static_params": len(self._static),
+            "other_commands": self.other_commands,
+        }
+
+
+def import_file(path: str, db: Session, key1: str, key2: str,
+                iterations: int = RC4KeyGenerator.DEFAULT_ITERATIONS, workers: Optional[int] = None,
+                chunk_frames: int = 2000, batch_size: int = 20000, dry_run: bool = False) -> dict:
+    """
+    Importuje plik sklejonych ramek do bazy
+
+    Args:
+        path: Plik z ramkami
+        db: Sesja bazy danych
+        key1, key2, iterations: Parametry klucza RC4
+        workers: Liczba procesów (0 - parsowanie w bieżącym procesie)
+        chunk_frames: Liczba ramek w paczce przekazywanej do procesu
+        batch_size: Liczba rekordów MeasureData w jednym commicie
+        dry_run: Tylko parsowanie i statystyki - bez zapisu
+
+    Returns:
+        dict: Statystyki importu
+    """
+    start = time.perf_counter()
+    importer = FrameImporter(db, batch_size=batch_size, dry_run=dry_run)
+    scanner = FrameScanner(key1, key2, iterations)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return dict(importer.get_stats(), frames_rejected=0, bytes_discarded=0, seconds=0.0)
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            chunks = _chunks(scanner.spans(data), chunk_frames)
+            if workers > 0:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                         initargs=(path, key1, key2, iterations)) as pool:
+                    # Wyniki odbierane w kolejności paczek - reguła zapisu zależy od kolejności ramek.
+                    # W toku jest najwyżej MAX_PENDING_PER_WORKER paczek na proces.
+                    pending = deque()
+                    for chunk in chunks:
+                        pending.append(pool.submit(_parse_chunk, chunk))
+                        if len(pending) >= workers * MAX_PENDING_PER_WORKER:
+                            for item in pending.popleft().result():
+                                importer.add(*item)
+                    while pending:
+                        for item in pending.popleft().result():
+                            importer.add(*item)
+            else:
+                for chunk in chunks:
+                    for offset, length in chunk:
+                        importer.add(*parse_frame(data[offset:offset + length], key1, key2, iterations))
+
+    importer.finish()
+    return dict(importer.get_stats(),
+                frames_rejected=scanner.frames_rejected,
+                bytes_discarded=scanner.bytes_discarded,
+                seconds=round(time.perf_counter() - start, 3))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from routers.commands import RC4_ITERATIONS, RC4_KEY1, RC4_KEY2
+
+    parser = argparse.ArgumentParser(description="Import archiwum ramek integratora do bazy danych")
+    parser.add_argument('path', help="plik sklejonych ramek")
+    parser.add_argument('--database', help="plik bazy SQLite (domyślnie baza aplikacji)")
+    parser.add_argument('--workers', type=int, default=None, help="liczba procesów (0 - bez puli)")
+    parser.add_argument('--chunk-frames', dest='chunk_frames', type=int, default=2000,
+                        help="liczba ramek w paczce dla procesu")
+    parser.add_argument('--batch-size', dest='batch_size', type=int, default=20000,
+                        help="liczba rekordów MeasureData w jednym commicie")
+    parser.add_argument('--key1', default=RC4_KEY1)
+    parser.add_argument('--key2', default=RC4_KEY2)
+    parser.add_argument('--iterations', type=int, default=RC4_ITERATIONS)
+    parser.add_argument('--dry-run', dest='dry_run', action='store_true', help="bez zapisu do bazy")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    # Obsługa komend loguje każdy pomiar - przy imporcie wystarczy podsumowanie
+    logging.getLogger('services').setLevel(logging.WARNING)
+
+    rc4_key_ring.load_env(args.key1, args.key2, args.iterations)
+    if args.database:
+        archive_engine = create_engine(f"sqlite:///{args.database}", connect_args={"timeout": 30})
+        Base.metadata.create_all(bind=archive_engine)
+        db = sessionmaker(bind=archive_engine, autoflush=False)()
+    else:
+        Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+
+    try:
+        stats = import_file(args.path, db, args.key1, args.key2, args.iterations, args.workers,
+                            args.chunk_frames, args.batch_size, args.dry_run)
+    finally:
+        db.close()
+
+    for name, value in stats.items():
+        print(f"{name:20s} {value}")
+    frames = stats['frames']
+    if stats['seconds']:
+        print(f"{'frames_per_second':20s} {frames / stats['seconds']:.0f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,315 @@
+# Uruchomienie: python -m services.frame_recorder dump ramki.rec [--device ID] [--limit N]
+#               python -m services.frame_recorder replay ramki.rec [--database kopia.db] [--repeat N]
+"""
+Rejestrator surowych ramek (przychodzących i wysyłanych) do pliku pierścieniowego.
+
+Plik jest alokowany z góry i mapowany do pamięci (mmap). Każda ramka zajmuje
+jeden slot o stałym rozmiarze: nagłówek rekordu (numer, czas odbioru, kierunek,
+DEVICE_ID, długość) i bajty ramki. Po zapełnieniu pliku najstarsze rekordy są
+nadpisywane. Zapis to jedno pack_into i jedno kopiowanie bajtów - bez alokacji
+i bez formatowania tekstu, więc rejestrator może działać stale na produkcji.
+
+Układ pliku:
+    nagłówek pliku (64B): MAGIC, rozmiar slotu, liczba slotów, numer następnego rekordu
+    sloty: [numer(8B) | czas_ns(8B) | kierunek(1B) | DEVICE_ID(10B) | długość(2B) | pad(3B) | ramka]
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Iterator, List, NamedTuple, Optional, Union
+
+from services.frame_splitter import MAX_FRAME_SIZE
+from services.frame_view import DEVICE_ID_OFFSET
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'MSFRREC1'
+# MAGIC, rozmiar slotu, liczba slotów, numer następnego rekordu
+FILE_HEADER_STRUCT = struct.Struct('<8sIIQ')
+FILE_HEADER_SIZE = 64
+NEXT_SEQ_OFFSET = 16
+NEXT_SEQ_STRUCT = struct.Struct('<Q')
+# Numer rekordu (od 1), czas odbioru [ns], kierunek, DEVICE_ID, długość ramki
+RECORD_HEADER_STRUCT = struct.Struct('<QqB10sH3x')
+RECORD_HEADER_SIZE = RECORD_HEADER_STRUCT.size      # 32
+SLOT_SIZE = RECORD_HEADER_SIZE + ((MAX_FRAME_SIZE + 7) // 8) * 8
+
+DIRECTION_IN = 0
+DIRECTION_OUT = 1
+DIRECTION_NAMES = {DIRECTION_IN: "IN", DIRECTION_OUT: "OUT"}
+
+
+class FrameRecord(NamedTuple):
+    seq: int
+    timestamp_ns: int
+    direction: int
+    device_id: str
+    frame: bytes
+
+    @property
+    def received_at(self) -> datetime:
+        return datetime.fromtimestamp(self.timestamp_ns / 1e9)
+
+
+class FrameRecorder:
+    """
+    Zapis ramek do pierścieniowego pliku mmap.
+    Dopóki open() nie zostanie wywołane, record() nic nie robi.
+    """
+
+    def __init__(self):
+        self.path: Optional[str] = None
+        self.slot_count = 0
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._next_seq = 1
+        self._lock = threading.Lock()
+        # Statystyki
+        self.records_total = 0
+        self.truncated_total = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._map is not None
+
+    def open(self, path: str, slot_count: int = 100000) -> None:
+        """
+        Otwiera plik rejestratora - istniejący plik o zgodnym układzie jest kontynuowany
+
+        Args:
+            path: Ścieżka pliku
+            slot_count: Liczba slotów (rozmiar pliku = 64B + slot_count * SLOT_SIZE)
+        """
+        self.close()
+        size = FILE_HEADER_SIZE + slot_count * SLOT_SIZE
+        next_seq = 1
+        file = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+        try:
+            header = file.read(FILE_HEADER_STRUCT.size)
+            if len(header) == FILE_HEADER_STRUCT.size:
+                magic, slot_size, count, stored_next = FILE_HEADER_STRUCT.unpack(header)
+                if magic == MAGIC and slot_size == SLOT_SIZE and count == slot_count:
+                    next_seq = stored_next
+                else:
+                    logger.warning(f"Rejestrator ramek: niezgodny układ pliku {path} - plik zostanie wyczyszczony")
+            if next_seq == 1:
+                # Nowy plik lub niezgodny układ - wszystkie sloty wyzerowane
+                file.truncate(0)
+            file.truncate(size)
+            self._map = mmap.mmap(file.fileno(), size)
+        except Exception:
+            file.close()
+            raise
+        self._file = file
+        self.path = path
+        self.slot_count = slot_count
+        self._next_seq = next_seq
+        FILE_HEADER_STRUCT.pack_into(self._map, 0, MAGIC, SLOT_SIZE, slot_count, next_seq)
+        logger.info(f"Rejestrator ramek: {path} ({slot_count} slotów, {size / 1e6:.1f} MB, "
+                    f"następny rekord {next_seq})")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._map is not None:
+                self._map.flush()
+                self._map.close()
+                self._map = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def record(self, direction: int, frame: Union[bytes, bytearray, memoryview],
+               timestamp_ns: Optional[int] = None) -> None:
+        """
+        Dopisuje ramkę do pliku (DEVICE_ID odczytywany z jawnej sekcji JAWNA)
+
+        Args:
+            direction: DIRECTION_IN lub DIRECTION_OUT
+            frame: Bajty ramki
+            timestamp_ns: Czas odbioru (domyślnie bieżący)
+        """
+        if self._map is None:
+            return
+        if timestamp_ns is None:
+            timestamp_ns = time.time_ns()
+        device_id = bytes(frame[DEVICE_ID_OFFSET:DEVICE_ID_OFFSET + 10])
+        length = min(len(frame), SLOT_SIZE - RECORD_HEADER_SIZE)
+        with self._lock:
+            data = self._map
+            if data is None:
+                return
+            seq = self._next_seq
+            offset = FILE_HEADER_SIZE + (seq % self.slot_count) * SLOT_SIZE
+            data[offset + RECORD_HEADER_SIZE:offset + RECORD_HEADER_SIZE + length] = frame[:length]
+            RECORD_HEADER_STRUCT.pack_into(data, offset, seq, timestamp_ns, direction, device_id, length)
+            self._next_seq = seq + 1
+            NEXT_SEQ_STRUCT.pack_into(data, NEXT_SEQ_OFFSET, seq + 1)
+            self.records_total += 1
+            if length < len(frame):
+                self.truncated_total += 1
+
+    def get_stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "slots": self.slot_count,
+            "records_total": self.records_total,
+            "truncated_total": self.truncated_total,
+        }
+
+
+def read_records(path: str, device_id: Optional[str] = None,
+                 direction: Optional[int] = None) -> Iterator[FrameRecord]:
+    """
+    Odczytuje rekordy z pliku rejestratora od najstarszego do najnowszego
+
+    Args:
+        path: Ścieżka pliku
+        device_id: Tylko ramki urządzenia
+        direction: Tylko ramki w kierunku DIRECTION_IN / DIRECTION_OUT
+    """
+    with open(path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic, slot_size, slot_count, next_seq = FILE_HEADER_STRUCT.unpack_from(data, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{path} nie jest plikiem rejestratora ramek")
+            for seq in range(max(1, next_seq - slot_count), next_seq):
+                offset = FILE_HEADER_SIZE + (seq % slot_count) * slot_size
+                stored_seq, timestamp_ns, record_direction, raw_id, length = \
+                    RECORD_HEADER_STRUCT.unpack_from(data, offset)
+                if stored_seq != seq:
+                    continue  # slot nadpisany w trakcie odczytu
+                if direction is not None and record_direction != direction:
+                    continue
+                record_id = raw_id.decode('ascii', errors='replace').strip('\x00 ')
+                if device_id is not None and record_id != device_id:
+                    continue
+                frame = data[offset + RECORD_HEADER_SIZE:offset + RECORD_HEADER_SIZE + length]
+                yield FrameRecord(seq, timestamp_ns, record_direction, record_id, frame)
+
+
+def replay(path: str, db, key1: str, key2: str, iterations: int, device_id: Optional[str] = None,
+           repeat: int = 1) -> dict:
+    """
+    Przepuszcza zarejestrowane ramki przychodzące przez CommandHandler i porównuje
+    odpowiedzi z zarejestrowanymi ramkami wysłanymi
+
+    Returns:
+        dict: Liczba ramek, odrzuconych, zgodnych i różnych odpowiedzi oraz czas obsługi
+    """
+    from fastapi.responses import Response
+    from services.command_handler import CommandHandler, FrameError
+    from services.duplicate_filter import duplicate_frame_filter
+
+    handler = CommandHandler(key1, key2)
+    records = list(read_records(path, device_id))
+    # Odpowiedź przypisywana jest ostatniej ramce przychodzącej od tego samego urządzenia
+    # (odpowiedź nie powtarza SEQ_NUM, a ramki innych urządzeń mogą się przeplatać)
+    replies = {}
+    last_inbound = {}
+    for record in records:
+        if record.direction == DIRECTION_IN:
+            last_inbound[record.device_id] = record.seq
+        elif record.device_id in last_inbound:
+            replies[last_inbound.pop(record.device_id)] = record.frame
+    inbound = [record for record in records if record.direction == DIRECTION_IN]
+
+    stats = {"frames": 0, "rejected": 0, "errors": 0, "replies_equal": 0, "replies_different": 0}
+    elapsed_ns = 0
+    for _ in range(repeat):
+        # Odtwarzane ramki nie mogą być traktowane jako retransmisje
+        duplicate_frame_filter.clear()
+        for record in inbound:
+            start = time.perf_counter_ns()
+            try:
+                response = handler.process_frame(record.frame, db, iterations)
+            except FrameError:
+                stats["rejected"] += 1
+                continue
+            except Exception as e:
+                stats["errors"] += 1
+                logger.error(f"Odtworzenie rekordu {record.seq}: {e}")
+                db.rollback()
+                continue
+            finally:
+                elapsed_ns += time.perf_counter_ns() - start
+                stats["frames"] += 1
+            expected = replies.get(record.seq)
+            if expected is not None and isinstance(response, Response):
+                if response.body == expected:
+                    stats["replies_equal"] += 1
+                else:
+                    stats["replies_different"] += 1
+    stats["avg_us"] = round(elapsed_ns / stats["frames"] / 1000, 1) if stats["frames"] else 0.0
+    return stats
+
+
+def _dump(args) -> int:
+    direction = {"in": DIRECTION_IN, "out": DIRECTION_OUT}.get(args.direction)
+    count = 0
+    for record in read_records(args.path, args.device, direction):
+        print(f"{record.seq:10d} {record.received_at.isoformat(timespec='milliseconds')} "
+              f"{DIRECTION_NAMES.get(record.direction, '?'):3s} {record.device_id:10s} {record.frame.hex(' ')}")
+        count += 1
+        if args.limit and count >= args.limit:
+            break
+    return 0
+
+
+def _replay(args) -> int:
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from repositories.database import Base
+    from routers.commands import RC4_ITERATIONS, RC4_KEY1, RC4_KEY2
+
+    logging.getLogger('services').setLevel(logging.WARNING)
+    if args.database:
+        engine = create_engine(f"sqlite:///{args.database}", connect_args={"timeout": 30})
+    else:
+        # Domyślnie baza w pamięci - odtworzenie nie zmienia danych produkcyjnych
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        stats = replay(args.path, db, RC4_KEY1, RC4_KEY2, RC4_ITERATIONS, args.device, args.repeat)
+    finally:
+        db.close()
+    for name, value in stats.items():
+        print(f"{name:18s} {value}")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Odczyt i odtwarzanie zarejestrowanych ramek")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    dump = commands.add_parser('dump', help="wypisanie rekordów")
+    dump.add_argument('path')
+    dump.add_argument('--device', help="tylko ramki urządzenia")
+    dump.add_argument('--direction', choices=('in', 'out'), help="tylko ramki w danym kierunku")
+    dump.add_argument('--limit', type=int, default=0, help="maksymalna liczba rekordów")
+
+    replay_parser = commands.add_parser('replay', help="odtworzenie ramek przez CommandHandler")
+    replay_parser.add_argument('path')
+    replay_parser.add_argument('--device', help="tylko ramki urządzenia")
+    replay_parser.add_argument('--database', help="plik bazy SQLite (domyślnie baza w pamięci)")
+    replay_parser.add_argument('--repeat', type=int, default=1, help="liczba powtórzeń (pomiar czasu)")
+
+    args = parser.parse_args(argv)
+    return _dump(args) if args.command == 'dump' else _replay(args)
+
+
+# Globalna instancja
+frame_recorder = FrameRecorder()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from services.checksum import crc16_ccitt
+from services.cipher import RC4KeyGenerator
+from services.frame_view import SEGMENT_START, FOOTER_SIZE
+from services.key_ring import RC4_KEY_ID_OFFSET, UnknownKeyError, resolve_key
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+START_MARKER = b'\xAA\x55'
+END_MARKER = 0x55
+# HEADER(4B) + JAWNA(17B) + DATA_LEN(1B) + CRC8(1B) + FOOTER(3B)
+FRAME_OVERHEAD = SEGMENT_START + 1 + 1 + FOOTER_SIZE  # 26
+MIN_FRAME_SIZE = FRAME_OVERHEAD
+MAX_FRAME_SIZE = FRAME_OVERHEAD + 0xFF
+
+KeyType = Union[str, bytes, list]
+
+
+class FrameAssembler:
+    """
+    Wydziela kompletne ramki ze strumienia bajtów.
+
+    Ramka zaczyna się znacznikiem 0xAA 0x55, jej długość wynika z pola DATA_LEN
+    (dla ramek szyfrowanych odszyfrowywany jest tylko pierwszy bajt segmentu),
+    a koniec weryfikowany jest znacznikiem 0x55 i sumą CRC16. Po błędzie
+    assembler synchronizuje się na kolejnym znaczniku początku ramki.
+    """
+
+    def __init__(self, key1: Optional[KeyType] = None, key2: Optional[KeyType] = None):
+        self.key1 = key1
+        self.key2 = key2
+        self._buffer = bytearray()
+        # Statystyki
+        self.frames_total = 0
+        self.frames_rejected = 0
+        self.bytes_discarded = 0
+
+    def _data_len(self, buffer: bytearray) -> Optional[int]:
+        """Zwraca DATA_LEN ramki na początku bufora (odszyfrowane, jeśli trzeba)"""
+        data_len = buffer[SEGMENT_START]
+        if buffer[3] & 0x01:
+            try:
+                cipher = RC4KeyGenerator.create_cipher(*resolve_key(buffer[RC4_KEY_ID_OFFSET], self.key1, self.key2))
+            except UnknownKeyError:
+                return None
+            data_len = cipher.decrypt(bytes([data_len]))[0]
+        return data_len
+
+    def _discard(self, count: int) -> None:
+        del self._buffer[:count]
+        self.bytes_discarded += count
+
+    def feed(self, data: Union[bytes, bytearray, memoryview]) -> List[bytes]:
+        """
+        Dodaje bajty do bufora i zwraca wszystkie kompletne, poprawne ramki
+        """
+        buffer = self._buffer
+        buffer += data
+        frames = []
+
+        while True:
+            start = buffer.find(START_MARKER)
+            if start < 0:
+                # Zachowaj ostatni bajt - może być początkiem znacznika
+                keep = 1 if buffer[-1:] == START_MARKER[:1] else 0
+                if len(buffer) > keep:
+                    self._discard(len(buffer) - keep)
+                break
+            if start > 0:
+                self._discard(start)
+
+            if len(buffer) <= SEGMENT_START:
+                break  # brak DATA_LEN - czekamy na więcej danych
+
+            data_len = self._data_len(buffer)
+            if data_len is None:
+                self.frames_rejected += 1
+                self._discard(1)
+                continue
+
+            length = FRAME_OVERHEAD + data_len
+            if len(buffer) < length:
+                break  # ramka niekompletna - czekamy na więcej danych
+
+            end = length - FOOTER_SIZE
+            received_crc = int.from_bytes(buffer[end:end + 2], 'big')
+            if buffer[length - 1] == END_MARKER and received_crc == crc16_ccitt(buffer[:end]):
+                frames.append(bytes(buffer[:length]))
+                del buffer[:length]
+                self.frames_total += 1
+            else:
+                # Uszkodzona ramka - szukamy następnego znacznika początku
+                self.frames_rejected += 1
+                logger.debug(f"Odrzucono uszkodzoną ramkę (długość {length}), resynchronizacja")
+                self._discard(1)
+
+        return frames
+
+    @property
+    def pending(self) -> int:
+        """Liczba bajtów oczekujących w buforze"""
+        return len(self._buffer)
+
+    def reset(self) -> int:
+        """Czyści bufor, zwraca liczbę porzuconych bajtów"""
+        pending = len(self._buffer)
+        self._discard(pending)
+        return pending
+
+
+class FrameScanner:
+    """
+    Wyszukuje granice ramek w dużym buforze (bytes lub mmap) bez kopiowania danych.
+
+    Zwraca tylko położenie ramek (offset, długość) - odszyfrowanie i obsługa
+    ramek należy do wywołującego. DATA_LEN ramek szyfrowanych odczytywany jest
+    przez XOR z pierwszym bajtem strumienia klucza RC4, który dla danego klucza
+    jest stały (wyliczany raz dla każdego RC4_KEY_ID), więc skanowanie nie tworzy
+    szyfratora dla każdej ramki.
+    """
+
+    def __init__(self, key1: Optional[KeyType] = None, key2: Optional[KeyType] = None,
+                 iterations: int = RC4KeyGenerator.DEFAULT_ITERATIONS):
+        self.key1 = key1
+        self.key2 = key2
+        self.iterations = iterations
+        # RC4_KEY_ID -> pierwszy bajt strumienia klucza (None - klucz nieznany)
+        self._keystream0: Dict[int, Optional[int]] = {}
+        # Statystyki
+        self.frames_total = 0
+        self.frames_rejected = 0
+        self.bytes_discarded = 0
+
+    def _get_keystream0(self, key_id: int) -> Optional[int]:
+        try:
+            return self._keystream0[key_id]
+        except KeyError:
+            pass
+        try:
+            key1, key2 = resolve_key(key_id, self.key1, self.key2)
+            keystream0 = RC4KeyGenerator.create_cipher(key1, key2, self.iterations).encrypt(b'\x00')[0]
+        except UnknownKeyError:
+            keystream0 = None
+        self._keystream0[key_id] = keystream0
+        return keystream0
+
+    def spans(self, buffer, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        """
+        Generator (offset, długość) kolejnych poprawnych ramek (znaczniki i CRC16)
+
+        Args:
+            buffer: Bufor z metodą find() - bytes, bytearray lub mmap
+            start: Początek przeszukiwanego obszaru
+            end: Koniec przeszukiwanego obszaru (domyślnie koniec bufora)
+        """
+        end = len(buffer) if end is None else end
+        position = start
+        while True:
+            offset = buffer.find(START_MARKER, position, end)
+            if offset < 0:
+                self.bytes_discarded += end - position
+                return
+            self.bytes_discarded += offset - position
+            if offset + SEGMENT_START >= end:
+                self.bytes_discarded += end - offset
+                return
+
+            data_len = buffer[offset + SEGMENT_START]
+            if buffer[offset + 3] & 0x01:
+                keystream0 = self._get_keystream0(buffer[offset + RC4_KEY_ID_OFFSET])
+                if keystream0 is None:
+                    self.frames_rejected += 1
+                    self.bytes_discarded += 1
+                    position = offset + 1
+                    continue
+                data_len ^= keystream0
+
+            length = FRAME_OVERHEAD + data_len
+            if offset + length > end:
+                # Niekompletna ramka na końcu obszaru - szukamy dalej od następnego bajtu
+                self.frames_rejected += 1
+                self.bytes_discarded += 1
+                position = offset + 1
+                continue
+
+            footer = offset + length - FOOTER_SIZE
+            received_crc = int.from_bytes(buffer[footer:footer + 2], 'big')
+            if buffer[offset + length - 1] == END_MARKER and received_crc == crc16_ccitt(buffer[offset:footer]):
+                self.frames_total += 1
+                yield offset, length
+                position = offset + length
+            else:
+                self.frames_rejected += 1
+                self.bytes_discarded += 1
+                position = offset + 1
+
+
+def split_frames(data: Union[bytes, bytearray, memoryview], key1: Optional[KeyType] = None,
+                 key2: Optional[KeyType] = None) -> Tuple[List[bytes], int]:
+    """
+    Dzieli bufor zawierający sklejone ramki na pojedyncze ramki
+
+    Returns:
+        Tuple[List[bytes], int]: (poprawne ramki w kolejności, liczba odrzuconych ramek)
+    """
+    assembler = FrameAssembler(key1, key2)
+    frames = assembler.feed(data)
+    rejected = assembler.frames_rejected
+    if assembler.pending >= len(START_MARKER):
+        # Niekompletna ramka na końcu danych
+        rejected += 1
+    assembler.reset()
+    return frames, rejected
@@ -0,0 +1,441 @@
+import struct
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Type, Union
+
+from services.measure_values import TYPED_FIELDS
+from services.protocol_schema import (
+    COMMAND_SCHEMAS, MEASURE_RECORD, PROTOCOL_V1, PROTOCOL_V2, TIME_FORMAT, VERSIONED_SCHEMAS,
+    FieldSpec, get_schema, layout_format,
+)
+
+# Struktura ramki:
+# +--------+---------+-------------+--------+
+# | HEADER | JAWNA   | SZYFROWANA  | FOOTER |
+# | (4B)   | (17B)   | (zmienna)   | (3B)   |
+# +--------+---------+-------------+--------+
+
+# HEADER: START_MARKER_1, START_MARKER_2, VERSION, FLAGS
+HEADER_STRUCT = struct.Struct('>BBBB')
+# JAWNA: DEVICE_ID(10B), COMMAND_ID(2B), RC4_KEY_ID(1B), TIMESTAMP(3B), SEQ_NUM(1B)
+JAWNA_STRUCT = struct.Struct('>10sHB3sB')
+# FOOTER: CRC16(2B), END_MARKER(1B)
+FOOTER_STRUCT = struct.Struct('>HB')
+# Początek sekcji DATA: STATUS(1B), REQUEST(1B)
+STATUS_REQUEST_STRUCT = struct.Struct('>BB')
+
+HEADER_SIZE = HEADER_STRUCT.size                    # 4
+JAWNA_SIZE = JAWNA_STRUCT.size                      # 17
+FOOTER_SIZE = FOOTER_STRUCT.size                    # 3
+SEGMENT_START = HEADER_SIZE + JAWNA_SIZE            # 21 - DATA_LEN
+DATA_START = SEGMENT_START + 1                      # 22 - STATUS
+FIELDS_START = DATA_START + STATUS_REQUEST_STRUCT.size  # 24 - pierwsze pole komendy
+DEVICE_ID_STRUCT = struct.Struct('>10s')
+DEVICE_ID_OFFSET = HEADER_SIZE
+COMMAND_ID_STRUCT = struct.Struct('>H')
+COMMAND_ID_OFFSET = HEADER_SIZE + 10
+
+
+def _ascii_property(name: str, offset: int, size: int) -> property:
+    """
+    Tworzy leniwe pole tekstowe - dekodowane dopiero przy pierwszym odczycie
+    i zapamiętywane w slocie instancji
+    """
+    unpack_from = struct.Struct(f'>{size}s').unpack_from
+    slot = '_v_' + name
+
+    def getter(self):
+        try:
+            return getattr(self, slot)
+        except AttributeError:
+            value = unpack_from(self._buf, offset)[0].decode('ascii').strip()
+            setattr(self, slot, value)
+            return value
+
+    return property(getter, doc=f"Pole {name} ({size}B ASCII)")
+
+
+class PayloadView:
+    """
+    Bazowy widok danych komendy nad buforem ramki (bez kopiowania).
+    Pola są dekodowane dopiero przy odczycie.
+    """
+    __slots__ = ('_buf', '_v_deviceId')
+
+    FIELDS: Tuple[str, ...] = ()
+    # Kolumny liczbowe MeasureData dostępne w widoku (speedValue, timeEpoch...)
+    TYPED: Tuple[str, ...] = ()
+    # Czy układ ma pola binarne (tekst pól wyliczany z wartości, VERSION 2)
+    BINARY: bool = False
+    LAYOUT: struct.Struct = struct.Struct('>')
+    MIN_FRAME_SIZE: int = FIELDS_START
+
+    def __init__(self, buf: Union[bytes, bytearray, memoryview]):
+        if len(buf) < self.MIN_FRAME_SIZE:
+            # Ramka krótsza niż układ pól - brakujące pola traktujemy jak puste
+            padded = bytearray(buf)
+            padded.extend(b' ' * (self.MIN_FRAME_SIZE - len(buf)))
+            buf = padded
+        self._buf = buf
+
+    @property
+    def deviceId(self) -> str:
+        """DEVICE_ID z sekcji JAWNA"""
+        try:
+            return self._v_deviceId
+        except AttributeError:
+            value = DEVICE_ID_STRUCT.unpack_from(self._buf, DEVICE_ID_OFFSET)[0].decode('ascii').strip()
+            self._v_deviceId = value
+            return value
+
+    @property
+    def status(self) -> int:
+        """Pole STATUS (1B)"""
+        return self._buf[DATA_START]
+
+    @property
+    def request(self) -> int:
+        """Pole REQUEST (1B)"""
+        return self._buf[DATA_START + 1]
+
+    def unpack(self) -> Tuple[bytes, ...]:
+        """Rozpakowuje wszystkie pola komendy naraz (surowe bajty)"""
+        return self.LAYOUT.unpack_from(self._buf, FIELDS_START)
+
+    def typed_values(self) -> Dict[str, Union[float, int, None]]:
+        """Kolumny liczbowe MeasureData (dla with_typed_values) - bez pól tekstowych"""
+        return {column: getattr(self, column) for column in self.TYPED}
+
+    def as_dict(self) -> Dict[str, Union[str, int]]:
+        """Zwraca wszystkie pola jako słownik (deviceId, status, request + pola komendy)"""
+        result = {
+            'deviceId': self.deviceId,
+            'status': self.status,
+            'request': self.request,
+        }
+        for name in self.FIELDS:
+            result[name] = getattr(self, name)
+        return result
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.as_dict()})"
+
+
+def _u8_property(name: str, offset: int) -> property:
+    """Tworzy pole liczbowe 1B"""
+
+    def getter(self):
+        return self._buf[offset]
+
+    return property(getter, doc=f"Pole {name} (1B)")
+
+
+FLOAT32_STRUCT = struct.Struct('>f')
+
+
+def float32_text(value: float) -> str:
+    """Najkrótszy zapis dziesiętny liczby float32 (0.85 zamiast 0.8500000238418579)"""
+    for precision in range(6, 10):
+        text = f"{value:.{precision}g}"
+        if FLOAT32_STRUCT.unpack(FLOAT32_STRUCT.pack(float(text)))[0] == value:
+            return text
+    return repr(value)
+
+
+# Konwersja pól binarnych (VERSION 2) do tekstu - widoki udostępniają te same
+# atrybuty tekstowe co dla pól ASCII z VERSION 1. Tekst budowany jest dopiero
+# przy odczycie pola (kolumny tekstowe zapisywanego rekordu), kolumny liczbowe
+# (speedValue, timeEpoch...) to wartości rozpakowane z ramki.
+BINARY_TEXT = {
+    'f32': float32_text,
+    'u16': str,
+    'u32': str,
+    'u64': str,
+    'epoch32': lambda value: datetime.fromtimestamp(value).strftime(TIME_FORMAT),
+}
+
+
+def _binary_number(self, slot: str):
+    """
+    Wartość pola binarnego - przy pierwszym odczycie wszystkie pola binarne
+    rozpakowywane są jednym wywołaniem LAYOUT.unpack_from
+    """
+    try:
+        return getattr(self, slot)
+    except AttributeError:
+        self._decode_binary()
+        return getattr(self, slot)
+
+
+def _binary_property(name: str, kind: str) -> property:
+    """Tworzy pole binarne jako tekst (konwersja BINARY_TEXT przy pierwszym odczycie)"""
+    slot = '_v_' + name
+    number_slot = '_n_' + name
+    to_text = BINARY_TEXT[kind]
+
+    def getter(self):
+        try:
+            return getattr(self, slot)
+        except AttributeError:
+            value = to_text(_binary_number(self, number_slot))
+            setattr(self, slot, value)
+            return value
+
+    return property(getter, doc=f"Pole {name} (binarne, jako tekst)")
+
+
+def _typed_property(name: str, binary: bool) -> property:
+    """
+    Tworzy kolumnę liczbową pola (TYPED_FIELDS): dla pola binarnego wartość z ramki,
+    dla pola ASCII - tekst pola przeliczony raz i zapamiętany
+    """
+    slot = '_n_' + name
+    column, parse = TYPED_FIELDS[name]
+
+    if binary:
+        def getter(self):
+            value = _binary_number(self, slot)
+            # NaN i nieskończoności float32 - jak parse_number dla tekstu
+            return value if value - value == 0 else None
+    else:
+        def getter(self):
+            try:
+                return getattr(self, slot)
+            except AttributeError:
+                value = parse(getattr(self, name))
+                setattr(self, slot, value)
+                return value
+
+    return property(getter, doc=f"Kolumna {column} (pole {name} jako liczba)")
+
+
+def _compile_binary_decoder(fields: Tuple[FieldSpec, ...]):
+    """Tworzy metodę rozpakowującą wszystkie pola binarne układu naraz (bez konwersji do tekstu)"""
+    slots = tuple('_n_' + field.name if field.kind in BINARY_TEXT else None for field in fields)
+
+    def _decode_binary(self):
+        values = self.LAYOUT.unpack_from(self._buf, FIELDS_START)
+        for slot, value in zip(slots, values):
+            if slot is not None:
+                setattr(self, slot, value)
+
+    return _decode_binary
+
+
+def compile_payload_view(class_name: str, fields: Tuple[FieldSpec, ...]) -> Type[PayloadView]:
+    """
+    Kompiluje deklaratywny układ pól do lekkiej klasy widoku (__slots__)
+    z prekompilowanym struct.Struct dla całego układu.
+    """
+    typed = [field for field in fields if field.name in TYPED_FIELDS and field.kind != 'u8']
+    namespace = {
+        '__slots__': tuple('_v_' + field.name for field in fields if field.kind != 'u8')
+                     + tuple('_n_' + field.name for field in fields
+                             if field.kind in BINARY_TEXT or field in typed),
+        'FIELDS': tuple(field.name for field in fields),
+        'TYPED': tuple(TYPED_FIELDS[field.name][0] for field in typed),
+        'LAYOUT': struct.Struct(layout_format(fields)),
+    }
+
+    offset = FIELDS_START
+    for field in fields:
+        if field.kind == 'u8':
+            namespace[field.name] = _u8_property(field.name, offset)
+        elif field.kind in BINARY_TEXT:
+            namespace[field.name] = _binary_property(field.name, field.kind)
+        else:
+            namespace[field.name] = _ascii_property(field.name, offset, field.size)
+        offset += field.size
+    for field in typed:
+        namespace[TYPED_FIELDS[field.name][0]] = _typed_property(field.name, field.kind in BINARY_TEXT)
+
+    if any(field.kind in BINARY_TEXT for field in fields):
+        namespace['_decode_binary'] = _compile_binary_decoder(fields)
+        namespace['BINARY'] = True
+
+    namespace['MIN_FRAME_SIZE'] = offset
+    return type(class_name, (PayloadView,), namespace)
+
+
+# Klasy widoków kompilowane ze schematów protokołu: COMMAND_ID -> klasa (VERSION 1)
+PAYLOAD_VIEWS: Dict[int, Type[PayloadView]] = {}
+# Widoki innych wersji protokołu: (COMMAND_ID, VERSION) -> klasa
+VERSIONED_PAYLOAD_VIEWS: Dict[Tuple[int, int], Type[PayloadView]] = {}
+
+
+def get_payload_view(command_id: int, version: int = PROTOCOL_V1) -> Optional[Type[PayloadView]]:
+    """
+    Zwraca klasę widoku dla komendy, kompilując ją przy pierwszym użyciu
+    (dotyczy również komend zarejestrowanych po imporcie modułu).
+    Komendy bez osobnego schematu dla danej wersji używają widoku VERSION 1.
+    """
+    views, view_key = PAYLOAD_VIEWS, command_id
+    if version != PROTOCOL_V1:
+        view_class = VERSIONED_PAYLOAD_VIEWS.get((command_id, version))
+        if view_class is not None:
+            return view_class
+        if (command_id, version) in VERSIONED_SCHEMAS:
+            views, view_key = VERSIONED_PAYLOAD_VIEWS, (command_id, version)
+
+    view_class = views.get(view_key)
+    if view_class is None:
+        schema = get_schema(command_id, version)
+        if schema is None or not schema.request.fields:
+            return None
+        class_name = ''.join(part.capitalize() for part in schema.name.split('_')) + 'View'
+        if schema.version != PROTOCOL_V1:
+            class_name = class_name[:-len('View')] + f'V{schema.version}View'
+        view_class = compile_payload_view(class_name, schema.request.fields)
+        views[view_key] = view_class
+    return view_class
+
+
+for _command_id in list(COMMAND_SCHEMAS):
+    get_payload_view(_command_id)
+
+AliasDataView = PAYLOAD_VIEWS[0x0002]
+MeasureDataView = PAYLOAD_VIEWS[0x0003]
+MeasureDataV2View = get_payload_view(0x0003, PROTOCOL_V2)
+DynamicDataView = PAYLOAD_VIEWS[0x0004]
+StaticDataView = PAYLOAD_VIEWS[0x0005]
+
+MEASURE_BATCH_HEADER = COMMAND_SCHEMAS[0x0007].request.struct
+_RECORD_COLUMNS = tuple(TYPED_FIELDS[field.name][0] for field in MEASURE_RECORD.fields)
+_RECORD_FLOATS = tuple(TYPED_FIELDS[field.name][0] for field in MEASURE_RECORD.fields if field.kind == 'f32')
+_RECORD_TEXT = tuple((field.name, TYPED_FIELDS[field.name][0], BINARY_TEXT[field.kind])
+                     for field in MEASURE_RECORD.fields)
+
+
+def with_text_fields(record: Dict) -> Dict:
+    """
+    Uzupełnia rekord z decode_measure_batch o pola tekstowe (speed, rate, total,
+    currentTime) jak w VERSION 1 - wywoływane tylko dla rekordów zapisywanych do bazy.
+    Rekord jest modyfikowany w miejscu i zwracany.
+    """
+    for name, column, to_text in _RECORD_TEXT:
+        if name not in record:
+            value = record[column]
+            record[name] = to_text(value) if value is not None else ''
+    return record
+
+
+def decode_measure_batch(data: Union[bytes, bytearray, memoryview]) -> Tuple[int, List[Dict]]:
+    """
+    Dekoduje paczkę MEASURE_BATCH w jednym przebiegu (struct.iter_unpack po rekordach).
+    Rekordy zawierają kolumny liczbowe MeasureData (speedValue, rateValue, totalValue,
+    timeEpoch; NaN float32 jako None) - pola tekstowe dodaje with_text_fields.
+
+    Returns:
+        Tuple[int, List[Dict]]: Numer pierwszego rekordu i rekordy; rekordy
+        niemieszczące się w DATA_LEN (ucięta paczka) są pomijane
+    """
+    buf = data if isinstance(data, memoryview) else memoryview(data)
+    first_record, count = MEASURE_BATCH_HEADER.unpack_from(buf, FIELDS_START)
+    start = FIELDS_START + MEASURE_BATCH_HEADER.size
+    # DATA_LEN obejmuje STATUS, REQUEST i pola komendy
+    end = min(DATA_START + buf[SEGMENT_START], len(buf) - FOOTER_SIZE - 1)
+    count = min(count, max(end - start, 0) // MEASURE_RECORD.size)
+    records = [
+        dict(zip(_RECORD_COLUMNS, values))
+        for values in MEASURE_RECORD.struct.iter_unpack(buf[start:start + count * MEASURE_RECORD.size])
+    ]
+    for record in records:
+        for column in _RECORD_FLOATS:
+            value = record[column]
+            if value - value != 0:
+                record[column] = None
+    return first_record, records
+
+
+class FrameView:
+    """
+    Widok ramki protokołu nad memoryview - bez kopiowania danych.
+    Pola HEADER, JAWNA i FOOTER są odczytywane prekompilowanymi strukturami.
+    """
+    __slots__ = ('_buf',)
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview]):
+        self._buf = data if isinstance(data, memoryview) else memoryview(data)
+
+    @property
+    def buffer(self) -> memoryview:
+        return self._buf
+
+    # --- HEADER
+    @property
+    def version(self) -> int:
+        return self._buf[2]
+
+    @property
+    def flags(self) -> int:
+        return self._buf[3]
+
+    @property
+    def is_encrypted(self) -> bool:
+        return bool(self._buf[3] & 0x01)
+
+    # --- JAWNA
+    @property
+    def device_id_raw(self) -> bytes:
+        return DEVICE_ID_STRUCT.unpack_from(self._buf, DEVICE_ID_OFFSET)[0]
+
+    @property
+    def device_id(self) -> str:
+        return self.device_id_raw.decode('ascii').strip()
+
+    @property
+    def command_id(self) -> int:
+        return COMMAND_ID_STRUCT.unpack_from(self._buf, COMMAND_ID_OFFSET)[0]
+
+    @property
+    def rc4_key_id(self) -> int:
+        return self._buf[HEADER_SIZE + 12]
+
+    @property
+    def timestamp(self) -> int:
+        return int.from_bytes(self._buf[HEADER_SIZE + 13:HEADER_SIZE + 16], 'big')
+
+    @property
+    def seq_num(self) -> int:
+        return self._buf[HEADER_SIZE + 16]
+
+    # --- SZYFROWANA
+    @property
+    def data_len(self) -> int:
+        return self._buf[SEGMENT_START]
+
+    @property
+    def segment(self) -> memoryview:
+        """Segment SZYFROWANA: DATA_LEN + DATA + CRC8"""
+        return self._buf[SEGMENT_START:-FOOTER_SIZE]
+
+    @property
+    def data(self) -> memoryview:
+        """Pole DATA (bez DATA_LEN i CRC8)"""
+        return self._buf[DATA_START:-FOOTER_SIZE - 1]
+
+    @property
+    def crc8(self) -> int:
+        return self._buf[-FOOTER_SIZE - 1]
+
+    # --- FOOTER
+    @property
+    def crc16(self) -> int:
+        return FOOTER_STRUCT.unpack_from(self._buf, len(self._buf) - FOOTER_SIZE)[0]
+
+    @property
+    def end_marker(self) -> int:
+        return self._buf[-1]
+
+    def payload(self, command_id: int = None) -> PayloadView:
+        """
+        Zwraca widok danych komendy dla COMMAND_ID ramki (lub podanego)
+
+        Raises:
+            ValueError: gdy dla komendy nie zdefiniowano układu pól
+        """
+        if command_id is None:
+            command_id = self.command_id
+        view_class = get_payload_view(command_id, self.version)
+        if view_class is None:
+            raise ValueError(f"Brak układu pól dla komendy 0x{command_id:04X}")
+        return view_class(self._buf)
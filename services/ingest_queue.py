@@ -0,0 +1,359 @@
+import json
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from models.models import MeasureData
+from repositories.database import DATABASE_PATH, WriterSessionLocal
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class IngestQueueFull(Exception):
+    """
+    Kolejka zapisu jest pełna - wywołujący powinien zapisać rekord samodzielnie
+    """
+    pass
+
+
+class MeasureWriteQueue:
+    """
+    Kolejka zapisu odroczonego (write-behind) dla MeasureData.
+
+    Handler komendy wstawia rekord do kolejki i od razu odpowiada integratorowi.
+    Wątek zapisujący zbiera rekordy i zapisuje je paczkami jednym commitem -
+    co batch_size rekordów lub co flush_interval_ms milisekund.
+    Kolejka ma ograniczoną pojemność: gdy jest pełna, enqueue() czeka
+    enqueue_timeout sekund, a potem zgłasza IngestQueueFull.
+
+    Integrator dostał już potwierdzenie rekordów z kolejki, więc nieudany commit
+    paczki nie porzuca rekordów: paczka jest ponawiana (retries razy, z rosnącą
+    przerwą), potem zapisywana rekord po rekordzie, a rekordy, których nie da się
+    zapisać, trafiają do pliku spill_path (JSON, rekord w linii). Przy starcie
+    kolejki plik jest ponownie zapisywany do bazy - przez worker, który pierwszy
+    przejmie go atomową zmianą nazwy (uvicorn --workers współdzieli jeden plik).
+
+    Rekord może mieć funkcję on_written(ok), wywoływaną z wątku zapisującego po
+    zatwierdzeniu rekordu (ok=True) albo gdy rekord nie trafił do bazy (ok=False).
+    """
+
+    def __init__(self, max_size: int = 10000, batch_size: int = 200, flush_interval_ms: int = 200,
+                 enqueue_timeout: float = 1.0, session_factory: Callable[[], Session] = WriterSessionLocal,
+                 retries: int = 3, retry_backoff: float = 0.1, spill_path: Optional[str] = None):
+        """
+        Args:
+            max_size: Pojemność kolejki (liczba rekordów)
+            batch_size: Maksymalna liczba rekordów w jednym commicie
+            flush_interval_ms: Maksymalny czas oczekiwania na skompletowanie paczki
+            enqueue_timeout: Czas oczekiwania na miejsce w pełnej kolejce [s]
+            session_factory: Fabryka sesji bazy danych
+            retries: Liczba ponowień nieudanego commitu paczki
+            retry_backoff: Przerwa przed pierwszym ponowieniem [s], podwajana przy kolejnych
+            spill_path: Plik rekordów, których nie udało się zapisać (None - tylko log)
+        """
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.enqueue_timeout = enqueue_timeout
+        self.session_factory = session_factory
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.spill_path = spill_path
+        self._spill_lock = threading.Lock()
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_size)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._metrics_lock = threading.Lock()
+        self._reset_metrics()
+
+    def _reset_metrics(self) -> None:
+        self.enqueued_total = 0
+        self.written_total = 0
+        self.failed_total = 0
+        self.retried_total = 0
+        self.spilled_total = 0
+        self.rejected_total = 0
+        self.batches_total = 0
+        self.max_depth = 0
+        self.last_batch_size = 0
+        self.last_commit_ms = 0.0
+        self.max_commit_ms = 0.0
+        self._commit_ms_total = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Uruchamia wątek zapisujący"""
+        if self.is_running:
+            return
+        self.replay_spill()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="measure-write-queue", daemon=True)
+        self._thread.start()
+        logger.info(f"Kolejka zapisu MeasureData uruchomiona (pojemność={self.max_size}, "
+                    f"paczka={self.batch_size}, interwał={self.flush_interval * 1000:.0f} ms)")
+
+    def enqueue(self, record: Dict[str, str], on_written: Optional[Callable[[bool], None]] = None) -> None:
+        """
+        Dodaje rekord MeasureData (słownik kolumn) do kolejki
+
+        Args:
+            record: Rekord MeasureData
+            on_written: Wywoływana po commicie rekordu (True) lub gdy rekord nie został zapisany (False)
+
+        Raises:
+            IngestQueueFull: gdy kolejka jest pełna dłużej niż enqueue_timeout
+        """
+        try:
+            self._queue.put((record, on_written), timeout=self.enqueue_timeout)
+        except queue.Full:
+            with self._metrics_lock:
+                self.rejected_total += 1
+            raise IngestQueueFull(f"Kolejka zapisu pełna ({self.max_size} rekordów)")
+
+        with self._metrics_lock:
+            self.enqueued_total += 1
+            depth = self._queue.qsize()
+            if depth > self.max_depth:
+                self.max_depth = depth
+
+    def _collect_batch(self) -> List[Tuple[Dict[str, str], Optional[Callable[[bool], None]]]]:
+        """Zbiera paczkę rekordów: czeka na pierwszy, potem dobiera do batch_size lub do upływu interwału"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0 or self._stop_event.is_set():
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _commit(self, rows: List[Dict[str, str]]) -> Optional[Exception]:
+        """
+        Zapisuje rekordy w jednej transakcji
+
+        Returns:
+            Optional[Exception]: Błąd zapisu (None - zapisano)
+        """
+        db = self.session_factory()
+        try:
+            db.bulk_insert_mappings(MeasureData, rows)
+            db.commit()
+            return None
+        except Exception as e:
+            db.rollback()
+            return e
+        finally:
+            db.close()
+
+    def _write_rows(self, rows: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        Zapisuje rekordy pojedynczo (zły rekord nie blokuje pozostałych)
+
+        Returns:
+            List[Dict[str, str]]: Rekordy, których nie udało się zapisać
+        """
+        failed = []
+        for row in rows:
+            error = self._commit([row])
+            if error is not None:
+                logger.error(f"BŁĄD zapisu rekordu MeasureData {row.get('deviceId')} "
+                             f"{row.get('currentTime')}: {error}")
+                failed.append(row)
+        return failed
+
+    def _spill(self, rows: List[Dict[str, str]]) -> None:
+        """Dopisuje niezapisane rekordy do pliku spill_path"""
+        if not self.spill_path:
+            logger.error(f"Utracono {len(rows)} rekordów MeasureData (brak pliku INGEST_SPILL_PATH)")
+            return
+        try:
+            # Jeden zapis dla całej paczki - linie innych workerów nie przeplatają się z paczką
+            lines = "".join(json.dumps(row, ensure_ascii=False, default=str) + "\n" for row in rows)
+            with self._spill_lock, open(self.spill_path, "a", encoding="utf-8") as spill:
+                spill.write(lines)
+            with self._metrics_lock:
+                self.spilled_total += len(rows)
+            logger.warning(f"Zapisano {len(rows)} rekordów MeasureData do pliku {self.spill_path}")
+        except OSError as e:
+            logger.error(f"Utracono {len(rows)} rekordów MeasureData - błąd pliku {self.spill_path}: {e}")
+
+    def replay_spill(self) -> int:
+        """
+        Zapisuje do bazy rekordy z pliku spill_path; rekordy nadal niezapisywalne zostają w pliku.
+        Przejęty plik (spill_path.<pid>.replay) usuwany jest po zapisie - po przerwanym
+        ponownym zapisie wystarczy zmienić jego nazwę z powrotem na spill_path.
+
+        Returns:
+            int: Liczba zapisanych rekordów
+        """
+        if not self.spill_path:
+            return 0
+        # Plik przejmuje jeden proces: zmiana nazwy jest atomowa, pozostałe workery
+        # nie znajdą już spill_path, a nowe rekordy trafiają do nowego pliku spill_path
+        claimed = f"{self.spill_path}.{os.getpid()}.replay"
+        with self._spill_lock:
+            try:
+                os.replace(self.spill_path, claimed)
+            except FileNotFoundError:
+                return 0
+            except OSError as e:
+                logger.error(f"Nie można przejąć pliku {self.spill_path} do ponownego zapisu: {e}")
+                return 0
+            with open(claimed, encoding="utf-8") as spill:
+                rows = [json.loads(line) for line in spill if line.strip()]
+        failed = self._write_rows(rows) if self._commit(rows) is not None else []
+        if failed:
+            self._spill(failed)
+        os.remove(claimed)
+        written = len(rows) - len(failed)
+        if written:
+            with self._metrics_lock:
+                self.written_total += written
+            logger.info(f"Zapisano {written} rekordów MeasureData z pliku {self.spill_path}")
+        return written
+
+    @staticmethod
+    def _notify(callbacks: List[Tuple[Optional[Callable[[bool], None]], bool]]) -> None:
+        """Wywołuje funkcje on_written rekordów (błąd funkcji nie przerywa zapisu)"""
+        for on_written, ok in callbacks:
+            if on_written is None:
+                continue
+            try:
+                on_written(ok)
+            except Exception as e:
+                logger.error(f"Błąd funkcji on_written rekordu MeasureData: {e}")
+
+    def _write_batch(self, batch: List[Tuple[Dict[str, str], Optional[Callable[[bool], None]]]]) -> None:
+        """Zapisuje paczkę rekordów w jednej transakcji (z ponowieniami i zapisem pojedynczym)"""
+        start = time.perf_counter()
+        rows = [row for row, _ in batch]
+        failed = []
+        try:
+            error = self._commit(rows)
+            delay = self.retry_backoff
+            for attempt in range(self.retries):
+                if error is None:
+                    break
+                logger.warning(f"Ponowienie zapisu paczki {len(batch)} rekordów MeasureData "
+                               f"({attempt + 1}/{self.retries}) po błędzie: {error}")
+                with self._metrics_lock:
+                    self.retried_total += 1
+                time.sleep(delay)
+                delay *= 2
+                error = self._commit(rows)
+
+            if error is not None:
+                logger.error(f"BŁĄD zapisu paczki {len(batch)} rekordów MeasureData: {error} - zapis pojedynczy")
+                failed = self._write_rows(rows)
+                if failed:
+                    self._spill(failed)
+
+            commit_ms = (time.perf_counter() - start) * 1000.0
+            with self._metrics_lock:
+                self.written_total += len(batch) - len(failed)
+                self.failed_total += len(failed)
+                self.batches_total += 1
+                self.last_batch_size = len(batch)
+                self.last_commit_ms = commit_ms
+                self.max_commit_ms = max(self.max_commit_ms, commit_ms)
+                self._commit_ms_total += commit_ms
+            logger.debug(f"Zapisano paczkę {len(batch)} rekordów w {commit_ms:.1f} ms")
+        finally:
+            failed_ids = {id(row) for row in failed}
+            self._notify([(on_written, id(row) not in failed_ids) for row, on_written in batch])
+            for _ in batch:
+                self._queue.task_done()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect_batch()
+            if batch:
+                self._write_batch(batch)
+            elif self._stop_event.is_set():
+                break
+
+    def flush(self) -> None:
+        """Czeka, aż wszystkie rekordy z kolejki zostaną zapisane"""
+        if self.is_running:
+            self._queue.join()
+
+    def stop(self, flush: bool = True, timeout: float = 30.0) -> None:
+        """
+        Zatrzymuje wątek zapisujący
+
+        Args:
+            flush: Czy zapisać rekordy pozostałe w kolejce
+            timeout: Maksymalny czas oczekiwania na zakończenie wątku [s]
+        """
+        if self._thread is None:
+            return
+        if not flush:
+            # Porzucenie niezapisanych rekordów
+            dropped = 0
+            try:
+                while True:
+                    _, on_written = self._queue.get_nowait()
+                    self._notify([(on_written, False)])
+                    self._queue.task_done()
+                    dropped += 1
+            except queue.Empty:
+                pass
+            if dropped:
+                logger.warning(f"Porzucono {dropped} niezapisanych rekordów MeasureData")
+        self._stop_event.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error(f"Kolejka zapisu nie zakończyła pracy w {timeout} s "
+                         f"(pozostało {self._queue.qsize()} rekordów)")
+        else:
+            logger.info(f"Kolejka zapisu MeasureData zatrzymana (zapisano {self.written_total} rekordów)")
+        self._thread = None
+
+    def get_metrics(self) -> dict:
+        """Zwraca metryki kolejki: głębokość, liczniki rekordów i czasy commitów"""
+        with self._metrics_lock:
+            return {
+                "running": self.is_running,
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self.max_size,
+                "max_depth": self.max_depth,
+                "enqueued_total": self.enqueued_total,
+                "written_total": self.written_total,
+                "failed_total": self.failed_total,
+                "retried_total": self.retried_total,
+                "spilled_total": self.spilled_total,
+                "rejected_total": self.rejected_total,
+                "batches_total": self.batches_total,
+                "last_batch_size": self.last_batch_size,
+                "last_commit_ms": round(self.last_commit_ms, 3),
+                "avg_commit_ms": round(self._commit_ms_total / self.batches_total, 3) if self.batches_total else 0.0,
+                "max_commit_ms": round(self.max_commit_ms, 3),
+            }
+
+
+# Globalna instancja
+measure_write_queue = MeasureWriteQueue(
+    max_size=int(os.getenv("INGEST_QUEUE_SIZE", "10000")),
+    batch_size=int(os.getenv("INGEST_BATCH_SIZE", "200")),
+    flush_interval_ms=int(os.getenv("INGEST_FLUSH_MS", "200")),
+    spill_path=os.getenv("INGEST_SPILL_PATH",
+                         os.path.join(os.path.dirname(DATABASE_PATH), "ingest_spill.jsonl")) or None,
+)
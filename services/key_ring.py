@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, NamedTuple, Optional, Tuple, Union
+
+from services.cipher import RC4KeyGenerator
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+KeyType = Union[str, bytes, list]
+
+# Położenie RC4_KEY_ID w sekcji JAWNA
+RC4_KEY_ID_OFFSET = 16
+# Identyfikator klucza, który integratory wysyłały dotąd zawsze (klucze z konfiguracji)
+DEFAULT_KEY_ID = 0x00
+
+
+class UnknownKeyError(KeyError):
+    """
+    Ramka wskazuje RC4_KEY_ID, dla którego nie ma klucza w pierścieniu
+    """
+    pass
+
+
+class KeyEntry(NamedTuple):
+    key_id: int
+    key: bytes
+    iterations: int
+    activated_at: float
+    # Klucze źródłowe - do usunięcia klucza pochodnego z cache RC4KeyGenerator przy wycofaniu
+    key1: KeyType
+    key2: KeyType
+
+
+class RC4KeyRing:
+    """
+    Pierścień kluczy RC4 indeksowany polem RC4_KEY_ID (1B) z sekcji JAWNA.
+
+    Klucze pochodne (1000+ rund SHA256) wyliczane są raz - przy ładowaniu
+    lub w tle przy rotacji - i dopiero gotowe trafiają do tablicy 256 slotów.
+    Odczyt to indeksowanie listy bez blokady, więc rotacja nie wstrzymuje
+    obsługi ramek.
+    """
+
+    def __init__(self):
+        self._slots: List[Optional[KeyEntry]] = [None] * 256
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def __contains__(self, key_id: int) -> bool:
+        return self._slots[key_id & 0xFF] is not None
+
+    def get(self, key_id: int) -> bytes:
+        """
+        Zwraca klucz pochodny dla RC4_KEY_ID
+
+        Raises:
+            UnknownKeyError: gdy slot jest pusty
+        """
+        entry = self._slots[key_id & 0xFF]
+        if entry is None:
+            raise UnknownKeyError(f"Nieznany RC4_KEY_ID: 0x{key_id & 0xFF:02X}")
+        return entry.key
+
+    def add(self, key_id: int, key1: KeyType, key2: KeyType,
+            iterations: int = RC4KeyGenerator.DEFAULT_ITERATIONS) -> None:
+        """
+        Wylicza klucz pochodny (blokująco, przez cache RC4KeyGenerator) i aktywuje go
+        w slocie key_id. Klucz zastąpiony w slocie jest usuwany z cache.
+        """
+        key = RC4KeyGenerator.precompute_key(key1, key2, iterations)
+        self._activate(KeyEntry(key_id & 0xFF, key, iterations, time.time(), key1, key2))
+
+    def _activate(self, entry: KeyEntry) -> None:
+        with self._lock:
+            replaced = self._slots[entry.key_id]
+            self._slots[entry.key_id] = entry
+        if replaced is not None and (replaced.key1, replaced.key2) != (entry.key1, entry.key2):
+            RC4KeyGenerator.invalidate_cache(replaced.key1, replaced.key2)
+        logger.info(f"{'Zastąpiono' if replaced else 'Aktywowano'} klucz RC4 0x{entry.key_id:02X}")
+
+    def rotate(self, key_id: int, key1: KeyType, key2: KeyType,
+               iterations: int = RC4KeyGenerator.DEFAULT_ITERATIONS) -> Future:
+        """
+        Wylicza klucz w wątku w tle i aktywuje go po wyliczeniu.
+        Do tego czasu ramki z key_id obsługiwane są dotychczasowym kluczem.
+
+        Returns:
+            Future: Zakończony po aktywacji klucza
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rc4-key-ring")
+            executor = self._executor
+        return executor.submit(self.add, key_id, key1, key2, iterations)
+
+    def remove(self, key_id: int) -> bool:
+        """
+        Wycofuje klucz - kolejne ramki z tym RC4_KEY_ID będą odrzucane,
+        a klucz pochodny jest usuwany z cache RC4KeyGenerator
+        """
+        with self._lock:
+            removed = self._slots[key_id & 0xFF]
+            self._slots[key_id & 0xFF] = None
+        if removed is not None:
+            RC4KeyGenerator.invalidate_cache(removed.key1, removed.key2)
+            logger.info(f"Wycofano klucz RC4 0x{key_id & 0xFF:02X}")
+        return removed is not None
+
+    def key_ids(self) -> List[int]:
+        return [entry.key_id for entry in self._slots if entry is not None]
+
+    def clear(self) -> None:
+        with self._lock:
+            removed, self._slots = self._slots, [None] * 256
+        for entry in filter(None, removed):
+            RC4KeyGenerator.invalidate_cache(entry.key1, entry.key2)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def get_stats(self) -> dict:
+        return {
+            "keys": [
+                {"key_id": f"0x{entry.key_id:02X}", "iterations": entry.iterations,
+                 "activated_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry.activated_at))}
+                for entry in self._slots if entry is not None
+            ],
+        }
+
+    def load_env(self, default_key1: KeyType, default_key2: KeyType,
+                 iterations: int = RC4KeyGenerator.DEFAULT_ITERATIONS) -> None:
+        """
+        Ładuje klucze przy starcie: slot DEFAULT_KEY_ID z kluczy konfiguracyjnych oraz
+        dodatkowe klucze ze zmiennej RC4_KEY_RING w formacie "id=klucz1:klucz2;id=klucz1:klucz2"
+        (id dziesiętnie lub 0x..)
+        """
+        self.add(DEFAULT_KEY_ID, default_key1, default_key2, iterations)
+        for item in filter(None, (part.strip() for part in os.getenv("RC4_KEY_RING", "").split(';'))):
+            try:
+                key_id, keys = item.split('=', 1)
+                key1, key2 = keys.split(':', 1)
+                self.add(int(key_id, 0), key1, key2, iterations)
+            except ValueError:
+                logger.error(f"Niepoprawny wpis RC4_KEY_RING: '{item.split('=', 1)[0]}=...'")
+
+
+def resolve_key(key_id: int, key1: Optional[KeyType], key2: Optional[KeyType]) -> Tuple[KeyType, Optional[KeyType]]:
+    """
+    Wybiera klucz dla RC4_KEY_ID ramki: klucz z pierścienia (jako gotowy klucz RC4,
+    bez drugiego składnika) lub - gdy pierścień go nie zawiera - podane klucze
+    dla DEFAULT_KEY_ID
+
+    Raises:
+        UnknownKeyError: gdy klucza nie ma w pierścieniu, a key_id != DEFAULT_KEY_ID
+    """
+    try:
+        return rc4_key_ring.get(key_id), None
+    except UnknownKeyError:
+        if key_id == DEFAULT_KEY_ID and key1 is not None:
+            return key1, key2
+        raise
+
+
+# Globalna instancja
+rc4_key_ring = RC4KeyRing()
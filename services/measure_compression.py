@@ -0,0 +1,339 @@
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from services.measure_values import TYPED_FIELDS
+from services.protocol_schema import TIME_FORMAT
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+MODE_OFF = "off"
+MODE_DEADBAND = "deadband"
+MODE_SWINGING_DOOR = "swinging_door"
+MODES = (MODE_OFF, MODE_DEADBAND, MODE_SWINGING_DOOR)
+
+# Pola kompresowane (tolerancja per pole w MeasureCompressionConfig)
+COMPRESSED_FIELDS = ('speed', 'rate')
+# Kolumny liczbowe pól kompresowanych (rekordy po with_typed_values)
+_COMPRESSED_COLUMNS = tuple(TYPED_FIELDS[name][0] for name in COMPRESSED_FIELDS)
+
+Record = Dict[str, str]
+
+
+class MeasureCompressionConfig(NamedTuple):
+    """
+    Konfiguracja kompresji zapisu MeasureData
+
+    Attributes:
+        mode: 'off', 'deadband' (zapis po zmianie większej niż tolerancja, odtwarzanie
+              schodkowe) lub 'swinging_door' (odtwarzanie interpolacją liniową)
+        speed_tolerance: Dopuszczalny błąd odtworzenia prędkości
+        rate_tolerance: Dopuszczalny błąd odtworzenia wydajności
+        heartbeat: Wymuszony zapis co najmniej co tyle sekund (0 - bez wymuszania)
+    """
+    mode: str = MODE_OFF
+    speed_tolerance: float = 0.01
+    rate_tolerance: float = 1.0
+    heartbeat: int = 300
+
+    @property
+    def tolerances(self) -> Tuple[float, ...]:
+        return self.speed_tolerance, self.rate_tolerance
+
+    def validated(self) -> 'MeasureCompressionConfig':
+        """
+        Raises:
+            ValueError: dla nieznanego trybu lub ujemnej tolerancji
+        """
+        if self.mode not in MODES:
+            raise ValueError(f"Nieznany tryb kompresji: {self.mode} (dozwolone: {', '.join(MODES)})")
+        if min(self.tolerances) < 0 or self.heartbeat < 0:
+            raise ValueError("Tolerancje i heartbeat kompresji nie mogą być ujemne")
+        return self
+
+
+class _DeviceState:
+    """
+    Stan kompresji jednego urządzenia: ostatni zapisany punkt (archiwum),
+    drzwi (zakres nachyleń) per pole oraz ostatni odebrany, jeszcze niezapisany rekord
+    """
+    __slots__ = ('archive_time', 'archive_values', 'slope_max', 'slope_min',
+                 'held', 'held_time', 'held_values', 'last_total', 'received', 'stored')
+
+    def __init__(self):
+        self.archive_time = 0.0
+        self.archive_values: Tuple[float, ...] = ()
+        self.slope_max: List[float] = []
+        self.slope_min: List[float] = []
+        self.held: Optional[Record] = None
+        self.held_time = 0.0
+        self.held_values: Tuple[float, ...] = ()
+        self.last_total: Optional[float] = None
+        self.received = 0
+        self.stored = 0
+
+    def copy(self) -> '_DeviceState':
+        state = _DeviceState()
+        for name in self.__slots__:
+            setattr(state, name, getattr(self, name))
+        state.slope_max = list(self.slope_max)
+        state.slope_min = list(self.slope_min)
+        return state
+
+
+def _record_time(record: Record) -> float:
+    # Rekord po with_typed_values - bez ponownego parsowania tekstu
+    epoch = record.get('timeEpoch')
+    if epoch is not None:
+        return float(epoch)
+    try:
+        return datetime.strptime(record['currentTime'].strip(), TIME_FORMAT).timestamp()
+    except (KeyError, ValueError, AttributeError):
+        return time.time()
+
+
+def _record_values(record: Record) -> Optional[Tuple[float, ...]]:
+    if _COMPRESSED_COLUMNS[0] in record:
+        values = tuple(record[column] for column in _COMPRESSED_COLUMNS)
+        return None if None in values else values
+    try:
+        return tuple(float(record[name]) for name in COMPRESSED_FIELDS)
+    except (KeyError, ValueError, TypeError):
+        return None
+
+
+def _parse_total(record: Record) -> Optional[float]:
+    if 'totalValue' in record:
+        return record['totalValue']
+    try:
+        return float(record['total'])
+    except (KeyError, ValueError, TypeError):
+        return None
+
+
+class MeasureCompressor:
+    """
+    Kompresja rekordów MeasureData przed zapisem do bazy.
+
+    Rekordy przechodzące regułę zapisu przy zerowej prędkości są dodatkowo
+    przerzedzane per urządzenie: w trybie 'deadband' zapisywany jest rekord,
+    którego prędkość lub wydajność zmieniła się o więcej niż tolerancja od ostatniego
+    zapisu; w trybie 'swinging_door' - punkty końcowe odcinków, po których
+    interpolacja liniowa odtwarza pominięte rekordy z błędem nie większym niż tolerancja.
+    Zawsze zapisywane są: pierwszy rekord urządzenia, rekordy wymuszone (zatrzymanie),
+    rekordy przy wyzerowaniu licznika sumy (wraz z ostatnim rekordem przed nim)
+    oraz rekord co heartbeat sekund.
+
+    Stan urządzenia zmienia się przy każdym process() - wywołujący, który wycofuje
+    zapis zwróconych rekordów, przywraca stan z snapshot() przez restore().
+    """
+
+    def __init__(self, config: MeasureCompressionConfig = MeasureCompressionConfig()):
+        self.configure(config)
+        self._devices: Dict[str, _DeviceState] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def config(self) -> MeasureCompressionConfig:
+        return self._config
+
+    @property
+    def enabled(self) -> bool:
+        return self._config.mode != MODE_OFF
+
+    def configure(self, config: MeasureCompressionConfig) -> None:
+        """
+        Raises:
+            ValueError: dla nieznanego trybu lub ujemnej tolerancji
+        """
+        self._config = config.validated()
+        logger.info(f"Kompresja MeasureData: {config._asdict()}")
+
+    def process(self, device_id: str, record: Record, force: bool = False) -> List[Record]:
+        """
+        Przyjmuje rekord urządzenia i zwraca rekordy do zapisu (0, 1 lub 2 - poprzedni
+        niezapisany rekord zamykający odcinek oraz bieżący)
+
+        Args:
+            device_id: DEVICE_ID
+            record: Rekord MeasureData (pola tekstowe jak z ramki)
+            force: Wymuś zapis bieżącego rekordu (np. zatrzymanie przenośnika)
+        """
+        with self._lock:
+            state = self._devices.get(device_id)
+            if state is None:
+                state = self._devices[device_id] = _DeviceState()
+            state.received += 1
+
+            if not self.enabled:
+                state.stored += 1
+                return [record]
+
+            timestamp = _record_time(record)
+            values = _record_values(record)
+            total = _parse_total(record)
+            # Wyzerowanie licznika sumy - zachowaj ostatni rekord przed nim i pierwszy po nim
+            reset = total is not None and state.last_total is not None and total < state.last_total
+            if total is not None:
+                state.last_total = total
+
+            heartbeat = self._config.heartbeat
+            if (force or reset or values is None or not state.archive_values
+                    or (heartbeat and timestamp - state.archive_time >= heartbeat)):
+                if reset:
+                    logger.info(f"Wyzerowanie licznika sumy: device={device_id}, total={record.get('total')}")
+                return self._store_forced(state, record, timestamp, values, reset)
+
+            if self._config.mode == MODE_DEADBAND:
+                return self._deadband(state, record, timestamp, values)
+            return self._swinging_door(state, record, timestamp, values)
+
+    def _archive(self, state: _DeviceState, timestamp: float, values: Optional[Tuple[float, ...]]) -> None:
+        state.archive_time = timestamp
+        state.archive_values = values or ()
+        state.slope_max = [float('inf')] * len(COMPRESSED_FIELDS)
+        state.slope_min = [float('-inf')] * len(COMPRESSED_FIELDS)
+        state.held = None
+
+    def _store_forced(self, state: _DeviceState, record: Record, timestamp: float,
+                      values: Optional[Tuple[float, ...]], reset: bool = False) -> List[Record]:
+        # Odtworzenie schodkowe (deadband) nie potrzebuje poprzedniego rekordu - poza
+        # wyzerowaniem licznika, gdzie niesie on ostatnią wartość sumy przed resetem
+        keep_held = state.held is not None and (reset or self._config.mode == MODE_SWINGING_DOOR)
+        stored = [state.held, record] if keep_held else [record]
+        state.stored += len(stored)
+        self._archive(state, timestamp, values)
+        return stored
+
+    def _deadband(self, state: _DeviceState, record: Record, timestamp: float,
+                  values: Tuple[float, ...]) -> List[Record]:
+        if all(abs(value - archived) <= tolerance for value, archived, tolerance
+               in zip(values, state.archive_values, self._config.tolerances)):
+            state.held, state.held_time, state.held_values = record, timestamp, values
+            return []
+        state.stored += 1
+        self._archive(state, timestamp, values)
+        return [record]
+
+    def _swinging_door(self, state: _DeviceState, record: Record, timestamp: float,
+                       values: Tuple[float, ...]) -> List[Record]:
+        if self._door_open(state, timestamp, values):
+            state.held, state.held_time, state.held_values = record, timestamp, values
+            return []
+
+        if state.held is None:
+            # Punkt z tym samym znacznikiem czasu co archiwum, poza tolerancją
+            state.stored += 1
+            self._archive(state, timestamp, values)
+            return [record]
+
+        # Drzwi zamknięte - poprzedni rekord kończy odcinek i staje się nowym archiwum
+        held = state.held
+        self._archive(state, state.held_time, state.held_values)
+        state.stored += 1
+        if not self._door_open(state, timestamp, values):
+            # Bieżący rekord nie mieści się nawet w drzwiach otwartych od poprzedniego
+            # (ten sam znacznik czasu) - zapisz go od razu
+            state.stored += 1
+            self._archive(state, timestamp, values)
+            return [held, record]
+        state.held, state.held_time, state.held_values = record, timestamp, values
+        return [held]
+
+    def _door_open(self, state: _DeviceState, timestamp: float, values: Tuple[float, ...]) -> bool:
+        """
+        Sprawdza, czy odcinek od archiwum do nowego punktu mieści się w drzwiach
+        (odtwarza wszystkie pominięte punkty z błędem <= tolerancja) i zawęża drzwi
+        o ten punkt. False - punkt nie może zakończyć odcinka od bieżącego archiwum.
+        """
+        elapsed = timestamp - state.archive_time
+        for value, archived, tolerance, low, high in zip(
+                values, state.archive_values, self._config.tolerances, state.slope_min, state.slope_max):
+            if elapsed <= 0:
+                if abs(value - archived) > tolerance:
+                    return False
+            elif not low <= (value - archived) / elapsed <= high:
+                return False
+        if elapsed > 0:
+            for index, (value, archived, tolerance) in enumerate(
+                    zip(values, state.archive_values, self._config.tolerances)):
+                state.slope_max[index] = min(state.slope_max[index], (value + tolerance - archived) / elapsed)
+                state.slope_min[index] = max(state.slope_min[index], (value - tolerance - archived) / elapsed)
+        return True
+
+    def flush(self, device_id: str) -> List[Record]:
+        """Zwraca niezapisany rekord urządzenia (np. przed zamknięciem serwera)"""
+        with self._lock:
+            state = self._devices.get(device_id)
+            if state is None or state.held is None:
+                return []
+            held = state.held
+            state.stored += 1
+            self._archive(state, state.held_time, state.held_values)
+            return [held]
+
+    def snapshot(self, device_id: str) -> Optional[_DeviceState]:
+        """Kopia stanu kompresji urządzenia (None - urządzenie jeszcze nieznane)"""
+        with self._lock:
+            state = self._devices.get(device_id)
+            return state.copy() if state is not None else None
+
+    def restore(self, device_id: str, snapshot: Optional[_DeviceState]) -> None:
+        """Przywraca stan urządzenia z snapshot() (np. po wycofaniu zapisu rekordów)"""
+        with self._lock:
+            if snapshot is None:
+                self._devices.pop(device_id, None)
+            else:
+                self._devices[device_id] = snapshot.copy()
+
+    def flush_all(self) -> List[Record]:
+        records = []
+        for device_id in list(self._devices):
+            records.extend(self.flush(device_id))
+        return records
+
+    def clear(self) -> None:
+        with self._lock:
+            self._devices.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            devices = {
+                device_id: {
+                    "received": state.received,
+                    "stored": state.stored,
+                    "ratio": round(state.received / state.stored, 2) if state.stored else None,
+                }
+                for device_id, state in self._devices.items()
+            }
+        received = sum(device["received"] for device in devices.values())
+        stored = sum(device["stored"] for device in devices.values())
+        return {
+            "config": self._config._asdict(),
+            "received": received,
+            "stored": stored,
+            "ratio": round(received / stored, 2) if stored else None,
+            "devices": devices,
+        }
+
+
+def _env_config() -> MeasureCompressionConfig:
+    default = MeasureCompressionConfig()
+    try:
+        return MeasureCompressionConfig(
+            mode=os.getenv("MEASURE_COMPRESSION", default.mode),
+            speed_tolerance=float(os.getenv("MEASURE_COMPRESSION_SPEED_TOLERANCE", default.speed_tolerance)),
+            rate_tolerance=float(os.getenv("MEASURE_COMPRESSION_RATE_TOLERANCE", default.rate_tolerance)),
+            heartbeat=int(os.getenv("MEASURE_COMPRESSION_HEARTBEAT", default.heartbeat)),
+        ).validated()
+    except ValueError as e:
+        logger.error(f"Niepoprawna konfiguracja MEASURE_COMPRESSION*: {e} - używam wartości domyślnych")
+        return default
+
+
+# Globalna instancja
+measure_compressor = MeasureCompressor(_env_config())
@@ -0,0 +1,80 @@
+import time
+from datetime import datetime
+from typing import Dict, Optional, Union
+
+from services.protocol_schema import TIME_FORMAT
+
+# Kolumny liczbowe MeasureData wyliczane z kolumn tekstowych (pola ramki)
+TYPED_COLUMNS = ('speedValue', 'rateValue', 'totalValue', 'timeEpoch', 'timeInvalid', 'receivedAt')
+
+
+def parse_number(value: Union[str, float, int, None]) -> Optional[float]:
+    """Tekst pola ramki (dopełniony spacjami) jako float lub None, gdy nie jest liczbą"""
+    if value is None:
+        return None
+    try:
+        number = float(value.strip() if isinstance(value, str) else value)
+    except (ValueError, TypeError):
+        return None
+    # NaN i nieskończoności nie są wartościami pomiaru
+    return number if number - number == 0 else None
+
+
+def parse_total(value: Union[str, float, int, None]) -> Optional[Union[int, float]]:
+    """
+    Licznik sumy jako int, gdy tekst pola jest liczbą całkowitą (dokładnie także powyżej 2^53),
+    w przeciwnym razie jak parse_number
+    """
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            pass
+    elif isinstance(value, int):
+        return value
+    return parse_number(value)
+
+
+def parse_epoch(value: Optional[str]) -> Optional[int]:
+    """Czas z ramki ("%Y-%m-%d %H:%M:%S", czas lokalny) jako sekundy epoki lub None"""
+    if not value:
+        return None
+    try:
+        return int(datetime.strptime(value.strip(), TIME_FORMAT).timestamp())
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def format_epoch(epoch: Optional[int]) -> Optional[str]:
+    """Sekundy epoki w formacie pola currentTime"""
+    if epoch is None:
+        return None
+    return datetime.fromtimestamp(epoch).strftime(TIME_FORMAT)
+
+
+# Pole ramki -> (kolumna liczbowa MeasureData, konwersja tekstu pola)
+TYPED_FIELDS = {
+    'speed': ('speedValue', parse_number),
+    'rate': ('rateValue', parse_number),
+    'total': ('totalValue', parse_total),
+    'currentTime': ('timeEpoch', parse_epoch),
+}
+
+
+def with_typed_values(record: Dict, received_at: Optional[float] = None) -> Dict:
+    """
+    Uzupełnia rekord MeasureData (pola tekstowe jak z ramki) o kolumny liczbowe.
+    Kolumny już obecne w rekordzie (wartości binarne z ramki VERSION 2) nie są
+    wyliczane ponownie z tekstu. Rekord bez poprawnego czasu ma timeInvalid = 1.
+    Rekord jest modyfikowany w miejscu i zwracany.
+
+    Args:
+        record: Słownik z polami speed, rate, total, currentTime
+        received_at: Czas odebrania przez serwer (domyślnie teraz)
+    """
+    for name, (column, parse) in TYPED_FIELDS.items():
+        if column not in record:
+            record[column] = parse(record.get(name))
+    record['timeInvalid'] = int(record['timeEpoch'] is None)
+    record['receivedAt'] = int(time.time() if received_at is None else received_at)
+    return record
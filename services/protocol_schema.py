@@ -0,0 +1,197 @@
+import struct
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional, Tuple, Union
+
+# Wersje protokołu (pole VERSION z HEADER)
+PROTOCOL_V1 = 0x01  # pola DATA jako tekst ASCII
+PROTOCOL_V2 = 0x02  # pola DATA binarne (IEEE-754, liczby całkowite big-endian)
+
+# Kody struct dla pól binarnych
+NUMERIC_FORMATS = {'u8': 'B', 'u16': 'H', 'u32': 'I', 'u64': 'Q', 'f32': 'f', 'epoch32': 'I'}
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class FieldSpec(NamedTuple):
+    """
+    Opis pojedynczego pola sekcji DATA
+
+    Attributes:
+        name: Nazwa pola (atrybut widoku / argument budowania)
+        size: Szerokość pola w bajtach
+        kind: 'ascii' - tekst dopełniony spacjami, 'u8' / 'u16' / 'u32' / 'u64' - liczba całkowita,
+              'f32' - liczba IEEE-754 (4B), 'epoch32' - czas uniksowy w sekundach (4B)
+    """
+    name: str
+    size: int
+    kind: str = 'ascii'
+
+
+def layout_format(fields: Tuple[FieldSpec, ...]) -> str:
+    """Format struct (big-endian) dla układu pól"""
+    return '>' + ''.join(NUMERIC_FORMATS.get(field.kind, f'{field.size}s') for field in fields)
+
+
+class CompiledLayout:
+    """
+    Układ pól skompilowany do struct.Struct - pakuje wartości do bajtów DATA
+    """
+    __slots__ = ('fields', 'struct', 'size', '_defaults')
+
+    def __init__(self, fields: Tuple[FieldSpec, ...]):
+        self.fields = fields
+        self.struct = struct.Struct(layout_format(fields))
+        self.size = self.struct.size
+        self._defaults = tuple(b'' if field.kind == 'ascii' else 0 for field in fields)
+
+    def pack(self, **values: Union[str, bytes, int, float]) -> bytes:
+        """
+        Pakuje podane wartości pól; pola ASCII są dopełniane spacjami
+        lub obcinane do szerokości pola, brakujące pola są puste (zerowe)
+        """
+        packed = []
+        for field, default in zip(self.fields, self._defaults):
+            value = values.get(field.name, default)
+            if field.kind == 'u8':
+                packed.append(int(value) & 0xFF)
+            elif field.kind == 'f32':
+                packed.append(float(value))
+            elif field.kind == 'epoch32':
+                if isinstance(value, str):
+                    value = datetime.strptime(value, TIME_FORMAT).timestamp()
+                packed.append(int(value))
+            elif field.kind != 'ascii':
+                packed.append(int(float(value)) if isinstance(value, str) else int(value))
+            else:
+                if isinstance(value, str):
+                    value = value.encode('ascii')
+                packed.append(value[:field.size].ljust(field.size, b' '))
+        return self.struct.pack(*packed)
+
+
+class CommandSchema:
+    """
+    Schemat komendy: pola DATA żądania (od integratora) i odpowiedzi (od serwera).
+    STATUS i REQUEST (po 1B) poprzedzają pola w obu kierunkach.
+    """
+    __slots__ = ('command_id', 'name', 'request', 'reply', 'version')
+
+    def __init__(self, command_id: int, name: str,
+                 request: Tuple[FieldSpec, ...] = (),
+                 reply: Tuple[FieldSpec, ...] = (),
+                 version: int = PROTOCOL_V1):
+        self.command_id = command_id
+        self.name = name
+        self.request = CompiledLayout(request)
+        self.reply = CompiledLayout(reply)
+        self.version = version
+
+
+# Rejestr schematów: COMMAND_ID -> CommandSchema (VERSION 1)
+COMMAND_SCHEMAS: Dict[int, CommandSchema] = {}
+# Schematy innych wersji protokołu: (COMMAND_ID, VERSION) -> CommandSchema
+VERSIONED_SCHEMAS: Dict[Tuple[int, int], CommandSchema] = {}
+
+
+def register_schema(command_id: int, name: str,
+                    request: Tuple[FieldSpec, ...] = (),
+                    reply: Tuple[FieldSpec, ...] = (),
+                    version: int = PROTOCOL_V1) -> CommandSchema:
+    """
+    Rejestruje schemat komendy. Ponowna rejestracja nadpisuje schemat.
+    """
+    schema = CommandSchema(command_id, name, request, reply, version)
+    if version == PROTOCOL_V1:
+        COMMAND_SCHEMAS[command_id] = schema
+    else:
+        VERSIONED_SCHEMAS[(command_id, version)] = schema
+    return schema
+
+
+def get_schema(command_id: int, version: int = PROTOCOL_V1) -> Optional[CommandSchema]:
+    """
+    Zwraca schemat komendy lub None. Komendy bez osobnego schematu
+    dla danej wersji protokołu używają schematu VERSION 1.
+    """
+    if version != PROTOCOL_V1:
+        schema = VERSIONED_SCHEMAS.get((command_id, version))
+        if schema is not None:
+            return schema
+    return COMMAND_SCHEMAS.get(command_id)
+
+
+register_schema(0x0000, "REGISTER_UNIT", reply=(
+    FieldSpec("currentTime", 19),
+))
+
+register_schema(0x0001, "CMD_1")
+
+register_schema(0x0002, "CAPTURE_ALIASES", request=(
+    FieldSpec("company", 10),
+    FieldSpec("location", 10),
+    FieldSpec("productName", 10),
+    FieldSpec("scaleId", 10),
+))
+
+register_schema(0x0003, "MEASURE_DATA", request=(
+    FieldSpec("speed", 6),
+    FieldSpec("rate", 7),
+    FieldSpec("total", 12),
+    FieldSpec("currentTime", 19),
+))
+
+register_schema(0x0004, "CAPTURE_DYNAMIC", request=(
+    FieldSpec("mvReading", 8),
+    FieldSpec("convDigits", 8),
+    FieldSpec("scaleWeight", 8),
+    FieldSpec("beltWeight", 8),
+    FieldSpec("zeroFactor", 8),
+    FieldSpec("currentTime", 19),
+))
+
+register_schema(0x0005, "CAPTURE_STATIC", request=(
+    FieldSpec("filterRate", 1),
+    FieldSpec("scaleCapacity", 8),
+    FieldSpec("autoZero", 8),
+    FieldSpec("deadBand", 8),
+    FieldSpec("scaleType", 1),
+    FieldSpec("loadcellSet", 1),
+    FieldSpec("loadcellCapacity", 8),
+    FieldSpec("trimm", 8),
+    FieldSpec("idlerSpacing", 8),
+    FieldSpec("speedSource", 1),
+    FieldSpec("wheelDiameter", 8),
+    FieldSpec("pulsesPerRev", 8),
+    FieldSpec("beltLength", 8),
+    FieldSpec("beltLengthPulses", 8),
+    FieldSpec("currentTime", 19),
+))
+
+register_schema(0x0006, "SERVICE_DATA", reply=(
+    FieldSpec("paramAddress", 1, 'u8'),
+    FieldSpec("paramData", 19),
+))
+
+# VERSION 2: MEASURE_DATA binarnie - 20B zamiast 44B tekstu.
+# Odpowiedź podaje interwał [s] do następnej ramki (polityka z report_interval_store).
+register_schema(0x0003, "MEASURE_DATA", version=PROTOCOL_V2, request=(
+    FieldSpec("speed", 4, 'f32'),
+    FieldSpec("rate", 4, 'f32'),
+    FieldSpec("total", 8, 'u64'),
+    FieldSpec("currentTime", 4, 'epoch32'),
+), reply=(
+    FieldSpec("reportInterval", 2, 'u16'),
+))
+
+# MEASURE_BATCH: nagłówek paczki, po nim recordCount rekordów w układzie MEASURE_RECORD.
+# Rekordy numerowane są kolejno od firstRecord; odpowiedź potwierdza ostatni przyjęty numer.
+register_schema(0x0007, "MEASURE_BATCH", request=(
+    FieldSpec("firstRecord", 4, 'u32'),
+    FieldSpec("recordCount", 1, 'u8'),
+), reply=(
+    FieldSpec("lastRecord", 4, 'u32'),
+))
+
+# Rekord pomiaru w MEASURE_BATCH - układ binarny MEASURE_DATA VERSION 2 (niezależnie od VERSION ramki)
+MEASURE_RECORD = CompiledLayout(VERSIONED_SCHEMAS[(0x0003, PROTOCOL_V2)].request.fields)
+# DATA_LEN (1B) obejmuje STATUS, REQUEST, nagłówek paczki i rekordy
+MAX_BATCH_RECORDS = (0xFF - 2 - COMMAND_SCHEMAS[0x0007].request.size) // MEASURE_RECORD.size
@@ -0,0 +1,186 @@
+import os
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+from sqlalchemy.orm import Session
+
+from models.models import ReportInterval
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Zakres pola reportInterval w odpowiedzi (u16, sekundy)
+MIN_INTERVAL = 1
+MAX_INTERVAL = 0xFFFF
+
+
+class ReportIntervalPolicy(NamedTuple):
+    """
+    Interwały raportowania MEASURE_DATA [s] zależne od stanu przenośnika
+
+    Attributes:
+        running: Taśma w ruchu
+        stopped: Taśma zatrzymana (prędkość = 0)
+        service: Urządzenie w sesji serwisowej
+    """
+    running: int = 5
+    stopped: int = 60
+    service: int = 1
+
+    def validated(self) -> "ReportIntervalPolicy":
+        """
+        Raises:
+            ValueError: gdy interwał jest poza zakresem pola reportInterval
+        """
+        for name, value in self._asdict().items():
+            if not MIN_INTERVAL <= int(value) <= MAX_INTERVAL:
+                raise ValueError(f"Interwał {name}={value} poza zakresem {MIN_INTERVAL}..{MAX_INTERVAL} s")
+        return ReportIntervalPolicy(*(int(value) for value in self))
+
+
+class ReportIntervalStore:
+    """
+    Polityka interwału raportowania per urządzenie.
+
+    Odpowiedź na MEASURE_DATA w VERSION 2 niesie pole reportInterval - czas [s]
+    do następnej ramki. Zatrzymana taśma raportuje rzadko, pracująca często,
+    a sesja serwisowa najczęściej. Urządzenia bez własnej polityki używają domyślnej.
+
+    Polityki zapisywane są w tabeli ReportInterval (wiersz DEFAULT_POLICY_ID - polityka
+    domyślna), więc przetrwają restart i są wspólne dla wszystkich workerów uvicorn.
+    Każdy proces trzyma kopię tabeli odświeżaną co refresh_seconds - zmiana zapisana
+    przez inny worker obowiązuje najpóźniej po tym czasie.
+    """
+
+    DEFAULT_POLICY_ID = '*'
+
+    def __init__(self, default: ReportIntervalPolicy = ReportIntervalPolicy(), refresh_seconds: float = 5.0):
+        """
+        Args:
+            default: Polityka domyślna, gdy tabela nie zawiera wiersza DEFAULT_POLICY_ID
+            refresh_seconds: Czas ważności kopii tabeli w procesie
+        """
+        self._env_default = default.validated()
+        self.refresh_seconds = refresh_seconds
+        self._default = self._env_default
+        self._policies: Dict[str, ReportIntervalPolicy] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _refresh(self, db: Session, force: bool = False) -> None:
+        """Wczytuje tabelę ReportInterval, gdy kopia w procesie jest starsza niż refresh_seconds"""
+        loaded_at = self._loaded_at
+        if not force and loaded_at is not None and time.monotonic() - loaded_at < self.refresh_seconds:
+            return
+        policies = {row.deviceId: ReportIntervalPolicy(row.running, row.stopped, row.service)
+                    for row in db.query(ReportInterval).all()}
+        with self._lock:
+            self._default = policies.pop(self.DEFAULT_POLICY_ID, self._env_default)
+            self._policies = policies
+            self._loaded_at = time.monotonic()
+
+    def _save(self, db: Session, device_id: str, policy: ReportIntervalPolicy) -> None:
+        db.merge(ReportInterval(deviceId=device_id, **policy._asdict()))
+        db.commit()
+        self._refresh(db, force=True)
+
+    def default(self, db: Session) -> ReportIntervalPolicy:
+        self._refresh(db)
+        return self._default
+
+    def set_default(self, db: Session, policy: ReportIntervalPolicy) -> None:
+        """
+        Raises:
+            ValueError: gdy interwał jest poza zakresem pola reportInterval
+        """
+        policy = policy.validated()
+        self._save(db, self.DEFAULT_POLICY_ID, policy)
+        logger.info(f"Domyślna polityka interwału raportowania: {policy._asdict()}")
+
+    def get_policy(self, db: Session, device_id: str) -> ReportIntervalPolicy:
+        self._refresh(db)
+        return self._policies.get(device_id, self._default)
+
+    def has_policy(self, db: Session, device_id: str) -> bool:
+        self._refresh(db)
+        return device_id in self._policies
+
+    def set_policy(self, db: Session, device_id: str, policy: ReportIntervalPolicy) -> None:
+        """
+        Raises:
+            ValueError: gdy interwał jest poza zakresem pola reportInterval
+                lub device_id jest identyfikatorem polityki domyślnej
+        """
+        if device_id == self.DEFAULT_POLICY_ID:
+            raise ValueError(f"'{device_id}' jest zarezerwowany dla polityki domyślnej")
+        policy = policy.validated()
+        self._save(db, device_id, policy)
+        logger.info(f"Polityka interwału raportowania dla {device_id}: {policy._asdict()}")
+
+    def reset_policy(self, db: Session, device_id: str) -> bool:
+        """Usuwa politykę urządzenia - wraca do domyślnej"""
+        if device_id == self.DEFAULT_POLICY_ID:
+            return False
+        removed = db.query(ReportInterval).filter(ReportInterval.deviceId == device_id).delete()
+        db.commit()
+        self._refresh(db, force=True)
+        return removed > 0
+
+    def interval_for(self, db: Session, device_id: str, speed: float, service_session: bool = False,
+                     speed_epsilon: float = 0.001) -> int:
+        """
+        Zwraca interwał raportowania [s] dla bieżącego stanu urządzenia
+
+        Args:
+            db: Sesja bazy danych (odczyt tabeli ReportInterval po upływie refresh_seconds)
+            device_id: DEVICE_ID
+            speed: Prędkość z ostatniej ramki
+            service_session: Czy urządzenie jest w sesji serwisowej
+            speed_epsilon: Prędkość traktowana jako zerowa
+        """
+        policy = self.get_policy(db, device_id)
+        if service_session:
+            return policy.service
+        return policy.running if abs(speed) > speed_epsilon else policy.stopped
+
+    def get_stats(self, db: Session) -> dict:
+        self._refresh(db)
+        with self._lock:
+            return {
+                "default": self._default._asdict(),
+                "devices": {device_id: policy._asdict() for device_id, policy in self._policies.items()},
+            }
+
+    def clear(self) -> None:
+        """Usuwa kopię tabeli w procesie - kolejny odczyt wczyta ją ponownie"""
+        with self._lock:
+            self._default = self._env_default
+            self._policies = {}
+            self._loaded_at = None
+
+
+def _env_policy() -> ReportIntervalPolicy:
+    default = ReportIntervalPolicy()
+    try:
+        return ReportIntervalPolicy(
+            running=int(os.getenv("REPORT_INTERVAL_RUNNING", default.running)),
+            stopped=int(os.getenv("REPORT_INTERVAL_STOPPED", default.stopped)),
+            service=int(os.getenv("REPORT_INTERVAL_SERVICE", default.service)),
+        ).validated()
+    except ValueError as e:
+        logger.error(f"Niepoprawna konfiguracja REPORT_INTERVAL_*: {e} - używam wartości domyślnych")
+        return default
+
+
+def _env_refresh() -> float:
+    try:
+        return float(os.getenv("REPORT_INTERVAL_REFRESH", "5"))
+    except ValueError:
+        logger.error("Niepoprawna konfiguracja REPORT_INTERVAL_REFRESH - używam 5 s")
+        return 5.0
+
+
+# Globalna instancja
+report_interval_store = ReportIntervalStore(_env_policy(), _env_refresh())
@@ -0,0 +1,165 @@
+import asyncio
+from typing import Optional, Union
+
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+
+from services.cipher import RC4KeyGenerator
+from services.command_handler import CommandHandler, FrameError
+from services.db_executor import ingest_executor
+from services.frame_splitter import FrameAssembler, MAX_FRAME_SIZE
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Maksymalna liczba ramek oczekujących na obsługę w jednym połączeniu -
+# po jej przekroczeniu wstrzymujemy odczyt z gniazda
+MAX_QUEUED_FRAMES = 64
+# Maksymalny rozmiar bufora niekompletnej ramki
+MAX_PENDING_BYTES = 4 * MAX_FRAME_SIZE
+
+
+class IntegratorTcpProtocol(asyncio.Protocol):
+    """
+    Połączenie TCP integratora: składa ramki ze strumienia bajtów,
+    obsługuje je po kolei i odsyła ramki odpowiedzi tym samym połączeniem
+    """
+
+    def __init__(self, server: 'IntegratorTcpServer'):
+        self.server = server
+        self.transport: Optional[asyncio.Transport] = None
+        self.peer = None
+        self.assembler = FrameAssembler(server.key1, server.key2)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._paused = False
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self.transport = transport
+        self.peer = transport.get_extra_info('peername')
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.get_running_loop().create_task(self._process_frames())
+        self.server.connections += 1
+        self.server.protocols.add(self)
+        logger.info(f"TCP: nowe połączenie integratora {self.peer}")
+
+    def data_received(self, data: bytes) -> None:
+        for frame in self.assembler.feed(data):
+            self._queue.put_nowait(frame)
+
+        if self.assembler.pending > MAX_PENDING_BYTES:
+            logger.warning(f"TCP: przepełnienie bufora ramki od {self.peer}, czyszczenie")
+            self.assembler.reset()
+
+        # Kontrola przepływu - nie czytamy, dopóki zaległe ramki nie zostaną obsłużone
+        if not self._paused and self._queue.qsize() >= MAX_QUEUED_FRAMES:
+            self._paused = True
+            self.transport.pause_reading()
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.server.connections -= 1
+        self.server.protocols.discard(self)
+        self.server.frames_rejected += self.assembler.frames_rejected
+        if self._worker is not None:
+            self._worker.cancel()
+        logger.info(f"TCP: zamknięto połączenie {self.peer}"
+                    f" (ramki: {self.assembler.frames_total}, odrzucone: {self.assembler.frames_rejected})")
+
+    async def _process_frames(self) -> None:
+        """Obsługuje ramki w kolejności odbioru - odpowiedzi wracają w tej samej kolejności"""
+        while True:
+            frame = await self._queue.get()
+            reply = await ingest_executor.run(self.server.handle_frame, frame)
+            if reply and not self.transport.is_closing():
+                self.transport.write(reply)
+
+            if self._paused and self._queue.qsize() < MAX_QUEUED_FRAMES // 2:
+                self._paused = False
+                self.transport.resume_reading()
+
+
+class IntegratorTcpServer:
+    """
+    Nasłuch TCP dla integratorów działający obok uvicorn w tej samej pętli asyncio.
+    Ramki są obsługiwane tą samą logiką co endpoint /commands/analyze
+    (CommandHandler.process_frame), bez narzutu HTTP. Zapis do bazy odbywa się
+    w puli ingest_executor - tej samej co dla endpointów HTTP.
+    """
+
+    def __init__(self, key1: Union[str, bytes], key2: Union[str, bytes],
+                 iterations: int = RC4KeyGenerator.DEFAULT_ITERATIONS):
+        """
+        Args:
+            key1: Pierwszy klucz RC4
+            key2: Drugi klucz RC4
+            iterations: Liczba iteracji wyliczania klucza RC4
+        """
+        self.key1 = key1
+        self.key2 = key2
+        self.iterations = iterations
+        self.command_handler = CommandHandler(key1, key2)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.protocols = set()
+        # Statystyki
+        self.connections = 0
+        self.frames_total = 0
+        self.frames_rejected = 0
+        self.errors = 0
+
+    def handle_frame(self, db: Session, frame: bytes) -> Optional[bytes]:
+        """
+        Obsługuje jedną kompletną ramkę (wywoływane w wątku ingest_executor)
+
+        Returns:
+            Optional[bytes]: Ramka odpowiedzi lub None, gdy nie ma czego odesłać
+        """
+        try:
+            response = self.command_handler.process_frame(frame, db, self.iterations)
+            self.frames_total += 1
+            if isinstance(response, Response):
+                return response.body
+            return None
+        except FrameError as e:
+            self.frames_rejected += 1
+            logger.warning(f"TCP: odrzucono ramkę: {e}")
+            return None
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"TCP: błąd obsługi ramki: {e}")
+            db.rollback()
+            return None
+
+    @property
+    def is_running(self) -> bool:
+        return self._server is not None
+
+    async def start(self, host: str, port: int) -> None:
+        """Uruchamia nasłuch na podanym adresie"""
+        if self._server is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._server = await loop.create_server(lambda: IntegratorTcpProtocol(self), host, port)
+        logger.info(f"TCP: nasłuch integratorów na {host}:{port}")
+
+    async def stop(self) -> None:
+        """Zatrzymuje nasłuch i zamyka połączenia integratorów"""
+        if self._server is None:
+            return
+        self._server.close()
+        # Zamknięcie otwartych połączeń - inaczej wait_closed czekałby na rozłączenie integratorów
+        for protocol in list(self.protocols):
+            protocol.transport.close()
+        await self._server.wait_closed()
+        self._server = None
+        logger.info("TCP: zatrzymano nasłuch integratorów")
+
+    def get_stats(self) -> dict:
+        """Zwraca statystyki nasłuchu"""
+        return {
+            "running": self.is_running,
+            "connections": self.connections,
+            "frames_total": self.frames_total,
+            "frames_rejected": self.frames_rejected,
+            "errors": self.errors,
+        }
@@ -4,6 +4,9 @@ from typing import Optional, ClassVar
 from pydantic import BaseModel
 import struct
 
+from services import checksum, frame_builder
+from services.frame_view import FrameView
+
 class IntegratorProtocol(BaseModel):
     """
     Pełna specyfikacja protokołu integratora
@@ -87,39 +90,17 @@ class IntegratorProtocol(BaseModel):
         def calculate_crc8(data: bytes) -> int:
             """
             Oblicza sumę kontrolną CRC8 dla DATA_LEN i DATA
+            (wielomian 0x07, implementacja wspólna z services.checksum)
             """
-            crc = 0x00  # wartość początkowa
-            polynomial = 0x07  # wielomian CRC-8
-            
-            for byte in data:
-                crc ^= byte
-                for _ in range(8):
-                    if crc & 0x80:
-                        crc = (crc << 1) ^ polynomial
-                    else:
-                        crc <<= 1
-                crc &= 0xFF
-            
-            return crc
+            return checksum.crc8(data)
 
         @staticmethod
         def calculate_crc16(data: bytes) -> int:
             """
             Oblicza sumę kontrolną CRC16 dla HEADER + JAWNA + SZYFROWANA
+            (CRC16-CCITT, implementacja wspólna z services.checksum)
             """
-            crc = 0xFFFF  # wartość początkowa
-            polynomial = 0x1021  # wielomian CRC-16-CCITT
-            
-            for byte in data:
-                crc ^= (byte << 8)
-                for _ in range(8):
-                    if crc & 0x8000:
-                        crc = (crc << 1) ^ polynomial
-                    else:
-                        crc <<= 1
-                crc &= 0xFFFF
-            
-            return crc
+            return checksum.crc16_ccitt(data)
 
     class Parser:
         """
@@ -148,21 +129,36 @@ class IntegratorProtocol(BaseModel):
             """
             Deszyfruje dane używając RC4 z odpowiednim kluczem
             """
-            # TODO: Implementacja deszyfrowania RC4
-            pass
+            key = IntegratorProtocol.CipherConfig.DEFAULT_KEY
+            return frame_builder.decrypt_frame(data, key)
+
+        @staticmethod
+        def parse_payload(data: bytes):
+            """
+            Zwraca widok pól komendy według schematu protokołu
+            """
+            return FrameView(data).payload()
 
     class Builder:
         """
         Metody do budowania ramek
         """
         @staticmethod
-        def create_frame(device_id: bytes, command_id: bytes, 
+        def create_frame(device_id: bytes, command_id: bytes,
                         data: bytes, encrypt: bool = False) -> bytes:
             """
             Tworzy kompletną ramkę protokołu
             """
-            # TODO: Implementacja tworzenia ramki
-            pass
+            # data zawiera pole DATA (STATUS, REQUEST i pola komendy)
+            return frame_builder.build_request_frame(
+                device_id,
+                int.from_bytes(command_id, 'big'),
+                status=data[0] if len(data) > 0 else 0x00,
+                request=data[1] if len(data) > 1 else 0x00,
+                payload=bytes(data[2:]),
+                encrypt=encrypt,
+                key1=IntegratorProtocol.CipherConfig.DEFAULT_KEY
+            )
 
     # Stałe protokołu
     MIN_FRAME_SIZE: ClassVar[int] = (FrameSegments.Header.TOTAL_SIZE +
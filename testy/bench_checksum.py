@@ -0,0 +1,41 @@
+# Uruchomienie: python -m testy.bench_checksum
+import os
+import time
+
+from services import checksum
+
+
+def zmierz(funkcja, data: bytes, powtorzenia: int) -> float:
+    """Zwraca przepustowość funkcji w MB/s"""
+    start = time.perf_counter()
+    for _ in range(powtorzenia):
+        funkcja(data)
+    elapsed = time.perf_counter() - start
+    return len(data) * powtorzenia / elapsed / 1e6
+
+
+if __name__ == "__main__":
+    # Typowa ramka MEASURE_DATA bez stopki ma 69 bajtów
+    ramka = os.urandom(69)
+
+    implementacje = [
+        ("crc16 bitowo (referencja)", checksum.crc16_ccitt_bitwise, 2000),
+        ("crc16 tablica 256", checksum.crc16_ccitt_table, 20000),
+        ("crc16 binascii.crc_hqx", checksum.crc16_ccitt, 500000),
+    ]
+
+    try:
+        from crc import Calculator, Configuration
+
+        calculator = Calculator(Configuration(
+            width=16, polynomial=0x1021, init_value=0xFFFF,
+            final_xor_value=0x0000, reverse_input=False, reverse_output=False
+        ))
+        implementacje.insert(1, ("crc16 pakiet crc", calculator.checksum, 2000))
+    except ImportError:
+        pass
+
+    for nazwa, funkcja, powtorzenia in implementacje:
+        mb_s = zmierz(funkcja, ramka, powtorzenia)
+        ns_ramka = len(ramka) / (mb_s * 1e6) * 1e9
+        print(f"{nazwa:30s} {mb_s:10.2f} MB/s {ns_ramka:12.0f} ns/ramka")
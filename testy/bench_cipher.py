@@ -0,0 +1,44 @@
+# Uruchomienie: python -m testy.bench_cipher
+import time
+
+from Crypto.Cipher import ARC4
+
+from services.cipher import RC4KeyGenerator
+
+
+# Przykładowy segment SZYFROWANA ramki MEASURE_DATA (DATA_LEN + DATA + CRC8)
+SEGMENT = bytes([46]) + bytes(46) + bytes([0])
+
+
+def koszt_ramki(key1: str, key2: str, use_cache: bool) -> None:
+    """
+    Symuluje koszt kryptograficzny jednej ramki:
+    odszyfrowanie żądania i zaszyfrowanie odpowiedzi.
+    """
+    key = RC4KeyGenerator.generate_key(key1, key2, use_cache=use_cache)
+    ARC4.new(key).decrypt(SEGMENT)
+    key = RC4KeyGenerator.generate_key(key1, key2, use_cache=use_cache)
+    ARC4.new(key).encrypt(SEGMENT[:4])
+
+
+def zmierz(ramki: int, use_cache: bool, key1: str = "Massensors", key2: str = "text") -> float:
+    """Zwraca średni czas obsługi ramki w mikrosekundach"""
+    RC4KeyGenerator.invalidate_cache()
+    if use_cache:
+        RC4KeyGenerator.precompute_key(key1, key2)
+
+    start = time.perf_counter()
+    for _ in range(ramki):
+        koszt_ramki(key1, key2, use_cache)
+    elapsed = time.perf_counter() - start
+
+    return elapsed / ramki * 1e6
+
+
+if __name__ == "__main__":
+    bez_cache = zmierz(200, use_cache=False)
+    z_cache = zmierz(20000, use_cache=True)
+
+    print(f"Bez cache kluczy: {bez_cache:10.1f} us/ramka")
+    print(f"Z cache kluczy:   {z_cache:10.1f} us/ramka")
+    print(f"Przyspieszenie:   {bez_cache / z_cache:10.1f}x")
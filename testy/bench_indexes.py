@@ -0,0 +1,124 @@
+# Uruchomienie: python -m testy.bench_indexes [--rows 10000000] [--devices 20] [--database /tmp/bench_indexes.db]
+"""
+Plany zapytań (EXPLAIN QUERY PLAN) i czasy typowych zapytań routerów
+przed i po migracji indeksów (repositories.migrations, wersja 2).
+"""
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine
+
+from repositories.migrations import apply_migrations, current_version
+
+START = int(datetime(2022, 1, 1).timestamp())
+KROK = 5  # odczyt co 5 s
+
+# Schemat tabel w wersji 1 (kolumny liczbowe, bez indeksów deviceId / czasu)
+SCHEMAT = [
+    'CREATE TABLE "MeasureData" (id INTEGER PRIMARY KEY, "deviceId" VARCHAR, speed VARCHAR, rate VARCHAR, '
+    'total VARCHAR, "currentTime" VARCHAR, "speedValue" FLOAT, "rateValue" FLOAT, "totalValue" FLOAT, '
+    '"timeEpoch" INTEGER, "receivedAt" INTEGER)',
+    'CREATE TABLE "Aliases" (id INTEGER PRIMARY KEY, "deviceId" VARCHAR, company VARCHAR, location VARCHAR, '
+    '"productName" VARCHAR, "scaleId" VARCHAR)',
+    'CREATE TABLE "StaticParams" (id INTEGER PRIMARY KEY, "deviceId" VARCHAR, "filterRate" VARCHAR, '
+    '"currentTime" VARCHAR)',
+]
+
+ZAPYTANIA = [
+    ("lista / wykres (urządzenie + zakres czasu)",
+     'SELECT * FROM "MeasureData" WHERE "deviceId" = :device AND "timeEpoch" >= :od AND "timeEpoch" <= :do '
+     'ORDER BY "timeEpoch"'),
+    ("podsumowanie okresu",
+     'SELECT count(id), min("timeEpoch"), max("timeEpoch"), avg("speedValue"), min("speedValue"), '
+     'max("speedValue"), avg("rateValue"), min("rateValue"), max("rateValue"), sum("totalValue") '
+     'FROM "MeasureData" WHERE "deviceId" = :device AND "timeEpoch" >= :od AND "timeEpoch" <= :do'),
+    ("najnowszy rekord urządzenia",
+     'SELECT * FROM "MeasureData" WHERE "deviceId" = :device ORDER BY id DESC LIMIT 1'),
+    ("liczba rekordów urządzenia",
+     'SELECT count(*) FROM "MeasureData" WHERE "deviceId" = :device'),
+    ("liczba rekordów w zakresie czasu",
+     'SELECT count(id) FROM "MeasureData" WHERE "timeEpoch" >= :od AND "timeEpoch" <= :do'),
+    ("alias urządzenia",
+     'SELECT * FROM "Aliases" WHERE "deviceId" = :device LIMIT 1'),
+    ("parametry urządzenia",
+     'SELECT * FROM "StaticParams" WHERE "deviceId" = :device ORDER BY id DESC LIMIT 1'),
+]
+
+
+def przygotuj_baze(sciezka: str, wiersze: int, urzadzenia: int) -> None:
+    """Baza w schemacie wersji 1 z odczytami urządzeń przeplecionymi w czasie"""
+    if os.path.exists(sciezka):
+        os.remove(sciezka)
+    polaczenie = sqlite3.connect(sciezka)
+    polaczenie.execute('PRAGMA journal_mode = OFF')
+    polaczenie.execute('PRAGMA synchronous = OFF')
+    for ddl in SCHEMAT:
+        polaczenie.execute(ddl)
+
+    def rekordy():
+        for i in range(wiersze):
+            epoka = START + (i // urzadzenia) * KROK
+            speed, rate, total = 1.5, 200.0 + i % 97, i * 0.05
+            yield (f"DEV{i % urzadzenia:03d}", f"{speed:.2f}", f"{rate:.1f}", f"{total:.2f}",
+                   datetime.fromtimestamp(epoka).strftime("%Y-%m-%d %H:%M:%S"),
+                   speed, rate, total, epoka, epoka)
+
+    polaczenie.executemany(
+        'INSERT INTO "MeasureData" ("deviceId", speed, rate, total, "currentTime", "speedValue", "rateValue", '
+        '"totalValue", "timeEpoch", "receivedAt") VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rekordy()
+    )
+    polaczenie.executemany('INSERT INTO "Aliases" ("deviceId", company) VALUES (?, ?)',
+                           [(f"DEV{d:03d}", "Firma") for d in range(urzadzenia)] * 50)
+    polaczenie.executemany('INSERT INTO "StaticParams" ("deviceId", "filterRate") VALUES (?, ?)',
+                           [(f"DEV{d:03d}", "1") for d in range(urzadzenia)] * 50)
+    polaczenie.commit()
+    polaczenie.close()
+
+
+def pokaz_plany(sciezka: str, parametry: dict, powtorzenia: int = 3) -> None:
+    polaczenie = sqlite3.connect(sciezka)
+    for nazwa, sql in ZAPYTANIA:
+        plan = [wiersz[3] for wiersz in polaczenie.execute(f"EXPLAIN QUERY PLAN {sql}", parametry)]
+        start = time.perf_counter()
+        for _ in range(powtorzenia):
+            polaczenie.execute(sql, parametry).fetchall()
+        ms = (time.perf_counter() - start) / powtorzenia * 1000
+        print(f"  {nazwa:<45} {ms:>10.2f} ms")
+        for krok in plan:
+            print(f"      {krok}")
+    polaczenie.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plany zapytań przed i po migracji indeksów")
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--devices', type=int, default=20)
+    parser.add_argument('--database', default='/tmp/bench_indexes.db')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    przygotuj_baze(args.database, args.rows, args.devices)
+    print(f"Baza {args.database}: {args.rows} rekordów, {args.devices} urządzeń "
+          f"({time.perf_counter() - start:.1f} s, {os.path.getsize(args.database) / 1e6:.0f} MB)")
+
+    engine = create_engine(f'sqlite:///{args.database}')
+    apply_migrations(engine, target=1)
+
+    # Jeden dzień danych urządzenia ze środka zakresu
+    srodek = START + (args.rows // args.devices) * KROK // 2
+    parametry = {"device": f"DEV{args.devices // 2:03d}", "od": srodek, "do": srodek + 86400}
+
+    print(f"\nPrzed migracją (wersja {current_version(engine)}):")
+    pokaz_plany(args.database, parametry)
+
+    start = time.perf_counter()
+    apply_migrations(engine)
+    print(f"\nMigracja indeksów: {time.perf_counter() - start:.1f} s, "
+          f"rozmiar bazy {os.path.getsize(args.database) / 1e6:.0f} MB")
+
+    print(f"\nPo migracji (wersja {current_version(engine)}):")
+    pokaz_plany(args.database, parametry)
+    engine.dispose()
@@ -0,0 +1,132 @@
+# Uruchomienie: python -m testy.bench_storage [--rows 1000000] [--seconds 10] [--profiles compat,durable,balanced]
+"""
+Szybkość zapisu ramek (pojedyncze commity jak w ingest_executor) podczas
+równoległego ciężkiego raportu - porównanie profili SQLite (repositories.sqlite_profile).
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from models.models import MeasureData
+from repositories.database import Base
+from repositories.migrations import apply_migrations
+from repositories.sqlite_profile import apply_profile, get_profile
+from services.measure_values import with_typed_values
+
+START = int(datetime(2024, 1, 1).timestamp())
+URZADZENIA = 20
+
+# Raport: agregaty wszystkich urządzeń po dniach + pełny odczyt jednego urządzenia
+RAPORT = [
+    'SELECT "deviceId", "timeEpoch" / 86400, count(id), avg("rateValue"), max("speedValue"), sum("totalValue") '
+    'FROM "MeasureData" GROUP BY 1, 2',
+    'SELECT * FROM "MeasureData" WHERE "deviceId" = \'DEV007\' ORDER BY "timeEpoch"',
+]
+
+
+def przygotuj_baze(sciezka: str, wiersze: int) -> None:
+    for plik in (sciezka, f"{sciezka}-wal", f"{sciezka}-shm"):
+        if os.path.exists(plik):
+            os.remove(plik)
+    engine = create_engine(f"sqlite:///{sciezka}")
+    Base.metadata.create_all(bind=engine)
+    apply_migrations(engine)
+    engine.dispose()
+
+    polaczenie = sqlite3.connect(sciezka)
+    polaczenie.executemany(
+        'INSERT INTO "MeasureData" ("deviceId", speed, rate, total, "currentTime", "speedValue", "rateValue", '
+        '"totalValue", "timeEpoch", "receivedAt") VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        ((f"DEV{i % URZADZENIA:03d}", "1.50", "200.0", f"{i * 0.05:.2f}", "", 1.5, 200.0, i * 0.05,
+          START + i // URZADZENIA * 5, START + i // URZADZENIA * 5) for i in range(wiersze))
+    )
+    polaczenie.commit()
+    polaczenie.close()
+
+
+def raporty(engine, stop: threading.Event, wynik: dict) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        with engine.connect() as connection:
+            for sql in RAPORT:
+                connection.execute(text(sql)).fetchall()
+        wynik["raporty"] += 1
+        wynik["raport_s"] = max(wynik["raport_s"], time.perf_counter() - start)
+
+
+def zapis(engine, sekundy: float) -> dict:
+    """Zapis rekordów pojedynczymi commitami przez sekundy"""
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    czasy, bledy, i = [], 0, 0
+    koniec = time.perf_counter() + sekundy
+    while time.perf_counter() < koniec:
+        db = session_factory()
+        start = time.perf_counter()
+        try:
+            db.add(MeasureData(**with_typed_values({
+                'deviceId': f"DEV{i % URZADZENIA:03d}", 'speed': "1.50", 'rate': "210.0", 'total': f"{i}",
+                'currentTime': datetime.now().strftime("%Y-%m-%d %H:%M:%S")})))
+            db.commit()
+            czasy.append(time.perf_counter() - start)
+        except OperationalError:
+            db.rollback()
+            bledy += 1
+        finally:
+            db.close()
+        i += 1
+    czasy.sort()
+    return {
+        "zapisy_s": len(czasy) / sekundy,
+        "p99_ms": czasy[int(len(czasy) * 0.99)] * 1000 if czasy else 0.0,
+        "max_ms": czasy[-1] * 1000 if czasy else 0.0,
+        "bledy": bledy,
+    }
+
+
+def zmierz(sciezka: str, nazwa: str, sekundy: float, z_raportem: bool) -> None:
+    profil = get_profile(nazwa)
+    writer = create_engine(f"sqlite:///{sciezka}", pool_size=1, max_overflow=0,
+                           connect_args={"check_same_thread": False, "timeout": 30})
+    reader = create_engine(f"sqlite:///{sciezka}", connect_args={"check_same_thread": False, "timeout": 30})
+    apply_profile(writer, profil)
+    apply_profile(reader, profil, read_only=True)
+
+    stop = threading.Event()
+    wynik_raportow = {"raporty": 0, "raport_s": 0.0}
+    watek = threading.Thread(target=raporty, args=(reader, stop, wynik_raportow), daemon=True)
+    if z_raportem:
+        watek.start()
+        time.sleep(0.2)
+    wynik = zapis(writer, sekundy)
+    stop.set()
+    if z_raportem:
+        watek.join()
+
+    opis = "z raportem" if z_raportem else "bez raportu"
+    print(f"  {nazwa:<10} {opis:<12} {wynik['zapisy_s']:>9.0f} zapisów/s   p99 {wynik['p99_ms']:>8.2f} ms   "
+          f"max {wynik['max_ms']:>8.1f} ms   błędy {wynik['bledy']:>3}   "
+          f"raporty {wynik_raportow['raporty']} (najdłuższy {wynik_raportow['raport_s']:.2f} s)")
+    writer.dispose()
+    reader.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Zapis ramek podczas równoległego raportu - profile SQLite")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--profiles', default="compat,durable,balanced")
+    parser.add_argument('--database', default='/tmp/bench_storage.db')
+    args = parser.parse_args()
+
+    for nazwa in args.profiles.split(","):
+        przygotuj_baze(args.database, args.rows)
+        print(f"Profil {nazwa}: {get_profile(nazwa)._asdict()}")
+        zmierz(args.database, nazwa, args.seconds, z_raportem=False)
+        zmierz(args.database, nazwa, args.seconds, z_raportem=True)
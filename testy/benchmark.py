@@ -0,0 +1,222 @@
+# Uruchomienie: python -m testy.benchmark [--output wyniki.json] [--compare baseline.json]
+"""
+Mikrobenchmarki ścieżki obsługi ramki - bez serwera.
+
+Dla każdej funkcji (ramki jawne i szyfrowane) mierzone są:
+    ns_op          - minimalny czas jednego wywołania z kilku powtórzeń [ns]
+    alloc_bytes_op - szczytowa ilość pamięci zaalokowanej w trakcie wywołania (tracemalloc) [B]
+    alloc_blocks_op - liczba bloków pamięci pozostających po wywołaniu (wynik i obiekty z nim związane)
+
+Tryb --compare porównuje wyniki z zapisanym plikiem bazowym i zgłasza
+regresje ns/op większe niż --threshold (kod wyjścia 1).
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from repositories.database import Base
+from services.cipher import RC4KeyGenerator
+from services.command_handler import CommandHandler
+from services.duplicate_filter import duplicate_frame_filter
+from services.frame_builder import build_request_frame
+from services.support import ProtocolAnalyzer, CommandID
+
+KEY1 = "Massensors"
+KEY2 = "text"
+ITERATIONS = RC4KeyGenerator.DEFAULT_ITERATIONS
+
+POLA_KOMEND = {
+    CommandID.REGISTER_UNIT: {},
+    CommandID.CMD_1: {},
+    CommandID.MEASURE_DATA: {'speed': "0.85", 'rate': "256.6", 'total': "92346",
+                             'currentTime': "2025-06-15 10:56:03"},
+    CommandID.CAPTURE_ALIASES: {'company': "Massensors", 'location': "Linia 1",
+                                'productName': "Belt-Mate", 'scaleId': "BM #1"},
+    CommandID.CAPTURE_DYNAMIC: {'mvReading': "1.234", 'convDigits': "12345", 'scaleWeight': "12.5",
+                                'beltWeight': "3.2", 'zeroFactor': "0.001",
+                                'currentTime': "2025-06-15 10:56:03"},
+    CommandID.CAPTURE_STATIC: {'filterRate': "2", 'scaleCapacity': "1000", 'autoZero': "0.5",
+                               'deadBand': "0.1", 'scaleType': "1", 'loadcellSet': "2",
+                               'loadcellCapacity': "500", 'trimm': "1.0", 'idlerSpacing': "1.2",
+                               'speedSource': "1", 'wheelDiameter': "0.3", 'pulsesPerRev': "100",
+                               'beltLength': "120", 'beltLengthPulses': "40000",
+                               'currentTime': "2025-06-15 10:56:03"},
+    CommandID.SERVICE_DATA: {},
+}
+
+
+def ramka(command_id: int, szyfrowana: bool) -> bytes:
+    return build_request_frame("BENCH", command_id, status=0x01, encrypt=szyfrowana,
+                               key1=KEY1, key2=KEY2, **POLA_KOMEND[command_id])
+
+
+def zmierz_czas(funkcja: Callable[[], object], min_czas: float, powtorzenia: int) -> Tuple[float, int]:
+    """
+    Kalibruje liczbę wywołań tak, by seria trwała co najmniej min_czas,
+    i zwraca (minimalny czas wywołania w ns, liczba wywołań w serii)
+    """
+    liczba = 1
+    while True:
+        start = time.perf_counter_ns()
+        for _ in range(liczba):
+            funkcja()
+        czas = time.perf_counter_ns() - start
+        if czas >= min_czas * 1e9 or liczba >= 1 << 24:
+            break
+        liczba *= 2 if czas == 0 else max(2, min(10, int(min_czas * 1e9 / czas) + 1))
+
+    najlepszy = czas / liczba
+    for _ in range(powtorzenia - 1):
+        start = time.perf_counter_ns()
+        for _ in range(liczba):
+            funkcja()
+        najlepszy = min(najlepszy, (time.perf_counter_ns() - start) / liczba)
+    return najlepszy, liczba
+
+
+def zmierz_alokacje(funkcja: Callable[[], object], liczba: int = 200) -> Tuple[float, float]:
+    """
+    Zwraca (średnia szczytowa pamięć wywołania [B], bloki pozostające po wywołaniu)
+    """
+    wyniki = []
+    tracemalloc.start()
+    try:
+        szczyt = 0
+        for _ in range(liczba):
+            tracemalloc.reset_peak()
+            przed = tracemalloc.get_traced_memory()[0]
+            wyniki.append(funkcja())
+            szczyt += tracemalloc.get_traced_memory()[1] - przed
+
+        przed = tracemalloc.take_snapshot()
+        for _ in range(liczba):
+            wyniki.append(funkcja())
+        po = tracemalloc.take_snapshot()
+        bloki = sum(stat.count_diff for stat in po.compare_to(przed, 'filename'))
+    finally:
+        tracemalloc.stop()
+    return szczyt / liczba, bloki / liczba
+
+
+def przypadki() -> List[Tuple[str, Callable[[], object]]]:
+    """Lista (nazwa, funkcja bez argumentów) do zmierzenia"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    handler = CommandHandler(KEY1, KEY2)
+    # Ta sama ramka wysyłana wielokrotnie - bez okna idempotencji mierzona jest pełna obsługa
+    duplicate_frame_filter.window_size = 0
+    RC4KeyGenerator.precompute_key(KEY1, KEY2, ITERATIONS)
+
+    lista = [
+        ("RC4KeyGenerator.create_cipher", lambda: RC4KeyGenerator.create_cipher(KEY1, KEY2)),
+    ]
+    for szyfrowana in (False, True):
+        rodzaj = "szyfrowana" if szyfrowana else "jawna"
+        pomiar = ramka(CommandID.MEASURE_DATA, szyfrowana)
+        odszyfrowana, _ = ProtocolAnalyzer.encode_data(pomiar, ITERATIONS, KEY1, KEY2)
+        lista += [
+            (f"validate_frame[{rodzaj}]", lambda r=pomiar: ProtocolAnalyzer.validate_frame(r)),
+            (f"encode_data[{rodzaj}]", lambda r=pomiar: ProtocolAnalyzer.encode_data(r, ITERATIONS, KEY1, KEY2)),
+            (f"process_frame MEASURE_DATA[{rodzaj}]", lambda r=pomiar: handler.process_frame(r, db, ITERATIONS)),
+        ]
+        for command_id in POLA_KOMEND:
+            dane, _ = ProtocolAnalyzer.encode_data(ramka(command_id, szyfrowana), ITERATIONS, KEY1, KEY2)
+            flaga = dane[3]
+            lista.append((f"handle_command {command_id.name}[{rodzaj}]",
+                          lambda c=command_id, d=dane, f=flaga: handler.handle_command(c, d, f, db)))
+
+    for command_id, parser in ((CommandID.MEASURE_DATA, ProtocolAnalyzer.parse_measure_data),
+                               (CommandID.CAPTURE_ALIASES, ProtocolAnalyzer.parse_alias_data),
+                               (CommandID.CAPTURE_STATIC, ProtocolAnalyzer.parse_static_data),
+                               (CommandID.CAPTURE_DYNAMIC, ProtocolAnalyzer.parse_dynamic_data)):
+        dane = ramka(command_id, False)
+        lista.append((f"{parser.__name__}", lambda p=parser, d=dane: p(d)))
+    return lista
+
+
+def uruchom(min_czas: float, powtorzenia: int, filtr: Optional[str]) -> Dict[str, dict]:
+    wyniki = {}
+    for nazwa, funkcja in przypadki():
+        if filtr and filtr not in nazwa:
+            continue
+        ns_op, liczba = zmierz_czas(funkcja, min_czas, powtorzenia)
+        bajty, bloki = zmierz_alokacje(funkcja, min(200, liczba))
+        wyniki[nazwa] = {
+            'ns_op': round(ns_op, 1),
+            'alloc_bytes_op': round(bajty, 1),
+            'alloc_blocks_op': round(bloki, 2),
+            'calls': liczba,
+        }
+        print(f"{nazwa:48s} {ns_op:14.1f} ns/op {bajty:10.1f} B/op {bloki:8.2f} bloków/op")
+    return wyniki
+
+
+def porownaj(wyniki: Dict[str, dict], bazowe: Dict[str, dict], prog: float) -> List[str]:
+    """Zwraca listę opisów regresji czasu względem wyników bazowych"""
+    regresje = []
+    print(f"\n{'funkcja':48s} {'bazowe':>12s} {'teraz':>12s} {'zmiana':>9s}")
+    for nazwa, wynik in wyniki.items():
+        baza = bazowe.get(nazwa)
+        if baza is None:
+            continue
+        zmiana = wynik['ns_op'] / baza['ns_op'] - 1.0 if baza['ns_op'] else 0.0
+        znacznik = ""
+        if zmiana > prog:
+            znacznik = "  REGRESJA"
+            regresje.append(f"{nazwa}: {baza['ns_op']:.1f} -> {wynik['ns_op']:.1f} ns/op ({zmiana * 100:+.1f}%)")
+        print(f"{nazwa:48s} {baza['ns_op']:12.1f} {wynik['ns_op']:12.1f} {zmiana * 100:+8.1f}%{znacznik}")
+    return regresje
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Mikrobenchmarki obsługi ramek protokołu")
+    parser.add_argument('--output', help="zapis wyników do pliku JSON")
+    parser.add_argument('--compare', help="plik JSON z wynikami bazowymi")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="dopuszczalny wzrost ns/op względem bazowych (0.10 = 10%%)")
+    parser.add_argument('--min-time', dest='min_time', type=float, default=0.2,
+                        help="minimalny czas serii pomiarowej [s]")
+    parser.add_argument('--repeat', type=int, default=5, help="liczba serii (wynik minimalny)")
+    parser.add_argument('--filter', help="mierz tylko funkcje zawierające podany tekst")
+    args = parser.parse_args(argv)
+
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    wyniki = uruchom(args.min_time, args.repeat, args.filter)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as plik:
+            json.dump({
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'python': sys.version.split()[0],
+                'platform': platform.platform(),
+                'results': wyniki,
+            }, plik, indent=2, ensure_ascii=False)
+        print(f"\nZapisano wyniki: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as plik:
+            bazowe = json.load(plik)['results']
+        regresje = porownaj(wyniki, bazowe, args.threshold)
+        if regresje:
+            print(f"\nRegresje powyżej {args.threshold * 100:.0f}%:")
+            for opis in regresje:
+                print(f"  {opis}")
+            return 1
+        print("\nBrak regresji")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Wspólne ustawienia testów: baza SQLite w katalogu tymczasowym zamiast ./measurement_system.db
+"""
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# repositories.database tworzy silniki i wywołuje init_db() przy imporcie - ścieżka
+# musi być ustawiona przed importem modułów testowych
+_KATALOG_BAZY = tempfile.mkdtemp(prefix="py_server3_testy_")
+os.environ["DATABASE_PATH"] = os.path.join(_KATALOG_BAZY, "measurement_system.db")
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_KATALOG_BAZY, ignore_errors=True)
+
+
+@pytest.fixture
+def baza_globalna(tmp_path, monkeypatch):
+    """
+    Plik bazy w tmp_path (jak silnik w test_frame_import) podstawiony za silniki
+    i fabryki sesji repositories.database oraz pul ingest_executor / query_executor
+
+    Returns:
+        sessionmaker: Fabryka sesji bazy testu
+    """
+    pytest.importorskip("sqlalchemy")
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    import models.models  # noqa: F401 - rejestracja tabel w Base.metadata
+    from repositories import database
+    from services.db_executor import ingest_executor, query_executor
+
+    sciezka = tmp_path / "baza.db"
+    engine = create_engine(f"sqlite:///{sciezka}", connect_args={"check_same_thread": False})
+    database.Base.metadata.create_all(bind=engine)
+    sesje = sessionmaker(bind=engine, autoflush=False)
+
+    for nazwa in ("engine", "writer_engine", "read_engine"):
+        monkeypatch.setattr(database, nazwa, engine)
+    for nazwa in ("SessionLocal", "WriterSessionLocal", "ReadSessionLocal"):
+        monkeypatch.setattr(database, nazwa, sesje)
+    monkeypatch.setattr(ingest_executor, "session_factory", sesje)
+    monkeypatch.setattr(query_executor, "session_factory", sesje)
+
+    async_engine = None
+    try:
+        import aiosqlite  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{sciezka}")
+        monkeypatch.setattr(database, "async_engine", async_engine)
+        monkeypatch.setattr(database, "AsyncSessionLocal", sessionmaker(
+            bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False))
+
+    yield sesje
+
+    if async_engine is not None:
+        async_engine.sync_engine.dispose()
+    engine.dispose()
@@ -0,0 +1,368 @@
+# Uruchomienie: python -m testy.symulator --integratory 50 --tempo 200 --czas 30 --tryb inproc
+"""
+Symulator floty integratorów i generator obciążenia serwera.
+
+Każdy integrator odtwarza cykl pracy przenośnika (praca / postój, zerowanie
+licznika sumy) i wysyła ramki MEASURE_DATA oraz okresowo CAPTURE_ALIASES,
+CAPTURE_STATIC, CAPTURE_DYNAMIC i SERVICE_DATA - szyfrowane lub jawne.
+
+Tryby:
+    inproc - ramki obsługiwane bezpośrednio przez CommandHandler (baza z repositories.database)
+    http   - POST /commands/analyze na działającym serwerze
+    tcp    - nasłuch TCP integratorów (services.tcp_listener)
+
+Raport: przepustowość, opóźnienia p50/p95/p99 i odsetek błędów.
+"""
+import argparse
+import http.client
+import json
+import math
+import random
+import socket
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from services.checksum import crc16_ccitt
+from services.frame_builder import build_request_frame, REPLY_BIT
+from services.frame_splitter import FrameAssembler
+from services.support import CommandID
+
+KEY1 = "Massensors"
+KEY2 = "text"
+
+# Udział komend w ruchu (pozostałe ramki to MEASURE_DATA)
+UDZIAL_KOMEND = {
+    CommandID.CAPTURE_DYNAMIC: 0.03,
+    CommandID.CAPTURE_ALIASES: 0.01,
+    CommandID.CAPTURE_STATIC: 0.01,
+    CommandID.SERVICE_DATA: 0.01,
+}
+
+
+class Integrator:
+    """
+    Symulowany integrator wagi przenośnikowej
+    """
+
+    def __init__(self, numer: int, szyfrowanie: bool, rng: random.Random):
+        self.device_id = f"SIM{numer:05d}"
+        self.szyfrowanie = szyfrowanie
+        self.rng = rng
+        self.seq_num = 0
+        self.pracuje = rng.random() < 0.7
+        self.do_zmiany_stanu = rng.uniform(30, 600)
+        self.predkosc_nominalna = rng.uniform(0.8, 2.5)
+        self.wydajnosc_nominalna = rng.uniform(50, 800)
+        self.suma = rng.uniform(0, 100000)
+        self.ostatni_czas = time.time()
+        self.zarejestrowany = False
+
+    def _krok(self, teraz: float) -> None:
+        """Aktualizuje stan przenośnika i licznik sumy"""
+        dt = max(0.0, teraz - self.ostatni_czas)
+        self.ostatni_czas = teraz
+        self.do_zmiany_stanu -= dt
+        if self.do_zmiany_stanu <= 0:
+            self.pracuje = not self.pracuje
+            self.do_zmiany_stanu = self.rng.uniform(60, 1800) if self.pracuje else self.rng.uniform(30, 600)
+        if self.pracuje:
+            self.suma += self.wydajnosc_nominalna * dt / 3600.0
+        # Sporadyczne zerowanie licznika sumy
+        if self.rng.random() < 0.0005:
+            self.suma = 0.0
+
+    def _pomiar(self) -> Dict[str, str]:
+        if self.pracuje:
+            predkosc = self.predkosc_nominalna * self.rng.uniform(0.97, 1.03)
+            wydajnosc = self.wydajnosc_nominalna * self.rng.uniform(0.8, 1.2)
+        else:
+            predkosc = 0.0
+            wydajnosc = 0.0
+        return {
+            'speed': f"{predkosc:.2f}",
+            'rate': f"{wydajnosc:.1f}",
+            'total': f"{self.suma:.1f}",
+            'currentTime': datetime.fromtimestamp(self.ostatni_czas).strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+    def _wybierz_komende(self) -> int:
+        if not self.zarejestrowany:
+            self.zarejestrowany = True
+            return CommandID.CAPTURE_ALIASES
+        los = self.rng.random()
+        for command_id, udzial in UDZIAL_KOMEND.items():
+            if los < udzial:
+                return command_id
+            los -= udzial
+        return CommandID.MEASURE_DATA
+
+    def nastepna_ramka(self, teraz: float) -> Tuple[int, bytes]:
+        """Zwraca (COMMAND_ID, ramka) kolejnego komunikatu integratora"""
+        self._krok(teraz)
+        command_id = self._wybierz_komende()
+        czas = datetime.fromtimestamp(teraz).strftime('%Y-%m-%d %H:%M:%S')
+
+        if command_id == CommandID.MEASURE_DATA:
+            pola = self._pomiar()
+        elif command_id == CommandID.CAPTURE_ALIASES:
+            pola = {'company': 'Symulacja', 'location': f"Linia {self.device_id[-2:]}",
+                    'productName': 'Belt-Mate', 'scaleId': self.device_id}
+        elif command_id == CommandID.CAPTURE_DYNAMIC:
+            pola = {'mvReading': f"{self.rng.uniform(0, 20):.3f}", 'convDigits': str(self.rng.randint(0, 99999)),
+                    'scaleWeight': f"{self.rng.uniform(0, 50):.2f}", 'beltWeight': f"{self.rng.uniform(0, 10):.2f}",
+                    'zeroFactor': f"{self.rng.uniform(-1, 1):.3f}", 'currentTime': czas}
+        elif command_id == CommandID.CAPTURE_STATIC:
+            pola = {'filterRate': '2', 'scaleCapacity': '1000', 'autoZero': '0.5', 'deadBand': '0.1',
+                    'scaleType': '1', 'loadcellSet': '2', 'loadcellCapacity': '500', 'trimm': '1.0',
+                    'idlerSpacing': '1.2', 'speedSource': '1', 'wheelDiameter': '0.3', 'pulsesPerRev': '100',
+                    'beltLength': '120', 'beltLengthPulses': '40000', 'currentTime': czas}
+        else:
+            pola = {}
+
+        self.seq_num = (self.seq_num + 1) & 0xFF
+        ramka = build_request_frame(self.device_id, command_id, status=0x01 if self.pracuje else 0x00,
+                                    encrypt=self.szyfrowanie, key1=KEY1, key2=KEY2,
+                                    timestamp=int(teraz), seq_num=self.seq_num, **pola)
+        return command_id, ramka
+
+
+def sprawdz_odpowiedz(ramka: bytes, command_id: int) -> None:
+    """
+    Sprawdza ramkę odpowiedzi serwera
+
+    Raises:
+        ValueError: gdy odpowiedź jest niepoprawna
+    """
+    if len(ramka) < 26 or ramka[:2] != b'\xAA\x55' or ramka[-1] != 0x55:
+        raise ValueError("znaczniki")
+    if int.from_bytes(ramka[-3:-1], 'big') != crc16_ccitt(ramka[:-3]):
+        raise ValueError("crc16")
+    if int.from_bytes(ramka[14:16], 'big') != (command_id | REPLY_BIT):
+        raise ValueError("command_id")
+
+
+class TransportInproc:
+    """Obsługa ramek w tym samym procesie (CommandHandler + sesja bazy)"""
+
+    # Obsługa jak w serwerze - ramki zapisywane do bazy po kolei
+    lock = threading.Lock()
+
+    @staticmethod
+    def przygotuj() -> None:
+        """Tworzy tabele po imporcie modeli (jak w main.py) - raz, przed startem wątków"""
+        from repositories.database import init_db
+        import services.command_handler  # noqa: F401 - rejestruje modele
+        init_db()
+
+    def __init__(self, args):
+        from repositories.database import SessionLocal
+        from services.command_handler import CommandHandler
+        self.session_factory = SessionLocal
+        self.handler = CommandHandler(KEY1, KEY2)
+
+    def wyslij(self, ramka: bytes) -> bytes:
+        with self.lock:
+            db = self.session_factory()
+            try:
+                return self.handler.process_frame(ramka, db).body
+            finally:
+                db.close()
+
+    def zamknij(self) -> None:
+        pass
+
+
+class TransportHttp:
+    """POST /commands/analyze przez utrzymywane połączenie HTTP"""
+
+    def __init__(self, args):
+        self.conn = http.client.HTTPConnection(args.host, args.port, timeout=args.timeout)
+
+    def wyslij(self, ramka: bytes) -> bytes:
+        self.conn.request("POST", "/commands/analyze", body=ramka,
+                          headers={"Content-Type": "application/octet-stream"})
+        odpowiedz = self.conn.getresponse()
+        tresc = odpowiedz.read()
+        if odpowiedz.status != 200:
+            raise ValueError(f"http_{odpowiedz.status}")
+        return tresc
+
+    def zamknij(self) -> None:
+        self.conn.close()
+
+
+class TransportTcp:
+    """Ramki wysyłane bezpośrednio do nasłuchu TCP integratorów"""
+
+    def __init__(self, args):
+        self.sock = socket.create_connection((args.host, args.tcp_port), timeout=args.timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.assembler = FrameAssembler(KEY1, KEY2)
+        self.odebrane: List[bytes] = []
+
+    def wyslij(self, ramka: bytes) -> bytes:
+        self.sock.sendall(ramka)
+        while not self.odebrane:
+            dane = self.sock.recv(4096)
+            if not dane:
+                raise ConnectionError("rozłączono")
+            self.odebrane.extend(self.assembler.feed(dane))
+        return self.odebrane.pop(0)
+
+    def zamknij(self) -> None:
+        self.sock.close()
+
+
+TRANSPORTY = {
+    'inproc': TransportInproc,
+    'http': TransportHttp,
+    'tcp': TransportTcp,
+}
+
+
+class Statystyki:
+    """Zbiera opóźnienia i błędy ze wszystkich wątków"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.opoznienia: List[float] = []
+        self.bledy = Counter()
+        self.komendy = Counter()
+
+    def sukces(self, command_id: int, opoznienie: float) -> None:
+        with self.lock:
+            self.opoznienia.append(opoznienie)
+            self.komendy[CommandID(command_id).name] += 1
+
+    def blad(self, rodzaj: str) -> None:
+        with self.lock:
+            self.bledy[rodzaj] += 1
+
+
+def percentyl(posortowane: List[float], p: float) -> float:
+    """Percentyl metodą najbliższej rangi"""
+    if not posortowane:
+        return 0.0
+    indeks = max(0, min(len(posortowane) - 1, math.ceil(p / 100.0 * len(posortowane)) - 1))
+    return posortowane[indeks]
+
+
+def watek_roboczy(integratory: List[Integrator], args, statystyki: Statystyki,
+                  koniec: float, interwal: float) -> None:
+    """Wysyła ramki integratorów z zadanym tempem (planowanie otwarte)"""
+    try:
+        transport = TRANSPORTY[args.tryb](args)
+    except Exception as e:
+        statystyki.blad(f"polaczenie: {type(e).__name__}")
+        return
+
+    nastepny = time.perf_counter()
+    i = 0
+    try:
+        while True:
+            teraz = time.perf_counter()
+            if teraz >= koniec:
+                break
+            if nastepny > teraz:
+                time.sleep(nastepny - teraz)
+            nastepny += interwal
+
+            integrator = integratory[i % len(integratory)]
+            i += 1
+            command_id, ramka = integrator.nastepna_ramka(time.time())
+            start = time.perf_counter()
+            try:
+                odpowiedz = transport.wyslij(ramka)
+                sprawdz_odpowiedz(odpowiedz, command_id)
+            except Exception as e:
+                statystyki.blad(str(e) if isinstance(e, ValueError) else type(e).__name__)
+                continue
+            statystyki.sukces(command_id, time.perf_counter() - start)
+    finally:
+        transport.zamknij()
+
+
+def uruchom(args) -> dict:
+    """Uruchamia symulację i zwraca raport"""
+    rng = random.Random(args.ziarno)
+    integratory = [Integrator(n, rng.random() < args.szyfrowane, random.Random(rng.random()))
+                   for n in range(args.integratory)]
+    watki_liczba = max(1, min(args.watki, len(integratory)))
+    statystyki = Statystyki()
+    if args.tryb == 'inproc':
+        TransportInproc.przygotuj()
+
+    start = time.perf_counter()
+    koniec = start + args.czas
+    interwal = watki_liczba / args.tempo
+    watki = [
+        threading.Thread(target=watek_roboczy,
+                         args=(integratory[n::watki_liczba], args, statystyki, koniec, interwal))
+        for n in range(watki_liczba)
+    ]
+    for watek in watki:
+        watek.start()
+    for watek in watki:
+        watek.join()
+    czas = time.perf_counter() - start
+
+    opoznienia = sorted(statystyki.opoznienia)
+    bledy = sum(statystyki.bledy.values())
+    wyslane = len(opoznienia) + bledy
+    return {
+        'tryb': args.tryb,
+        'integratory': args.integratory,
+        'watki': watki_liczba,
+        'tempo_docelowe': args.tempo,
+        'czas_s': round(czas, 3),
+        'wyslane': wyslane,
+        'poprawne': len(opoznienia),
+        'przepustowosc_ramek_s': round(len(opoznienia) / czas, 1) if czas else 0.0,
+        'opoznienie_ms': {
+            'p50': round(percentyl(opoznienia, 50) * 1000, 3),
+            'p95': round(percentyl(opoznienia, 95) * 1000, 3),
+            'p99': round(percentyl(opoznienia, 99) * 1000, 3),
+            'max': round(opoznienia[-1] * 1000, 3) if opoznienia else 0.0,
+        },
+        'odsetek_bledow': round(bledy / wyslane, 4) if wyslane else 0.0,
+        'bledy': dict(statystyki.bledy),
+        'komendy': dict(statystyki.komendy),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Symulator floty integratorów / generator obciążenia")
+    parser.add_argument('--integratory', type=int, default=20, help="liczba symulowanych integratorów")
+    parser.add_argument('--tempo', type=float, default=100.0, help="docelowa liczba ramek na sekundę (łącznie)")
+    parser.add_argument('--czas', type=float, default=10.0, help="czas trwania [s]")
+    parser.add_argument('--watki', type=int, default=8, help="liczba wątków wysyłających")
+    parser.add_argument('--tryb', choices=sorted(TRANSPORTY), default='inproc')
+    parser.add_argument('--szyfrowane', type=float, default=0.5, help="udział integratorów z szyfrowaniem (0-1)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080, help="port HTTP serwera")
+    parser.add_argument('--tcp-port', dest='tcp_port', type=int, default=8081, help="port nasłuchu TCP")
+    parser.add_argument('--timeout', type=float, default=5.0, help="limit czasu odpowiedzi [s]")
+    parser.add_argument('--ziarno', type=int, default=1, help="ziarno generatora losowego")
+    parser.add_argument('--json', action='store_true', help="raport w formacie JSON")
+    args = parser.parse_args(argv)
+
+    raport = uruchom(args)
+    if args.json:
+        print(json.dumps(raport, indent=2, ensure_ascii=False))
+        return
+
+    print(f"Tryb: {raport['tryb']}, integratory: {raport['integratory']}, wątki: {raport['watki']}, "
+          f"czas: {raport['czas_s']} s")
+    print(f"Wysłane: {raport['wyslane']}, poprawne: {raport['poprawne']}, "
+          f"przepustowość: {raport['przepustowosc_ramek_s']} ramek/s (cel {raport['tempo_docelowe']})")
+    o = raport['opoznienie_ms']
+    print(f"Opóźnienie [ms]: p50={o['p50']} p95={o['p95']} p99={o['p99']} max={o['max']}")
+    print(f"Błędy: {raport['odsetek_bledow'] * 100:.2f}% {raport['bledy']}")
+    print(f"Komendy: {raport['komendy']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from services.bulk_decoder import MEASURE_FRAME_SIZE, ascii_to_float, decode_measure_frames
+from services.frame_builder import build_request_frame
+from services.measure_values import with_typed_values
+from services.support import ProtocolAnalyzer
+
+
+def _ramka(i: int, **pola) -> bytes:
+    wartosci = dict(speed=f"{i % 100 / 10:.2f}", rate="256.6", total=str(i * 13),
+                    currentTime=f"2025-06-15 10:56:{i % 60:02d}")
+    wartosci.update(pola)
+    return build_request_frame(f"DEV{i % 3}", 0x0003, seq_num=i % 256, **wartosci)
+
+
+def test_zgodnosc_z_parserem_ramki():
+    ramki = [_ramka(i) for i in range(50)]
+    wynik = decode_measure_frames(b''.join(ramki))
+    wiersze = wynik.rows()
+
+    assert len(ramki[0]) == MEASURE_FRAME_SIZE
+    assert wynik.valid_count == 50
+    for i, ramka in enumerate(ramki):
+        widok = ProtocolAnalyzer.parse_measure_data(ramka)
+        # Kolumny liczbowe takie same jak przy zapisie z obsługi ramki
+        assert wiersze[i] == with_typed_values({'deviceId': widok.deviceId, 'speed': widok.speed, 'rate': widok.rate,
+                                                'total': widok.total, 'currentTime': widok.currentTime},
+                                               wiersze[i]['receivedAt'])
+        assert wynik.speed[i] == float(widok.speed)
+        assert wynik.total[i] == float(widok.total)
+
+
+def test_odrzucenie_blednych_sum_kontrolnych():
+    uszkodzona_crc8 = bytearray(_ramka(1))
+    uszkodzona_crc8[-4] ^= 0x01
+    uszkodzona_crc16 = bytearray(_ramka(2))
+    uszkodzona_crc16[-2] ^= 0x01
+    wynik = decode_measure_frames(_ramka(0) + bytes(uszkodzona_crc8) + bytes(uszkodzona_crc16) + b'\xAA\x55')
+
+    assert len(wynik) == 3
+    assert wynik.trailing_bytes == 2
+    assert wynik.valid.tolist() == [True, False, False]
+    assert wynik.crc8_ok.tolist() == [True, False, True]
+    assert len(wynik.rows()) == 1
+
+
+def test_konwersja_tekstu_na_liczby():
+    teksty = [b"0.85", b"-256.6", b" +12", b"1.2.3", b"abc", b"4-", b""]
+    kolumna = np.frombuffer(b''.join(t.ljust(6) for t in teksty), dtype=np.uint8).reshape(-1, 6)
+    wynik = ascii_to_float(kolumna)
+    assert wynik[:3].tolist() == [0.85, -256.6, 12.0]
+    assert all(math.isnan(x) for x in wynik[3:])
@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from services import checksum
+
+
+def _probki():
+    """Zestaw danych testowych: przypadki brzegowe + losowe ramki"""
+    rng = random.Random(2025)
+    probki = [b"", b"\x00", b"\xff", b"123456789", bytes(range(256))]
+    probki += [bytes(rng.getrandbits(8) for _ in range(rng.randint(1, 300))) for _ in range(200)]
+    return probki
+
+
+def test_crc16_wektor_referencyjny():
+    # CRC-16/CCITT-FALSE dla "123456789" wynosi 0x29B1
+    assert checksum.crc16_ccitt(b"123456789") == 0x29B1
+    assert checksum.crc16_ccitt_table(b"123456789") == 0x29B1
+    assert checksum.crc16_ccitt_bitwise(b"123456789") == 0x29B1
+
+
+def test_crc16_zgodnosc_implementacji():
+    for data in _probki():
+        expected = checksum.crc16_ccitt_bitwise(data)
+        assert checksum.crc16_ccitt_table(data) == expected
+        assert checksum.crc16_ccitt(data) == expected
+        assert checksum.crc16_ccitt(data).to_bytes(2, 'big') == expected.to_bytes(2, 'big')
+
+
+def test_crc16_zgodnosc_z_pakietem_crc():
+    crc = pytest.importorskip("crc")
+    config = crc.Configuration(
+        width=16,
+        polynomial=0x1021,
+        init_value=0xFFFF,
+        final_xor_value=0x0000,
+        reverse_input=False,
+        reverse_output=False
+    )
+    calculator = crc.Calculator(config)
+    for data in _probki():
+        assert checksum.crc16_ccitt(data) == calculator.checksum(data)
+
+
+def test_crc8_zgodnosc_implementacji():
+    # CRC-8 (wielomian 0x07) dla "123456789" wynosi 0xF4
+    assert checksum.crc8(b"123456789") == 0xF4
+    for data in _probki():
+        assert checksum.crc8(data) == checksum.crc8_bitwise(data)
+
+
+def test_suma_bajtow():
+    for data in _probki():
+        assert checksum.byte_sum8(data) == sum(data) % 256
@@ -0,0 +1,39 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from services.command_registry import CommandRegistry, command_registry
+from services.support import CommandID
+
+
+def test_rejestr_zawiera_wszystkie_komendy():
+    # Import modułu rejestruje metody obsługi CommandHandler
+    import services.command_handler  # noqa: F401
+    assert set(command_registry.command_ids()) == {int(c) for c in CommandID}
+
+
+def test_dispatch_zlicza_wywolania_i_bledy():
+    rejestr = CommandRegistry()
+
+    @rejestr.register(0x0100, name="TEST")
+    def obsluga(handler, decoded_data, flag, db):
+        if decoded_data is None:
+            raise ValueError("brak danych")
+        return {"handler": handler, "flag": flag}
+
+    assert rejestr.dispatch("h", 0x0100, b"\x00", 1, None) == {"handler": "h", "flag": 1}
+    with pytest.raises(ValueError):
+        rejestr.dispatch("h", 0x0100, None, 1, None)
+
+    statystyki = rejestr.get_stats()["commands"]["TEST"]
+    assert statystyki["calls"] == 2
+    assert statystyki["errors"] == 1
+    assert sum(statystyki["histogram_ms"].values()) == 2
+
+
+def test_nieznana_komenda():
+    rejestr = CommandRegistry()
+    assert rejestr.dispatch(None, 0x7FFF, b"", 0, None) is None
+    assert rejestr.get_stats()["unknown_commands"] == 1
+    rejestr.reset_stats()
+    assert rejestr.get_stats()["unknown_commands"] == 0
@@ -0,0 +1,121 @@
+import math
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.measure_compression import (
+    MODE_DEADBAND, MODE_SWINGING_DOOR, MeasureCompressionConfig, MeasureCompressor,
+)
+
+START = datetime(2025, 6, 15, 10, 0, 0)
+
+
+def _seria(liczba: int = 2000, ziarno: int = 7):
+    """Taśma w ruchu: wolno zmienna wydajność z szumem, licznik sumy rosnący"""
+    losowanie = random.Random(ziarno)
+    rekordy, suma = [], 0.0
+    for i in range(liczba):
+        rate = 250.0 + 30.0 * math.sin(i / 150.0) + losowanie.uniform(-0.3, 0.3)
+        speed = 1.5 + losowanie.uniform(-0.004, 0.004)
+        suma += rate / 3600.0
+        rekordy.append({
+            'speed': f"{speed:.3f}", 'rate': f"{rate:.2f}", 'total': f"{suma:.2f}",
+            'currentTime': (START + timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S"),
+        })
+    return rekordy
+
+
+def _kompresuj(config, rekordy):
+    kompresor = MeasureCompressor(config)
+    zapisane = []
+    for rekord in rekordy:
+        zapisane.extend(kompresor.process("DEV1", rekord))
+    zapisane.extend(kompresor.flush_all())
+    return kompresor, zapisane
+
+
+def _czas(rekord):
+    return datetime.strptime(rekord['currentTime'], "%Y-%m-%d %H:%M:%S").timestamp()
+
+
+def _odtworz_liniowo(zapisane, t, pole):
+    for a, b in zip(zapisane, zapisane[1:]):
+        ta, tb = _czas(a), _czas(b)
+        if ta <= t <= tb:
+            if tb == ta:
+                return float(a[pole])
+            return float(a[pole]) + (float(b[pole]) - float(a[pole])) * (t - ta) / (tb - ta)
+    raise AssertionError("Punkt poza zakresem odtworzenia")
+
+
+def _odtworz_schodkowo(zapisane, t, pole):
+    wartosc = None
+    for rekord in zapisane:
+        if _czas(rekord) > t:
+            break
+        wartosc = float(rekord[pole])
+    return wartosc
+
+
+@pytest.mark.parametrize("tryb, odtworz", [
+    (MODE_SWINGING_DOOR, _odtworz_liniowo),
+    (MODE_DEADBAND, _odtworz_schodkowo),
+])
+def test_odtworzenie_w_granicach_tolerancji(tryb, odtworz):
+    config = MeasureCompressionConfig(mode=tryb, speed_tolerance=0.01, rate_tolerance=2.0, heartbeat=0)
+    rekordy = _seria()
+    kompresor, zapisane = _kompresuj(config, rekordy)
+
+    assert len(zapisane) * 5 < len(rekordy)
+    for rekord in rekordy:
+        t = _czas(rekord)
+        assert abs(odtworz(zapisane, t, 'rate') - float(rekord['rate'])) <= 2.0 + 1e-9
+        assert abs(odtworz(zapisane, t, 'speed') - float(rekord['speed'])) <= 0.01 + 1e-9
+
+    statystyki = kompresor.get_stats()["devices"]["DEV1"]
+    assert statystyki["received"] == len(rekordy)
+    assert statystyki["stored"] == len(zapisane)
+
+
+def test_heartbeat_i_wyzerowanie_licznika():
+    config = MeasureCompressionConfig(mode=MODE_SWINGING_DOOR, rate_tolerance=1000.0, speed_tolerance=10.0,
+                                      heartbeat=60)
+    rekordy = _seria(600)
+    # Wyzerowanie licznika sumy w połowie serii
+    przed = rekordy[299]
+    for rekord in rekordy[300:]:
+        rekord['total'] = f"{float(rekord['total']) - float(przed['total']):.2f}"
+    _, zapisane = _kompresuj(config, rekordy)
+
+    czasy = [_czas(rekord) for rekord in zapisane]
+    assert max(b - a for a, b in zip(czasy, czasy[1:])) <= 60
+    assert przed in zapisane and rekordy[300] in zapisane
+
+
+def test_tryb_wylaczony_zapisuje_wszystko():
+    rekordy = _seria(50)
+    _, zapisane = _kompresuj(MeasureCompressionConfig(), rekordy)
+    assert zapisane == rekordy
+
+
+def test_deadband_zachowuje_rekord_przed_wyzerowaniem():
+    config = MeasureCompressionConfig(mode=MODE_DEADBAND, speed_tolerance=0.01, rate_tolerance=1.0, heartbeat=0)
+    rekordy = [{'speed': '1.50', 'rate': '250.0', 'total': total,
+                'currentTime': (START + timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S")}
+               for i, total in enumerate(('10', '20', '30', '0'))]
+    kompresor = MeasureCompressor(config)
+    zapisane = []
+    for rekord in rekordy:
+        zapisane.extend(kompresor.process("DEV1", rekord))
+    # Ostatnia suma przed resetem (30) zapisana razem z pierwszym rekordem po nim
+    assert [rekord['total'] for rekord in zapisane] == ['10', '30', '0']
+
+
+def test_bledna_konfiguracja_z_env_daje_domyslna(monkeypatch):
+    from services.measure_compression import _env_config
+    monkeypatch.setenv("MEASURE_COMPRESSION", "gzip")
+    assert _env_config() == MeasureCompressionConfig()
+    monkeypatch.setenv("MEASURE_COMPRESSION", MODE_DEADBAND)
+    monkeypatch.setenv("MEASURE_COMPRESSION_HEARTBEAT", "5min")
+    assert _env_config() == MeasureCompressionConfig()
@@ -0,0 +1,90 @@
+import pytest
+
+pytest.importorskip("Crypto")
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models.models import MeasureData
+from repositories.database import Base
+from services.command_handler import CommandHandler
+from services.duplicate_filter import DuplicateFrameFilter, duplicate_frame_filter
+from services.frame_builder import build_request_frame
+
+KEY1 = "Massensors"
+KEY2 = "text"
+
+
+def _ramka(seq: int, command_id: int = 0x0003, device_id: str = "DUP1", total: str = "92346") -> bytes:
+    return build_request_frame(device_id, command_id, encrypt=True, key1=KEY1, key2=KEY2, seq_num=seq,
+                               timestamp=0x010203, speed="0.85", rate="256.6", total=total,
+                               currentTime="2025-06-15 10:56:03")
+
+
+def test_okno_pamieta_ostatnie_ramki():
+    filtr = DuplicateFrameFilter(window_size=2)
+    for seq in (1, 2, 3):
+        filtr.remember(_ramka(seq), bytes([seq]))
+    # Ramka 1 wypadła z pierścienia
+    assert filtr.lookup(_ramka(1)) is None
+    assert filtr.lookup(_ramka(3)) == b'\x03'
+    # Inna zawartość przy tym samym SEQ_NUM i TIMESTAMP - inna ramka (CRC16)
+    assert filtr.lookup(_ramka(3, total="1")) is None
+    # Inne urządzenie ma własne okno
+    assert filtr.lookup(_ramka(3, device_id="DUP2")) is None
+    assert filtr.get_stats()["duplicates_total"] == 1
+
+
+def test_filtr_obejmuje_tylko_wybrane_komendy():
+    filtr = DuplicateFrameFilter(window_size=4)
+    ramka = _ramka(1, command_id=0x0002)
+    filtr.remember(ramka, b'\x01')
+    assert filtr.lookup(ramka) is None
+
+
+def test_retransmisja_bez_zapisu_do_bazy():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    handler = CommandHandler(KEY1, KEY2)
+    duplicate_frame_filter.clear()
+
+    ramka = _ramka(7, device_id="DUPTEST001")
+    pierwsza = handler.process_frame(ramka, db)
+    druga = handler.process_frame(ramka, db)
+
+    assert druga.body == pierwsza.body
+    assert db.query(MeasureData).filter(MeasureData.deviceId == "DUPTEST001").count() == 1
+    assert duplicate_frame_filter.get_stats()["duplicates_by_device"] == {"DUPTEST001": 1}
+    duplicate_frame_filter.clear()
+    db.close()
+
+
+def test_odpowiedz_zapamietana_dopiero_po_zapisie_z_kolejki(tmp_path, monkeypatch):
+    import services.command_handler as command_handler
+    from services.ingest_queue import MeasureWriteQueue
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    sesje = sessionmaker(bind=engine, autoflush=False)
+    # Baza kolejki bez tabel - każdy commit kolejki kończy się błędem
+    bez_tabel = sessionmaker(bind=create_engine("sqlite://", connect_args={"check_same_thread": False},
+                                                poolclass=StaticPool))
+    handler = CommandHandler(KEY1, KEY2)
+    duplicate_frame_filter.clear()
+    db = sesje()
+
+    for fabryka, device_id, zapamietana in ((bez_tabel, "DUPQ1", False), (sesje, "DUPQ2", True)):
+        kolejka = MeasureWriteQueue(flush_interval_ms=20, session_factory=fabryka, retries=0,
+                                    spill_path=str(tmp_path / "spill.jsonl"))
+        monkeypatch.setattr(command_handler, "measure_write_queue", kolejka)
+        kolejka.start()
+        ramka = _ramka(9, device_id=device_id)
+        handler.process_frame(ramka, db)
+        kolejka.stop(flush=True)
+        assert (duplicate_frame_filter.lookup(ramka) is not None) == zapamietana
+
+    duplicate_frame_filter.clear()
+    db.close()
@@ -0,0 +1,48 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("Crypto")
+pytest.importorskip("aiosqlite")
+httpx = pytest.importorskip("httpx")
+
+from fastapi import FastAPI, Response
+
+from routers import commands, reports
+from services.frame_builder import build_request_frame
+
+
+def test_dlugi_raport_nie_wstrzymuje_analyze(baza_globalna, monkeypatch):
+    def wolny_raport(db, period_type, start_date=None, end_date=None, resolution=None):
+        time.sleep(1.5)
+        return Response(content=b"raport", media_type="text/csv")
+
+    monkeypatch.setattr(reports, "_generate_report", wolny_raport)
+
+    app = FastAPI()
+    app.include_router(commands.router)
+    app.include_router(reports.router, prefix="/reports")
+    ramka = build_request_frame("2341", 0x0001, status=0x01)
+
+    async def scenariusz():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            raport = asyncio.ensure_future(client.get("/reports/generate-report",
+                                                      params={"period_type": "current_month"}))
+            await asyncio.sleep(0.1)
+
+            czasy = []
+            for _ in range(5):
+                start = time.perf_counter()
+                odpowiedz = await client.post("/commands/analyze", content=ramka)
+                czasy.append(time.perf_counter() - start)
+                assert odpowiedz.status_code == 200
+                assert odpowiedz.content[:2] == b'\xAA\x55'
+
+            assert not raport.done()
+            assert (await raport).status_code == 200
+            return czasy
+
+    czasy = asyncio.run(scenariusz())
+    assert max(czasy) < 0.5
@@ -0,0 +1,48 @@
+import pytest
+
+pytest.importorskip("Crypto")
+
+from services.checksum import crc16_ccitt, byte_sum8
+from services.frame_builder import reply_builder, build_request_frame, decrypt_frame
+from services.frame_view import FrameView
+
+
+def _sprawdz_ramke(frame: bytes):
+    assert frame[:2] == b'\xAA\x55'
+    assert frame[-1] == 0x55
+    assert int.from_bytes(frame[-3:-1], 'big') == crc16_ccitt(frame[:-3])
+
+
+def test_odpowiedz_standardowa():
+    request = build_request_frame("2341", 0x0003, status=1, speed="0.85", rate="256.6",
+                                  total="92346", currentTime="2025-06-15 10:56:03")
+    _sprawdz_ramke(request)
+
+    reply = reply_builder.build(request, 0x00, status=0x01, request=0x03)
+    _sprawdz_ramke(reply)
+
+    view = FrameView(reply)
+    assert view.command_id == 0x8003
+    assert view.device_id_raw == request[4:14]
+    assert bytes(view.data) == bytes([0x01, 0x03])
+    assert view.crc8 == byte_sum8(bytes(view.segment)[:-1])
+
+
+def test_odpowiedz_serwisowa_wg_schematu():
+    request = build_request_frame("2341", 0x0006)
+    reply = reply_builder.build_reply(request, 0x00, 0x01, 0x03, paramAddress=5, paramData="12.5")
+    _sprawdz_ramke(reply)
+    assert FrameView(reply).data_len == 22
+    assert bytes(FrameView(reply).data) == bytes([0x01, 0x03, 0x05]) + b"12.5".ljust(19)
+
+
+def test_odpowiedz_szyfrowana():
+    request = build_request_frame("2341", 0x0003, encrypt=True, key1="Massensors", key2="text",
+                                  speed="1.00")
+    assert FrameView(decrypt_frame(request, "Massensors", "text")).payload().speed == "1.00"
+
+    reply = reply_builder.build(request, 0x01, 0x01, 0x00, key1="Massensors", key2="text")
+    _sprawdz_ramke(reply)
+    assert FrameView(reply).is_encrypted
+    decrypted = FrameView(decrypt_frame(reply, "Massensors", "text"))
+    assert bytes(decrypted.data) == bytes([0x01, 0x00])
@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip("Crypto")
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models.models import Aliases, MeasureData, StaticParams
+from repositories.database import Base
+from services.frame_builder import build_request_frame
+from services.frame_import import import_file
+
+KEY1 = "Massensors"
+KEY2 = "text"
+
+
+def _pomiar(device_id: str, seq: int, speed: str) -> bytes:
+    return build_request_frame(device_id, 0x0003, encrypt=seq % 2 == 1, key1=KEY1, key2=KEY2, seq_num=seq,
+                               speed=speed, rate="256.6", total=str(seq), currentTime="2025-06-15 10:56:03")
+
+
+@pytest.fixture
+def plik_archiwum(tmp_path):
+    predkosci = ["0", "0", "0.85", "0.90", "0", "0", "0.70"]
+    ramki = [_pomiar("IMPORT0001", seq, speed) for seq, speed in enumerate(predkosci)]
+    ramki.insert(3, b'\x00\xAA\x55\x01')  # śmieci między ramkami
+    ramki.append(build_request_frame("IMPORT0001", 0x0002, encrypt=True, key1=KEY1, key2=KEY2,
+                                     company="Stara", location="L1", productName="P", scaleId="S1"))
+    ramki.append(build_request_frame("IMPORT0001", 0x0002, key1=KEY1, key2=KEY2,
+                                     company="Nowa", location="L2", productName="P", scaleId="S1"))
+    ramki.append(build_request_frame("IMPORT0001", 0x0005, key1=KEY1, key2=KEY2, scaleCapacity="1000"))
+    sciezka = tmp_path / "ramki.bin"
+    sciezka.write_bytes(b''.join(ramki))
+    return str(sciezka)
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_import_archiwum(plik_archiwum, workers):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    db.add(Aliases(deviceId="IMPORT0001", company="Pierwsza"))
+    db.commit()
+
+    stats = import_file(plik_archiwum, db, KEY1, KEY2, workers=workers, chunk_frames=3, batch_size=2)
+
+    # Reguła zapisu jak w obsłudze MEASURE_DATA: pomijane postoje, zapisany pierwszy rekord po zatrzymaniu
+    assert [m.total for m in db.query(MeasureData).order_by(MeasureData.id)] == ["2", "3", "4", "6"]
+    assert stats["frames"] == 10
+    assert stats["measures_skipped"] == 3
+    aliasy = db.query(Aliases).all()
+    assert [(a.company, a.location) for a in aliasy] == [("Nowa", "L2")]
+    assert db.query(StaticParams).one().scaleCapacity == "1000"
+    db.close()
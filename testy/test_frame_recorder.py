@@ -0,0 +1,65 @@
+import pytest
+
+pytest.importorskip("Crypto")
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from repositories.database import Base
+from services.command_handler import CommandHandler
+from services.frame_builder import build_request_frame
+from services.frame_recorder import (DIRECTION_IN, DIRECTION_OUT, FrameRecorder, frame_recorder,
+                                     read_records, replay)
+
+KEY1 = "Massensors"
+KEY2 = "text"
+
+
+def _ramka(seq: int, device_id: str = "REC0000001") -> bytes:
+    return build_request_frame(device_id, 0x0003, encrypt=True, key1=KEY1, key2=KEY2, seq_num=seq,
+                               speed="0.85", rate="256.6", total=str(seq), currentTime="2025-06-15 10:56:03")
+
+
+def test_pierscien_nadpisuje_najstarsze_rekordy(tmp_path):
+    sciezka = str(tmp_path / "ramki.rec")
+    rejestrator = FrameRecorder()
+    rejestrator.open(sciezka, slot_count=4)
+    for seq in range(6):
+        rejestrator.record(DIRECTION_IN, _ramka(seq))
+    rejestrator.close()
+
+    rekordy = list(read_records(sciezka))
+    assert [r.seq for r in rekordy] == [3, 4, 5, 6]
+    assert [r.frame for r in rekordy] == [_ramka(seq) for seq in range(2, 6)]
+    assert rekordy[0].device_id == "REC0000001"
+
+    # Ponowne otwarcie kontynuuje numerację
+    rejestrator.open(sciezka, slot_count=4)
+    rejestrator.record(DIRECTION_OUT, _ramka(9, "REC0000002"))
+    rejestrator.close()
+    assert [r.seq for r in read_records(sciezka, device_id="REC0000002")] == [7]
+
+
+def test_rejestracja_i_odtworzenie(tmp_path):
+    sciezka = str(tmp_path / "ramki.rec")
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    handler = CommandHandler(KEY1, KEY2)
+
+    frame_recorder.open(sciezka, slot_count=64)
+    try:
+        for seq in range(5):
+            handler.process_frame(_ramka(seq, "REC0000003"), db)
+    finally:
+        frame_recorder.close()
+
+    kierunki = [r.direction for r in read_records(sciezka)]
+    assert kierunki == [DIRECTION_IN, DIRECTION_OUT] * 5
+
+    wynik = replay(sciezka, db, KEY1, KEY2, 1000)
+    assert wynik["frames"] == 5
+    assert wynik["replies_equal"] == 5
+    db.close()
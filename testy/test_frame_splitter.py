@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip("Crypto")
+
+from services.frame_builder import build_request_frame
+from services.frame_splitter import FrameAssembler, split_frames
+
+KEY1 = "Massensors"
+KEY2 = "text"
+
+
+def _ramka(seq: int, encrypt: bool = False) -> bytes:
+    return build_request_frame("2341", 0x0003, encrypt=encrypt, key1=KEY1, key2=KEY2, seq_num=seq,
+                               speed="0.85", rate="256.6", total="92346",
+                               currentTime="2025-06-15 10:56:03")
+
+
+def test_podzial_sklejonych_ramek():
+    ramki = [_ramka(1), _ramka(2, encrypt=True), _ramka(3)]
+    frames, rejected = split_frames(b''.join(ramki), KEY1, KEY2)
+    assert frames == ramki
+    assert rejected == 0
+
+
+def test_resynchronizacja_po_uszkodzonej_ramce():
+    uszkodzona = bytearray(_ramka(2))
+    uszkodzona[30] ^= 0xFF
+    dane = b'\x00\x13' + _ramka(1) + bytes(uszkodzona) + _ramka(3) + _ramka(4)[:20]
+    frames, rejected = split_frames(dane, KEY1, KEY2)
+    assert frames == [_ramka(1), _ramka(3)]
+    assert rejected == 2
+
+
+def test_strumien_podzielony_na_fragmenty():
+    dane = _ramka(1) + _ramka(2, encrypt=True)
+    assembler = FrameAssembler(KEY1, KEY2)
+    frames = []
+    for i in range(0, len(dane), 7):
+        frames.extend(assembler.feed(dane[i:i + 7]))
+    assert frames == [_ramka(1), _ramka(2, encrypt=True)]
+    assert assembler.pending == 0
@@ -0,0 +1,53 @@
+import struct
+
+from services.frame_view import FrameView, MeasureDataView, StaticDataView, PAYLOAD_VIEWS
+
+
+def _ramka(command_id: int, data: bytes) -> bytes:
+    """Składa ramkę bez szyfrowania (CRC nie są tu weryfikowane)"""
+    header = bytes([0xAA, 0x55, 0x01, 0x00])
+    plain = "2341".encode('ascii').ljust(10, b' ') + struct.pack('>H', command_id) + bytes([0x07, 0x00, 0x01, 0x02, 0x05])
+    segment = bytes([len(data)]) + data + bytes([sum(bytes([len(data)]) + data) & 0xFF])
+    return header + plain + segment + b'\x12\x34\x55'
+
+
+def test_widok_measure_data():
+    data = (bytes([0x01, 0x03]) + b"0.85  " + b"256.6  " + b"92346       " + b"2025-06-15 10:56:03")
+    ramka = _ramka(0x0003, data)
+    frame = FrameView(ramka)
+
+    assert frame.version == 1
+    assert not frame.is_encrypted
+    assert frame.device_id == "2341"
+    assert frame.command_id == 0x0003
+    assert frame.rc4_key_id == 0x07
+    assert frame.timestamp == 0x000102
+    assert frame.seq_num == 0x05
+    assert frame.data_len == len(data)
+    assert bytes(frame.data) == data
+    assert frame.crc16 == 0x1234
+    assert frame.end_marker == 0x55
+
+    payload = frame.payload()
+    assert isinstance(payload, MeasureDataView)
+    assert payload.as_dict() == {
+        'deviceId': "2341",
+        'status': 1,
+        'request': 3,
+        'speed': "0.85",
+        'rate': "256.6",
+        'total': "92346",
+        'currentTime': "2025-06-15 10:56:03",
+    }
+    assert payload.unpack()[0] == b"0.85  "
+
+
+def test_krotka_ramka_daje_puste_pola():
+    payload = StaticDataView(_ramka(0x0005, bytes([0x01, 0x00]) + b"3"))
+    assert payload.filterRate == "3"
+    assert payload.currentTime == ""
+
+
+def test_uklady_pol_sa_ciagle():
+    for command_id, view_class in PAYLOAD_VIEWS.items():
+        assert view_class.MIN_FRAME_SIZE == 24 + view_class.LAYOUT.size
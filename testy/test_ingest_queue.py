@@ -0,0 +1,100 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models.models import MeasureData
+from repositories.database import Base
+from services.ingest_queue import MeasureWriteQueue, IngestQueueFull
+
+
+def _sesje():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine, autoflush=False)
+
+
+def _rekord(i: int) -> dict:
+    return {'deviceId': '2341', 'speed': '0.85', 'rate': '256.6', 'total': str(i),
+            'currentTime': f'2025-06-15 10:{i // 60 % 60:02d}:{i % 60:02d}'}
+
+
+def test_zapis_paczkami_i_oproznienie_przy_zatrzymaniu():
+    sesje = _sesje()
+    kolejka = MeasureWriteQueue(max_size=1000, batch_size=100, flush_interval_ms=50, session_factory=sesje)
+    kolejka.start()
+    for i in range(250):
+        kolejka.enqueue(_rekord(i))
+    kolejka.stop(flush=True)
+
+    db = sesje()
+    assert db.query(MeasureData).count() == 250
+    db.close()
+
+    metryki = kolejka.get_metrics()
+    assert metryki['written_total'] == 250
+    assert metryki['queue_depth'] == 0
+    assert 3 <= metryki['batches_total'] < 250
+
+
+def test_pelna_kolejka_zglasza_wyjatek():
+    kolejka = MeasureWriteQueue(max_size=2, enqueue_timeout=0.01, session_factory=_sesje())
+    kolejka.enqueue(_rekord(1))
+    kolejka.enqueue(_rekord(2))
+    with pytest.raises(IngestQueueFull):
+        kolejka.enqueue(_rekord(3))
+    assert kolejka.get_metrics()['rejected_total'] == 1
+
+
+def test_nieudana_paczka_zapis_pojedynczy_i_plik_spill(tmp_path):
+    sesje = _sesje()
+    spill = tmp_path / "spill.jsonl"
+    kolejka = MeasureWriteQueue(max_size=100, batch_size=10, flush_interval_ms=50, session_factory=sesje,
+                                retries=1, retry_backoff=0, spill_path=str(spill))
+    zly = dict(_rekord(99), deviceId=['2341'])  # lista nie jest typem kolumny SQLite
+    wyniki = {}
+    kolejka.start()
+    for rekord in [_rekord(1), _rekord(2), zly, _rekord(3)]:
+        kolejka.enqueue(rekord, on_written=lambda ok, total=rekord['total']: wyniki.__setitem__(total, ok))
+    kolejka.stop(flush=True)
+
+    # Funkcje on_written dostają wynik zapisu każdego rekordu
+    assert wyniki == {'1': True, '2': True, '99': False, '3': True}
+
+    # Dobre rekordy z paczki zapisane mimo złego rekordu, zły w pliku
+    db = sesje()
+    assert db.query(MeasureData).count() == 3
+    metryki = kolejka.get_metrics()
+    assert (metryki['written_total'], metryki['failed_total'], metryki['spilled_total']) == (3, 1, 1)
+    assert metryki['retried_total'] == 1
+    assert spill.read_text(encoding="utf-8").count("\n") == 1
+
+    # Rekord nadal niezapisywalny zostaje w pliku; po poprawieniu pliku trafia do bazy
+    assert kolejka.replay_spill() == 0
+    assert spill.exists()
+    spill.write_text(spill.read_text(encoding="utf-8").replace('["2341"]', '"2341"'), encoding="utf-8")
+    assert kolejka.replay_spill() == 1
+    assert not spill.exists()
+    assert db.query(MeasureData).count() == 4
+    db.close()
+
+
+def test_plik_spill_przejmuje_jeden_worker(tmp_path):
+    sesje = _sesje()
+    spill = tmp_path / "spill.jsonl"
+    spill.write_text("".join(json.dumps(_rekord(i)) + "\n" for i in range(5)), encoding="utf-8")
+    # Dwa workery uvicorn z tym samym INGEST_SPILL_PATH
+    workery = [MeasureWriteQueue(session_factory=sesje, spill_path=str(spill)) for _ in range(2)]
+    with ThreadPoolExecutor(max_workers=2) as pula:
+        zapisane = list(pula.map(lambda kolejka: kolejka.replay_spill(), workery))
+    assert sorted(zapisane) == [0, 5]
+    assert list(tmp_path.iterdir()) == []
+    db = sesje()
+    assert db.query(MeasureData).count() == 5
+    db.close()
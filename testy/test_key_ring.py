@@ -0,0 +1,82 @@
+import pytest
+
+pytest.importorskip("Crypto")
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from repositories.database import Base
+from services.command_handler import CommandHandler, FrameError
+from services.frame_builder import build_request_frame, decrypt_frame
+from services.frame_splitter import FrameScanner, split_frames
+from services.cipher import RC4KeyGenerator
+from services.key_ring import RC4KeyRing, UnknownKeyError, rc4_key_ring
+
+KEY1 = "Massensors"
+KEY2 = "text"
+
+
+@pytest.fixture
+def pierscien():
+    rc4_key_ring.clear()
+    rc4_key_ring.add(0x00, KEY1, KEY2)
+    rc4_key_ring.rotate(0x05, "Nowy", "klucz").result(timeout=10)
+    yield rc4_key_ring
+    rc4_key_ring.clear()
+
+
+def _ramka(key_id: int, key1: str, key2: str, seq: int = 1) -> bytes:
+    return build_request_frame("KEYRING001", 0x0001, encrypt=True, key1=key1, key2=key2,
+                               rc4_key_id=key_id, seq_num=seq)
+
+
+def test_wybor_klucza_wedlug_rc4_key_id(pierscien):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    handler = CommandHandler(KEY1, KEY2)
+
+    odpowiedz = handler.process_frame(_ramka(0x05, "Nowy", "klucz"), db).body
+    # Odpowiedź niesie RC4_KEY_ID żądania i jest zaszyfrowana tym samym kluczem
+    assert odpowiedz[16] == 0x05
+    jawna = decrypt_frame(odpowiedz, "Nowy", "klucz")
+    assert jawna[22] == 0x01  # STATUS
+
+    assert handler.process_frame(_ramka(0x00, KEY1, KEY2), db).body[16] == 0x00
+    with pytest.raises(FrameError):
+        handler.process_frame(_ramka(0x07, "Nowy", "klucz"), db)
+    db.close()
+
+
+def test_podzial_ramek_z_roznymi_kluczami(pierscien):
+    ramki = [_ramka(0x00, KEY1, KEY2, 1), _ramka(0x05, "Nowy", "klucz", 2), _ramka(0x07, "X", "Y", 3)]
+    dane = b''.join(ramki)
+    assert split_frames(dane, KEY1, KEY2)[0] == ramki[:2]
+    skaner = FrameScanner(KEY1, KEY2)
+    assert [dane[o:o + n] for o, n in skaner.spans(dane)] == ramki[:2]
+
+
+def test_wycofanie_klucza():
+    pierscien = RC4KeyRing()
+    pierscien.add(0x03, KEY1, KEY2)
+    assert 0x03 in pierscien
+    assert pierscien.remove(0x03)
+    with pytest.raises(UnknownKeyError):
+        pierscien.get(0x03)
+
+
+def test_wycofanie_klucza_usuwa_go_z_cache():
+    pierscien = RC4KeyRing()
+    RC4KeyGenerator.invalidate_cache()
+    pierscien.add(0x03, "Stary", "klucz", iterations=10)
+    assert RC4KeyGenerator.cache_size() == 1
+
+    # Zastąpienie klucza w slocie usuwa z cache klucz poprzedni
+    pierscien.add(0x03, "Nowy", "klucz", iterations=10)
+    assert RC4KeyGenerator.invalidate_cache("Stary", "klucz") == 0
+    assert RC4KeyGenerator.cache_size() == 1
+
+    pierscien.remove(0x03)
+    assert RC4KeyGenerator.cache_size() == 0
@@ -0,0 +1,130 @@
+import pytest
+
+pytest.importorskip("Crypto")
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models.models import MeasureData
+from repositories.database import Base
+from services.command_handler import CommandHandler
+from services.duplicate_filter import duplicate_frame_filter
+from services.frame_builder import build_request_frame, decrypt_frame, pack_measure_batch
+from services.frame_view import FIELDS_START, FrameView, with_text_fields
+from services.protocol_schema import MAX_BATCH_RECORDS
+from services.support import CommandID, ProtocolAnalyzer
+
+KEY1 = "Massensors"
+KEY2 = "text"
+
+
+def _rekordy(predkosci):
+    return [dict(speed=str(speed), rate="256.6", total=str(1000 + i), currentTime=f"2025-06-15 10:56:{i:02d}")
+            for i, speed in enumerate(predkosci)]
+
+
+def _ramka(device_id: str, first_record: int, rekordy) -> bytes:
+    return build_request_frame(device_id, CommandID.MEASURE_BATCH, encrypt=True, key1=KEY1, key2=KEY2,
+                               payload=pack_measure_batch(first_record, rekordy))
+
+
+def _baza():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine, autoflush=False)()
+
+
+def test_dekodowanie_paczki():
+    rekordy = _rekordy([1.5] * MAX_BATCH_RECORDS)
+    decoded, crc_ok = ProtocolAnalyzer.encode_data(_ramka("BATCH00001", 500, rekordy), 1000, KEY1, KEY2)
+    assert crc_ok
+    device_id, first_record, odczytane = ProtocolAnalyzer.parse_measure_batch(decoded)
+    assert (device_id, first_record) == ("BATCH00001", 500)
+    # Rekordy paczki mają kolumny liczbowe, pola tekstowe dodaje with_text_fields
+    assert (odczytane[0]['speedValue'], odczytane[0]['totalValue']) == (1.5, 1000)
+    assert [{name: rekord[name] for name in rekordy[0]} for rekord in map(with_text_fields, odczytane)] == rekordy
+
+    with pytest.raises(ValueError):
+        pack_measure_batch(0, _rekordy([1.0] * (MAX_BATCH_RECORDS + 1)))
+
+
+def test_zapis_paczki_i_potwierdzenie():
+    db = _baza()
+    duplicate_frame_filter.clear()
+    handler = CommandHandler(KEY1, KEY2)
+
+    # Postój na początku paczki - zapisany tylko pierwszy rekord z zerową prędkością po ruchu
+    ramka = _ramka("BATCH00002", 41, _rekordy([0, 0, 1.2, 1.3, 0, 0]))
+    odpowiedz = handler.process_frame(ramka, db)
+
+    reply = FrameView(decrypt_frame(odpowiedz.body, KEY1, KEY2))
+    assert reply.command_id == CommandID.MEASURE_BATCH | 0x8000
+    assert int.from_bytes(reply.buffer[FIELDS_START:FIELDS_START + 4], 'big') == 46
+    wiersze = db.query(MeasureData).filter(MeasureData.deviceId == "BATCH00002").order_by(MeasureData.id).all()
+    assert [row.speed for row in wiersze] == ["1.2", "1.3", "0"]
+
+    # Retransmisja paczki nie dubluje rekordów
+    assert handler.process_frame(ramka, db).body == odpowiedz.body
+    assert db.query(MeasureData).filter(MeasureData.deviceId == "BATCH00002").count() == 3
+
+
+def test_wycofana_paczka_przywraca_stan_kompresji(monkeypatch):
+    import services.command_handler as command_handler
+    from services.measure_compression import MODE_SWINGING_DOOR, MeasureCompressionConfig, MeasureCompressor
+
+    monkeypatch.setattr(command_handler, "measure_compressor", MeasureCompressor(
+        MeasureCompressionConfig(mode=MODE_SWINGING_DOOR, speed_tolerance=0.01, rate_tolerance=1.0, heartbeat=0)))
+    db = _baza()
+    # Baza bez tabel - zapis paczki kończy się błędem
+    bez_tabel = sessionmaker(bind=create_engine("sqlite://", connect_args={"check_same_thread": False},
+                                                poolclass=StaticPool))()
+    duplicate_frame_filter.clear()
+    handler = CommandHandler(KEY1, KEY2)
+
+    handler.process_frame(_ramka("BATCH00003", 1, _rekordy([1.5, 1.5, 1.5])), db)
+    assert db.query(MeasureData).filter(MeasureData.deviceId == "BATCH00003").count() == 1
+
+    # Nieudany zapis - odpowiedź odrzuca paczkę i nie trafia do filtra retransmisji
+    druga = _ramka("BATCH00003", 4, [dict(speed="2.5", rate="256.6", total="2000",
+                                          currentTime="2025-06-15 10:57:00")])
+    reply = FrameView(decrypt_frame(handler.process_frame(druga, bez_tabel).body, KEY1, KEY2))
+    assert int.from_bytes(reply.buffer[FIELDS_START:FIELDS_START + 4], 'big') == 3
+
+    # Ponowiona paczka zapisuje też rekord wstrzymany przez kompresję przed nieudaną próbą
+    handler.process_frame(druga, db)
+    wiersze = db.query(MeasureData).filter(MeasureData.deviceId == "BATCH00003").order_by(MeasureData.id).all()
+    assert [(row.speed, row.total) for row in wiersze] == [("1.5", "1000"), ("1.5", "1002")]
+    duplicate_frame_filter.clear()
+
+
+def test_analyze_batch_wynik_per_ramka_i_przywrocenie_stanu():
+    from routers import commands
+    from services.command_handler import _last_speed_by_device
+    from services.measure_compression import measure_compressor
+
+    def pomiar(device_id: str, **pola) -> bytes:
+        return build_request_frame(device_id, CommandID.MEASURE_DATA, encrypt=True, key1=KEY1, key2=KEY2,
+                                   **{**dict(speed="1.2", rate="256.6", total="100",
+                                             currentTime="2025-06-15 10:56:03"), **pola})
+
+    db = _baza()
+    duplicate_frame_filter.clear()
+    # Ramka z nieznanym RC4_KEY_ID jest odrzucana - wynik None na jej pozycji
+    replies, processed, rejected = commands._analyze_batch(
+        db, [pomiar("BATCH00004"), pomiar("BATCH00005", rc4_key_id=0x7F), pomiar("BATCH00006")])
+    assert [reply is None for reply in replies] == [False, True, False]
+    assert (processed, rejected) == (2, 1)
+
+    # Wycofana transakcja paczki przywraca ostatnią prędkość i stan kompresji urządzeń
+    bez_tabel = sessionmaker(bind=create_engine("sqlite://", connect_args={"check_same_thread": False},
+                                                poolclass=StaticPool))()
+    with pytest.raises(Exception):
+        # Postój bez zapisu zmienia stan urządzenia, zapis kolejnej ramki kończy się błędem
+        commands._analyze_batch(bez_tabel, [pomiar("BATCH00007", speed="0"),
+                                            pomiar("BATCH00004", speed="0", total="200")])
+    assert "BATCH00007" not in _last_speed_by_device
+    assert _last_speed_by_device["BATCH00004"] == 1.2
+    assert measure_compressor.snapshot("BATCH00004").received == 1
+    duplicate_frame_filter.clear()
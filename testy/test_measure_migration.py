@@ -0,0 +1,103 @@
+from datetime import date
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models.models import MeasureData
+from repositories.database import Base
+from repositories.measure_migration import MeasureBackfill, ensure_typed_columns
+from repositories.measure_partitions import measure_partitions
+from services.measure_values import parse_epoch, with_typed_values
+
+
+def _stara_baza(sciezka, liczba: int):
+    engine = create_engine(f"sqlite:///{sciezka}")
+    with engine.begin() as connection:
+        connection.execute(text('CREATE TABLE "MeasureData" (id INTEGER PRIMARY KEY, "deviceId" VARCHAR, '
+                                'speed VARCHAR, rate VARCHAR, total VARCHAR, "currentTime" VARCHAR)'))
+        connection.execute(text('INSERT INTO "MeasureData" ("deviceId", speed, rate, total, "currentTime") '
+                                'VALUES (:d, :s, :r, :t, :c)'),
+                           [{"d": "DEV1", "s": f" {i / 10:.2f}", "r": f"{100 + i}.5", "t": f"{1000 + i}  ",
+                             "c": f"2025-06-15 10:{i // 60:02d}:{i % 60:02d}"} for i in range(liczba)]
+                           + [{"d": "DEV1", "s": "x", "r": "", "t": "1", "c": "bez czasu"}])
+    return engine
+
+
+def test_wznawialna_migracja(tmp_path):
+    engine = _stara_baza(tmp_path / "stara.db", 25)
+    assert ensure_typed_columns(engine) == ['speedValue', 'rateValue', 'totalValue', 'timeEpoch', 'timeInvalid',
+                                            'receivedAt']
+    assert ensure_typed_columns(engine) == []
+
+    # Przerwana migracja - jedna paczka
+    pierwsza = MeasureBackfill(engine, batch_size=10, pause=0)
+    assert pierwsza.run(max_batches=1) == 10
+    assert pierwsza.pending() == 16
+    # Do końca migracji okresy są oznaczane jako niekompletne
+    with sessionmaker(bind=engine)() as db:
+        assert measure_partitions.count_without_time(db, "DEV1") == (0, 16)
+
+    # Ponowne uruchomienie kończy pozostałe rekordy
+    druga = MeasureBackfill(engine, batch_size=10, pause=0)
+    assert druga.run() == 16
+    assert druga.finished
+    # Rekord z niepoprawnym czasem oznaczony timeInvalid - migracja zakończona
+    assert (druga.pending(), druga.invalid(), druga.get_stats()["invalid_time"]) == (0, 1, 1)
+    assert MeasureBackfill(engine, batch_size=10, pause=0).run() == 0
+    with sessionmaker(bind=engine)() as db:
+        assert measure_partitions.count_without_time(db, "DEV1") == (1, 0)
+
+    with engine.connect() as connection:
+        wiersz = connection.execute(text('SELECT "speedValue", "rateValue", "totalValue", "timeEpoch", '
+                                         '"timeInvalid", "receivedAt" FROM "MeasureData" WHERE id = 13')).one()
+        bledny = connection.execute(text('SELECT "speedValue", "rateValue", "totalValue", "timeEpoch", '
+                                         '"timeInvalid", "receivedAt" FROM "MeasureData" WHERE id = 26')).one()
+    epoch = parse_epoch("2025-06-15 10:00:12")
+    assert tuple(wiersz) == (1.2, 112.5, 1012, epoch, 0, epoch)
+    # receivedAt rekordu bez czasu - czas poprzedniego rekordu
+    assert tuple(bledny) == (None, None, 1, None, 1, parse_epoch("2025-06-15 10:00:24"))
+
+
+def test_licznik_sumy_bez_utraty_dokladnosci():
+    licznik = 2 ** 60 + 1
+    rekord = with_typed_values({'speed': '1.0', 'rate': '2.0', 'total': f"{licznik}  ", 'currentTime': 'bez czasu'})
+    assert (rekord['totalValue'], rekord['timeEpoch'], rekord['timeInvalid']) == (licznik, None, 1)
+    assert with_typed_values({'total': '12.5', 'currentTime': '2025-06-15 10:00:00'})['totalValue'] == 12.5
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    db.add(MeasureData(**dict(rekord, deviceId='CNT1')))
+    db.commit()
+    assert db.query(MeasureData.totalValue).scalar() == licznik
+
+
+def test_podsumowanie_z_kolumn_liczbowych():
+    from routers.measure_data import _get_period_summary
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    for dzien, speed, rate in ((14, "9.0", "900"), (15, "1.0", "10"), (15, "3.0", "30"), (16, "9.0", "900")):
+        db.add(MeasureData(**with_typed_values({'deviceId': 'SUM1', 'speed': speed, 'rate': rate, 'total': '5',
+                                                'currentTime': f"2025-06-{dzien} 12:00:00"})))
+    db.add(MeasureData(**with_typed_values({'deviceId': 'SUM1', 'speed': '5.0', 'rate': '50', 'total': '5',
+                                            'currentTime': 'bez czasu'})))
+    db.commit()
+
+    wynik = _get_period_summary(db, "SUM1", date(2025, 6, 15), date(2025, 6, 15), None)
+    # Rekord bez poprawnego czasu poza okresem, ale widoczny w podsumowaniu
+    assert (wynik.total_records, wynik.invalid_time_records, wynik.complete) == (2, 1, True)
+
+    # Rekord starszej bazy jeszcze bez kolumn liczbowych - podsumowanie oznaczone jako niekompletne
+    db.add(MeasureData(deviceId='SUM1', speed='2.0', rate='20', total='5', currentTime="2025-06-15 13:00:00"))
+    db.commit()
+    wynik = _get_period_summary(db, "SUM1", date(2025, 6, 15), date(2025, 6, 15), None)
+    assert (wynik.total_records, wynik.pending_records, wynik.complete) == (2, 1, False)
+    assert (wynik.speed_avg, wynik.rate_max, wynik.total_sum) == (2.0, 30.0, 10.0)
+    assert wynik.first_measurement == "2025-06-15 12:00:00"
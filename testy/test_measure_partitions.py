@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from models.models import MeasureData
+from repositories.database import Base
+from repositories.measure_partitions import MeasurePartitions, month_bounds
+from services.measure_values import with_typed_values
+
+
+def _rekord(device_id: str, czas: datetime, rate: float):
+    return with_typed_values({'deviceId': device_id, 'speed': "1.5", 'rate': f"{rate:.1f}", 'total': f"{rate * 2:.1f}",
+                              'currentTime': czas.strftime("%Y-%m-%d %H:%M:%S")})
+
+
+@pytest.fixture
+def baza(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'glowna.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    # Marzec - czerwiec 2025, dwa urządzenia, rekord co 6 godzin
+    czas, i = datetime(2025, 3, 1), 0
+    while czas < datetime(2025, 6, 20):
+        db.bulk_insert_mappings(MeasureData, [_rekord("DEV1", czas, i), _rekord("DEV2", czas, 1000 + i)])
+        czas += timedelta(hours=6)
+        i += 1
+    db.commit()
+    yield engine, db, MeasurePartitions(engine, str(tmp_path / "partycje"), hot_months=1, batch_size=50)
+    db.close()
+    engine.dispose()
+
+
+def _klucze(rekordy):
+    return [(m.id, m.timeEpoch) for m in rekordy]
+
+
+def test_przeniesienie_i_zapytania_przez_partycje(baza):
+    engine, db, partycje = baza
+    od, do = month_bounds("202504")[0], month_bounds("202505")[1] - 1
+    przed = _klucze(partycje.query_measures(db, "DEV1", od, do))
+    podsumowanie_przed = partycje.summarize(db, "DEV1", od, do)
+
+    przeniesione = partycje.rollover(now=datetime(2025, 6, 20))
+    assert set(przeniesione) == {"202503", "202504", "202505"}
+    assert partycje.list_partitions() == ["202503", "202504", "202505"]
+    # W tabeli głównej zostaje czerwiec
+    assert db.query(MeasureData).filter(MeasureData.timeEpoch < month_bounds("202506")[0]).count() == 0
+
+    # Zapytanie o kwiecień-maj czyta tylko dwie partycje
+    assert partycje.partitions_for(od, do) == ["202504", "202505"]
+    assert _klucze(partycje.query_measures(db, "DEV1", od, do)) == przed
+    assert partycje.summarize(db, "DEV1", od, do) == pytest.approx(podsumowanie_przed)
+    assert partycje.count(db, "DEV1", od, do) == len(przed)
+
+    # Próbkowanie z wielu partycji - pozycje w kolejności czasu
+    probka = partycje.sample_measures(db, "DEV1", od, do, lambda liczba: [0, liczba // 2, liczba - 1])
+    assert _klucze(probka) == [przed[0], przed[len(przed) // 2], przed[-1]]
+
+    # Spóźniony rekord z przeniesionego miesiąca trafia do tabeli głównej i jest łączony w kolejności czasu
+    db.add(MeasureData(**_rekord("DEV1", datetime(2025, 4, 10, 1), 5.0)))
+    db.commit()
+    wynik = partycje.query_measures(db, "DEV1", od, do)
+    assert len(wynik) == len(przed) + 1
+    assert [m.timeEpoch for m in wynik] == sorted(m.timeEpoch for m in wynik)
+
+
+def test_zapytania_w_trakcie_przenoszenia_paczki(baza):
+    engine, db, partycje = baza
+    od, do = month_bounds("202504")[0], month_bounds("202505")[1] - 1
+    przed = _klucze(partycje.query_measures(db, "DEV1", od, do))
+    podsumowanie_przed = partycje.summarize(db, "DEV1", od, do)
+    probka_przed = _klucze(partycje.sample_measures(db, "DEV1", od, do, lambda liczba: list(range(liczba))))
+
+    # Paczka skopiowana do partycji (pierwsza transakcja roll_month), jeszcze nieusunięta z tabeli głównej
+    sciezka = partycje._create_partition("202504")
+    poczatek, koniec = month_bounds("202504")
+    with engine.connect() as connection:
+        connection.exec_driver_sql("ATTACH DATABASE ? AS part", (sciezka,))
+        connection.execute(text('INSERT INTO part."MeasureData" SELECT * FROM main."MeasureData" '
+                                'WHERE "timeEpoch" >= :start AND "timeEpoch" < :end ORDER BY id LIMIT 50'),
+                           {"start": poczatek, "end": koniec})
+        connection.commit()
+        connection.exec_driver_sql("DETACH DATABASE part")
+
+    assert _klucze(partycje.query_measures(db, "DEV1", od, do)) == przed
+    assert partycje.count(db, "DEV1", od, do) == len(przed)
+    assert partycje.summarize(db, "DEV1", od, do) == pytest.approx(podsumowanie_przed)
+    assert _klucze(partycje.sample_measures(db, "DEV1", od, do, lambda liczba: list(range(liczba)))) == probka_przed
+
+    # Dokończone przeniesienie miesiąca
+    partycje.roll_month("202504")
+    assert partycje.count(db, "DEV1", od, do) == len(przed)
+
+
+def test_pierwszy_rekord_urzadzenia_z_partycji(baza):
+    engine, db, partycje = baza
+    pierwszy = partycje.first_measure(db, "DEV2").id
+    partycje.rollover(now=datetime(2025, 6, 20))
+    # Wszystkie rekordy DEV3 w partycji marca
+    db.add(MeasureData(**_rekord("DEV3", datetime(2025, 3, 5), 1.0)))
+    db.add(MeasureData(**_rekord("DEV1", datetime(2025, 6, 19), 1.0)))
+    db.commit()
+    partycje.roll_month("202503")
+    assert db.query(MeasureData).filter(MeasureData.deviceId == "DEV3").count() == 0
+
+    assert (partycje.first_measure(db, "DEV2").id, partycje.first_measure(db, "DEV3").currentTime) == \
+        (pierwszy, "2025-03-05 00:00:00")
+    assert partycje.first_measure(db, "BRAK") is None
+
+
+def test_archiwizacja_partycji(baza, tmp_path):
+    engine, db, partycje = baza
+    partycje.rollover(now=datetime(2025, 6, 20))
+    wszystkie = partycje.count(db, None)
+
+    poczatek, koniec = month_bounds("202503")
+    marzec = partycje.count(db, None, poczatek, koniec - 1)
+    sciezka = partycje.archive("202503", str(tmp_path / "archiwum"))
+    assert sciezka.endswith("MeasureData_202503.db")
+    assert partycje.list_partitions() == ["202504", "202505"]
+    assert partycje.count(db, None) == wszystkie - marzec
+
+    partycje.drop("202504")
+    assert partycje.list_partitions() == ["202505"]
+    with pytest.raises(ValueError):
+        partycje.drop("202504")
@@ -0,0 +1,127 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models.models import MeasureData, MeasureRollup
+from repositories.database import Base
+from repositories.measure_partitions import MeasurePartitions
+from repositories.measure_rollups import DAY, HOUR, MeasureRollups
+from routers.reports import calculate_incremental_sum, calculate_working_time
+from services.measure_values import with_typed_values
+
+START = datetime(2025, 5, 30, 22, 0)
+
+
+def _rekord(device_id: str, czas: datetime, speed: float, rate: float, total: float):
+    return with_typed_values({'deviceId': device_id, 'speed': f"{speed:.2f}", 'rate': f"{rate:.1f}",
+                              'total': f"{total:.1f}", 'currentTime': czas.strftime("%Y-%m-%d %H:%M:%S")})
+
+
+def _seria(device_id: str, liczba: int, losowanie: random.Random):
+    """Rekordy co 20-200 s z postojami (speed 0) i resetami licznika"""
+    czas, total, rekordy = START, 100.0, []
+    for _ in range(liczba):
+        speed = 0.0 if losowanie.random() < 0.3 else losowanie.uniform(0.5, 2.0)
+        total = 0.0 if losowanie.random() < 0.01 else total + losowanie.uniform(0, 3) * (speed > 0)
+        rekordy.append(_rekord(device_id, czas, speed, losowanie.uniform(0, 500), total))
+        czas += timedelta(seconds=losowanie.randint(20, 200))
+    return rekordy
+
+
+@pytest.fixture
+def baza(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'glowna.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    losowanie = random.Random(7)
+    rekordy = _seria("DEV1", 2500, losowanie)
+    # Paczka spóźnionych rekordów (MEASURE_BATCH po utracie połączenia) zapisana po nowszych
+    db.bulk_insert_mappings(MeasureData, rekordy[:1500] + rekordy[1700:] + _seria("DEV2", 300, losowanie))
+    db.commit()
+    db.bulk_insert_mappings(MeasureData, rekordy[1500:1700])
+    db.commit()
+    partycje = MeasurePartitions(engine, str(tmp_path / "partycje"), hot_months=1, batch_size=200)
+    yield db, partycje, MeasureRollups(engine, partycje, pause=0)
+    db.close()
+    engine.dispose()
+
+
+def _z_rekordow(db, partycje, device_id, od, do):
+    rekordy = partycje.query_measures(db, device_id, od, do)
+    return {
+        "total_records": len(rekordy),
+        "speed_max": max(m.speedValue for m in rekordy),
+        "rate_avg": sum(m.rateValue for m in rekordy) / len(rekordy),
+        "total_increment": calculate_incremental_sum([m.totalValue for m in rekordy]),
+        "working_hours": calculate_working_time(rekordy)[0],
+    }
+
+
+def _z_agregatow(agregaty, db, device_id, od, do):
+    wynik = agregaty.summarize(db, device_id, od, do)
+    return {
+        "total_records": wynik["total_records"],
+        "speed_max": wynik["speed_max"],
+        "rate_avg": wynik["rate_avg"],
+        "total_increment": wynik["total_increment"],
+        "working_hours": wynik["running_seconds"] / 3600.0,
+    }
+
+
+def _okresy():
+    poczatek = int(START.timestamp())
+    return [
+        (int(datetime(2025, 5, 31).timestamp()), int(datetime(2025, 6, 2).timestamp()) - 1),  # pełne doby
+        (poczatek + 4321, poczatek + 3 * DAY + 7 * HOUR + 123),                              # nierówne brzegi
+        (poczatek, poczatek + 20 * DAY),                                                     # cała seria
+    ]
+
+
+def test_agregaty_jak_rekordy(baza):
+    db, partycje, agregaty = baza
+    # Wyzwalacze oznaczyły przedziały ze spóźnionymi rekordami
+    assert db.query(MeasureRollup).filter(MeasureRollup.dirty == 1).count() > 0
+    agregaty._mark_ready()
+
+    for od, do in _okresy():
+        assert _z_agregatow(agregaty, db, "DEV1", od, do) == pytest.approx(_z_rekordow(db, partycje, "DEV1", od, do))
+
+    # Przeliczenie przedziałów dirty i przeniesienie miesięcy do partycji nie zmienia wyników
+    assert agregaty.refresh_dirty() > 0
+    assert db.query(MeasureRollup).filter(MeasureRollup.dirty == 1).count() == 0
+    partycje.rollover(now=datetime(2025, 6, 20))
+    assert partycje.list_partitions() == ["202505"]
+    for od, do in _okresy():
+        assert _z_agregatow(agregaty, db, "DEV1", od, do) == pytest.approx(_z_rekordow(db, partycje, "DEV1", od, do))
+
+
+def test_przebudowa_zakresu(baza):
+    db, partycje, agregaty = baza
+    agregaty.refresh_dirty()
+    stan = [(r.deviceId, r.resolution, r.bucket, r.count, r.totalIncrement, r.runningSeconds)
+            for r in db.query(MeasureRollup).order_by(MeasureRollup.deviceId, MeasureRollup.resolution,
+                                                      MeasureRollup.bucket)]
+    db.query(MeasureRollup).delete()
+    db.commit()
+    assert agregaty.rebuild() == len(stan)
+    db.expire_all()
+    assert [(r.deviceId, r.resolution, r.bucket, r.count, pytest.approx(r.totalIncrement), r.runningSeconds)
+            for r in db.query(MeasureRollup).order_by(MeasureRollup.deviceId, MeasureRollup.resolution,
+                                                      MeasureRollup.bucket)] == stan
+
+
+def test_rozdzielczosc_wykresu(baza):
+    _, _, agregaty = baza
+    doba = int(datetime(2025, 6, 1).timestamp())
+    assert agregaty.chart_resolution(doba, doba + DAY - 1, 500) == 60
+    # Przedziały godzinowe liczone od pełnych godzin epoki (strefy z przesunięciem o pół godziny - minuty)
+    assert agregaty.chart_resolution(doba, doba + 365 * DAY - 1, 500) == (HOUR if doba % HOUR == 0 else 60)
+    assert agregaty.chart_resolution(doba, doba + 2 * 365 * DAY - 1, 500) == DAY
+    # Granica okresu poza granicą przedziału - wykres z rekordów
+    assert agregaty.chart_resolution(doba + 30, doba + DAY - 1, 500) is None
@@ -0,0 +1,73 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine, text
+
+from repositories.migrations import LATEST_VERSION, apply_migrations, current_version
+
+
+def _plan(engine, sql):
+    with engine.connect() as connection:
+        return " ".join(row[3] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+
+def test_migracja_starej_bazy(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'stara.db'}")
+    with engine.begin() as connection:
+        connection.execute(text('CREATE TABLE "MeasureData" (id INTEGER PRIMARY KEY, "deviceId" VARCHAR, '
+                                'speed VARCHAR, rate VARCHAR, total VARCHAR, "currentTime" VARCHAR)'))
+        connection.execute(text('CREATE TABLE "Aliases" (id INTEGER PRIMARY KEY, "deviceId" VARCHAR)'))
+
+    assert current_version(engine) == 0
+    assert apply_migrations(engine) == list(range(1, LATEST_VERSION + 1))
+    assert current_version(engine) == LATEST_VERSION
+    # Ponowne uruchomienie niczego nie zmienia
+    assert apply_migrations(engine) == []
+
+    podsumowanie = _plan(engine, 'SELECT count(id), avg("rateValue"), sum("totalValue") FROM "MeasureData" '
+                                 'WHERE "deviceId" = \'DEV1\' AND "timeEpoch" >= 0 AND "timeEpoch" <= 100')
+    assert "COVERING INDEX ix_MeasureData_device_time" in podsumowanie
+    assert "ix_Aliases_deviceId" in _plan(engine, 'SELECT * FROM "Aliases" WHERE "deviceId" = \'DEV1\'')
+
+
+def test_wersja_docelowa(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baza.db'}")
+    assert apply_migrations(engine, target=1) == [1]
+    assert current_version(engine) == 1
+    assert apply_migrations(engine) == list(range(2, LATEST_VERSION + 1))
+
+
+def test_bez_zdublowanego_indeksu_urzadzenia(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baza.db'}")
+    with engine.begin() as connection:
+        connection.execute(text('CREATE TABLE "MeasureData" (id INTEGER PRIMARY KEY, "deviceId" VARCHAR, '
+                                'speed VARCHAR, rate VARCHAR, total VARCHAR, "currentTime" VARCHAR)'))
+    apply_migrations(engine)
+
+    # Filtr deviceId obsługuje prefiks ix_MeasureData_device_time - bez osobnego indeksu
+    with engine.connect() as connection:
+        indeksy = {row[0] for row in connection.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'MeasureData'"))}
+    assert "ix_MeasureData_deviceId" not in indeksy and "ix_MeasureData_device_time" in indeksy
+    plan = _plan(engine, 'SELECT * FROM "MeasureData" WHERE "deviceId" = \'DEV1\' ORDER BY id DESC LIMIT 1')
+    assert "ix_MeasureData_device_time" in plan
+
+
+def test_licznik_sumy_jako_integer(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baza.db'}")
+    with engine.begin() as connection:
+        connection.execute(text('CREATE TABLE "MeasureData" (id INTEGER PRIMARY KEY, "deviceId" VARCHAR, '
+                                'speed VARCHAR, rate VARCHAR, total VARCHAR, "currentTime" VARCHAR)'))
+    apply_migrations(engine)
+
+    # Kolumna INTEGER - licznik uint64 powyżej 2^53 zapisany dokładnie, ułamek jako REAL
+    licznik = 2 ** 60 + 1
+    with engine.begin() as connection:
+        connection.execute(text('INSERT INTO "MeasureData" ("deviceId", "totalValue") VALUES (\'DEV1\', :total)'),
+                           [{"total": 1000.5}, {"total": licznik}])
+    with engine.connect() as connection:
+        typy = {row[1]: row[2] for row in connection.execute(text('PRAGMA table_info("MeasureData")'))}
+        wartosci = connection.execute(text('SELECT "totalValue" FROM "MeasureData" ORDER BY id')).scalars().all()
+    assert (typy["totalValue"], typy["timeInvalid"]) == ("INTEGER", "INTEGER")
+    assert wartosci == [1000.5, licznik]
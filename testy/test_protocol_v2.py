@@ -0,0 +1,85 @@
+import struct
+
+import pytest
+
+pytest.importorskip("Crypto")
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models.models import MeasureData
+from repositories.database import Base
+from services.command_handler import CommandHandler
+from services.duplicate_filter import duplicate_frame_filter
+from services.frame_builder import build_request_frame
+from services.frame_view import FrameView, MeasureDataV2View, float32_text
+from services.measure_values import parse_epoch
+from services.protocol_schema import PROTOCOL_V1, PROTOCOL_V2, get_schema
+from services.support import ProtocolAnalyzer
+
+KEY1 = "Massensors"
+KEY2 = "text"
+POMIAR = dict(speed="0.85", rate="256.6", total="92346", currentTime="2025-06-15 10:56:03")
+
+
+def _ramka(version: int, device_id: str = "V2TEST0001", **pola) -> bytes:
+    return build_request_frame(device_id, 0x0003, encrypt=True, key1=KEY1, key2=KEY2,
+                               version=version, **{**POMIAR, **pola})
+
+
+def test_schemat_v2_jest_ponad_dwa_razy_mniejszy():
+    v1 = get_schema(0x0003, PROTOCOL_V1).request.size
+    v2 = get_schema(0x0003, PROTOCOL_V2).request.size
+    assert v2 * 2 < v1
+    # Komendy bez schematu VERSION 2 używają schematu VERSION 1
+    assert get_schema(0x0002, PROTOCOL_V2) is get_schema(0x0002, PROTOCOL_V1)
+
+
+def test_widok_v2_zwraca_te_same_teksty():
+    decoded, crc_ok = ProtocolAnalyzer.encode_data(_ramka(PROTOCOL_V2), 1000, KEY1, KEY2)
+    assert crc_ok
+    pomiar = ProtocolAnalyzer.parse_measure_data(decoded)
+    assert isinstance(pomiar, MeasureDataV2View)
+    assert (pomiar.speed, pomiar.rate, pomiar.total, pomiar.currentTime) == (
+        POMIAR["speed"], POMIAR["rate"], POMIAR["total"], POMIAR["currentTime"])
+    assert pomiar.deviceId == "V2TEST0001"
+    assert isinstance(FrameView(decoded).payload(), MeasureDataV2View)
+
+
+def test_float32_najkrotszy_zapis():
+    for tekst in ("0.85", "256.6", "0", "-1.5", "12345.67"):
+        wartosc = struct.unpack('>f', struct.pack('>f', float(tekst)))[0]
+        assert float32_text(wartosc) == tekst
+
+
+def test_zapis_v1_i_v2_w_bazie():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    handler = CommandHandler(KEY1, KEY2)
+    duplicate_frame_filter.clear()
+
+    odpowiedz_v1 = handler.process_frame(_ramka(PROTOCOL_V1, device_id="V1TEST0001"), db)
+    odpowiedz_v2 = handler.process_frame(_ramka(PROTOCOL_V2), db)
+
+    # Odpowiedź w wersji protokołu żądania
+    assert odpowiedz_v1.body[2] == PROTOCOL_V1
+    assert odpowiedz_v2.body[2] == PROTOCOL_V2
+    wiersze = {row.deviceId: row for row in db.query(MeasureData).all()}
+    for device_id in ("V1TEST0001", "V2TEST0001"):
+        row = wiersze[device_id]
+        assert (row.speed, row.rate, row.total, row.currentTime) == (
+            POMIAR["speed"], POMIAR["rate"], POMIAR["total"], POMIAR["currentTime"])
+
+
+def test_widok_v2_zwraca_liczby_bez_tekstu():
+    decoded, _ = ProtocolAnalyzer.encode_data(_ramka(PROTOCOL_V2), 1000, KEY1, KEY2)
+    pomiar = ProtocolAnalyzer.parse_measure_data(decoded)
+    wartosci = pomiar.typed_values()
+    assert wartosci['speedValue'] == struct.unpack('>f', struct.pack('>f', 0.85))[0]
+    assert (wartosci['totalValue'], wartosci['timeEpoch']) == (92346, parse_epoch(POMIAR["currentTime"]))
+    # Kolumny liczbowe nie budują pól tekstowych
+    assert not hasattr(pomiar, '_v_speed') and not hasattr(pomiar, '_v_currentTime')
+    assert pomiar.currentTime == POMIAR["currentTime"]
@@ -0,0 +1,89 @@
+import struct
+
+import pytest
+
+pytest.importorskip("Crypto")
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from repositories.database import Base
+from services.command_handler import CommandHandler
+from services.duplicate_filter import duplicate_frame_filter
+from services.frame_builder import build_request_frame, decrypt_frame
+from services.frame_view import FIELDS_START, SEGMENT_START
+from services.protocol_schema import PROTOCOL_V1, PROTOCOL_V2
+from services.report_interval import ReportIntervalPolicy, ReportIntervalStore, report_interval_store
+
+KEY1 = "Massensors"
+KEY2 = "text"
+
+
+def _ramka(version: int, device_id: str, speed: str, seq: int) -> bytes:
+    return build_request_frame(device_id, 0x0003, encrypt=True, key1=KEY1, key2=KEY2, version=version,
+                               seq_num=seq, speed=speed, rate="256.6", total="92346",
+                               currentTime="2025-06-15 10:56:03")
+
+
+def _baza():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine, autoflush=False)
+
+
+def test_polityka_zalezy_od_stanu():
+    db = _baza()()
+    store = ReportIntervalStore(ReportIntervalPolicy(running=5, stopped=120, service=1))
+    assert store.interval_for(db, "A", 1.2) == 5
+    assert store.interval_for(db, "A", 0.0) == 120
+    assert store.interval_for(db, "A", 0.0, service_session=True) == 1
+    store.set_policy(db, "A", ReportIntervalPolicy(running=2, stopped=600, service=1))
+    assert store.interval_for(db, "A", 0.0) == 600
+    assert store.interval_for(db, "B", 0.0) == 120
+    with pytest.raises(ValueError):
+        store.set_policy(db, "A", ReportIntervalPolicy(running=0))
+    db.close()
+
+
+def test_polityki_wspolne_dla_workerow_i_restartu():
+    sesje = _baza()
+    # Dwa workery uvicorn - osobne instancje z kopią tabeli w procesie
+    worker1 = ReportIntervalStore(ReportIntervalPolicy(), refresh_seconds=0)
+    worker2 = ReportIntervalStore(ReportIntervalPolicy(), refresh_seconds=0)
+    with sesje() as db:
+        worker1.set_policy(db, "A", ReportIntervalPolicy(running=2, stopped=600, service=1))
+        worker1.set_default(db, ReportIntervalPolicy(running=7, stopped=90, service=1))
+    with sesje() as db:
+        assert worker2.interval_for(db, "A", 0.0) == 600
+        assert worker2.interval_for(db, "B", 1.0) == 7
+        assert worker2.reset_policy(db, "A")
+        assert worker1.interval_for(db, "A", 0.0) == 90
+
+    # Restart - nowa instancja czyta polityki z bazy
+    with sesje() as db:
+        assert ReportIntervalStore().get_stats(db)["default"] == {"running": 7, "stopped": 90, "service": 1}
+
+
+def test_interwal_w_odpowiedzi_v2():
+    db = _baza()()
+    handler = CommandHandler(KEY1, KEY2)
+    duplicate_frame_filter.clear()
+    report_interval_store.set_policy(db, "RIVTEST001", ReportIntervalPolicy(running=3, stopped=300, service=1))
+    try:
+        wyniki = []
+        for seq, speed in enumerate(("1.5", "0")):
+            reply = decrypt_frame(handler.process_frame(_ramka(PROTOCOL_V2, "RIVTEST001", speed, seq), db).body,
+                                  KEY1, KEY2)
+            wyniki.append(struct.unpack_from('>H', reply, FIELDS_START)[0])
+        assert wyniki == [3, 300]
+
+        # VERSION 1 - odpowiedź bez pola reportInterval (DATA_LEN = STATUS + REQUEST)
+        reply = decrypt_frame(handler.process_frame(_ramka(PROTOCOL_V1, "RIVTEST001", "1.5", 9), db).body,
+                              KEY1, KEY2)
+        assert reply[SEGMENT_START] == 2
+    finally:
+        report_interval_store.reset_policy(db, "RIVTEST001")
+        report_interval_store.clear()
+        db.close()
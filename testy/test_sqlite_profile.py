@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from repositories.sqlite_profile import StorageMaintenance, StorageProfile, apply_profile, get_profile
+
+
+def test_profil_wal_i_polaczenia_tylko_do_odczytu(tmp_path):
+    sciezka = tmp_path / "baza.db"
+    writer = create_engine(f"sqlite:///{sciezka}")
+    reader = create_engine(f"sqlite:///{sciezka}")
+    apply_profile(writer, get_profile("balanced"))
+    apply_profile(reader, get_profile("balanced"), read_only=True)
+
+    with writer.begin() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        connection.execute(text("CREATE TABLE t (x INTEGER)"))
+        connection.execute(text("INSERT INTO t VALUES (1)"))
+
+    with reader.connect() as connection:
+        assert connection.execute(text("SELECT count(*) FROM t")).scalar() == 1
+        with pytest.raises(OperationalError):
+            connection.execute(text("INSERT INTO t VALUES (2)"))
+
+    # Odczyt w toku nie blokuje zapisu
+    with reader.connect() as odczyt:
+        odczyt.execute(text("BEGIN"))
+        odczyt.execute(text("SELECT count(*) FROM t")).scalar()
+        with writer.begin() as connection:
+            connection.execute(text("INSERT INTO t VALUES (3)"))
+        # Czytelnik widzi stan z początku swojej transakcji
+        assert odczyt.execute(text("SELECT count(*) FROM t")).scalar() == 1
+
+    wynik = StorageMaintenance(writer, interval=0).run_once("TRUNCATE")
+    assert wynik["busy"] == 0 and wynik["log"] == 0
+
+
+def test_walidacja_profilu():
+    assert StorageProfile(journal_mode="wal").validated().journal_mode == "WAL"
+    with pytest.raises(ValueError):
+        StorageProfile(synchronous="SOMETIMES").validated()
+    with pytest.raises(ValueError):
+        get_profile("turbo")
+
+
+def test_domyslny_profil_zachowuje_trwalosc(monkeypatch):
+    from repositories.sqlite_profile import env_profile
+    monkeypatch.delenv("SQLITE_PROFILE", raising=False)
+    monkeypatch.delenv("SQLITE_SYNCHRONOUS", raising=False)
+    assert env_profile().synchronous == "FULL"
+    monkeypatch.setenv("SQLITE_PROFILE", "balanced")
+    assert env_profile().synchronous == "NORMAL"
@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("Crypto")
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+
+from services.frame_builder import build_request_frame
+from services.tcp_listener import IntegratorTcpServer
+
+
+def test_odpowiedzi_w_kolejnosci_ramek_po_uszkodzonych_danych():
+    async def scenariusz():
+        server = IntegratorTcpServer("Massensors", "text")
+        # Zamiast obsługi w bazie - odsyłamy SEQ_NUM ramki
+        server.handle_frame = lambda db, frame: bytes([frame[20]])
+        await server.start("127.0.0.1", 0)
+        port = server._server.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            ramki = [build_request_frame("2341", 0x0001, seq_num=seq) for seq in (1, 2, 3)]
+            dane = b'\x00\xAA\x55\x01' + ramki[0] + ramki[1][:-1] + b'\x00' + ramki[2]
+            for i in range(0, len(dane), 5):
+                writer.write(dane[i:i + 5])
+            await writer.drain()
+            odpowiedz = await asyncio.wait_for(reader.readexactly(2), timeout=5)
+            writer.close()
+            return odpowiedz
+        finally:
+            await server.stop()
+
+    assert asyncio.run(scenariusz()) == bytes([1, 3])